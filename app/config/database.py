@@ -1,47 +1,94 @@
-from supabase import create_client, Client
+from supabase import create_client, Client, AsyncClient, AsyncClientOptions
 from supabase.client import ClientOptions
 from app.config.settings import settings
-import ssl
+from app.config.transport import create_async_http_client, create_sync_http_client
+from typing import Any, Callable
 import httpx
+import logging
 
-# Configurar opciones del cliente
-ssl_context = ssl.create_default_context()
-ssl_context.check_hostname = False
-ssl_context.verify_mode = ssl.CERT_NONE
+logger = logging.getLogger(__name__)
 
-http_client = httpx.Client(verify=False)
+class LazyClient:
+    """
+    Proxy que construye el cliente real en el primer acceso a un atributo.
+    Importar este módulo (y con él todos los servicios) no crea clientes ni
+    contextos SSL: el costo se paga en la primera petición o en las
+    verificaciones de arranque, que corren en segundo plano.
+    """
 
-client_options = ClientOptions(
-    httpx_client=http_client,
-    schema="public"
-)
+    __slots__ = ("_name", "_factory", "_instance")
 
-# ✅ Cliente anon - SOLO para autenticación temporal
-try:
-    supabase: Client = create_client(
-        settings.supabase_url,
-        settings.supabase_anon_key,
-        options=client_options
-    )
-    print(f"✅ Cliente Supabase anon creado")
-except Exception as e:
-    print(f"Error creando cliente Supabase: {e}")
-    supabase: Client = create_client(
-        settings.supabase_url,
-        settings.supabase_anon_key
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_instance", None)
+
+    def get_instance(self) -> Any:
+        instance = object.__getattribute__(self, "_instance")
+        if instance is None:
+            instance = object.__getattribute__(self, "_factory")()
+            object.__setattr__(self, "_instance", instance)
+        return instance
+
+    @property
+    def initialized(self) -> bool:
+        return object.__getattribute__(self, "_instance") is not None
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self.get_instance(), attr)
+
+    def __repr__(self) -> str:
+        estado = "creado" if self.initialized else "pendiente"
+        return f"<LazyClient {object.__getattribute__(self, '_name')} ({estado})>"
+
+def _create_sync_client(key: str, nombre: str) -> Client:
+    try:
+        client = create_client(
+            settings.supabase_url,
+            key,
+            options=ClientOptions(httpx_client=http_client.get_instance(), schema="public")
+        )
+        logger.info("Cliente Supabase %s creado", nombre)
+        return client
+    except Exception as e:
+        logger.error("Error creando cliente Supabase %s: %s", nombre, e)
+        return create_client(settings.supabase_url, key)
+
+def _async_client_options() -> AsyncClientOptions:
+    """Opciones por cliente (sesión propia) sobre el mismo pool HTTP"""
+    return AsyncClientOptions(
+        httpx_client=async_http_client.get_instance(),
+        schema="public"
     )
 
+def _create_async_client(key: str, nombre: str) -> AsyncClient:
+    client = AsyncClient(settings.supabase_url, key, options=_async_client_options())
+    logger.info("Cliente Supabase asíncrono %s creado", nombre)
+    return client
+
+http_client: httpx.Client = LazyClient("http_client", create_sync_http_client)
+
+# ✅ Cliente anon - SOLO para autenticación temporal
+supabase: Client = LazyClient("supabase", lambda: _create_sync_client(settings.supabase_anon_key, "anon"))
+
 # ✅ Cliente admin - Para TODAS las operaciones de datos
-try:
-    supabase_admin: Client = create_client(
-        settings.supabase_url,
-        settings.supabase_service_role_key,
-        options=client_options
-    )
-    print(f"✅ Cliente Supabase admin creado")
-except Exception as e:
-    print(f"Error creando cliente Supabase admin: {e}")
-    supabase_admin: Client = create_client(
-        settings.supabase_url,
-        settings.supabase_service_role_key
-    )
\ No newline at end of file
+supabase_admin: Client = LazyClient("supabase_admin", lambda: _create_sync_client(settings.supabase_service_role_key, "admin"))
+
+# ✅ Cliente HTTP asíncrono con pool compartido - no bloquea el event loop
+async_http_client: httpx.AsyncClient = LazyClient("async_http_client", create_async_http_client)
+
+# ✅ Clientes asíncronos - Usados por los servicios
+supabase_async: AsyncClient = LazyClient(
+    "supabase_async", lambda: _create_async_client(settings.supabase_anon_key, "anon")
+)
+
+supabase_admin_async: AsyncClient = LazyClient(
+    "supabase_admin_async", lambda: _create_async_client(settings.supabase_service_role_key, "admin")
+)
+
+async def close_clients() -> None:
+    """Cierra los pools HTTP (hook de apagado); los clientes no creados se ignoran"""
+    if async_http_client.initialized:
+        await async_http_client.aclose()
+    if http_client.initialized:
+        http_client.close()
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List, Optional
+from typing import Dict, List, Optional
 import os
 
 class Settings(BaseSettings):
@@ -14,6 +14,32 @@ class Settings(BaseSettings):
     debug: bool = False  # Cambiar a False para producción
     secret_key: str
     
+    # Logging estructurado
+    log_level: str = "INFO"
+    log_format: str = "json"  # "json" o "text"
+    log_levels: Dict[str, str] = {"httpx": "WARNING", "httpcore": "WARNING", "hpack": "WARNING"}  # Niveles por módulo
+    
+    # Métricas Prometheus en /metrics
+    metrics_enabled: bool = True
+    metrics_token: Optional[str] = None  # Si se define, /metrics exige "Authorization: Bearer <token>"
+    
+    # Perfilado por petición (cProfile); sin token ni muestreo el middleware no se instala
+    profiling_token: Optional[str] = None  # Habilita la cabecera "X-Profile: <token>" y /debug/profiles
+    profiling_sample_rate: float = 0.0
+    profiling_path_prefix: str = "/api/v1/"
+    profiling_store_size: int = 50
+    profiling_top_functions: int = 40
+    
+    # Administradores (IDs de usuario, JSON en la variable de entorno): entrenamiento del modelo y diagnósticos
+    admin_user_ids: List[str] = []
+    
+    # Verificaciones de arranque (en segundo plano)
+    startup_check_timeout_seconds: float = 15.0
+    
+    # Sondeos periódicos de Supabase para /readyz y /health
+    health_probe_interval_seconds: float = 30.0
+    health_probe_timeout_seconds: float = 5.0
+    
     # Configuración del servidor
     host: str = "0.0.0.0"
     port: int = int(os.getenv("PORT", 8000))  # Usar PORT de Render
@@ -28,6 +54,92 @@ class Settings(BaseSettings):
     
     # Configuración del bucket
     bucket_name: str = "monitoreo_bovinos_IA"
+    image_max_bytes: int = 10 * 1024 * 1024  # 10MB
+    image_variant_sizes: List[int] = [64, 256, 1024]  # Lado máximo en px de cada variante WebP
+    image_variant_quality: int = 80
+    image_process_workers: int = 2
+    image_dedup_cache_max_size: int = 10000
+    image_dedup_cache_ttl_seconds: int = 86400
+    image_sweeper_enabled: bool = True
+    image_sweep_interval_seconds: int = 3600
+    image_sweep_grace_seconds: int = 86400  # Objetos más recientes no se borran
+    
+    # Diagnóstico muestreado de peticiones (solo tamaños y tiempos, nunca contenidos)
+    diagnostics_routes: List[str] = ["/api/v1/images/"]  # Prefijos de ruta; lista vacía lo desactiva
+    diagnostics_sample_rate: float = 0.1
+    
+    # Configuración del pool HTTP asíncrono hacia Supabase
+    db_pool_max_connections: int = 100
+    db_pool_max_keepalive: int = 20
+    db_pool_keepalive_expiry_seconds: float = 60.0
+    db_pool_timeout_seconds: float = 10.0  # Espera máxima por una conexión libre del pool
+    db_timeout_seconds: float = 30.0
+    db_connect_timeout_seconds: float = 10.0
+    db_connect_retries: int = 2  # Solo fallos de conexión (seguros para POST)
+    db_http2: bool = True  # Requiere el paquete h2
+    db_verify_ssl: bool = True  # False solo en local (proxy con certificado propio)
+    
+    # Supabase en memoria para pruebas de carga sin red (app/fake_supabase)
+    fake_supabase_enabled: bool = False  # True: el pool HTTP usa el backend falso, nunca la red
+    fake_supabase_latency_ms: float = 0.0  # Latencia base inyectada por petición
+    fake_supabase_jitter_ms: float = 0.0  # Jitter uniforme adicional (0..jitter)
+    fake_supabase_seed: int = 0  # Semilla del jitter: corridas reproducibles
+    
+    # Verificación de tokens JWT de Supabase
+    supabase_jwt_secret: Optional[str] = None  # Secreto HS256 del proyecto (legacy)
+    supabase_jwks_url: Optional[str] = None  # Por defecto {supabase_url}/auth/v1/.well-known/jwks.json
+    jwt_audience: str = "authenticated"
+    jwt_leeway_seconds: int = 10
+    auth_force_remote_verification: bool = False  # True: siempre consulta auth.get_user
+    token_cache_max_size: int = 10000
+    token_cache_max_ttl_seconds: int = 300
+    
+    # Caché del índice de propiedad (bovino -> finca -> propietario)
+    ownership_cache_max_size: int = 50000
+    ownership_cache_ttl_seconds: int = 600
+    
+    # Carga masiva de mediciones
+    mediciones_batch_max_items: int = 5000
+    mediciones_batch_chunk_size: int = 500  # Filas por INSERT multi-fila
+    
+    # Paginación keyset de los listados
+    page_default_limit: int = 100
+    page_max_limit: int = 1000
+    
+    # Exportación en streaming
+    export_page_size: int = 1000  # Filas por página keyset
+    
+    # Caché de estadísticas (clave: recurso + conteo + última medición)
+    estadisticas_cache_max_size: int = 2000
+    estadisticas_cache_ttl_seconds: int = 3600
+    
+    # Caché de respuestas por usuario (listados de fincas y bovinos)
+    response_cache_enabled: bool = True
+    response_cache_ttl_seconds: float = 60.0  # En memoria cada worker invalida solo lo que escribe: cota de obsolescencia
+    response_cache_max_size: int = 10000
+    response_cache_redis_url: Optional[str] = None  # redis://host:6379/0: caché compartida entre workers (requiere el paquete redis)
+    
+    # GET condicionales: ETag desde marcas de agua (requiere migrations/001_updated_at.sql)
+    etag_enabled: bool = True
+    
+    # Sincronización incremental (GET /sync, requiere migrations/002_sync.sql)
+    sync_page_default_limit: int = 500
+    sync_page_max_limit: int = 2000
+    sync_safety_lag_seconds: float = 10.0  # Los cambios más recientes esperan a la siguiente sincronización
+    
+    # Compresión gzip de las respuestas (clientes en redes móviles lentas)
+    gzip_enabled: bool = True
+    gzip_minimum_size: int = 1000  # Bytes; las respuestas pequeñas no compensan el costo
+    gzip_compress_level: int = 6
+    
+    # Modelo de estimación de peso (ridge log-lineal)
+    peso_modelo_path: str = "data/modelo_peso.npz"  # Copia local; el disco de Render no sobrevive a un redeploy
+    peso_modelo_bucket: Optional[str] = None  # Bucket privado (ya creado) donde se publica el modelo; None: solo disco local
+    peso_modelo_object_key: str = "modelo_peso.npz"
+    peso_modelo_refresh_seconds: float = 60.0  # Cada cuánto un worker revisa si hay una versión nueva
+    peso_modelo_alpha: float = 1.0
+    peso_modelo_min_muestras: int = 30
+    estimacion_batch_max_items: int = 5000
     
     class Config:
         env_file = ".env"
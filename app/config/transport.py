@@ -0,0 +1,74 @@
+"""
+Capa de transporte HTTP hacia Supabase
+======================================
+
+Único lugar donde se configuran el pool de conexiones, keep-alive, HTTP/2,
+timeouts y reintentos. La usan todos los clientes de Supabase (PostgREST,
+storage, auth) y las llamadas directas a storage, de modo que cada petición
+reutiliza conexiones ya abiertas en lugar de repetir el handshake TCP+TLS.
+Con `fake_supabase_enabled` el transporte es el backend en memoria de
+app/fake_supabase (pruebas de carga sin red).
+
+Los reintentos son los del transporte de httpx: solo se repiten los fallos
+de conexión (antes de enviar la petición), así que son seguros para POST.
+"""
+from app.config.settings import settings
+from app.core.metrics import MetricsTransport
+import httpx
+import logging
+
+logger = logging.getLogger(__name__)
+
+def http2_enabled() -> bool:
+    """HTTP/2 requiere el paquete opcional `h2`; sin él se usa HTTP/1.1"""
+    if not settings.db_http2:
+        return False
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        logger.warning("db_http2 activo pero el paquete 'h2' no está instalado; se usa HTTP/1.1")
+        return False
+
+def pool_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.db_pool_max_connections,
+        max_keepalive_connections=settings.db_pool_max_keepalive,
+        keepalive_expiry=settings.db_pool_keepalive_expiry_seconds
+    )
+
+def timeouts() -> httpx.Timeout:
+    return httpx.Timeout(
+        settings.db_timeout_seconds,
+        connect=settings.db_connect_timeout_seconds,
+        pool=settings.db_pool_timeout_seconds
+    )
+
+def create_async_http_client() -> httpx.AsyncClient:
+    """Cliente asíncrono compartido; el transporte se mide para /metrics"""
+    if settings.fake_supabase_enabled:
+        # Import diferido: el backend falso no se carga en producción
+        from app.fake_supabase import get_fake_backend
+        logger.warning("fake_supabase_enabled activo: Supabase se sirve en memoria")
+        transport = get_fake_backend().async_transport()
+    else:
+        transport = httpx.AsyncHTTPTransport(
+            verify=settings.db_verify_ssl,
+            http2=http2_enabled(),
+            limits=pool_limits(),
+            retries=settings.db_connect_retries
+        )
+    return httpx.AsyncClient(transport=MetricsTransport(transport), timeout=timeouts())
+
+def create_sync_http_client() -> httpx.Client:
+    """Cliente síncrono (scripts y clientes sync de Supabase) con la misma configuración"""
+    if settings.fake_supabase_enabled:
+        from app.fake_supabase import get_fake_backend
+        return httpx.Client(transport=get_fake_backend().sync_transport(), timeout=timeouts())
+    transport = httpx.HTTPTransport(
+        verify=settings.db_verify_ssl,
+        http2=http2_enabled(),
+        limits=pool_limits(),
+        retries=settings.db_connect_retries
+    )
+    return httpx.Client(transport=transport, timeout=timeouts())
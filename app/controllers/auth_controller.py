@@ -2,7 +2,7 @@ from fastapi import APIRouter, HTTPException, status, Depends
 from app.models.auth import UserRegister, UserLogin, TokenResponse, PerfilUpdate, PerfilResponse
 from app.services.auth_service import auth_service
 from fastapi.security import HTTPAuthorizationCredentials  # 👈 Añade esto
-from app.middleware.auth import get_current_user, get_current_user_id, security  # Añadir security
+from app.middleware.auth import get_admin_user_id, get_current_user, get_current_user_id, security  # Añadir security
 from typing import Dict, Any
 
 router = APIRouter(prefix="/auth", tags=["Autenticación"])
@@ -127,3 +127,11 @@ async def verify_token(current_user: Dict[str, Any] = Depends(get_current_user))
         "user_id": current_user.get("id"),
         "email": current_user.get("email")
     }
+
+@router.get("/verify/stats")
+async def get_token_verification_stats(current_user_id: str = Depends(get_admin_user_id)):
+    """
+    Métricas de la caché de verificación de tokens (tasa de aciertos, verificaciones locales/remotas).
+    Solo administradores (settings.admin_user_ids)
+    """
+    return auth_service.get_token_cache_stats()
@@ -1,7 +1,10 @@
-from fastapi import APIRouter, HTTPException, status, Depends, Query
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Request, Response
 from app.models.bovino import BovinoCreate, BovinoUpdate, BovinoResponse, BovinoWithMediciones
 from app.services.bovino_service import bovino_service
+from app.services.etag_service import etag_service
 from app.middleware.auth import get_current_user_id
+from app.middleware.etag import check_etag
+from app.middleware.pagination import PageParams, page_params, set_page_headers
 from typing import List, Optional
 import uuid
 
@@ -28,14 +31,25 @@ async def create_bovino(
 @router.get("/finca/{finca_id}", response_model=List[BovinoResponse])
 async def get_bovinos_by_finca(
     finca_id: str,
+    request: Request,
+    response: Response,
+    pagina: PageParams = Depends(page_params()),
     current_user_id: str = Depends(get_current_user_id)
 ):
     """
-    Obtiene todos los bovinos de una finca específica
+    Obtiene los bovinos de una finca específica con paginación por cursor
     """
     try:
-        bovinos = await bovino_service.get_bovinos_by_finca(finca_id, current_user_id)
-        return bovinos
+        etag = await etag_service.bovinos_finca(finca_id, current_user_id, pagina.to_dict())
+        no_modificado = check_etag(request, response, etag)
+        if no_modificado:
+            return no_modificado
+        
+        bovinos = await bovino_service.get_bovinos_by_finca(
+            finca_id, current_user_id, pagina.limit, pagina.after, pagina.with_count
+        )
+        set_page_headers(response, bovinos)
+        return bovinos.items
     
     except Exception as e:
         raise HTTPException(
@@ -46,12 +60,18 @@ async def get_bovinos_by_finca(
 @router.get("/{bovino_id}", response_model=BovinoResponse)
 async def get_bovino_by_id(
     bovino_id: str,
+    request: Request,
+    response: Response,
     current_user_id: str = Depends(get_current_user_id)
 ):
     """
     Obtiene un bovino específico del usuario actual
     """
     try:
+        no_modificado = check_etag(request, response, await etag_service.bovino(bovino_id, current_user_id))
+        if no_modificado:
+            return no_modificado
+        
         bovino = await bovino_service.get_bovino_by_id(bovino_id, current_user_id)
         
         if not bovino:
@@ -117,12 +137,18 @@ async def delete_bovino(
 @router.get("/{bovino_id}/with-mediciones", response_model=BovinoWithMediciones)
 async def get_bovino_with_mediciones(
     bovino_id: str,
+    request: Request,
+    response: Response,
     current_user_id: str = Depends(get_current_user_id)
 ):
     """
     Obtiene un bovino con todas sus mediciones
     """
     try:
+        no_modificado = check_etag(request, response, await etag_service.bovino(bovino_id, current_user_id, mediciones=True))
+        if no_modificado:
+            return no_modificado
+        
         bovino = await bovino_service.get_bovino_with_mediciones(bovino_id, current_user_id)
         
         if not bovino:
@@ -143,6 +169,8 @@ async def get_bovino_with_mediciones(
 
 @router.get("/search/by-id", response_model=List[BovinoResponse])
 async def search_bovinos_by_id(
+    request: Request,
+    response: Response,
     id_bovino: str = Query(..., description="ID del bovino (placa/arete) a buscar"),
     current_user_id: str = Depends(get_current_user_id)
 ):
@@ -150,6 +178,11 @@ async def search_bovinos_by_id(
     Busca bovinos por ID de bovino (placa/arete)
     """
     try:
+        etag = await etag_service.bovinos_usuario(current_user_id, {"id_bovino": id_bovino})
+        no_modificado = check_etag(request, response, etag)
+        if no_modificado:
+            return no_modificado
+        
         bovinos = await bovino_service.search_bovinos_by_id(id_bovino, current_user_id)
         return bovinos
     
@@ -0,0 +1,148 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+from app.models.estimacion import (
+    MedidasMorfometricas,
+    EstimacionPeso,
+    EstimacionPesoBatchRequest,
+    EstimacionPesoBatchResponse,
+    EstimacionPesoFincaResponse,
+    ModeloPesoInfo,
+    EntrenamientoPesoRequest
+)
+from app.config.settings import settings
+from app.services.estimacion_peso_service import estimacion_peso_service
+from app.middleware.auth import get_admin_user_id, get_current_user_id
+import logging
+
+# Configurar logger para el controlador
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/estimacion", tags=["Estimación de peso"])
+
+def _modelo_no_disponible(e: LookupError) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+
+@router.post("/peso", response_model=EstimacionPeso)
+async def estimar_peso(
+    medidas: MedidasMorfometricas,
+    current_user_id: str = Depends(get_current_user_id)
+):
+    """
+    Estima el peso de un bovino a partir de sus medidas morfométricas
+    """
+    try:
+        await estimacion_peso_service.refrescar_modelo()
+        estimacion = estimacion_peso_service.estimar([medidas.model_dump()])[0]
+        return EstimacionPeso(referencia=medidas.referencia, **estimacion)
+    
+    except LookupError as e:
+        raise _modelo_no_disponible(e)
+    except Exception as e:
+        logger.error(f"Error al estimar peso: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al estimar peso: {str(e)}"
+        )
+
+@router.post("/peso/batch", response_model=EstimacionPesoBatchResponse)
+async def estimar_peso_batch(
+    request: EstimacionPesoBatchRequest,
+    current_user_id: str = Depends(get_current_user_id)
+):
+    """
+    Estima el peso de muchos bovinos (p. ej. un corral completo) en una sola llamada
+    """
+    try:
+        max_items = settings.estimacion_batch_max_items
+        if len(request.medidas) > max_items:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"No se pueden estimar más de {max_items} bovinos por lote"
+            )
+        
+        await estimacion_peso_service.refrescar_modelo()
+        estimaciones = estimacion_peso_service.estimar([medidas.model_dump() for medidas in request.medidas])
+        return EstimacionPesoBatchResponse(
+            estimaciones=[
+                EstimacionPeso(referencia=medidas.referencia, **estimacion)
+                for medidas, estimacion in zip(request.medidas, estimaciones)
+            ],
+            total=len(estimaciones)
+        )
+    
+    except HTTPException:
+        raise
+    except LookupError as e:
+        raise _modelo_no_disponible(e)
+    except Exception as e:
+        logger.error(f"Error al estimar peso en lote: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al estimar peso: {str(e)}"
+        )
+
+@router.get("/finca/{finca_id}", response_model=EstimacionPesoFincaResponse)
+async def estimar_peso_finca(
+    finca_id: str,
+    current_user_id: str = Depends(get_current_user_id)
+):
+    """
+    Estima el peso de todos los bovinos de una finca con su última medición
+    """
+    try:
+        logger.info(f"Estimando peso de los bovinos de la finca: {finca_id}")
+        estimaciones = await estimacion_peso_service.estimar_finca(finca_id, current_user_id)
+        return EstimacionPesoFincaResponse(
+            finca_id=finca_id,
+            estimaciones=estimaciones,
+            total_bovinos_estimados=len(estimaciones)
+        )
+    
+    except LookupError as e:
+        raise _modelo_no_disponible(e)
+    except PermissionError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error al estimar peso de la finca {finca_id}: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al estimar peso: {str(e)}"
+        )
+
+@router.get("/modelo", response_model=ModeloPesoInfo)
+async def get_modelo_peso(current_user_id: str = Depends(get_current_user_id)):
+    """
+    Información del modelo de estimación de peso entrenado
+    """
+    await estimacion_peso_service.refrescar_modelo()
+    modelo = estimacion_peso_service.get_modelo()
+    if modelo is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Modelo de estimación de peso no entrenado"
+        )
+    return modelo.info()
+
+@router.post("/modelo/entrenar", response_model=ModeloPesoInfo)
+async def entrenar_modelo_peso(
+    request: Optional[EntrenamientoPesoRequest] = None,
+    current_user_id: str = Depends(get_admin_user_id)
+):
+    """
+    Entrena el modelo con las mediciones que tienen peso de báscula de todas las
+    fincas. Solo administradores (settings.admin_user_ids).
+    """
+    try:
+        logger.info(f"Entrenando modelo de estimación de peso (solicitado por {current_user_id})")
+        info = await estimacion_peso_service.entrenar(request.alpha if request else None)
+        logger.info(f"Modelo entrenado con {info['muestras']} mediciones")
+        return info
+    
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error al entrenar modelo de peso: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al entrenar modelo: {str(e)}"
+        )
@@ -1,7 +1,10 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Request, Response
 from app.models.finca import FincaCreate, FincaUpdate, FincaResponse, FincaWithBovinos, FincaWithBovinosAndMediciones
 from app.services.finca_service import finca_service
+from app.services.etag_service import etag_service
 from app.middleware.auth import get_current_user_id
+from app.middleware.etag import check_etag
+from app.middleware.pagination import PageParams, page_params, set_page_headers
 from typing import List
 import uuid
 
@@ -26,13 +29,23 @@ async def create_finca(
         )
 
 @router.get("/", response_model=List[FincaResponse])
-async def get_my_fincas(current_user_id: str = Depends(get_current_user_id)):
+async def get_my_fincas(
+    request: Request,
+    response: Response,
+    pagina: PageParams = Depends(page_params()),
+    current_user_id: str = Depends(get_current_user_id)
+):
     """
-    Obtiene todas las fincas del usuario actual
+    Obtiene las fincas del usuario actual con paginación por cursor
     """
     try:
-        fincas = await finca_service.get_fincas_by_user(current_user_id)
-        return fincas
+        no_modificado = check_etag(request, response, await etag_service.fincas_usuario(current_user_id, pagina.to_dict()))
+        if no_modificado:
+            return no_modificado
+        
+        fincas = await finca_service.get_fincas_by_user(current_user_id, pagina.limit, pagina.after, pagina.with_count)
+        set_page_headers(response, fincas)
+        return fincas.items
     
     except Exception as e:
         raise HTTPException(
@@ -43,12 +56,18 @@ async def get_my_fincas(current_user_id: str = Depends(get_current_user_id)):
 @router.get("/{finca_id}", response_model=FincaResponse)
 async def get_finca_by_id(
     finca_id: str,
+    request: Request,
+    response: Response,
     current_user_id: str = Depends(get_current_user_id)
 ):
     """
     Obtiene una finca específica del usuario actual
     """
     try:
+        no_modificado = check_etag(request, response, await etag_service.finca(finca_id, current_user_id))
+        if no_modificado:
+            return no_modificado
+        
         finca = await finca_service.get_finca_by_id(finca_id, current_user_id)
         
         if not finca:
@@ -114,13 +133,23 @@ async def delete_finca(
 @router.get("/{finca_id}/with-bovinos", response_model=FincaWithBovinos)
 async def get_finca_with_bovinos(
     finca_id: str,
+    request: Request,
+    response: Response,
+    pagina: PageParams = Depends(page_params()),
     current_user_id: str = Depends(get_current_user_id)
 ):
     """
-    Obtiene una finca con todos sus bovinos
+    Obtiene una finca con sus bovinos (paginados por cursor)
     """
     try:
-        finca = await finca_service.get_finca_with_bovinos(finca_id, current_user_id)
+        etag = await etag_service.finca(finca_id, current_user_id, pagina.to_dict(), bovinos=True)
+        no_modificado = check_etag(request, response, etag)
+        if no_modificado:
+            return no_modificado
+        
+        finca, bovinos = await finca_service.get_finca_with_bovinos(
+            finca_id, current_user_id, pagina.limit, pagina.after, pagina.with_count
+        )
         
         if not finca:
             raise HTTPException(
@@ -128,6 +157,7 @@ async def get_finca_with_bovinos(
                 detail="Finca no encontrada"
             )
         
+        set_page_headers(response, bovinos)
         return finca
     
     except HTTPException:
@@ -141,12 +171,19 @@ async def get_finca_with_bovinos(
 @router.get("/{finca_id}/complete", response_model=FincaWithBovinosAndMediciones)
 async def get_finca_complete(
     finca_id: str,
+    request: Request,
+    response: Response,
     current_user_id: str = Depends(get_current_user_id)
 ):
     """
     Obtiene una finca completa con todos sus bovinos y la última medición de cada uno
     """
     try:
+        etag = await etag_service.finca(finca_id, current_user_id, bovinos=True, mediciones=True)
+        no_modificado = check_etag(request, response, etag)
+        if no_modificado:
+            return no_modificado
+        
         finca_completa = await finca_service.get_finca_with_bovinos_and_mediciones(finca_id, current_user_id)
         
         if not finca_completa:
@@ -1,14 +1,47 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from typing import List
 from datetime import date
 from app.models.medicion import MedicionCreate, MedicionUpdate, MedicionResponse
+from app.config.settings import settings
 from app.services.medicion_service import medicion_service
+from app.services.export_service import export_service, EXPORT_FORMATS, DEFAULT_EXPORT_FORMAT
+from app.services.etag_service import etag_service
 from app.middleware.auth import get_current_user_id
+from app.middleware.etag import check_etag, etag_headers
+from app.middleware.pagination import PageParams, page_params, set_page_headers
+from app.utils.json_response import FastJSONResponse
 import logging
 
 # Configurar logger para el controlador
 logger = logging.getLogger(__name__)
 
+# Formatos aceptados por los endpoints de exportación
+EXPORT_FORMAT_REGEX = f"^({'|'.join(EXPORT_FORMATS)})$"
+
+def _export_response(stream, formato: str, nombre_base: str) -> StreamingResponse:
+    """Respuesta en streaming con el tipo de contenido y nombre de archivo del formato"""
+    return StreamingResponse(
+        stream,
+        media_type=EXPORT_FORMATS[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nombre_base}_{date.today().isoformat()}.{formato}"'}
+    )
+
+async def _export(export_call, formato: str, nombre_base: str) -> StreamingResponse:
+    """Valida el formato y los permisos antes de iniciar el streaming"""
+    if formato == "parquet" and not export_service.parquet_available():
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Exportación Parquet no disponible: requiere pyarrow"
+        )
+    
+    try:
+        stream = await export_call()
+    except PermissionError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    
+    return _export_response(stream, formato, nombre_base)
+
 router = APIRouter(prefix="/mediciones", tags=["Mediciones"])
 
 @router.post("/", response_model=MedicionResponse, status_code=status.HTTP_201_CREATED)
@@ -38,24 +71,56 @@ async def create_medicion(
             detail=str(e)
         )
 
+@router.get("/export")
+async def export_mediciones_cuenta(
+    formato: str = Query(default=DEFAULT_EXPORT_FORMAT, pattern=EXPORT_FORMAT_REGEX, description="Formato de exportación: json, csv, ndjson o parquet"),
+    current_user_id: str = Depends(get_current_user_id)
+):
+    """
+    Exporta en streaming todas las mediciones de la cuenta del usuario actual
+    """
+    try:
+        logger.info(f"Exportando mediciones de la cuenta en formato {formato}")
+        return await _export(
+            lambda: export_service.export_cuenta(current_user_id, formato),
+            formato,
+            "mediciones_cuenta"
+        )
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error en exportación de cuenta: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error en exportación: {str(e)}"
+        )
+
 @router.get("/bovino/{bovino_id}", response_model=List[MedicionResponse])
 async def get_mediciones_by_bovino(
     bovino_id: str,
-    limit: int = Query(default=50, ge=1, le=100, description="Número máximo de mediciones a devolver"),
+    request: Request,
+    response: Response,
+    pagina: PageParams = Depends(page_params(default_limit=50, max_limit=100)),
     current_user_id: str = Depends(get_current_user_id)
 ):
     """
-    Obtiene todas las mediciones de un bovino específico con paginación
+    Obtiene las mediciones de un bovino específico (más recientes primero) con paginación por cursor
     """
     try:
-        logger.info(f"Obteniendo mediciones para bovino: {bovino_id}, limit: {limit}")
-        mediciones = await medicion_service.get_mediciones_by_bovino(bovino_id, current_user_id)
+        etag = await etag_service.mediciones_bovino(bovino_id, current_user_id, {"ruta": "list", **pagina.to_dict()})
+        no_modificado = check_etag(request, response, etag)
+        if no_modificado:
+            return no_modificado
         
-        # Aplicar límite de resultados
-        mediciones_limitadas = mediciones[:limit] if mediciones else []
+        logger.info(f"Obteniendo mediciones para bovino: {bovino_id}, limit: {pagina.limit}")
+        mediciones = await medicion_service.get_mediciones_by_bovino(
+            bovino_id, current_user_id, pagina.limit, pagina.after, pagina.with_count
+        )
+        set_page_headers(response, mediciones)
         
-        logger.info(f"Devolviendo {len(mediciones_limitadas)} mediciones de {len(mediciones)} totales")
-        return mediciones_limitadas
+        logger.info(f"Devolviendo {len(mediciones.items)} mediciones")
+        return mediciones.items
     
     except Exception as e:
         logger.error(f"Error al obtener mediciones del bovino {bovino_id}: {str(e)}")
@@ -67,12 +132,18 @@ async def get_mediciones_by_bovino(
 @router.get("/{medicion_id}", response_model=MedicionResponse)
 async def get_medicion_by_id(
     medicion_id: str,
+    request: Request,
+    response: Response,
     current_user_id: str = Depends(get_current_user_id)
 ):
     """
     Obtiene una medición específica del usuario actual
     """
     try:
+        no_modificado = check_etag(request, response, await etag_service.medicion(medicion_id, current_user_id))
+        if no_modificado:
+            return no_modificado
+        
         logger.info(f"Obteniendo medición: {medicion_id}")
         medicion = await medicion_service.get_medicion_by_id(medicion_id, current_user_id)
         
@@ -156,6 +227,8 @@ async def delete_medicion(
 @router.get("/bovino/{bovino_id}/range", response_model=List[MedicionResponse])
 async def get_mediciones_by_date_range(
     bovino_id: str,
+    request: Request,
+    response: Response,
     fecha_inicio: date = Query(..., description="Fecha de inicio (YYYY-MM-DD)"),
     fecha_fin: date = Query(..., description="Fecha de fin (YYYY-MM-DD)"),
     current_user_id: str = Depends(get_current_user_id)
@@ -171,6 +244,13 @@ async def get_mediciones_by_date_range(
                 detail="La fecha de inicio no puede ser posterior a la fecha de fin"
             )
         
+        etag = await etag_service.mediciones_bovino(
+            bovino_id, current_user_id, {"ruta": "range", "desde": str(fecha_inicio), "hasta": str(fecha_fin)}
+        )
+        no_modificado = check_etag(request, response, etag)
+        if no_modificado:
+            return no_modificado
+        
         logger.info(f"Obteniendo mediciones de {bovino_id} del {fecha_inicio} al {fecha_fin}")
         mediciones = await medicion_service.get_mediciones_by_fecha_range(
             bovino_id, fecha_inicio, fecha_fin, current_user_id
@@ -191,12 +271,18 @@ async def get_mediciones_by_date_range(
 @router.get("/bovino/{bovino_id}/ultima", response_model=MedicionResponse)
 async def get_ultima_medicion_bovino(
     bovino_id: str,
+    request: Request,
+    response: Response,
     current_user_id: str = Depends(get_current_user_id)
 ):
     """
     Obtiene la última medición de un bovino
     """
     try:
+        no_modificado = check_etag(request, response, await etag_service.mediciones_bovino(bovino_id, current_user_id, {"ruta": "ultima"}))
+        if no_modificado:
+            return no_modificado
+        
         logger.info(f"Obteniendo última medición de bovino: {bovino_id}")
         medicion = await medicion_service.get_ultima_medicion_bovino(bovino_id, current_user_id)
         
@@ -224,16 +310,24 @@ async def get_ultima_medicion_bovino(
 @router.get("/bovino/{bovino_id}/estadisticas")
 async def get_estadisticas_mediciones_bovino(
     bovino_id: str,
+    request: Request,
+    response: Response,
     current_user_id: str = Depends(get_current_user_id)
 ):
     """
     Obtiene estadísticas de las mediciones de un bovino
     """
     try:
+        etag = await etag_service.mediciones_bovino(bovino_id, current_user_id, {"ruta": "estadisticas"})
+        no_modificado = check_etag(request, response, etag)
+        if no_modificado:
+            return no_modificado
+        
         logger.info(f"Obteniendo estadísticas de mediciones para bovino: {bovino_id}")
         estadisticas = await medicion_service.get_estadisticas_mediciones_bovino(bovino_id, current_user_id)
         logger.info(f"Estadísticas calculadas para bovino {bovino_id}")
-        return estadisticas
+        # Sin response_model: se serializa directamente, sin pasar por jsonable_encoder
+        return FastJSONResponse(estadisticas, headers=etag_headers(etag))
     
     except Exception as e:
         logger.error(f"Error al obtener estadísticas: {str(e)}")
@@ -242,6 +336,34 @@ async def get_estadisticas_mediciones_bovino(
             detail=f"Error al calcular estadísticas: {str(e)}"
         )
 
+@router.get("/finca/{finca_id}/estadisticas")
+async def get_estadisticas_mediciones_finca(
+    finca_id: str,
+    request: Request,
+    response: Response,
+    current_user_id: str = Depends(get_current_user_id)
+):
+    """
+    Obtiene estadísticas agregadas de las mediciones de todos los bovinos de una finca
+    """
+    try:
+        etag = await etag_service.mediciones_finca(finca_id, current_user_id, {"ruta": "estadisticas"})
+        no_modificado = check_etag(request, response, etag)
+        if no_modificado:
+            return no_modificado
+        
+        logger.info(f"Obteniendo estadísticas de mediciones para finca: {finca_id}")
+        estadisticas = await medicion_service.get_estadisticas_mediciones_finca(finca_id, current_user_id)
+        logger.info(f"Estadísticas calculadas para finca {finca_id}: {estadisticas['total_bovinos']} bovinos")
+        return FastJSONResponse(estadisticas, headers=etag_headers(etag))
+    
+    except Exception as e:
+        logger.error(f"Error al obtener estadísticas de finca: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al calcular estadísticas: {str(e)}"
+        )
+
 @router.post("/bovino/{bovino_id}/batch", response_model=List[MedicionResponse], status_code=status.HTTP_201_CREATED)
 async def create_mediciones_batch(
     bovino_id: str,
@@ -252,28 +374,18 @@ async def create_mediciones_batch(
     Crea múltiples mediciones para un bovino de una vez
     """
     try:
-        if len(mediciones_data) > 50:  # Límite de mediciones por lote
+        max_items = settings.mediciones_batch_max_items
+        if len(mediciones_data) > max_items:  # Límite de mediciones por lote
             raise HTTPException(
                 status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-                detail="No se pueden crear más de 50 mediciones por lote"
+                detail=f"No se pueden crear más de {max_items} mediciones por lote"
             )
         
         logger.info(f"Creando {len(mediciones_data)} mediciones en lote para bovino: {bovino_id}")
         
-        mediciones_creadas = []
-        errores = []
-        
-        for i, medicion_data in enumerate(mediciones_data):
-            try:
-                # Verificar que el bovino_id coincida
-                if str(medicion_data.bovino_id) != bovino_id:
-                    errores.append(f"Medición {i+1}: bovino_id no coincide")
-                    continue
-                
-                medicion = await medicion_service.create_medicion(medicion_data, current_user_id)
-                mediciones_creadas.append(medicion)
-            except Exception as e:
-                errores.append(f"Medición {i+1}: {str(e)}")
+        resultado = await medicion_service.create_mediciones_bulk(bovino_id, mediciones_data, current_user_id)
+        mediciones_creadas = resultado["creadas"]
+        errores = [f"Medición {error['indice'] + 1}: {error['error']}" for error in resultado["errores"]]
         
         if errores and not mediciones_creadas:
             # Si todas fallaron
@@ -300,33 +412,19 @@ async def create_mediciones_batch(
 @router.get("/bovino/{bovino_id}/export")
 async def export_mediciones_bovino(
     bovino_id: str,
-    formato: str = Query(default="json", regex="^(json|csv)$", description="Formato de exportación: json o csv"),
+    formato: str = Query(default=DEFAULT_EXPORT_FORMAT, pattern=EXPORT_FORMAT_REGEX, description="Formato de exportación: json, csv, ndjson o parquet"),
     current_user_id: str = Depends(get_current_user_id)
 ):
     """
-    Exporta todas las mediciones de un bovino en formato JSON o CSV
+    Exporta todas las mediciones de un bovino en streaming (JSON, CSV, NDJSON o Parquet)
     """
     try:
         logger.info(f"Exportando mediciones de bovino {bovino_id} en formato {formato}")
-        mediciones = await medicion_service.get_mediciones_by_bovino(bovino_id, current_user_id)
-        
-        if formato == "csv":
-            # Para implementación futura de CSV
-            raise HTTPException(
-                status_code=status.HTTP_501_NOT_IMPLEMENTED,
-                detail="Exportación CSV no implementada aún"
-            )
-        
-        # Formato JSON (por defecto)
-        export_data = {
-            "bovino_id": bovino_id,
-            "total_mediciones": len(mediciones),
-            "fecha_exportacion": date.today().isoformat(),
-            "mediciones": mediciones
-        }
-        
-        logger.info(f"Exportación completada: {len(mediciones)} mediciones")
-        return export_data
+        return await _export(
+            lambda: export_service.export_bovino(bovino_id, current_user_id, formato),
+            formato,
+            f"mediciones_bovino_{bovino_id}"
+        )
     
     except HTTPException:
         raise
@@ -336,3 +434,29 @@ async def export_mediciones_bovino(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error en exportación: {str(e)}"
         )
+
+@router.get("/finca/{finca_id}/export")
+async def export_mediciones_finca(
+    finca_id: str,
+    formato: str = Query(default=DEFAULT_EXPORT_FORMAT, pattern=EXPORT_FORMAT_REGEX, description="Formato de exportación: json, csv, ndjson o parquet"),
+    current_user_id: str = Depends(get_current_user_id)
+):
+    """
+    Exporta las mediciones de todos los bovinos de una finca en streaming
+    """
+    try:
+        logger.info(f"Exportando mediciones de finca {finca_id} en formato {formato}")
+        return await _export(
+            lambda: export_service.export_finca(finca_id, current_user_id, formato),
+            formato,
+            f"mediciones_finca_{finca_id}"
+        )
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error en exportación de finca: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error en exportación: {str(e)}"
+        )
@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse, Response
+from typing import Any, Dict, List, Optional
+from app.config.settings import settings
+from app.core.profiling import SORT_KEYS
+from app.middleware.profiling import profile_store
+import hmac
+
+router = APIRouter(prefix="/debug/profiles", tags=["Diagnóstico"], include_in_schema=False)
+
+async def require_profiling_token(x_profile: Optional[str] = Header(None)) -> None:
+    """Los perfiles exponen rutas internas del código: exigen el token de perfilado"""
+    if not settings.profiling_token or not x_profile or not hmac.compare_digest(x_profile, settings.profiling_token):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+
+@router.get("/", dependencies=[Depends(require_profiling_token)])
+async def list_profiles() -> List[Dict[str, Any]]:
+    """Perfiles capturados (más reciente primero)"""
+    return profile_store.list()
+
+@router.get("/{profile_id}", dependencies=[Depends(require_profiling_token)])
+async def get_profile(
+    profile_id: str,
+    formato: str = Query("text", pattern="^(text|pstats)$"),
+    sort: str = Query("cumulative"),
+    limit: int = Query(settings.profiling_top_functions, ge=1, le=500)
+):
+    """
+    Informe de texto de un perfil, o las estadísticas crudas con
+    `formato=pstats` (se abren con `python -m pstats` o snakeviz)
+    """
+    if sort not in SORT_KEYS:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"sort debe ser uno de {SORT_KEYS}")
+
+    if formato == "pstats":
+        raw = profile_store.raw(profile_id)
+        if raw is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Perfil no encontrado")
+        return Response(raw, media_type="application/octet-stream", headers={
+            "Content-Disposition": f'attachment; filename="{profile_id}.prof"'
+        })
+
+    report = profile_store.report(profile_id, sort=sort, limit=limit)
+    if report is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Perfil no encontrado")
+    return PlainTextResponse(report)
@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import Optional
+from app.config.settings import settings
+from app.services.sync_service import sync_service
+from app.middleware.auth import get_current_user_id
+from app.utils.json_response import FastJSONResponse
+import logging
+
+# Configurar logger para el controlador
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/sync", tags=["Sincronización"])
+
+@router.get("/")
+async def get_cambios(
+    since: Optional[str] = Query(default=None, description="Watermark de la sincronización anterior (vacío: todo)"),
+    limit: int = Query(default=settings.sync_page_default_limit, ge=1, le=settings.sync_page_max_limit,
+                       description="Máximo de elementos (fincas, bovinos, mediciones y bajas) por respuesta"),
+    current_user_id: str = Depends(get_current_user_id)
+):
+    """
+    Cambios del usuario después de `since`: fincas, bovinos y mediciones creados
+    o editados y las bajas (`eliminados`). Guardar `watermark` y repetir mientras
+    `has_more` sea verdadero. Las bajas incluyen los hijos borrados en cascada.
+    """
+    try:
+        cambios = await sync_service.get_cambios(current_user_id, since, limit)
+        # Sin response_model: se serializa directamente, sin pasar por jsonable_encoder
+        return FastJSONResponse(cambios)
+
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Error al sincronizar cambios: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al sincronizar: {str(e)}"
+        )
@@ -0,0 +1,112 @@
+"""
+Salud de los servicios de Supabase
+==================================
+
+Una tarea de fondo sondea PostgREST, storage y auth cada
+`health_probe_interval_seconds` (con timeout por sondeo) y guarda el último
+resultado. `/readyz` y `/health` solo leen ese resultado: las consultas del
+balanceador nunca generan llamadas a Supabase.
+"""
+from app.config.database import supabase_admin_async, async_http_client
+from app.config.settings import settings
+from app.core.metrics import registry
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from datetime import datetime, timezone
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+upstream_up = registry.gauge("upstream_health_up", "1 si el último sondeo del servicio fue exitoso", ("service",))
+upstream_probe_latency = registry.gauge(
+    "upstream_health_probe_latency_seconds", "Latencia del último sondeo de salud", ("service",)
+)
+
+async def probe_postgrest() -> None:
+    await supabase_admin_async.table("perfiles").select("id").limit(1).execute()
+
+async def probe_storage() -> None:
+    await supabase_admin_async.storage.get_bucket(settings.bucket_name)
+
+async def probe_auth() -> None:
+    response = await async_http_client.get(
+        f"{settings.supabase_url}/auth/v1/health",
+        headers={"apikey": settings.supabase_anon_key}
+    )
+    response.raise_for_status()
+
+PROBES: Dict[str, Callable[[], Awaitable[None]]] = {
+    "postgrest": probe_postgrest,
+    "storage": probe_storage,
+    "auth": probe_auth
+}
+
+class UpstreamHealth:
+    """Último resultado de cada sondeo y la tarea periódica que los actualiza"""
+
+    def __init__(self, probes: Dict[str, Callable[[], Awaitable[None]]] = PROBES,
+                 interval: Optional[float] = None, timeout: Optional[float] = None):
+        self.probes = probes
+        self.interval = settings.health_probe_interval_seconds if interval is None else interval
+        self.timeout = settings.health_probe_timeout_seconds if timeout is None else timeout
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self._checked_at: Dict[str, float] = {}
+
+    async def _probe(self, name: str, probe: Callable[[], Awaitable[None]]) -> None:
+        inicio = time.perf_counter()
+        error = None
+        try:
+            await asyncio.wait_for(probe(), self.timeout)
+        except asyncio.TimeoutError:
+            error = f"Sin respuesta en {self.timeout:.1f}s"
+        except Exception as e:
+            error = str(e)[:200]
+        latencia = time.perf_counter() - inicio
+
+        anterior = self.results.get(name, {}).get("ok")
+        self.results[name] = {
+            "ok": error is None,
+            "latency_ms": round(latencia * 1000, 1),
+            "checked_at": datetime.now(timezone.utc).isoformat(),
+            **({"error": error} if error else {})
+        }
+        self._checked_at[name] = time.monotonic()
+        upstream_up.set(1 if error is None else 0, name)
+        upstream_probe_latency.set(latencia, name)
+
+        if error and anterior is not False:
+            logger.warning("Sondeo de %s falló: %s", name, error)
+        elif not error and anterior is False:
+            logger.info("Sondeo de %s recuperado (%.1f ms)", name, latencia * 1000)
+
+    async def check_all(self) -> None:
+        """Ejecuta todos los sondeos en paralelo"""
+        await asyncio.gather(*(self._probe(name, probe) for name, probe in self.probes.items()))
+
+    async def run(self) -> None:
+        """Bucle de fondo; el primer sondeo es inmediato"""
+        while True:
+            await self.check_all()
+            await asyncio.sleep(self.interval)
+
+    def is_fresh(self, name: str) -> bool:
+        """Un resultado más viejo que 3 intervalos (tarea detenida) no cuenta"""
+        checked_at = self._checked_at.get(name)
+        return checked_at is not None and time.monotonic() - checked_at <= self.interval * 3 + self.timeout
+
+    def failing(self) -> List[str]:
+        """Servicios cuyo último sondeo falló o quedó viejo (sin resultado aún no cuenta)"""
+        return [name for name in self.results if not self.results[name]["ok"] or not self.is_fresh(name)]
+
+    def ready(self) -> bool:
+        return all(self.results.get(name, {}).get("ok") and self.is_fresh(name) for name in self.probes)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            name: {**self.results[name], "stale": not self.is_fresh(name)} if name in self.results else {"ok": None}
+            for name in self.probes
+        }
+
+# Instancia global
+upstream_health = UpstreamHealth()
@@ -0,0 +1,118 @@
+"""
+Configuración de logging estructurado y asíncrono
+=================================================
+
+Los módulos solo llaman a `logging.getLogger(__name__)`. Aquí se instala un
+`QueueHandler` en el logger raíz: el hilo del event loop únicamente encola el
+registro y un `QueueListener` en segundo plano lo formatea (JSON o texto) y
+escribe en stdout, de modo que la E/S de logs nunca bloquea una petición.
+Cada registro lleva el `request_id` de la petición en curso (contextvar).
+"""
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+from datetime import datetime, timezone
+import logging
+import orjson
+import queue
+import sys
+
+# ID de la petición en curso; lo fija RequestIdMiddleware
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+# Atributos propios de LogRecord; el resto son campos `extra` del registro
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id"}
+
+_listener: Optional[QueueListener] = None
+
+class RequestIdFilter(logging.Filter):
+    """Adjunta el request_id del contexto actual (se evalúa en el hilo que emite)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+class JsonFormatter(logging.Formatter):
+    """Una línea JSON por registro, con los campos `extra` al primer nivel"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-")
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and key not in entry:
+                entry[key] = value
+        return orjson.dumps(entry, default=str).decode()
+
+class TextFormatter(logging.Formatter):
+    """Formato legible para desarrollo local"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s [%(request_id)s] %(name)s: %(message)s")
+
+class _PreparedQueueHandler(QueueHandler):
+    """
+    Encola el registro con el mensaje ya interpolado y la traza como texto
+    (los argumentos y la excepción pueden no ser seguros entre hilos), pero sin
+    formatearlo: el formato lo aplica el listener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.message = record.getMessage()
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+def setup_logging(level: str = "INFO", log_format: str = "json", levels: Optional[Dict[str, str]] = None,
+                  stream=None) -> QueueListener:
+    """
+    Instala el handler con cola en el logger raíz y arranca el listener.
+    `levels` fija niveles por módulo, p. ej. {"httpx": "WARNING", "app.services": "DEBUG"}.
+    Es idempotente: una segunda llamada reemplaza la configuración anterior.
+    """
+    global _listener
+    shutdown_logging()
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter() if log_format == "json" else TextFormatter())
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    handler = _PreparedQueueHandler(log_queue)
+    handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level.upper())
+
+    for name, module_level in (levels or {}).items():
+        logging.getLogger(name).setLevel(module_level.upper())
+
+    # uvicorn instala sus propios handlers; se redirigen a la cola
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers.clear()
+        uvicorn_logger.propagate = True
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+def shutdown_logging() -> None:
+    """Detiene el listener vaciando antes los registros pendientes"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,224 @@
+"""
+Métricas en formato de exposición de Prometheus
+===============================================
+
+Implementación mínima (contadores, gauges e histogramas con etiquetas) sin
+dependencias externas. Se exponen en `/metrics`:
+
+- http_request_duration_seconds{method,route,status}: latencia por plantilla de ruta
+- http_requests_in_flight: peticiones en curso
+- upstream_request_duration_seconds{service,target,operation,status}: cada
+  llamada a Supabase hecha por los servicios (PostgREST tabla + operación,
+  storage, auth), medida en el transporte del pool HTTP compartido
+- upstream_requests_in_flight{service}
+"""
+from typing import Dict, Iterable, List, Sequence, Tuple
+import bisect
+import httpx
+import re
+import threading
+import time
+
+# Buckets por defecto del cliente oficial de Prometheus (segundos)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pares = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        lineas = self._header()
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lineas.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lineas
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = float(value)
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Por etiquetas: [conteos por bucket (no acumulados, el último es +Inf), suma]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        indice = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            serie = self._series.get(labels)
+            if serie is None:
+                serie = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            serie[0][indice] += 1
+            serie[1] += value
+
+    def count(self, *labels: str) -> int:
+        serie = self._series.get(labels)
+        return sum(serie[0]) if serie else 0
+
+    def render(self) -> List[str]:
+        lineas = self._header()
+        with self._lock:
+            series = [(labels, list(conteos), suma) for labels, (conteos, suma) in sorted(self._series.items())]
+        for labels, conteos, suma in series:
+            acumulado = 0
+            for limite, conteo in zip(self.buckets + (float("inf"),), conteos):
+                acumulado += conteo
+                le = f'le="{_format_value(limite)}"'
+                lineas.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {acumulado}")
+            etiquetas = _format_labels(self.labelnames, labels)
+            lineas.append(f"{self.name}_sum{etiquetas} {_format_value(suma)}")
+            lineas.append(f"{self.name}_count{etiquetas} {acumulado}")
+        return lineas
+
+class MetricsRegistry:
+    """Conjunto de métricas que se renderizan juntas en /metrics"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lineas: List[str] = []
+        for metric in self._metrics:
+            lineas.extend(metric.render())
+        return "\n".join(lineas) + "\n"
+
+# Registro global y métricas de la aplicación
+registry = MetricsRegistry()
+
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "Latencia de las peticiones HTTP por plantilla de ruta",
+    ("method", "route", "status")
+)
+http_requests_in_flight = registry.gauge("http_requests_in_flight", "Peticiones HTTP en curso")
+upstream_request_duration = registry.histogram(
+    "upstream_request_duration_seconds", "Latencia de las llamadas a Supabase hasta recibir las cabeceras",
+    ("service", "target", "operation", "status")
+)
+upstream_requests_in_flight = registry.gauge(
+    "upstream_requests_in_flight", "Llamadas a Supabase en curso", ("service",)
+)
+
+# --- Clasificación de llamadas a Supabase ---
+
+_ID_SEGMENT = re.compile(r"^([0-9a-fA-F-]{16,}|\d+)$")
+_POSTGREST_OPERATIONS = {"GET": "select", "HEAD": "count", "POST": "insert", "PATCH": "update", "PUT": "upsert", "DELETE": "delete"}
+_STORAGE_OBJECT_ACTIONS = {"list", "sign", "public", "authenticated", "info", "move", "copy", "upload"}
+_STORAGE_OPERATIONS = {"GET": "download", "HEAD": "info", "POST": "upload", "PUT": "update", "DELETE": "delete"}
+
+def classify_upstream(request: httpx.Request) -> Tuple[str, str, str]:
+    """
+    (servicio, objetivo, operación) de una petición a Supabase, con cardinalidad acotada:
+    /rest/v1/mediciones_bovinos GET -> ("postgrest", "mediciones_bovinos", "select")
+    /storage/v1/object/list/bucket -> ("storage", "bucket", "list")
+    /auth/v1/user GET -> ("auth", "user", "get")
+    """
+    segmentos = [s for s in request.url.path.split("/") if s]
+    metodo = request.method
+
+    if segmentos[:2] == ["rest", "v1"] and len(segmentos) > 2:
+        if segmentos[2] == "rpc" and len(segmentos) > 3:
+            return "postgrest", segmentos[3], "rpc"
+        operacion = _POSTGREST_OPERATIONS.get(metodo, metodo.lower())
+        if metodo == "POST" and "merge-duplicates" in request.headers.get("prefer", ""):
+            operacion = "upsert"
+        return "postgrest", segmentos[2], operacion
+
+    if segmentos[:2] == ["storage", "v1"] and len(segmentos) > 2:
+        if segmentos[2] == "object" and len(segmentos) > 3:
+            if segmentos[3] in _STORAGE_OBJECT_ACTIONS and len(segmentos) > 4:
+                return "storage", segmentos[4], segmentos[3]
+            return "storage", segmentos[3], _STORAGE_OPERATIONS.get(metodo, metodo.lower())
+        return "storage", segmentos[2], metodo.lower()
+
+    if segmentos[:2] == ["auth", "v1"] and len(segmentos) > 2:
+        objetivo = "/".join(":id" if _ID_SEGMENT.match(s) else s for s in segmentos[2:4])
+        return "auth", objetivo, metodo.lower()
+
+    return "other", request.url.host, metodo.lower()
+
+class MetricsTransport(httpx.AsyncBaseTransport):
+    """
+    Transporte que envuelve al del pool HTTP y mide cada llamada (incluidos
+    errores de red y timeouts, que se registran con status="error").
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        service, target, operation = classify_upstream(request)
+        upstream_requests_in_flight.inc(service)
+        status = "error"
+        inicio = time.perf_counter()
+        try:
+            response = await self._transport.handle_async_request(request)
+            status = str(response.status_code)
+            return response
+        finally:
+            upstream_requests_in_flight.dec(service)
+            upstream_request_duration.observe(time.perf_counter() - inicio, service, target, operation, status)
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
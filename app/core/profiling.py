@@ -0,0 +1,73 @@
+"""
+Perfilado de peticiones con cProfile
+====================================
+
+Guarda en memoria los últimos perfiles capturados por ProfilingMiddleware.
+En la ruta de la petición solo se serializan las estadísticas crudas (marshal);
+el informe de texto se genera al consultarlo.
+"""
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+import cProfile
+import io
+import marshal
+import pstats
+import threading
+
+SORT_KEYS = ("cumulative", "tottime", "ncalls")
+
+class _StoredStats:
+    """Adaptador para que pstats.Stats cargue estadísticas ya recolectadas"""
+
+    def __init__(self, stats: Dict):
+        self.stats = stats
+
+    def create_stats(self) -> None:
+        pass
+
+class ProfileStore:
+    """Últimos N perfiles (los más antiguos se descartan)"""
+
+    def __init__(self, max_size: int = 50):
+        self.max_size = max_size
+        self._profiles: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profile_id: str, profiler: cProfile.Profile, **info: Any) -> None:
+        profiler.create_stats()
+        entry = {
+            "id": profile_id,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            **info,
+            "_stats": marshal.dumps(profiler.stats)
+        }
+        with self._lock:
+            self._profiles[profile_id] = entry
+            while len(self._profiles) > self.max_size:
+                self._profiles.popitem(last=False)
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Resumen de los perfiles guardados (más reciente primero)"""
+        with self._lock:
+            entries = list(self._profiles.values())
+        return [{k: v for k, v in entry.items() if k != "_stats"} for entry in reversed(entries)]
+
+    def raw(self, profile_id: str) -> Optional[bytes]:
+        """Estadísticas en el formato de `Profile.dump_stats` (snakeviz, pstats)"""
+        entry = self._profiles.get(profile_id)
+        return entry["_stats"] if entry else None
+
+    def report(self, profile_id: str, sort: str = "cumulative", limit: int = 40) -> Optional[str]:
+        """Informe de texto de pstats con las `limit` funciones principales"""
+        raw = self.raw(profile_id)
+        if raw is None:
+            return None
+        buffer = io.StringIO()
+        stats = pstats.Stats(_StoredStats(marshal.loads(raw)), stream=buffer)
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        return buffer.getvalue()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._profiles.clear()
@@ -1,66 +1,60 @@
 """
-Sistema de inicialización con feedback visual para el servidor
+Sistema de inicialización con feedback del servidor
 """
+from typing import Any, Awaitable, Callable, Dict, Optional
+import asyncio
 import logging
-from typing import Dict, Any
-
-# Configurar colores para terminal
-class Colors:
-    RED = '\033[91m'
-    GREEN = '\033[92m'
-    YELLOW = '\033[93m'
-    BLUE = '\033[94m'
-    MAGENTA = '\033[95m'
-    CYAN = '\033[96m'
-    WHITE = '\033[97m'
-    BOLD = '\033[1m'
-    RESET = '\033[0m'
+import time
+
+# Los mensajes pasan por el logging estructurado (JSON, cola e id de petición)
+logger = logging.getLogger(__name__)
 
 def print_status(message: str, status: bool = True, emoji_success: str = "✅", emoji_error: str = "❌"):
-    """Imprime un mensaje de estado con color y emoji"""
+    """Registra un mensaje de estado con emoji (error si `status` es falso)"""
     if status:
-        print(f"{Colors.GREEN}{emoji_success} {message}{Colors.RESET}")
+        logger.info(f"{emoji_success} {message}")
     else:
-        print(f"{Colors.RED}{emoji_error} {message}{Colors.RESET}")
+        logger.error(f"{emoji_error} {message}")
 
 def print_info(message: str, emoji: str = "📋"):
-    """Imprime información general"""
-    print(f"{Colors.CYAN}{emoji} {message}{Colors.RESET}")
+    """Registra información general"""
+    logger.info(f"{emoji} {message}")
 
 def print_warning(message: str, emoji: str = "⚠️"):
-    """Imprime una advertencia"""
-    print(f"{Colors.YELLOW}{emoji} {message}{Colors.RESET}")
+    """Registra una advertencia"""
+    logger.warning(f"{emoji} {message}")
 
 def print_header():
-    """Imprime el header del sistema"""
-    print(f"\n{Colors.BOLD}{Colors.MAGENTA}{'='*60}{Colors.RESET}")
-    print(f"{Colors.BOLD}{Colors.MAGENTA}🐄 BACKEND MONITOREO BOVINOS IA - INICIANDO 🤖{Colors.RESET}")
-    print(f"{Colors.BOLD}{Colors.MAGENTA}{'='*60}{Colors.RESET}\n")
+    """Registra el inicio del sistema"""
+    logger.info("🐄 BACKEND MONITOREO BOVINOS IA - INICIANDO 🤖")
 
 async def check_database_connection():
-    """Verifica la conexión a la base de datos"""
+    """Verifica la conexión a la base de datos (clientes asíncronos, en paralelo)"""
     try:
-        from app.config.database import supabase, supabase_admin
+        from app.config.database import supabase_async, supabase_admin_async
         
         print_info("Verificando conexión a base de datos...")
         
-        # Test conexión regular
-        try:
-            result = supabase.table("perfiles").select("id").limit(1).execute()
-            print_status("Conexión a Supabase (usuario): OK")
-        except Exception as e:
-            print_status(f"Conexión a Supabase (usuario): Error - {str(e)[:50]}", False)
-            return False
-        
-        # Test conexión admin
-        try:
-            buckets = supabase_admin.storage.list_buckets()
-            print_status("Conexión a Supabase (admin): OK")
-        except Exception as e:
-            print_status(f"Conexión a Supabase (admin): Error - {str(e)[:50]}", False)
-            return False
-            
-        return True
+        async def conexion_usuario():
+            try:
+                await supabase_async.table("perfiles").select("id").limit(1).execute()
+                print_status("Conexión a Supabase (usuario): OK")
+                return True
+            except Exception as e:
+                print_status(f"Conexión a Supabase (usuario): Error - {str(e)[:50]}", False)
+                return False
+        
+        async def conexion_admin():
+            try:
+                await supabase_admin_async.storage.list_buckets()
+                print_status("Conexión a Supabase (admin): OK")
+                return True
+            except Exception as e:
+                print_status(f"Conexión a Supabase (admin): Error - {str(e)[:50]}", False)
+                return False
+        
+        # Además de verificar, deja abiertas conexiones del pool para las primeras peticiones
+        return all(await asyncio.gather(conexion_usuario(), conexion_admin()))
         
     except Exception as e:
         print_status(f"Error en verificación de BD: {str(e)[:50]}", False)
@@ -145,44 +139,100 @@ async def check_routes():
         print_status(f"Error verificando rutas: {str(e)[:50]}", False)
         return False
 
-async def startup_checks() -> Dict[str, bool]:
-    """Ejecuta todas las verificaciones de inicio"""
-    print_header()
-    
-    results = {}
-    
-    # Verificar variables de entorno
-    results['env'] = await check_environment_variables()
-    
-    # Verificar modelos
-    results['models'] = await check_models()
+SERVICE_NAMES = {
+    'env': 'Variables de entorno',
+    'models': 'Modelos de datos',
+    'routes': 'Rutas de API',
+    'database': 'Base de datos'
+}
+
+# Verificaciones que repiten los sondeos periódicos (app/core/health.py): un
+# fallo transitorio en el arranque no deja a la instancia fuera para siempre
+LIVE_CHECKS = ('database',)
+
+class StartupState:
+    """
+    Progreso de las verificaciones de arranque. Se ejecutan en segundo plano
+    mientras el servidor ya atiende peticiones; /health consulta este estado.
+    """
+
+    def __init__(self):
+        self.checks: Dict[str, Dict[str, Any]] = {name: {"status": "pending"} for name in SERVICE_NAMES}
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def done(self) -> bool:
+        return self.finished_at is not None
+
+    def results(self) -> Dict[str, bool]:
+        """Resultado por verificación (solo las terminadas)"""
+        return {name: check["status"] == "ok" for name, check in self.checks.items() if check["status"] in ("ok", "error")}
+
+    def overall_status(self) -> str:
+        """Estado de las verificaciones estáticas; la base de datos la juzgan los sondeos"""
+        if any(check["status"] == "error" for name, check in self.checks.items() if name not in LIVE_CHECKS):
+            return "degraded"
+        return "healthy" if self.done else "starting"
+
+    def snapshot(self) -> Dict[str, Any]:
+        completadas = sum(1 for check in self.checks.values() if check["status"] in ("ok", "error"))
+        fin = self.finished_at or time.perf_counter()
+        return {
+            "completed": completadas,
+            "total": len(self.checks),
+            "elapsed_ms": round((fin - self.started_at) * 1000, 1) if self.started_at else None,
+            "checks": {name: dict(check) for name, check in self.checks.items()}
+        }
+
+    async def run_check(self, name: str, check: Callable[[], Awaitable[bool]], timeout: float) -> bool:
+        inicio = time.perf_counter()
+        self.checks[name] = {"status": "running"}
+        try:
+            ok = await asyncio.wait_for(check(), timeout)
+        except asyncio.TimeoutError:
+            print_status(f"{SERVICE_NAMES[name]}: sin respuesta en {timeout:.0f}s", False)
+            ok = False
+        except Exception as e:
+            print_status(f"{SERVICE_NAMES[name]}: Error - {str(e)[:50]}", False)
+            ok = False
+        self.checks[name] = {"status": "ok" if ok else "error", "duration_ms": round((time.perf_counter() - inicio) * 1000, 1)}
+        return ok
+
+# Estado global de las verificaciones de arranque
+startup_state = StartupState()
+
+async def startup_checks(state: StartupState = startup_state) -> Dict[str, bool]:
+    """Ejecuta todas las verificaciones de inicio en paralelo"""
+    from app.config.settings import settings
     
-    # Verificar rutas
-    results['routes'] = await check_routes()
+    print_header()
+    state.started_at = time.perf_counter()
     
-    # Verificar base de datos
-    results['database'] = await check_database_connection()
+    checks = {
+        'env': check_environment_variables,
+        'models': check_models,
+        'routes': check_routes,
+        'database': check_database_connection
+    }
+    await asyncio.gather(*(
+        state.run_check(name, check, settings.startup_check_timeout_seconds) for name, check in checks.items()
+    ))
+    state.finished_at = time.perf_counter()
+    results = state.results()
     
     # Resumen final
-    print(f"\n{Colors.BOLD}{Colors.BLUE}📊 RESUMEN DE INICIALIZACIÓN:{Colors.RESET}")
+    print_info(f"RESUMEN DE INICIALIZACIÓN ({state.snapshot()['elapsed_ms']} ms):", "📊")
     
     all_good = True
     for service, status in results.items():
-        service_names = {
-            'env': 'Variables de entorno',
-            'models': 'Modelos de datos',
-            'routes': 'Rutas de API',
-            'database': 'Base de datos'
-        }
-        print_status(f"{service_names[service]}: {'Funcionando' if status else 'Con errores'}", status)
+        print_status(f"{SERVICE_NAMES[service]}: {'Funcionando' if status else 'Con errores'}", status)
         if not status:
             all_good = False
     
     if all_good:
-        print(f"\n{Colors.BOLD}{Colors.GREEN}🎉 ¡TODOS LOS SERVICIOS INICIADOS CORRECTAMENTE!{Colors.RESET}")
-        print(f"{Colors.GREEN}🚀 Servidor listo para recibir peticiones{Colors.RESET}\n")
+        print_info("¡TODOS LOS SERVICIOS INICIADOS CORRECTAMENTE! Servidor listo para recibir peticiones", "🎉")
     else:
-        print(f"\n{Colors.BOLD}{Colors.YELLOW}⚠️  ALGUNOS SERVICIOS TIENEN PROBLEMAS{Colors.RESET}")
-        print(f"{Colors.YELLOW}🔧 El servidor puede funcionar con limitaciones{Colors.RESET}\n")
+        print_warning("ALGUNOS SERVICIOS TIENEN PROBLEMAS: el servidor puede funcionar con limitaciones")
     
     return results
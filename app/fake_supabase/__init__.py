@@ -0,0 +1,21 @@
+"""
+Supabase en memoria (PostgREST + Auth + Storage) para pruebas de carga sin red.
+Se activa con FAKE_SUPABASE_ENABLED=true; ver app/config/transport.py.
+"""
+from app.fake_supabase.backend import (
+    FakeSupabase,
+    FakeAsyncTransport,
+    FakeSyncTransport,
+    get_fake_backend,
+    jwt_secret
+)
+from app.fake_supabase.auth import FAKE_JWT_SECRET
+
+__all__ = [
+    "FakeSupabase",
+    "FakeAsyncTransport",
+    "FakeSyncTransport",
+    "get_fake_backend",
+    "jwt_secret",
+    "FAKE_JWT_SECRET"
+]
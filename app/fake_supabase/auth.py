@@ -0,0 +1,150 @@
+"""
+Supabase Auth (GoTrue) en memoria
+=================================
+
+Registro, login con contraseña, refresh, `GET /user`, logout y health.
+Los access tokens son JWT HS256 firmados con el mismo secreto que usa el
+validador local, así que la verificación no sale a la red.
+"""
+from typing import Any, Dict, Optional, Tuple
+from datetime import datetime, timezone
+from urllib.parse import parse_qs
+import hashlib
+import json
+import secrets
+import time
+import uuid
+
+import jwt
+
+from app.fake_supabase.postgrest import PostgrestStore
+
+# Secreto por defecto cuando el proyecto no define supabase_jwt_secret
+FAKE_JWT_SECRET = "fake-supabase-jwt-secret-solo-para-pruebas"
+TOKEN_TTL_SECONDS = 3600
+
+def _error(status: int, code: str, msg: str) -> Tuple[int, Dict[str, Any]]:
+    return status, {"code": status, "error_code": code, "msg": msg}
+
+class FakeAuth:
+    """Usuarios, contraseñas (hash) y refresh tokens en memoria"""
+
+    def __init__(self, store: PostgrestStore, jwt_secret: str, audience: str = "authenticated"):
+        self.store = store
+        self.jwt_secret = jwt_secret
+        self.audience = audience
+        self.users: Dict[str, Dict[str, Any]] = {}  # email -> usuario
+        self.passwords: Dict[str, str] = {}  # user_id -> sha256
+        self.refresh_tokens: Dict[str, str] = {}  # refresh token -> user_id
+
+    @staticmethod
+    def _hash(password: str) -> str:
+        return hashlib.sha256(password.encode()).hexdigest()
+
+    def create_user(self, email: str, password: str, user_metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Crea el usuario y su perfil (emula el trigger handle_new_user)"""
+        ahora = datetime.now(timezone.utc).isoformat()
+        user = {
+            "id": str(uuid.uuid4()),
+            "aud": self.audience,
+            "role": "authenticated",
+            "email": email,
+            "phone": "",
+            "email_confirmed_at": ahora,
+            "confirmed_at": ahora,
+            "last_sign_in_at": ahora,
+            "app_metadata": {"provider": "email", "providers": ["email"]},
+            "user_metadata": user_metadata or {},
+            "identities": [],
+            "created_at": ahora,
+            "updated_at": ahora
+        }
+        self.users[email] = user
+        self.passwords[user["id"]] = self._hash(password)
+        self.store.insert("perfiles", {
+            "id": user["id"],
+            "nombre_completo": (user_metadata or {}).get("nombre_completo")
+        })
+        return user
+
+    def issue_token(self, user: Dict[str, Any]) -> str:
+        ahora = int(time.time())
+        return jwt.encode({
+            "sub": user["id"],
+            "aud": self.audience,
+            "role": "authenticated",
+            "email": user["email"],
+            "iat": ahora,
+            "exp": ahora + TOKEN_TTL_SECONDS,
+            "user_metadata": user["user_metadata"],
+            "app_metadata": user["app_metadata"],
+            "session_id": str(uuid.uuid4())
+        }, self.jwt_secret, algorithm="HS256")
+
+    def _session(self, user: Dict[str, Any]) -> Dict[str, Any]:
+        refresh_token = secrets.token_urlsafe(24)
+        self.refresh_tokens[refresh_token] = user["id"]
+        return {
+            "access_token": self.issue_token(user),
+            "token_type": "bearer",
+            "expires_in": TOKEN_TTL_SECONDS,
+            "expires_at": int(time.time()) + TOKEN_TTL_SECONDS,
+            "refresh_token": refresh_token,
+            "user": user
+        }
+
+    def _user_by_id(self, user_id: str) -> Optional[Dict[str, Any]]:
+        return next((u for u in self.users.values() if u["id"] == user_id), None)
+
+    def user_from_token(self, token: str) -> Optional[Dict[str, Any]]:
+        try:
+            claims = jwt.decode(token, self.jwt_secret, algorithms=["HS256"], audience=self.audience)
+        except jwt.InvalidTokenError:
+            return None
+        return self._user_by_id(claims["sub"])
+
+    def handle(self, method: str, path: str, query: str, headers: Dict[str, str], body: bytes) -> Tuple[int, Any]:
+        """(status, cuerpo JSON o None) para una ruta relativa a /auth/v1"""
+        datos = json.loads(body) if body else {}
+
+        if path == "health" and method == "GET":
+            return 200, {"version": "fake", "name": "GoTrue", "description": "Supabase Auth en memoria"}
+
+        if path == ".well-known/jwks.json" and method == "GET":
+            return 200, {"keys": []}
+
+        if path == "signup" and method == "POST":
+            email = (datos.get("email") or "").lower()
+            if not email or not datos.get("password"):
+                return _error(422, "validation_failed", "Signup requires a valid password")
+            if email in self.users:
+                return _error(422, "user_already_exists", "User already registered")
+            return 200, self._session(self.create_user(email, datos["password"], datos.get("data")))
+
+        if path == "token" and method == "POST":
+            grant_type = parse_qs(query).get("grant_type", [""])[0]
+            if grant_type == "password":
+                user = self.users.get((datos.get("email") or "").lower())
+                if user is None or self.passwords[user["id"]] != self._hash(datos.get("password") or ""):
+                    return _error(400, "invalid_credentials", "Invalid login credentials")
+                return 200, self._session(user)
+            if grant_type == "refresh_token":
+                user_id = self.refresh_tokens.pop(datos.get("refresh_token"), None)
+                user = self._user_by_id(user_id) if user_id else None
+                if user is None:
+                    return _error(400, "refresh_token_not_found", "Invalid Refresh Token: Refresh Token Not Found")
+                return 200, self._session(user)
+            return _error(400, "validation_failed", f"Unsupported grant type: {grant_type}")
+
+        token = headers.get("authorization", "").removeprefix("Bearer ").strip()
+
+        if path == "user" and method == "GET":
+            user = self.user_from_token(token)
+            if user is None:
+                return _error(403, "bad_jwt", "invalid JWT: unable to parse or verify signature")
+            return 200, user
+
+        if path == "logout" and method == "POST":
+            return 204, None
+
+        return _error(404, "not_found", f"Ruta de auth no soportada: {method} /{path}")
@@ -0,0 +1,152 @@
+"""
+Backend falso de Supabase
+=========================
+
+Enruta cada petición httpx a PostgREST (`/rest/v1`), Auth (`/auth/v1`) o
+Storage (`/storage/v1`) en memoria y agrega una latencia configurable
+(base + jitter uniforme con semilla fija, reproducible entre corridas).
+Se conecta como transporte de httpx, así que el resto de la aplicación
+(clientes de Supabase, pool, métricas) no cambia.
+"""
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+import asyncio
+import random
+import threading
+import time
+
+import httpx
+import orjson
+
+from app.fake_supabase.auth import FakeAuth, FAKE_JWT_SECRET
+from app.fake_supabase.postgrest import PostgrestError, PostgrestStore
+from app.fake_supabase.storage import FakeStorage
+
+if TYPE_CHECKING:
+    from supabase import AsyncClient
+
+class FakeSupabase:
+    """Estado en memoria de los tres servicios y la latencia inyectada"""
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, seed: int = 0,
+                 jwt_secret: str = FAKE_JWT_SECRET, buckets: Tuple[str, ...] = ()):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self._random = random.Random(seed)
+        # El transporte síncrono puede usarse desde varios hilos
+        self._lock = threading.RLock()
+        self.store = PostgrestStore()
+        self.auth = FakeAuth(self.store, jwt_secret)
+        self.storage = FakeStorage(list(buckets))
+        self.requests = 0
+
+    def delay(self) -> float:
+        """Segundos de latencia para la próxima petición"""
+        if self.latency_ms <= 0 and self.jitter_ms <= 0:
+            return 0.0
+        with self._lock:
+            jitter = self._random.uniform(0, self.jitter_ms) if self.jitter_ms > 0 else 0.0
+        return max(self.latency_ms + jitter, 0.0) / 1000
+
+    def _dispatch(self, request: httpx.Request) -> Tuple[int, Dict[str, str], Any]:
+        servicio, _, resto = request.url.path.strip("/").partition("/")
+        version, _, ruta = resto.partition("/")
+        headers = {k.lower(): v for k, v in request.headers.items()}
+        query = request.url.query.decode() if isinstance(request.url.query, bytes) else request.url.query
+        body = request.content
+
+        if version != "v1":
+            return 404, {}, {"message": f"Ruta no soportada: {request.url.path}"}
+        if servicio == "rest":
+            try:
+                return self.store.handle(request.method, ruta, query, headers, body)
+            except PostgrestError as e:
+                return e.status, {}, e.body
+            except (ValueError, KeyError) as e:
+                return 400, {}, {"code": "PGRST100", "message": str(e), "details": None, "hint": None}
+        if servicio == "auth":
+            status, payload = self.auth.handle(request.method, ruta, query, headers, body)
+            return status, {}, payload
+        if servicio == "storage":
+            return self.storage.handle(request.method, ruta, headers, body)
+        return 404, {}, {"message": f"Servicio no soportado: {servicio}"}
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        with self._lock:
+            self.requests += 1
+            status, headers, payload = self._dispatch(request)
+
+        if isinstance(payload, bytes):
+            return httpx.Response(status, headers=headers, content=payload, request=request)
+        if payload is None:
+            return httpx.Response(status, headers=headers, request=request)
+        contenido = orjson.dumps(payload, default=str)
+        return httpx.Response(
+            status,
+            headers={**headers, "Content-Type": "application/json"},
+            content=contenido,
+            request=request
+        )
+
+    def async_transport(self) -> "FakeAsyncTransport":
+        return FakeAsyncTransport(self)
+
+    def sync_transport(self) -> "FakeSyncTransport":
+        return FakeSyncTransport(self)
+
+    def async_http_client(self) -> httpx.AsyncClient:
+        """Cliente httpx sobre el transporte en memoria (no abre conexiones: no hace falta cerrarlo)"""
+        return httpx.AsyncClient(transport=self.async_transport())
+
+    def async_db_client(self, http: Optional[httpx.AsyncClient] = None, key: str = "service-role") -> "AsyncClient":
+        """Cliente de supabase-py contra este backend, como los de app/config/database.py"""
+        from supabase import AsyncClient, AsyncClientOptions
+        from app.config.settings import settings
+        return AsyncClient(settings.supabase_url, key,
+                           options=AsyncClientOptions(httpx_client=http or self.async_http_client()))
+
+class FakeAsyncTransport(httpx.AsyncBaseTransport):
+    """La latencia se espera con asyncio.sleep: no bloquea el event loop"""
+
+    def __init__(self, backend: FakeSupabase):
+        self.backend = backend
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        espera = self.backend.delay()
+        if espera:
+            await asyncio.sleep(espera)
+        return self.backend.handle(request)
+
+class FakeSyncTransport(httpx.BaseTransport):
+    def __init__(self, backend: FakeSupabase):
+        self.backend = backend
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.read()
+        espera = self.backend.delay()
+        if espera:
+            time.sleep(espera)
+        return self.backend.handle(request)
+
+_backend: Optional[FakeSupabase] = None
+_backend_lock = threading.Lock()
+
+def jwt_secret() -> str:
+    """Secreto con el que el backend falso firma los tokens"""
+    from app.config.settings import settings
+    return settings.supabase_jwt_secret or FAKE_JWT_SECRET
+
+def get_fake_backend() -> FakeSupabase:
+    """Instancia compartida por los clientes síncrono y asíncrono, creada desde settings"""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            from app.config.settings import settings
+            _backend = FakeSupabase(
+                latency_ms=settings.fake_supabase_latency_ms,
+                jitter_ms=settings.fake_supabase_jitter_ms,
+                seed=settings.fake_supabase_seed,
+                jwt_secret=jwt_secret(),
+                buckets=(settings.bucket_name,) + ((settings.peso_modelo_bucket,) if settings.peso_modelo_bucket else ())
+            )
+        return _backend
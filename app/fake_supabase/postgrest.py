@@ -0,0 +1,437 @@
+"""
+Subconjunto de PostgREST en memoria
+===================================
+
+Implementa lo que usan los servicios: select con columnas y recursos
+embebidos (`bovinos(*)`, `fincas!inner(...)`, anidados), filtros `eq`, `neq`,
+`gt`, `gte`, `lt`, `lte`, `like`, `ilike`, `in`, `is` (con `not.`), filtros
+sobre recursos embebidos (`bovinos.finca_id=eq.x`), árboles `or=(...)` con
+`and(...)`, `order`, `limit`/`offset`, `Prefer: count=...`, inserción
+(simple, múltiple y upsert), actualización y borrado, y las vistas de
+migrations/ (`ultimas_mediciones_bovinos`).
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from urllib.parse import parse_qsl
+import json
+import re
+import threading
+import uuid
+
+# Tablas del esquema público
+TABLES = ("perfiles", "fincas", "bovinos", "mediciones_bovinos", "eliminaciones")
+
+def _ultimas_mediciones(tables: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """DISTINCT ON (bovino_id) ... ORDER BY bovino_id, fecha DESC, created_at DESC"""
+    ultimas: Dict[Any, Dict[str, Any]] = {}
+    for row in sorted(tables["mediciones_bovinos"], key=lambda r: (r.get("fecha") or "", r.get("created_at") or ""), reverse=True):
+        ultimas.setdefault(row.get("bovino_id"), row)
+    return [dict(row) for row in ultimas.values()]
+
+# Vistas de solo lectura (migrations/): nombre -> filas calculadas desde las tablas
+VIEWS = {
+    "ultimas_mediciones_bovinos": _ultimas_mediciones,
+}
+
+# (tabla, recurso embebido) -> (columna local, columna remota, cardinalidad)
+RELATIONS = {
+    ("mediciones_bovinos", "bovinos"): ("bovino_id", "id", "one"),
+    ("bovinos", "fincas"): ("finca_id", "id", "one"),
+    ("bovinos", "mediciones_bovinos"): ("id", "bovino_id", "many"),
+    ("fincas", "bovinos"): ("id", "finca_id", "many"),
+    ("fincas", "perfiles"): ("propietario_id", "id", "one"),
+}
+
+# Borrado en cascada: tabla -> [(tabla hija, columna que la referencia)]
+CASCADES = {
+    "fincas": [("bovinos", "finca_id")],
+    "bovinos": [("mediciones_bovinos", "bovino_id")],
+}
+
+# Bajas para GET /sync (triggers de migrations/002_sync.sql):
+# tabla -> (nombre en eliminaciones, tabla padre, columna que la referencia)
+TOMBSTONES = {
+    "fincas": ("fincas", None, None),
+    "bovinos": ("bovinos", "fincas", "finca_id"),
+    "mediciones_bovinos": ("mediciones", "bovinos", "bovino_id"),
+}
+
+RESERVED_PARAMS = {"select", "order", "limit", "offset", "or", "and", "columns", "on_conflict"}
+
+class PostgrestError(Exception):
+    """Error con el cuerpo JSON que devolvería PostgREST"""
+
+    def __init__(self, status: int, code: str, message: str, details: Optional[str] = None):
+        super().__init__(message)
+        self.status = status
+        self.body = {"code": code, "message": message, "details": details, "hint": None}
+
+_ultimo_instante = datetime.min.replace(tzinfo=timezone.utc)
+_instante_lock = threading.Lock()
+
+def now_iso() -> str:
+    """Como clock_timestamp(): estrictamente creciente, dos escrituras nunca comparten instante"""
+    global _ultimo_instante
+    with _instante_lock:
+        ahora = datetime.now(timezone.utc)
+        if ahora <= _ultimo_instante:
+            ahora = _ultimo_instante + timedelta(microseconds=1)
+        _ultimo_instante = ahora
+    return ahora.isoformat()
+
+# --- Parseo ---
+
+def split_top_level(text: str, sep: str = ",") -> List[str]:
+    """Divide por `sep` fuera de paréntesis y comillas"""
+    partes, actual, nivel, en_comillas, escape = [], [], 0, False, False
+    for char in text:
+        if escape:
+            actual.append(char)
+            escape = False
+            continue
+        if char == "\\" and en_comillas:
+            actual.append(char)
+            escape = True
+            continue
+        if char == '"':
+            en_comillas = not en_comillas
+        elif not en_comillas and char == "(":
+            nivel += 1
+        elif not en_comillas and char == ")":
+            nivel -= 1
+        elif not en_comillas and nivel == 0 and char == sep:
+            partes.append("".join(actual))
+            actual = []
+            continue
+        actual.append(char)
+    if actual or partes:
+        partes.append("".join(actual))
+    return partes
+
+def unquote(value: str) -> str:
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return re.sub(r'\\(.)', r'\1', value[1:-1])
+    return value
+
+def parse_select(text: str) -> List[Tuple]:
+    """
+    "*, bovinos!inner(id, fincas!inner(propietario_id))" ->
+    [("col", "*"), ("embed", "bovinos", True, [("col", "id"), ("embed", "fincas", True, [...])])]
+    """
+    items = []
+    for parte in split_top_level(text.replace(" ", "")):
+        if not parte:
+            continue
+        if parte.endswith(")") and "(" in parte:
+            cabeza, cuerpo = parte[:-1].split("(", 1)
+            nombre, _, hint = cabeza.partition("!")
+            items.append(("embed", nombre.split(":")[-1], hint == "inner", parse_select(cuerpo)))
+        else:
+            items.append(("col", parte))
+    return items
+
+def parse_condition(expr: str) -> Tuple[bool, str, Any]:
+    """ "not.is.null" -> (True, "is", "null"); "in.(a,b)" -> (False, "in", {"a", "b"}) """
+    negado = False
+    if expr.startswith("not."):
+        negado, expr = True, expr[4:]
+    op, _, valor = expr.partition(".")
+    if op == "in":
+        valores = frozenset(unquote(v) for v in split_top_level(valor.strip("()")))
+        return negado, op, valores
+    return negado, op, unquote(valor)
+
+def parse_logic(text: str) -> Tuple:
+    """ "(a.gt.1,and(a.eq.1,id.gt.2))" dentro de or= -> árbol ("or", [...]) """
+    nodos = []
+    for parte in split_top_level(text.strip()[1:-1]):
+        for operador in ("and", "or", "not.and", "not.or"):
+            if parte.startswith(operador + "("):
+                nodo = parse_logic(parte[len(operador):])
+                nodos.append(("not", (operador[4:], nodo[1])) if operador.startswith("not.") else (operador, nodo[1]))
+                break
+        else:
+            columna, _, resto = parte.partition(".")
+            nodos.append(("cond", columna) + parse_condition(resto))
+    return ("or", nodos)
+
+# --- Evaluación ---
+
+def _coerce(row_value: Any, raw: Any) -> Any:
+    if isinstance(raw, frozenset):
+        return raw if isinstance(row_value, str) else frozenset(_coerce(row_value, v) for v in raw)
+    if isinstance(row_value, bool):
+        return str(raw).lower() == "true"
+    if isinstance(row_value, (int, float)):
+        try:
+            return float(raw)
+        except ValueError:
+            return raw
+    return raw
+
+def _like(pattern: str, flags: int = 0) -> "re.Pattern":
+    partes = [".*" if c in "%*" else re.escape(c) for c in pattern]
+    return re.compile("^" + "".join(partes) + "$", flags | re.DOTALL)
+
+def matches(row_value: Any, negado: bool, op: str, raw: Any) -> bool:
+    if op == "is":
+        esperado = {"null": None, "true": True, "false": False}.get(str(raw).lower(), raw)
+        resultado = row_value is esperado if esperado is None else row_value == esperado
+        return resultado != negado
+
+    if row_value is None:
+        return False  # Comparaciones con NULL nunca son verdaderas (ni negadas)
+
+    # Camino rápido (ids y fechas): sin conversión de tipos
+    if isinstance(row_value, str) and op in ("eq", "in"):
+        return (row_value == raw if op == "eq" else row_value in raw) != negado
+
+    valor = _coerce(row_value, raw)
+    comparable = row_value if not isinstance(row_value, (dict, list)) else json.dumps(row_value)
+    if isinstance(valor, str) and not isinstance(comparable, str):
+        comparable = str(comparable)
+
+    if op == "eq":
+        resultado = comparable == valor
+    elif op == "neq":
+        resultado = comparable != valor
+    elif op == "gt":
+        resultado = comparable > valor
+    elif op == "gte":
+        resultado = comparable >= valor
+    elif op == "lt":
+        resultado = comparable < valor
+    elif op == "lte":
+        resultado = comparable <= valor
+    elif op == "like":
+        resultado = bool(_like(str(raw)).match(str(row_value)))
+    elif op == "ilike":
+        resultado = bool(_like(str(raw), re.IGNORECASE).match(str(row_value)))
+    elif op == "in":
+        resultado = comparable in valor
+    else:
+        raise PostgrestError(400, "PGRST100", f"Operador no soportado: {op}")
+    return resultado != negado
+
+def eval_logic(row: Dict[str, Any], nodo: Tuple) -> bool:
+    tipo = nodo[0]
+    if tipo == "cond":
+        _, columna, negado, op, valor = nodo
+        return matches(row.get(columna), negado, op, valor)
+    if tipo == "not":
+        return not eval_logic(row, nodo[1])
+    resultados = (eval_logic(row, hijo) for hijo in nodo[1])
+    return all(resultados) if tipo == "and" else any(resultados)
+
+def _sort_rows(rows: List[Dict[str, Any]], order: str) -> List[Dict[str, Any]]:
+    for parte in reversed(order.split(",")):
+        columna, *mods = parte.split(".")
+        desc = "desc" in mods
+        nulls_first = "nullsfirst" in mods or (desc and "nullslast" not in mods)
+        con_valor = [r for r in rows if r.get(columna) is not None]
+        nulos = [r for r in rows if r.get(columna) is None]
+        con_valor.sort(key=lambda r: r[columna], reverse=desc)
+        rows = nulos + con_valor if nulls_first else con_valor + nulos
+    return rows
+
+class PostgrestStore:
+    """Tablas en memoria con la semántica de PostgREST que usa la aplicación"""
+
+    def __init__(self):
+        self.tables: Dict[str, List[Dict[str, Any]]] = {name: [] for name in TABLES}
+
+    def _table(self, name: str) -> List[Dict[str, Any]]:
+        if name in VIEWS:
+            return VIEWS[name](self.tables)
+        if name not in self.tables:
+            raise PostgrestError(404, "42P01", f'relation "public.{name}" does not exist')
+        return self.tables[name]
+
+    # --- Lectura ---
+
+    def _embed(self, table: str, rows: List[Dict[str, Any]], item: Tuple,
+               filtros: Dict[str, List[Tuple]]) -> Tuple[str, str, bool, Dict[Any, List[Dict[str, Any]]]]:
+        """
+        Resuelve un recurso embebido para todas las filas a la vez (índice por
+        columna remota): (columna local, cardinalidad, inner, valor -> filas)
+        """
+        _, nombre, inner, sub_items = item
+        relacion = RELATIONS.get((table, nombre))
+        if relacion is None:
+            raise PostgrestError(400, "PGRST200", f"Could not find a relationship between '{table}' and '{nombre}'")
+        local, remota, cardinalidad = relacion
+
+        claves = {row.get(local) for row in rows} - {None}
+        candidatos = [r for r in self._table(nombre) if r.get(remota) in claves]
+        sub_filtros = {k[len(nombre) + 1:]: v for k, v in filtros.items() if k.startswith(nombre + ".")}
+        indice: Dict[Any, List[Dict[str, Any]]] = {}
+        for original, salida in self._resolve(nombre, candidatos, sub_items, sub_filtros):
+            indice.setdefault(original.get(remota), []).append(salida)
+        return local, cardinalidad, inner, indice
+
+    def _resolve(self, table: str, rows: List[Dict[str, Any]], items: List[Tuple],
+                 filtros: Dict[str, List[Tuple]]) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """Filtra (columnas propias), embebe y proyecta: [(fila original, fila de salida)]"""
+        propios = [(col, cond) for col, conds in filtros.items() if "." not in col for cond in conds]
+        columnas = [item[1] for item in items if item[0] == "col"]
+        filas = [row for row in rows if all(matches(row.get(col), *cond) for col, cond in propios)]
+        embebidos = [(item[1],) + self._embed(table, filas, item, filtros) for item in items if item[0] == "embed"]
+
+        resultado = []
+        for row in filas:
+            salida = dict(row) if "*" in columnas or not columnas else {c: row.get(c) for c in columnas}
+            incluir = True
+            for nombre, local, cardinalidad, inner, indice in embebidos:
+                relacionadas = indice.get(row.get(local), [])
+                if inner and not relacionadas:
+                    incluir = False
+                    break
+                if cardinalidad == "one":
+                    salida[nombre] = relacionadas[0] if relacionadas else None
+                else:
+                    salida[nombre] = relacionadas
+            if incluir:
+                resultado.append((row, salida))
+        return resultado
+
+    def select(self, table: str, params: List[Tuple[str, str]]) -> Tuple[List[Dict[str, Any]], int, int]:
+        """(filas de la página, total filtrado, offset)"""
+        items = parse_select(dict(params).get("select", "*"))
+        filtros: Dict[str, List[Tuple]] = {}
+        logica = []
+        for clave, valor in params:
+            if clave == "or":
+                logica.append(parse_logic(valor))
+            elif clave == "and":
+                logica.append(("and", parse_logic(valor)[1]))
+            elif clave not in RESERVED_PARAMS:
+                filtros.setdefault(clave, []).append(parse_condition(valor))
+
+        base = [row for row in self._table(table) if all(eval_logic(row, nodo) for nodo in logica)]
+        # Se conserva la fila original para ordenar por columnas no seleccionadas
+        pares = self._resolve(table, base, items, filtros)
+
+        opciones = dict(params)
+        if "order" in opciones:
+            orden = _sort_rows([{**row, "__salida": salida} for row, salida in pares], opciones["order"])
+            salidas = [r["__salida"] for r in orden]
+        else:
+            salidas = [salida for _, salida in pares]
+
+        total = len(salidas)
+        offset = int(opciones.get("offset", 0))
+        limite = int(opciones["limit"]) if "limit" in opciones else None
+        pagina = salidas[offset:offset + limite if limite is not None else None]
+        return pagina, total, offset
+
+    # --- Escritura ---
+
+    def _matching(self, table: str, params: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        filtros = [(k, parse_condition(v)) for k, v in params if k not in RESERVED_PARAMS]
+        logica = [parse_logic(v) for k, v in params if k == "or"]
+        return [
+            row for row in self._table(table)
+            if all(matches(row.get(col), *cond) for col, cond in filtros) and all(eval_logic(row, n) for n in logica)
+        ]
+
+    @staticmethod
+    def _normalize(values: Dict[str, Any]) -> Dict[str, Any]:
+        return {k: now_iso() if v == "now()" else v for k, v in values.items()}
+
+    def insert(self, table: str, body: Any, upsert: bool = False) -> List[Dict[str, Any]]:
+        filas = self._table(table)
+        por_id = {row["id"]: row for row in filas}
+        creadas = []
+        for datos in (body if isinstance(body, list) else [body]):
+            datos = self._normalize(datos)
+            existente = por_id.get(datos.get("id"))
+            if existente is not None:
+                if not upsert:
+                    raise PostgrestError(409, "23505", f'duplicate key value violates unique constraint "{table}_pkey"')
+                existente.update(datos)
+                existente["updated_at"] = now_iso()
+                creadas.append(dict(existente))
+                continue
+            ahora = now_iso()
+            fila = {"id": str(uuid.uuid4()), "created_at": ahora, "updated_at": ahora, **datos}
+            filas.append(fila)
+            por_id[fila["id"]] = fila
+            creadas.append(dict(fila))
+        return creadas
+
+    def update(self, table: str, params: List[Tuple[str, str]], body: Dict[str, Any]) -> List[Dict[str, Any]]:
+        datos = self._normalize(body)
+        actualizadas = []
+        for row in self._matching(table, params):
+            row.update(datos)
+            row.setdefault("updated_at", None)
+            if "updated_at" not in datos:
+                row["updated_at"] = now_iso()
+            actualizadas.append(dict(row))
+        return actualizadas
+
+    def delete(self, table: str, params: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        borradas = self._matching(table, params)
+        self._remove(table, borradas)
+        return [dict(row) for row in borradas]
+
+    def _remove(self, table: str, rows: List[Dict[str, Any]]) -> None:
+        ids = {id(row) for row in rows}
+        self.tables[table] = [row for row in self.tables[table] if id(row) not in ids]
+        if table in TOMBSTONES:
+            self._record_deletions(table, rows)
+        for hija, columna in CASCADES.get(table, []):
+            claves = {row["id"] for row in rows}
+            self._remove(hija, [row for row in self.tables[hija] if row.get(columna) in claves])
+
+    def _owner(self, table: str, row: Dict[str, Any]) -> Optional[str]:
+        """Propietario de una fila; si el padre ya se borró, el de la baja del padre"""
+        if table == "fincas":
+            return row.get("propietario_id")
+        _, padre, columna = TOMBSTONES[table]
+        padre_id = row.get(columna)
+        fila_padre = next((r for r in self.tables[padre] if r["id"] == padre_id), None)
+        if fila_padre is not None:
+            return self._owner(padre, fila_padre)
+        baja = next((e for e in self.tables["eliminaciones"]
+                     if e["tabla"] == TOMBSTONES[padre][0] and e["registro_id"] == padre_id), None)
+        return baja["propietario_id"] if baja else None
+
+    def _record_deletions(self, table: str, rows: List[Dict[str, Any]]) -> None:
+        """Emula el trigger registrar_eliminacion: antes que la cascada, como los triggers diferidos"""
+        nombre = TOMBSTONES[table][0]
+        bajas = [
+            {"propietario_id": propietario, "tabla": nombre, "registro_id": row["id"]}
+            for row in rows
+            for propietario in [self._owner(table, row)]
+            if propietario is not None
+        ]
+        if bajas:
+            self.insert("eliminaciones", bajas)
+
+    # --- HTTP ---
+
+    def handle(self, method: str, table: str, query: str, headers: Dict[str, str], body: bytes) -> Tuple[int, Dict[str, str], Any]:
+        """(status, cabeceras, cuerpo JSON o None)"""
+        params = parse_qsl(query, keep_blank_values=True)
+        prefer = headers.get("prefer", "")
+        representacion = "return=representation" in prefer
+
+        if method in ("GET", "HEAD"):
+            filas, total, offset = self.select(table, params)
+            conteo = re.search(r"count=(exact|planned|estimated)", prefer)
+            rango = f"{offset}-{offset + len(filas) - 1}" if filas else "*"
+            headers_salida = {"Content-Range": f"{rango}/{total if conteo else '*'}"}
+            return 200, headers_salida, None if method == "HEAD" else filas
+
+        datos = json.loads(body) if body else {}
+        if method == "POST":
+            filas = self.insert(table, datos, upsert="merge-duplicates" in prefer)
+            return 201, {}, filas if representacion else None
+        if method == "PATCH":
+            filas = self.update(table, params, datos)
+            return 200, {}, filas if representacion else None
+        if method == "DELETE":
+            filas = self.delete(table, params)
+            return 200, {}, filas if representacion else None
+        raise PostgrestError(405, "PGRST117", f"Método no soportado: {method}")
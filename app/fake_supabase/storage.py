@@ -0,0 +1,142 @@
+"""
+Supabase Storage en memoria
+===========================
+
+Buckets, subida (POST/PUT con `x-upsert`), descarga y HEAD (incluida la ruta
+pública), listado por prefijo y borrado por lote (`prefixes`).
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime, timezone
+import json
+import uuid
+
+def _error(status: int, error: str, message: str) -> Tuple[int, Dict[str, str], Any]:
+    return status, {}, {"statusCode": str(status), "error": error, "message": message}
+
+class FakeStorage:
+    """Objetos en memoria por bucket: {bucket: {clave: objeto}}"""
+
+    def __init__(self, buckets: Optional[List[str]] = None):
+        self.buckets: Dict[str, Dict[str, Any]] = {}
+        self.objects: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for nombre in buckets or []:
+            self.create_bucket(nombre)
+
+    def create_bucket(self, name: str, public: bool = True) -> None:
+        ahora = datetime.now(timezone.utc).isoformat()
+        self.buckets[name] = {
+            "id": name, "name": name, "owner": "", "public": public,
+            "file_size_limit": None, "allowed_mime_types": None,
+            "created_at": ahora, "updated_at": ahora
+        }
+        self.objects.setdefault(name, {})
+
+    @staticmethod
+    def _metadata(obj: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "size": len(obj["data"]),
+            "mimetype": obj["content_type"],
+            "cacheControl": obj["cache_control"],
+            "eTag": f'"{obj["id"]}"'
+        }
+
+    def _put(self, bucket: str, key: str, headers: Dict[str, str], body: bytes, upsert: bool) -> Tuple[int, Dict[str, str], Any]:
+        objetos = self.objects[bucket]
+        if key in objetos and not upsert:
+            return _error(400, "Duplicate", "The resource already exists")
+        ahora = datetime.now(timezone.utc).isoformat()
+        anterior = objetos.get(key)
+        objetos[key] = {
+            "id": str(uuid.uuid4()),
+            "data": body,
+            "content_type": headers.get("content-type", "application/octet-stream"),
+            "cache_control": headers.get("cache-control", "no-cache"),
+            "created_at": anterior["created_at"] if anterior else ahora,
+            "updated_at": ahora
+        }
+        return 200, {}, {"Id": objetos[key]["id"], "Key": f"{bucket}/{key}"}
+
+    def _list(self, bucket: str, datos: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Entradas directamente bajo el prefijo; las subcarpetas van sin id"""
+        prefijo = (datos.get("prefix") or "").strip("/")
+        base = f"{prefijo}/" if prefijo else ""
+        archivos: Dict[str, Dict[str, Any]] = {}
+        carpetas = set()
+        for key, obj in self.objects[bucket].items():
+            if not key.startswith(base):
+                continue
+            resto = key[len(base):]
+            if "/" in resto:
+                carpetas.add(resto.split("/", 1)[0])
+            else:
+                archivos[resto] = {
+                    "name": resto, "id": obj["id"],
+                    "created_at": obj["created_at"], "updated_at": obj["updated_at"],
+                    "last_accessed_at": obj["updated_at"], "metadata": self._metadata(obj)
+                }
+        entradas = [
+            {"name": c, "id": None, "created_at": None, "updated_at": None, "last_accessed_at": None, "metadata": None}
+            for c in carpetas
+        ] + list(archivos.values())
+
+        orden = datos.get("sortBy") or {"column": "name", "order": "asc"}
+        columna = orden.get("column", "name")
+        entradas.sort(key=lambda e: (e.get(columna) is None, e.get(columna) or ""), reverse=orden.get("order") == "desc")
+        offset = int(datos.get("offset") or 0)
+        return entradas[offset:offset + int(datos.get("limit") or 100)]
+
+    def handle(self, method: str, path: str, headers: Dict[str, str], body: bytes) -> Tuple[int, Dict[str, str], Any]:
+        """(status, cabeceras, cuerpo JSON, bytes o None) para una ruta relativa a /storage/v1"""
+        segmentos = path.split("/")
+
+        if segmentos[0] == "bucket":
+            if len(segmentos) == 1 and method == "GET":
+                return 200, {}, list(self.buckets.values())
+            bucket = self.buckets.get(segmentos[1]) if len(segmentos) > 1 else None
+            if bucket is None:
+                return _error(404, "Bucket not found", "Bucket not found")
+            return 200, {}, bucket
+
+        if segmentos[0] != "object" or len(segmentos) < 2:
+            return _error(404, "not_found", f"Ruta de storage no soportada: {method} /{path}")
+
+        if segmentos[1] == "list" and method == "POST":
+            if segmentos[2] not in self.buckets:
+                return _error(404, "Bucket not found", "Bucket not found")
+            return 200, {}, self._list(segmentos[2], json.loads(body) if body else {})
+
+        # /object/public/<bucket>/<clave> y /object/authenticated/<bucket>/<clave> solo lectura
+        if segmentos[1] in ("public", "authenticated"):
+            segmentos = segmentos[1:]
+        bucket, key = segmentos[1], "/".join(segmentos[2:])
+        if bucket not in self.buckets:
+            return _error(404, "Bucket not found", "Bucket not found")
+
+        if method == "DELETE" and not key:
+            prefijos = (json.loads(body) if body else {}).get("prefixes", [])
+            borrados = []
+            for prefijo in prefijos:
+                obj = self.objects[bucket].pop(prefijo, None)
+                if obj is not None:
+                    borrados.append({"name": prefijo, "bucket_id": bucket, "id": obj["id"], "metadata": self._metadata(obj)})
+            return 200, {}, borrados
+
+        if method in ("POST", "PUT"):
+            upsert = method == "PUT" or headers.get("x-upsert", "").lower() == "true"
+            return self._put(bucket, key, headers, body, upsert)
+
+        obj = self.objects[bucket].get(key)
+        if obj is None:
+            return _error(404, "not_found", "Object not found")
+        if method == "DELETE":
+            del self.objects[bucket][key]
+            return 200, {}, {"message": "Successfully deleted"}
+        if method in ("GET", "HEAD"):
+            cabeceras = {
+                "Content-Type": obj["content_type"],
+                "Cache-Control": obj["cache_control"],
+                "ETag": f'"{obj["id"]}"',
+                "Content-Length": str(len(obj["data"]))
+            }
+            return 200, cabeceras, None if method == "HEAD" else obj["data"]
+        return _error(405, "method_not_allowed", f"Método no soportado: {method}")
@@ -1,65 +1,69 @@
 from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.exceptions import RequestValidationError
-from fastapi.encoders import jsonable_encoder
+from fastapi.datastructures import Default
 from app.config.settings import settings
 from app.views.api import api_router
-from app.core.startup import startup_checks, print_status, print_info
+from app.core.startup import startup_checks, startup_state, print_status, print_info
+from app.utils.json_response import FastJSONResponse
+from app.middleware.diagnostics import RequestDiagnosticsMiddleware
+from app.middleware.request_id import RequestIdMiddleware
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.profiling import ProfilingMiddleware, profiling_enabled
+from app.controllers import profiling_controller
+from app.core import metrics
+from app.core.health import upstream_health
+from app.config.database import close_clients
+from app.core.logging_config import setup_logging, shutdown_logging
+from app.services.image_service import image_service, shutdown_process_pool
+from app.services.response_cache_service import response_cache_service
 import logging
-import time
 import asyncio
-import json
-from decimal import Decimal
-from datetime import datetime, date
-import uuid
 
-# Configurar logging
-logging.basicConfig(level=logging.INFO)
+# Configurar logging (JSON, niveles por módulo y escritura en un hilo aparte)
+setup_logging(settings.log_level, settings.log_format, settings.log_levels)
 logger = logging.getLogger(__name__)
 
-# Variable global para almacenar resultados de startup
-startup_results = {}
-
-# JSON Encoder personalizado para manejar Decimals
-class CustomJSONEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, Decimal):
-            return float(obj)  # Convertir Decimal a float
-        elif isinstance(obj, (datetime, date)):
-            return obj.isoformat()
-        elif isinstance(obj, uuid.UUID):
-            return str(obj)
-        return super().default(obj)
-
-# Función helper para respuestas JSON personalizadas
-def custom_json_response(content, status_code: int = 200):
-    """Crea una respuesta JSON usando el encoder personalizado"""
-    return JSONResponse(
-        content=json.loads(json.dumps(content, cls=CustomJSONEncoder)),
-        status_code=status_code
-    )
+# Tareas de fondo iniciadas en el arranque
+background_tasks = []
 
 # Crear instancia de FastAPI
 app = FastAPI(
     title=settings.app_name,
     description="Backend para el sistema de Monitoreo Bovinos con IA",
     version=settings.app_version,
-    debug=settings.debug
+    debug=settings.debug,
+    # Serialización JSON única (orjson). Como valor por defecto, las rutas con
+    # response_model conservan la serialización directa a bytes de Pydantic.
+    default_response_class=Default(FastJSONResponse)
 )
 
 # Eventos de ciclo de vida
 @app.on_event("startup")
 async def startup_event():
     """Evento que se ejecuta al iniciar el servidor"""
-    global startup_results
-    startup_results = await startup_checks()
+    # Las verificaciones corren en segundo plano: el servidor acepta tráfico de inmediato
+    # y /health informa el progreso
+    background_tasks.append(asyncio.create_task(startup_checks()))
+    background_tasks.append(asyncio.create_task(upstream_health.run()))
+    
+    if settings.image_sweeper_enabled:
+        background_tasks.append(asyncio.create_task(image_service.run_sweeper()))
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Evento que se ejecuta al cerrar el servidor"""
     print_info("🛑 Cerrando servidor...")
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    await close_clients()
+    await response_cache_service.close()
+    shutdown_process_pool()
     print_status("Servidor detenido correctamente", True, "👋")
+    shutdown_logging()
 
 # Configurar CORS
 app.add_middleware(
@@ -68,67 +72,26 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count", "X-Request-ID"],
 )
 
-# Middleware para logging de peticiones a upload-profile
-@app.middleware("http")
-async def log_upload_profile_requests(request: Request, call_next):
-    """Middleware temporal para debugging de upload-profile"""
-    
-    # Solo loggear peticiones a upload-profile
-    if "/images/upload-profile" in str(request.url):
-        print(f"🌐 === MIDDLEWARE: Petición recibida ===")
-        print(f"📍 URL: {request.url}")
-        print(f"🔧 Método: {request.method}")
-        print(f"📋 Headers: {dict(request.headers)}")
-        
-        # Leer el body si es POST
-        if request.method == "POST":
-            try:
-                # Obtener el body raw
-                body = await request.body()
-                print(f"📦 Body size: {len(body)} bytes")
-                
-                # Intentar parsear como JSON
-                if body:
-                    try:
-                        import json
-                        body_json = json.loads(body.decode())
-                        print(f"📝 Body JSON keys: {list(body_json.keys()) if isinstance(body_json, dict) else 'Not dict'}")
-                        
-                        # Si hay image_base64, mostrar info sobre él
-                        if isinstance(body_json, dict) and 'image_base64' in body_json:
-                            b64_data = body_json['image_base64']
-                            print(f"📷 image_base64 length: {len(b64_data)}")
-                            print(f"📷 image_base64 starts with: {b64_data[:50]}...")
-                            
-                            if 'file_name' in body_json:
-                                print(f"📄 file_name: {body_json['file_name']}")
-                        else:
-                            print("❌ No se encontró 'image_base64' en el body JSON")
-                            
-                    except json.JSONDecodeError as e:
-                        print(f"❌ Error parseando JSON: {e}")
-                        print(f"📝 Body raw (primeros 200 chars): {body.decode()[:200]}...")
-                    except Exception as e:
-                        print(f"❌ Error general parseando body: {e}")
-                        
-                # Recrear el request con el body
-                from starlette.requests import Request as StarletteRequest
-                
-                async def receive():
-                    return {"type": "http.request", "body": body}
-                
-                request._receive = receive
-                
-            except Exception as e:
-                print(f"❌ Error leyendo body: {e}")
-        
-        print(f"🌐 === MIDDLEWARE: Fin logging ===")
-    
-    # Continuar con la petición
-    response = await call_next(request)
-    return response
+# Compresión gzip (sync, finca completa y listados en redes móviles lentas)
+if settings.gzip_enabled:
+    app.add_middleware(GZipMiddleware, minimum_size=settings.gzip_minimum_size, compresslevel=settings.gzip_compress_level)
+
+# Diagnóstico muestreado por ruta (sin leer el cuerpo de las peticiones)
+app.add_middleware(RequestDiagnosticsMiddleware)
+
+# Perfilado opcional de las rutas de la API (sin costo si no está configurado)
+if profiling_enabled():
+    app.add_middleware(ProfilingMiddleware)
+
+# Latencia por plantilla de ruta y peticiones en curso (/metrics)
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
+# ID de petición para correlacionar logs y línea de acceso (el más externo)
+app.add_middleware(RequestIdMiddleware)
 
 # Manejadores de errores globales ACTUALIZADOS
 @app.exception_handler(HTTPException)
@@ -139,7 +102,7 @@ async def http_exception_handler(request: Request, exc: HTTPException):
         "detail": exc.detail,
         "status_code": exc.status_code
     }
-    return custom_json_response(content, exc.status_code)
+    return FastJSONResponse(content, exc.status_code)
 
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
@@ -149,18 +112,18 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
         "detail": "Error de validación",
         "errors": exc.errors()
     }
-    return custom_json_response(content, 422)
+    return FastJSONResponse(content, 422)
 
 @app.exception_handler(Exception)
 async def general_exception_handler(request: Request, exc: Exception):
     """Manejador para errores generales"""
-    logger.error(f"Error no manejado: {str(exc)}")
+    logger.error("Error no manejado en %s %s", request.method, request.url.path, exc_info=exc)
     content = {
         "error": True,
         "detail": "Error interno del servidor",
         "message": str(exc) if settings.debug else "Ha ocurrido un error inesperado"
     }
-    return custom_json_response(content, 500)
+    return FastJSONResponse(content, 500)
 
 # Rutas de salud y información ACTUALIZADAS
 @app.get("/")
@@ -171,69 +134,56 @@ async def root():
         "version": settings.app_version,
         "status": "running"
     }
-    return custom_json_response(content)
+    return FastJSONResponse(content)
 
 @app.get("/health")
 async def health_check():
-    """Verificación de salud del servicio"""
-    global startup_results
-    
-    # Estado general basado en los resultados de startup
-    overall_status = "healthy"
-    if startup_results:
-        if not all(startup_results.values()):
-            overall_status = "degraded"
-    else:
-        overall_status = "starting"
+    """Verificación de salud del servicio (estado de arranque y último sondeo de Supabase)"""
+    overall_status = startup_state.overall_status()
+    if overall_status == "healthy" and upstream_health.failing():
+        overall_status = "degraded"
     
     content = {
         "status": overall_status,
         "service": settings.app_name,
         "version": settings.app_version,
-        "services": startup_results if startup_results else "initializing"
+        "services": startup_state.results() if startup_state.done else "initializing",
+        "startup": startup_state.snapshot(),
+        "upstream": upstream_health.snapshot()
+    }
+    return FastJSONResponse(content)
+
+@app.get("/livez", include_in_schema=False)
+async def liveness():
+    """Liveness: el proceso responde (sin E/S)"""
+    return FastJSONResponse({"status": "alive"})
+
+@app.get("/readyz", include_in_schema=False)
+async def readiness():
+    """
+    Readiness: verificaciones estáticas del arranque correctas y último sondeo de
+    Supabase exitoso (resultado en caché). Un fallo de conexión al arrancar se
+    recupera con el siguiente sondeo.
+    """
+    ready = startup_state.done and startup_state.overall_status() == "healthy" and upstream_health.ready()
+    content = {
+        "status": "ready" if ready else "not_ready",
+        "startup": "done" if startup_state.done else "running",
+        "upstream": upstream_health.snapshot()
     }
-    return custom_json_response(content)
+    return FastJSONResponse(content, 200 if ready else 503)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint(request: Request):
+    """Métricas en formato de exposición de Prometheus"""
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if settings.metrics_token and request.headers.get("authorization") != f"Bearer {settings.metrics_token}":
+        raise HTTPException(status_code=401, detail="Token de métricas inválido")
+    return PlainTextResponse(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
 
 # Incluir todas las rutas de la API
 app.include_router(api_router, prefix="/api/v1")
 
-# Middleware personalizado para logging CON SOPORTE DECIMAL
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    """Middleware para logging de requests"""
-    start_time = time.time()
-    
-    # Log del request
-    logger.info(f"Request: {request.method} {request.url}")
-    
-    response = await call_next(request)
-    
-    # Log de la respuesta
-    process_time = time.time() - start_time
-    logger.info(f"Response: {response.status_code} - Time: {process_time:.4f}s")
-    
-    return response
-
-# Middleware para manejar automáticamente las respuestas con Decimals
-@app.middleware("http")
-async def decimal_json_middleware(request: Request, call_next):
-    """Middleware para convertir automáticamente respuestas con Decimals"""
-    response = await call_next(request)
-    
-    # Si la respuesta es JSON y contiene datos, procesarla
-    if (response.headers.get("content-type", "").startswith("application/json") and 
-        hasattr(response, 'body')):
-        try:
-            # Solo procesar si no es una respuesta ya procesada por custom_json_response
-            if not hasattr(response, '_custom_encoded'):
-                body = response.body
-                if body:
-                    content = json.loads(body)
-                    # Re-serializar usando nuestro encoder personalizado
-                    new_body = json.dumps(content, cls=CustomJSONEncoder)
-                    response.body = new_body.encode()
-        except (json.JSONDecodeError, AttributeError):
-            # Si no se puede decodificar o procesar, dejar la respuesta como está
-            pass
-    
-    return response
\ No newline at end of file
+# Consulta de perfiles capturados (requiere profiling_token)
+app.include_router(profiling_controller.router)
@@ -1,9 +1,13 @@
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from app.config.settings import settings
 from app.services.auth_service import auth_service
 from typing import Optional, Dict, Any
+import logging
 import uuid
 
+logger = logging.getLogger(__name__)
+
 security = HTTPBearer()
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Dict[str, Any]:
@@ -35,10 +39,20 @@ async def get_current_user_id(current_user: Dict[str, Any] = Depends(get_current
     Obtiene solo el ID del usuario actual
     """
     user_id = current_user.get("id")
-    print(f"🔐 AUTH: Usuario autenticado ID: {user_id}")
-    print(f"🔍 AUTH: Datos completos usuario: {current_user}")
+    logger.debug("Usuario autenticado", extra={"user_id": user_id})
     return user_id
 
+async def get_admin_user_id(current_user_id: str = Depends(get_current_user_id)) -> str:
+    """
+    ID del usuario actual si es administrador (settings.admin_user_ids); 403 si no
+    """
+    if current_user_id not in settings.admin_user_ids:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Se requieren permisos de administrador"
+        )
+    return current_user_id
+
 class AuthMiddleware:
     """
     Middleware personalizado para manejo de autenticación
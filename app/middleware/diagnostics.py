@@ -0,0 +1,69 @@
+from app.config.settings import settings
+from typing import Iterable, Optional
+import logging
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+class RequestDiagnosticsMiddleware:
+    """
+    Diagnóstico muestreado de peticiones (middleware ASGI puro).
+    Solo para las rutas configuradas: registra tamaños y tiempos contando los
+    bytes a medida que pasan, sin leer ni almacenar el cuerpo de la petición.
+    """
+
+    def __init__(self, app, routes: Optional[Iterable[str]] = None, sample_rate: Optional[float] = None):
+        self.app = app
+        self.routes = tuple(settings.diagnostics_routes if routes is None else routes)
+        self.sample_rate = settings.diagnostics_sample_rate if sample_rate is None else sample_rate
+
+    def _sampled(self, path: str) -> bool:
+        if not self.routes or self.sample_rate <= 0:
+            return False
+        if not path.startswith(self.routes):
+            return False
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._sampled(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        stats = {"request_bytes": 0, "response_bytes": 0, "status": None, "ttfb_ms": None, "body_read_ms": None}
+
+        async def counting_receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                stats["request_bytes"] += len(message.get("body", b""))
+                if not message.get("more_body", False):
+                    stats["body_read_ms"] = round((time.perf_counter() - start) * 1000, 2)
+            return message
+
+        async def counting_send(message):
+            if message["type"] == "http.response.start":
+                stats["status"] = message["status"]
+                stats["ttfb_ms"] = round((time.perf_counter() - start) * 1000, 2)
+            elif message["type"] == "http.response.body":
+                stats["response_bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            headers = dict(scope.get("headers") or [])
+            diagnostics = {
+                "method": scope["method"],
+                "path": scope["path"],
+                "content_type": headers.get(b"content-type", b"").decode("latin-1").split(";")[0],
+                "content_length": int(headers[b"content-length"]) if headers.get(b"content-length", b"").isdigit() else None,
+                "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+                **stats
+            }
+            logger.info(
+                "diagnostico %s %s status=%s request_bytes=%d response_bytes=%d duration_ms=%.2f",
+                diagnostics["method"], diagnostics["path"], diagnostics["status"],
+                diagnostics["request_bytes"], diagnostics["response_bytes"], diagnostics["duration_ms"],
+                extra={"diagnostics": diagnostics}
+            )
@@ -0,0 +1,32 @@
+from fastapi import Request, Response, status
+from typing import Dict, Optional
+
+# Respuestas por usuario: ningún proxy compartido las guarda y el cliente revalida siempre
+CACHE_CONTROL = "private, no-cache"
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparación débil de `If-None-Match` (lista separada por comas, `*` o `W/"..."`)"""
+    if not if_none_match:
+        return False
+    candidatos = [candidato.strip() for candidato in if_none_match.split(",")]
+    return "*" in candidatos or any(candidato.removeprefix("W/") == etag for candidato in candidatos)
+
+def etag_headers(etag: Optional[str]) -> Dict[str, str]:
+    """Cabeceras de validación; para las rutas que devuelven su propia Response"""
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL} if etag else {}
+
+def check_etag(request: Request, response: Response, etag: Optional[str]) -> Optional[Response]:
+    """
+    Devuelve un 304 si el cliente ya tiene la versión `etag`; si no, agrega ETag
+    y Cache-Control a la respuesta y devuelve None para que la ruta continúe.
+    Sin ETag (None) la ruta responde como siempre.
+    """
+    if etag is None:
+        return None
+
+    headers = etag_headers(etag)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,49 @@
+from app.core.metrics import http_request_duration, http_requests_in_flight
+import time
+
+def route_template(scope) -> str:
+    """
+    Plantilla completa de la ruta resuelta. En FastAPI recientes `scope["route"]`
+    es la ruta original del router incluido (sin el prefijo de include_router),
+    así que el prefijo se toma de los primeros segmentos de la ruta real.
+    """
+    template = getattr(scope.get("route"), "path", None)
+    if not template:
+        return "unmatched"
+    segmentos_ruta = [s for s in scope["path"].split("/") if s]
+    segmentos_plantilla = [s for s in template.split("/") if s]
+    sobrantes = len(segmentos_ruta) - len(segmentos_plantilla)
+    if sobrantes <= 0:
+        return template
+    return "/" + "/".join(segmentos_ruta[:sobrantes]) + template
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que mide cada petición HTTP. La etiqueta `route` es la
+    plantilla de la ruta (p. ej. /api/v1/fincas/{finca_id}) que resolvió el
+    router, para no crear una serie por cada ID; sin coincidencia es "unmatched".
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_flight.dec()
+            http_request_duration.observe(time.perf_counter() - inicio, scope["method"], route_template(scope), str(status_code))
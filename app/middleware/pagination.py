@@ -0,0 +1,39 @@
+from fastapi import HTTPException, Query, Response, status
+from app.config.settings import settings
+from app.utils.pagination import Page, decode_cursor
+from typing import Any, Dict, Optional, Tuple
+
+class PageParams:
+    """Parámetros de paginación ya validados"""
+
+    def __init__(self, limit: int, after: Optional[Tuple[Any, Any]], with_count: bool):
+        self.limit = limit
+        self.after = after
+        self.with_count = with_count
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Parámetros como parte de una clave (caché de respuestas, ETags)"""
+        return {"limit": self.limit, "after": self.after, "with_count": self.with_count}
+
+def page_params(default_limit: int = settings.page_default_limit, max_limit: int = settings.page_max_limit):
+    """
+    Dependencia con `limit`, `cursor` (valor de X-Next-Cursor de la página anterior)
+    y `count` (total estimado en X-Total-Count)
+    """
+    def dependency(
+        limit: int = Query(default=default_limit, ge=1, le=max_limit, description="Número máximo de elementos a devolver"),
+        cursor: Optional[str] = Query(default=None, description="Cursor de la página siguiente (cabecera X-Next-Cursor)"),
+        count: bool = Query(default=False, description="Incluir el total estimado en la cabecera X-Total-Count")
+    ) -> PageParams:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        return PageParams(limit, after, count)
+
+    return dependency
+
+def set_page_headers(response: Response, page: Optional[Page]) -> None:
+    """Agrega X-Next-Cursor / X-Total-Count a la respuesta"""
+    if page is not None:
+        response.headers.update(page.headers())
@@ -0,0 +1,87 @@
+from app.config.settings import settings
+from app.core.profiling import ProfileStore
+from typing import Optional
+import cProfile
+import hmac
+import logging
+import random
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+
+# Perfiles capturados; se consultan en /debug/profiles
+profile_store = ProfileStore(max_size=settings.profiling_store_size)
+
+def profiling_enabled() -> bool:
+    """El middleware solo se instala si hay token o muestreo configurado"""
+    return bool(settings.profiling_token) or settings.profiling_sample_rate > 0
+
+class ProfilingMiddleware:
+    """
+    Perfila con cProfile las peticiones a las rutas de la API que lo piden con
+    la cabecera `X-Profile: <profiling_token>` o que caen en el muestreo.
+    El ID del perfil se devuelve en `X-Profile-Id`.
+
+    cProfile mide el hilo completo: mientras la petición espera E/S, el código
+    de otras peticiones concurrentes también aparece. Por eso se perfila una
+    sola petición a la vez y las demás pasan sin perfilar.
+    """
+
+    def __init__(self, app, store: ProfileStore = profile_store, token: Optional[str] = None,
+                 sample_rate: Optional[float] = None, path_prefix: Optional[str] = None):
+        self.app = app
+        self.store = store
+        self.token = (settings.profiling_token if token is None else token) or ""
+        self.sample_rate = settings.profiling_sample_rate if sample_rate is None else sample_rate
+        self.path_prefix = settings.profiling_path_prefix if path_prefix is None else path_prefix
+        self._active = False
+
+    def _requested(self, scope) -> bool:
+        if not self.token:
+            return False
+        for name, value in scope.get("headers") or []:
+            if name == PROFILE_HEADER:
+                return hmac.compare_digest(value, self.token.encode())
+        return False
+
+    def _should_profile(self, scope) -> bool:
+        if scope["type"] != "http" or self._active or not scope["path"].startswith(self.path_prefix):
+            return False
+        if self._requested(scope):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex
+        status_code = 500
+
+        async def send_with_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = list(message.get("headers") or []) + [(PROFILE_ID_HEADER, profile_id.encode())]
+            await send(message)
+
+        self._active = True
+        profiler = cProfile.Profile()
+        inicio = time.perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profiler.disable()
+            self._active = False
+            duration_ms = round((time.perf_counter() - inicio) * 1000, 2)
+            self.store.add(
+                profile_id, profiler,
+                method=scope["method"], path=scope["path"], status=status_code, duration_ms=duration_ms
+            )
+            logger.info("Perfil %s capturado para %s %s (%.2fms)", profile_id, scope["method"], scope["path"], duration_ms)
@@ -0,0 +1,52 @@
+from app.core.logging_config import request_id_var
+import logging
+import time
+import uuid
+
+logger = logging.getLogger("app.access")
+
+REQUEST_ID_HEADER = b"x-request-id"
+
+class RequestIdMiddleware:
+    """
+    Middleware ASGI que asigna un ID a cada petición (reutiliza `X-Request-ID`
+    si el cliente o el proxy lo envían), lo deja en el contexto de logging,
+    lo devuelve en la respuesta y registra una línea de acceso al terminar.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope.get("headers") or []:
+            if name == REQUEST_ID_HEADER:
+                request_id = value.decode("latin-1")[:128]
+                break
+        if not request_id:
+            request_id = uuid.uuid4().hex
+
+        token = request_id_var.set(request_id)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = list(message.get("headers") or []) + [(REQUEST_ID_HEADER, request_id.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            duration_ms = round((time.perf_counter() - start) * 1000, 2)
+            logger.info(
+                "%s %s %s %.2fms", scope["method"], scope["path"], status_code, duration_ms,
+                extra={"method": scope["method"], "path": scope["path"], "status": status_code, "duration_ms": duration_ms}
+            )
+            request_id_var.reset(token)
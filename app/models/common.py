@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Optional, Dict
 
 class ProfileImageUploadRequest(BaseModel):
     """Modelo para subir imagen de perfil en base64"""
@@ -12,3 +12,4 @@ class ProfileImageUploadResponse(BaseModel):
     public_url: str
     file_name: str
     profile_updated: bool
+    variantes: Dict[str, str] = Field(default_factory=dict, description="URL pública de cada variante WebP por tamaño en px")
@@ -0,0 +1,54 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List, Dict
+from datetime import date
+from decimal import Decimal
+
+class MedidasMorfometricas(BaseModel):
+    """Medidas corporales usadas para estimar el peso"""
+    referencia: Optional[str] = Field(None, max_length=100, description="Identificador libre devuelto con la estimación")
+    altura_cm: Optional[Decimal] = Field(None, ge=0, max_digits=6, decimal_places=2)
+    l_torso_cm: Optional[Decimal] = Field(None, ge=0, max_digits=6, decimal_places=2)
+    l_oblicua_cm: Optional[Decimal] = Field(None, ge=0, max_digits=6, decimal_places=2)
+    l_cadera_cm: Optional[Decimal] = Field(None, ge=0, max_digits=6, decimal_places=2)
+    a_cadera_cm: Optional[Decimal] = Field(None, ge=0, max_digits=6, decimal_places=2)
+    edad_meses: Optional[int] = Field(None, ge=0)
+
+class EstimacionPeso(BaseModel):
+    """Peso estimado con intervalo aproximado del 95 %"""
+    referencia: Optional[str] = None
+    peso_estimado_kg: Optional[float] = None
+    peso_min_kg: Optional[float] = None
+    peso_max_kg: Optional[float] = None
+
+class EstimacionPesoBatchRequest(BaseModel):
+    """Lote de medidas para estimar en una sola llamada"""
+    medidas: List[MedidasMorfometricas] = Field(..., min_length=1)
+
+class EstimacionPesoBatchResponse(BaseModel):
+    estimaciones: List[EstimacionPeso]
+    total: int
+
+class EstimacionPesoBovino(EstimacionPeso):
+    """Estimación de un bovino a partir de su última medición"""
+    bovino_id: str
+    id_bovino: Optional[str] = None
+    fecha_medicion: Optional[date] = None
+    peso_bascula_kg: Optional[float] = None
+
+class EstimacionPesoFincaResponse(BaseModel):
+    finca_id: str
+    estimaciones: List[EstimacionPesoBovino]
+    total_bovinos_estimados: int
+
+class ModeloPesoInfo(BaseModel):
+    """Resumen del modelo de estimación entrenado"""
+    entrenado_en: str
+    muestras: int
+    alpha: float
+    sigma_log: float
+    metricas: Dict[str, float] = {}
+    exponentes: Dict[str, float] = {}
+    publicado: Optional[bool] = None  # Solo al entrenar: None sin bucket, False si falló la publicación
+
+class EntrenamientoPesoRequest(BaseModel):
+    alpha: Optional[float] = Field(None, gt=0, description="Regularización ridge (por defecto la configurada)")
@@ -1,6 +1,9 @@
 """
 Resolver referencias circulares entre modelos Pydantic
 """
+import logging
+
+logger = logging.getLogger(__name__)
 
 def resolve_model_references():
     """
@@ -18,7 +21,7 @@ def resolve_model_references():
         # Resolver referencias en BovinoWithMediciones
         BovinoWithMediciones.model_rebuild()
         
-        print("✅ Referencias de modelos resueltas correctamente")
+        logger.debug("Referencias de modelos resueltas correctamente")
         
     except Exception as e:
-        print(f"⚠️ Error resolviendo referencias de modelos: {e}")
+        logger.warning("Error resolviendo referencias de modelos: %s", e)
@@ -1,26 +1,93 @@
-from supabase import Client, create_client
-from app.config.database import supabase, supabase_admin
+from supabase import AsyncClient
+from supabase._async.auth_client import AsyncSupabaseAuthClient
+from app.config.database import supabase_async, supabase_admin_async, async_http_client
 from app.config.settings import settings
 from app.models.auth import UserRegister, UserLogin, PerfilCreate, PerfilUpdate
+from app.services.response_cache_service import ResponseCacheService, response_cache_service
+from app.utils.cache import TTLCache
+from app.utils.jwt_validator import (
+    JWTValidator,
+    TokenValidationError,
+    LocalValidationUnavailable,
+    token_fingerprint,
+    user_from_claims
+)
 from typing import Optional, Dict, Any
+import httpx
+import jwt
+import logging
+import time
 import uuid
 
+logger = logging.getLogger(__name__)
+
+# Prefijo de las revocaciones en el almacenamiento compartido de la caché de respuestas
+REVOCATION_KEY_PREFIX = "auth:revoked:"
+
 class AuthService:
-    def __init__(self, db_client: Client = supabase):
+    """
+    Registro, login, logout y verificación de tokens.
+
+    Un logout revoca el token hasta su `exp`. Con la caché de respuestas
+    compartida (Redis) la revocación se guarda allí y la ven todos los
+    workers. Sin almacenamiento compartido solo la conoce el worker que
+    atendió el logout: ese worker rechaza el token y verifica contra
+    Supabase (que ya cerró la sesión) los demás tokens de la misma sesión,
+    pero los otros workers siguen aceptando el token por validación local
+    hasta que expira. Las revocaciones locales no se descartan por LRU.
+    """
+
+    def __init__(self, db_client: AsyncClient = supabase_async, http_client: httpx.AsyncClient = async_http_client,
+                 cache: ResponseCacheService = response_cache_service):
         self.db = db_client  # Solo para queries de datos (perfiles)
-        self.admin_db = supabase_admin  # Para validación de tokens
+        self.admin_db = supabase_admin_async  # Para validación de tokens
+        self.http = http_client  # Pool compartido para login y registro
+        self.cache = cache  # Su almacenamiento, si es compartido, guarda las revocaciones
+        
+        # Validación local de JWT + caché de usuarios verificados (clave: hash del token)
+        jwt_secret = settings.supabase_jwt_secret
+        jwks_url = settings.supabase_jwks_url or f"{settings.supabase_url}/auth/v1/.well-known/jwks.json"
+        if settings.fake_supabase_enabled:
+            # El backend falso firma con HS256; sin JWKS no hay descargas por red
+            from app.fake_supabase import jwt_secret as fake_jwt_secret
+            jwt_secret, jwks_url = fake_jwt_secret(), None
+        self.jwt_validator = JWTValidator(
+            secret=jwt_secret,
+            jwks_url=jwks_url,
+            audience=settings.jwt_audience,
+            leeway=settings.jwt_leeway_seconds
+        )
+        self.token_cache = TTLCache(
+            max_size=settings.token_cache_max_size,
+            default_ttl=settings.token_cache_max_ttl_seconds
+        )
+        # Huella del token / id de sesión -> expiración (monotonic); solo se podan las vencidas
+        self.revoked_tokens: Dict[str, float] = {}
+        self.revoked_sessions: Dict[str, float] = {}
+        self.verification_stats = {"local": 0, "remote": 0, "rejected": 0}
+    
+    def _auth_client(self) -> AsyncSupabaseAuthClient:
+        """
+        Cliente de auth efímero para login/registro: sin sesión persistente
+        (un usuario no afecta a otros) y sobre el pool HTTP compartido, así que
+        no abre conexiones nuevas en cada llamada
+        """
+        return AsyncSupabaseAuthClient(
+            url=f"{settings.supabase_url}/auth/v1",
+            headers={
+                "apikey": settings.supabase_anon_key,
+                "Authorization": f"Bearer {settings.supabase_anon_key}"
+            },
+            auto_refresh_token=False,
+            persist_session=False,
+            http_client=self.http
+        )
     
     async def register_user(self, user_data: UserRegister) -> Dict[str, Any]:
         """Registra un nuevo usuario"""
         try:
-            # ✅ CREAR UN CLIENTE TEMPORAL para el registro
-            # Esto evita afectar el cliente singleton
-            temp_client = create_client(
-                settings.supabase_url,
-                settings.supabase_anon_key
-            )
-            
-            auth_response = temp_client.auth.sign_up({
+            # ✅ Cliente de auth temporal: no afecta al cliente singleton
+            auth_response = await self._auth_client().sign_up({
                 "email": user_data.email,
                 "password": user_data.password,
                 "options": {
@@ -44,14 +111,8 @@ class AuthService:
     async def login_user(self, user_data: UserLogin) -> Dict[str, Any]:
         """Autentica un usuario"""
         try:
-            # ✅ CREAR UN CLIENTE TEMPORAL para el login
-            # Esto evita que el login de un usuario afecte a otros
-            temp_client = create_client(
-                settings.supabase_url,
-                settings.supabase_anon_key
-            )
-            
-            auth_response = temp_client.auth.sign_in_with_password({
+            # ✅ Cliente de auth temporal: el login de un usuario no afecta a otros
+            auth_response = await self._auth_client().sign_in_with_password({
                 "email": user_data.email,
                 "password": user_data.password
             })
@@ -76,14 +137,14 @@ class AuthService:
         try:
             # ✅ Usar admin_db para queries de datos
             # Esto evita problemas de permisos
-            response = self.admin_db.table('perfiles').select('*').eq('id', user_id).execute()
+            response = await self.admin_db.table('perfiles').select('*').eq('id', user_id).execute()
             
             if response.data:
                 return response.data[0]
             return None
             
         except Exception as e:
-            print(f"Error obteniendo perfil: {str(e)}")
+            logger.error("Error obteniendo perfil de %s: %s", user_id, e)
             raise Exception(f"Error obteniendo perfil: {str(e)}")
     
     async def update_user_profile(self, user_id: str, profile_data: PerfilUpdate) -> Dict[str, Any]:
@@ -93,7 +154,7 @@ class AuthService:
             update_data['updated_at'] = 'now()'
             
             # ✅ Usar admin_db para actualizaciones
-            response = self.admin_db.table('perfiles').update(update_data).eq('id', user_id).execute()
+            response = await self.admin_db.table('perfiles').update(update_data).eq('id', user_id).execute()
             
             if response.data:
                 return response.data[0]
@@ -110,24 +171,159 @@ class AuthService:
             user = await self.verify_token(access_token)
             
             if not user:
-                print("⚠️ Token inválido en logout")
+                logger.warning("Token inválido en logout")
                 return False
             
+            # Revocar localmente hasta su expiración y cerrar la sesión en Supabase
+            await self.revoke_token(access_token)
+            try:
+                await self.admin_db.auth.admin.sign_out(access_token, scope="local")
+            except Exception as sign_out_error:
+                logger.warning("No se pudo cerrar la sesión remota: %s", sign_out_error)
+            
             user_id = user.get('id')
-            print(f"✅ Logout exitoso para usuario: {user_id}")
+            logger.info("Logout exitoso", extra={"user_id": user_id})
             
             return True
             
         except Exception as e:
-            print(f"❌ Error en logout: {str(e)}")
+            logger.error("Error en logout: %s", e)
             return False
     
-    async def verify_token(self, access_token: str) -> Optional[Dict[str, Any]]:
+    def _token_ttl(self, access_token: str) -> float:
+        """Segundos de vida restantes del token (acotados por la configuración de caché)"""
+        try:
+            claims = jwt.decode(access_token, options={"verify_signature": False})
+            remaining = float(claims.get("exp", 0)) - time.time()
+        except jwt.InvalidTokenError:
+            return 0
+        return min(remaining, settings.token_cache_max_ttl_seconds)
+    
+    @staticmethod
+    def _revocation_key(token_key: str) -> str:
+        return REVOCATION_KEY_PREFIX + token_key
+    
+    @staticmethod
+    def _is_revoked_locally(revocations: Dict[str, float], key: Optional[str]) -> bool:
+        expires_at = revocations.get(key) if key else None
+        return expires_at is not None and expires_at > time.monotonic()
+    
+    @staticmethod
+    def _remember_revocation(revocations: Dict[str, float], key: str, ttl: float) -> None:
+        now = time.monotonic()
+        for expired in [k for k, expires_at in revocations.items() if expires_at <= now]:
+            del revocations[expired]
+        revocations[key] = now + ttl
+    
+    async def revoke_token(self, access_token: str) -> None:
+        """
+        Invalida el token hasta su expiración: en este proceso y, si la caché de
+        respuestas es compartida, en todos los workers
+        """
+        token_key = token_fingerprint(access_token)
+        self.token_cache.delete(token_key)
+        # Se conserva hasta el `exp` real, no hasta el TTL máximo de la caché
+        try:
+            claims = jwt.decode(access_token, options={"verify_signature": False})
+            ttl = max(float(claims.get("exp", 0)) - time.time(), 1)
+        except jwt.InvalidTokenError:
+            claims, ttl = {}, settings.token_cache_max_ttl_seconds
+        
+        self._remember_revocation(self.revoked_tokens, token_key, ttl)
+        if claims.get("session_id"):
+            self._remember_revocation(self.revoked_sessions, str(claims["session_id"]), ttl)
+        
+        if self.cache.shared:
+            try:
+                await self.cache.backend.set(self._revocation_key(token_key), b"1", ttl)
+            except Exception as e:
+                logger.error("No se pudo guardar la revocación compartida: %s", e)
+    
+    async def _is_revoked_shared(self, token_key: str) -> Optional[bool]:
+        """Revocación hecha por cualquier worker; None si no hay almacenamiento compartido disponible"""
+        if not self.cache.shared:
+            return None
+        try:
+            return (await self.cache.backend.mget([self._revocation_key(token_key)]))[0] is not None
+        except Exception as e:
+            logger.warning("Revocaciones compartidas no disponibles: %s", e)
+            return None
+    
+    def get_token_cache_stats(self) -> Dict[str, Any]:
+        """Métricas de la caché de tokens y del tipo de verificación usado"""
+        return {
+            **self.token_cache.stats(),
+            "revoked": sum(1 for expires_at in self.revoked_tokens.values() if expires_at > time.monotonic()),
+            "verifications": dict(self.verification_stats)
+        }
+    
+    async def verify_token(self, access_token: str, force_remote: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Verifica un token de acceso.
+        Orden: revocaciones -> caché -> validación local del JWT -> Admin API de
+        Supabase (respaldo). Los tokens de una sesión cerrada en este worker, o
+        cuya revocación no se pudo consultar, se verifican contra Supabase.
+        """
+        token_key = token_fingerprint(access_token)
+        
+        if self._is_revoked_locally(self.revoked_tokens, token_key):
+            self.verification_stats["rejected"] += 1
+            return None
+        
+        revoked_shared = await self._is_revoked_shared(token_key)
+        if revoked_shared:
+            self.verification_stats["rejected"] += 1
+            return None
+        
+        force_remote = (
+            force_remote
+            or settings.auth_force_remote_verification
+            or (revoked_shared is None and self.cache.shared)
+            or (bool(self.revoked_sessions) and self._is_revoked_locally(self.revoked_sessions, self._session_id(access_token)))
+        )
+        
+        if not force_remote:
+            cached_user = self.token_cache.get(token_key)
+            if cached_user is not None:
+                return cached_user
+            
+            try:
+                claims = await self.jwt_validator.decode(access_token)
+                user_dict = user_from_claims(claims)
+                self.verification_stats["local"] += 1
+                self.token_cache.set(token_key, user_dict, ttl=self._token_ttl(access_token))
+                return user_dict
+            except TokenValidationError as e:
+                # Firma, expiración o audiencia inválidas: no hace falta consultar a Supabase
+                logger.info("Token rechazado localmente: %s", e)
+                self.verification_stats["rejected"] += 1
+                return None
+            except LocalValidationUnavailable:
+                pass
+        
+        user_dict = await self._verify_token_remote(access_token)
+        if user_dict:
+            self.token_cache.set(token_key, user_dict, ttl=self._token_ttl(access_token))
+        else:
+            self.verification_stats["rejected"] += 1
+        return user_dict
+    
+    @staticmethod
+    def _session_id(access_token: str) -> Optional[str]:
+        try:
+            session_id = jwt.decode(access_token, options={"verify_signature": False}).get("session_id")
+        except jwt.InvalidTokenError:
+            return None
+        return str(session_id) if session_id else None
+    
+    async def _verify_token_remote(self, access_token: str) -> Optional[Dict[str, Any]]:
         """Verifica un token de acceso usando Admin API"""
         try:
+            self.verification_stats["remote"] += 1
+            
             # ✅ USAR ADMIN_DB para verificar tokens
             # Esto NO afecta el estado de ningún cliente
-            user_response = self.admin_db.auth.get_user(access_token)
+            user_response = await self.admin_db.auth.get_user(access_token)
             
             if user_response and user_response.user:
                 user_dict = {
@@ -143,9 +339,7 @@ class AuthService:
             return None
             
         except Exception as e:
-            print(f"❌ Error verificando token: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.warning("Error verificando token en Supabase: %s", e, exc_info=True)
             return None
 
 # Instancia global del servicio
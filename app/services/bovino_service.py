@@ -1,58 +1,79 @@
-from supabase import Client
-from app.config.database import supabase_admin  # ✅ Cambiar a admin
+from supabase import AsyncClient
+from app.config.database import supabase_admin_async  # ✅ Cliente admin asíncrono
 from app.models.bovino import BovinoCreate, BovinoUpdate
-from typing import List, Dict, Any, Optional
+from app.services.ownership_service import OwnershipService, ownership_service
+from app.services.response_cache_service import ResponseCacheService, response_cache_service
+from app.utils.pagination import Page, count_method, fetch_page
+from typing import List, Dict, Any, Optional, Tuple
 import uuid
 
 class BovinoService:
-    def __init__(self, db_client: Client = supabase_admin):  # ✅ Usar admin
+    def __init__(self, db_client: AsyncClient = supabase_admin_async, ownership: OwnershipService = ownership_service,
+                 cache: ResponseCacheService = response_cache_service):  # ✅ Usar admin asíncrono
         self.db = db_client
+        self.ownership = ownership
+        self.cache = cache
     
     async def create_bovino(self, bovino_data: BovinoCreate, propietario_id: str) -> Dict[str, Any]:
         """Crea un nuevo bovino"""
         try:
             # Verificar que la finca pertenece al usuario
-            finca_response = self.db.table('fincas').select('id').eq('id', str(bovino_data.finca_id)).eq('propietario_id', propietario_id).execute()
-            
-            if not finca_response.data:
+            if not await self.ownership.owns_finca(str(bovino_data.finca_id), propietario_id):
                 raise Exception("Finca no encontrada o sin permisos")
             
             # ✅ CORREGIR: Convertir UUID a string antes de insertar
             insert_data = bovino_data.dict()
             insert_data['finca_id'] = str(insert_data['finca_id'])  # Convertir UUID a string
             
-            response = self.db.table('bovinos').insert(insert_data).execute()
+            response = await self.db.table('bovinos').insert(insert_data).execute()
             
             if response.data:
-                return response.data[0]
+                bovino = response.data[0]
+                self.ownership.remember_bovino(bovino['id'], bovino['finca_id'], propietario_id)
+                await self.cache.invalidate(propietario_id, ("bovinos",))
+                return bovino
             else:
                 raise Exception("Error creando bovino")
                 
         except Exception as e:
             raise Exception(f"Error creando bovino: {str(e)}")
     
-    async def get_bovinos_by_finca(self, finca_id: str, propietario_id: str) -> List[Dict[str, Any]]:
-        """Obtiene todos los bovinos de una finca"""
+    async def get_bovinos_by_finca(self, finca_id: str, propietario_id: str, limit: int, after: Optional[Tuple[Any, Any]] = None,
+                                   with_count: bool = False) -> Page:
+        """Obtiene una página de bovinos de una finca (keyset sobre created_at, id)"""
         try:
-            # Verificar permisos
-            finca_response = self.db.table('fincas').select('id').eq('id', finca_id).eq('propietario_id', propietario_id).execute()
-            
-            if not finca_response.data:
-                raise Exception("Finca no encontrada o sin permisos")
-            
-            response = self.db.table('bovinos').select('*').eq('finca_id', finca_id).execute()
-            return response.data if response.data else []
+            return await self.cache.cached(
+                "bovinos.by_finca", propietario_id, ("bovinos",),
+                {"finca_id": finca_id, "limit": limit, "after": after, "with_count": with_count},
+                lambda: self._load_bovinos_by_finca(finca_id, propietario_id, limit, after, with_count),
+                dump=Page.to_dict, load=Page.from_dict
+            )
             
         except Exception as e:
             raise Exception(f"Error obteniendo bovinos: {str(e)}")
     
+    async def _load_bovinos_by_finca(self, finca_id: str, propietario_id: str, limit: int, after: Optional[Tuple[Any, Any]],
+                                     with_count: bool) -> Page:
+        # Verificar permisos (los aciertos de caché ya pasaron esta verificación: la clave incluye al usuario)
+        if not await self.ownership.owns_finca(finca_id, propietario_id):
+            raise Exception("Finca no encontrada o sin permisos")
+        
+        query = self.db.table('bovinos').select('*', count=count_method(with_count)).eq('finca_id', finca_id)
+        return await fetch_page(query, limit, after)
+    
     async def get_bovino_by_id(self, bovino_id: str, propietario_id: str) -> Optional[Dict[str, Any]]:
         """Obtiene un bovino específico"""
         try:
-            response = self.db.table('bovinos').select('*, fincas!inner(propietario_id)').eq('id', bovino_id).execute()
+            response = await self.db.table('bovinos').select('*, fincas!inner(propietario_id)').eq('id', bovino_id).execute()
             
-            if response.data and response.data[0]['fincas']['propietario_id'] == propietario_id:
-                return response.data[0]
+            if not response.data:
+                return None
+            
+            bovino = response.data[0]
+            self.ownership.remember_bovino(bovino['id'], bovino['finca_id'], bovino['fincas']['propietario_id'])
+            
+            if bovino['fincas']['propietario_id'] == propietario_id:
+                return bovino
             return None
             
         except Exception as e:
@@ -62,15 +83,15 @@ class BovinoService:
         """Actualiza un bovino"""
         try:
             # Verificar permisos
-            bovino_actual = await self.get_bovino_by_id(bovino_id, propietario_id)
-            if not bovino_actual:
+            if not await self.ownership.owns_bovino(bovino_id, propietario_id):
                 raise Exception("Bovino no encontrado o sin permisos")
             
             update_data = bovino_data.dict(exclude_unset=True)
             
-            response = self.db.table('bovinos').update(update_data).eq('id', bovino_id).execute()
+            response = await self.db.table('bovinos').update(update_data).eq('id', bovino_id).execute()
             
             if response.data:
+                await self.cache.invalidate(propietario_id, ("bovinos",))
                 return response.data[0]
             else:
                 raise Exception("Error actualizando bovino")
@@ -82,11 +103,13 @@ class BovinoService:
         """Elimina un bovino"""
         try:
             # Verificar permisos
-            bovino_actual = await self.get_bovino_by_id(bovino_id, propietario_id)
-            if not bovino_actual:
+            if not await self.ownership.owns_bovino(bovino_id, propietario_id):
                 raise Exception("Bovino no encontrado o sin permisos")
             
-            response = self.db.table('bovinos').delete().eq('id', bovino_id).execute()
+            response = await self.db.table('bovinos').delete().eq('id', bovino_id).execute()
+            self.ownership.forget_bovino(bovino_id)
+            # El borrado es en cascada: también cambian sus mediciones
+            await self.cache.invalidate(propietario_id, ("bovinos", "mediciones"))
             
             return len(response.data) > 0
             
@@ -103,7 +126,7 @@ class BovinoService:
                 return None
             
             # Obtener mediciones del bovino
-            mediciones_response = self.db.table('mediciones_bovinos').select('*').eq('bovino_id', bovino_id).order('fecha', desc=True).execute()
+            mediciones_response = await self.db.table('mediciones_bovinos').select('*').eq('bovino_id', bovino_id).order('fecha', desc=True).execute()
             
             bovino['mediciones'] = mediciones_response.data if mediciones_response.data else []
             
@@ -115,7 +138,7 @@ class BovinoService:
     async def search_bovinos_by_id(self, id_bovino: str, propietario_id: str) -> List[Dict[str, Any]]:
         """Busca bovinos por ID de bovino (placa/arete)"""
         try:
-            response = self.db.table('bovinos').select('*, fincas!inner(propietario_id)').ilike('id_bovino', f'%{id_bovino}%').execute()
+            response = await self.db.table('bovinos').select('*, fincas!inner(propietario_id)').ilike('id_bovino', f'%{id_bovino}%').execute()
             
             # Filtrar por propietario
             bovinos = [bovino for bovino in response.data if bovino['fincas']['propietario_id'] == propietario_id]
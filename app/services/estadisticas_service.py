@@ -0,0 +1,238 @@
+from __future__ import annotations  # Anotaciones con np.ndarray sin cargar numpy al importar
+from supabase import AsyncClient
+from app.config.database import supabase_admin_async  # ✅ Cliente admin asíncrono
+from app.config.settings import settings
+from app.services.ownership_service import OwnershipService, ownership_service
+from app.utils.cache import TTLCache
+from app.utils.lazy_import import lazy_import
+from app.utils.pagination import iter_keyset_pages
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import date
+
+np = lazy_import("numpy")  # Se carga en el primer cálculo, no en el arranque
+
+# Campos numéricos de mediciones_bovinos que se resumen
+CAMPOS_MEDICION = [
+    'altura_cm', 'l_torso_cm', 'l_oblicua_cm', 'l_cadera_cm',
+    'a_cadera_cm', 'edad_meses', 'peso_bascula_kg'
+]
+# Campos morfométricos cuya tasa de crecimiento (pendiente por día) se calcula
+CAMPOS_CRECIMIENTO = ['altura_cm', 'l_torso_cm', 'l_oblicua_cm', 'l_cadera_cm', 'a_cadera_cm']
+PERCENTILES = (25, 50, 75)
+CAMPO_PESO = 'peso_bascula_kg'
+
+SELECT_COLUMNS = 'id, bovino_id, fecha, ' + ', '.join(CAMPOS_MEDICION)
+
+def mediciones_to_arrays(rows: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Convierte filas de mediciones en arreglos NumPy:
+    (ids de bovino, días desde época, matriz [n, campos] con NaN para valores nulos)
+    """
+    bovino_ids = np.array([row['bovino_id'] for row in rows], dtype=object)
+    dias = np.array(
+        [np.datetime64(str(row['fecha'])[:10], 'D').astype(np.int64) for row in rows],
+        dtype=np.float64
+    )
+    valores = np.array(
+        [[np.nan if row.get(campo) is None else float(row[campo]) for campo in CAMPOS_MEDICION] for row in rows],
+        dtype=np.float64
+    ).reshape(len(rows), len(CAMPOS_MEDICION))
+    return bovino_ids, dias, valores
+
+def resumen_campos(valores: np.ndarray) -> Dict[str, Dict[str, Any]]:
+    """min/max/media/desviación/percentiles por campo ignorando nulos"""
+    validos = ~np.isnan(valores)
+    conteos = validos.sum(axis=0)
+    resumen: Dict[str, Dict[str, Any]] = {}
+
+    columnas = np.flatnonzero(conteos)
+    if columnas.size:
+        sub = valores[:, columnas]
+        minimos = np.nanmin(sub, axis=0)
+        maximos = np.nanmax(sub, axis=0)
+        medias = np.nanmean(sub, axis=0)
+        desviaciones = np.nanstd(sub, axis=0)
+        percentiles = np.nanpercentile(sub, PERCENTILES, axis=0)
+
+    for posicion, campo in enumerate(CAMPOS_MEDICION):
+        if not conteos[posicion]:
+            resumen[campo] = {"n": 0}
+            continue
+        j = int(np.searchsorted(columnas, posicion))
+        resumen[campo] = {
+            "n": int(conteos[posicion]),
+            "min": float(minimos[j]),
+            "max": float(maximos[j]),
+            "media": float(medias[j]),
+            "desviacion": float(desviaciones[j]),
+            **{f"p{p}": float(percentiles[k, j]) for k, p in enumerate(PERCENTILES)}
+        }
+    return resumen
+
+def pendientes_por_grupo(grupos: np.ndarray, n_grupos: int, x: np.ndarray, valores: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pendiente de mínimos cuadrados de cada columna de `valores` respecto a `x`,
+    por grupo y en una sola pasada (sumas con bincount). Devuelve (pendientes, n)
+    con forma [n_grupos, columnas]; NaN cuando hay menos de 2 puntos o x constante.
+    """
+    validos = ~np.isnan(valores)
+    y = np.where(validos, valores, 0.0)
+    xv = np.where(validos, x[:, None], 0.0)
+
+    columnas = valores.shape[1]
+    pendientes = np.full((n_grupos, columnas), np.nan)
+    conteos = np.zeros((n_grupos, columnas))
+
+    for c in range(columnas):
+        n = np.bincount(grupos, weights=validos[:, c].astype(np.float64), minlength=n_grupos)
+        sx = np.bincount(grupos, weights=xv[:, c], minlength=n_grupos)
+        sy = np.bincount(grupos, weights=y[:, c], minlength=n_grupos)
+        sxx = np.bincount(grupos, weights=xv[:, c] * xv[:, c], minlength=n_grupos)
+        sxy = np.bincount(grupos, weights=xv[:, c] * y[:, c], minlength=n_grupos)
+
+        denominador = n * sxx - sx * sx
+        ok = (n >= 2) & (np.abs(denominador) > 1e-9)
+        pendientes[ok, c] = (n[ok] * sxy[ok] - sx[ok] * sy[ok]) / denominador[ok]
+        conteos[:, c] = n
+
+    return pendientes, conteos
+
+def _float_or_none(value: float) -> Optional[float]:
+    return None if value is None or np.isnan(value) else float(value)
+
+def estadisticas_bovino(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Estadísticas de las mediciones de un solo bovino"""
+    if not rows:
+        return {"total_mediciones": 0, "campos": {}, "ganancia_diaria_kg": None, "tasas_crecimiento_dia": {}}
+
+    _, dias, valores = mediciones_to_arrays(rows)
+    grupos = np.zeros(len(rows), dtype=np.int64)
+    indices = [CAMPOS_MEDICION.index(campo) for campo in CAMPOS_CRECIMIENTO + [CAMPO_PESO]]
+    pendientes, _ = pendientes_por_grupo(grupos, 1, dias, valores[:, indices])
+
+    return {
+        "total_mediciones": len(rows),
+        "primera_fecha": str(date.fromordinal(int(dias.min()) + date(1970, 1, 1).toordinal())),
+        "ultima_fecha": str(date.fromordinal(int(dias.max()) + date(1970, 1, 1).toordinal())),
+        "campos": resumen_campos(valores),
+        "ganancia_diaria_kg": _float_or_none(pendientes[0, -1]),
+        "tasas_crecimiento_dia": {
+            campo: _float_or_none(pendientes[0, k]) for k, campo in enumerate(CAMPOS_CRECIMIENTO)
+        }
+    }
+
+def estadisticas_finca(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Estadísticas agregadas de muchos bovinos en una sola pasada vectorizada"""
+    if not rows:
+        return {"total_mediciones": 0, "total_bovinos": 0, "campos": {}, "ganancia_diaria_kg": {}, "bovinos": []}
+
+    bovino_ids, dias, valores = mediciones_to_arrays(rows)
+    ids_unicos, grupos = np.unique(bovino_ids.astype(str), return_inverse=True)
+    n_grupos = len(ids_unicos)
+
+    indices = [CAMPOS_MEDICION.index(campo) for campo in CAMPOS_CRECIMIENTO + [CAMPO_PESO]]
+    pendientes, _ = pendientes_por_grupo(grupos, n_grupos, dias, valores[:, indices])
+
+    # Última medición de cada bovino: ordenar por (grupo, día) y tomar el final de cada segmento
+    orden = np.lexsort((dias, grupos))
+    fin_segmento = np.r_[np.flatnonzero(np.diff(grupos[orden])), len(orden) - 1]
+    ultimas = orden[fin_segmento]
+    total_por_bovino = np.bincount(grupos, minlength=n_grupos)
+
+    ganancias = pendientes[:, -1]
+    ganancias_validas = ganancias[~np.isnan(ganancias)]
+
+    bovinos = [
+        {
+            "bovino_id": str(ids_unicos[g]),
+            "total_mediciones": int(total_por_bovino[g]),
+            "ultima_fecha": str(date.fromordinal(int(dias[ultimas[g]]) + date(1970, 1, 1).toordinal())),
+            "ultimo_peso_kg": _float_or_none(valores[ultimas[g], CAMPOS_MEDICION.index(CAMPO_PESO)]),
+            "ganancia_diaria_kg": _float_or_none(ganancias[g]),
+            "tasas_crecimiento_dia": {
+                campo: _float_or_none(pendientes[g, k]) for k, campo in enumerate(CAMPOS_CRECIMIENTO)
+            }
+        }
+        for g in range(n_grupos)
+    ]
+
+    return {
+        "total_mediciones": len(rows),
+        "total_bovinos": n_grupos,
+        "campos": resumen_campos(valores),
+        "ultimas_mediciones": resumen_campos(valores[ultimas]),
+        "ganancia_diaria_kg": {
+            "n": int(ganancias_validas.size),
+            "media": _float_or_none(ganancias_validas.mean()) if ganancias_validas.size else None,
+            "mediana": _float_or_none(np.median(ganancias_validas)) if ganancias_validas.size else None
+        },
+        "bovinos": bovinos
+    }
+
+class EstadisticasService:
+    """
+    Motor de estadísticas de mediciones.
+    Carga las mediciones en arreglos NumPy una sola vez y calcula todo en forma vectorizada;
+    los resultados se cachean por (recurso, conteo, updated_at máximo).
+    """
+
+    def __init__(self, db_client: AsyncClient = supabase_admin_async, ownership: OwnershipService = ownership_service):
+        self.db = db_client
+        self.ownership = ownership
+        self.cache = TTLCache(
+            max_size=settings.estadisticas_cache_max_size,
+            default_ttl=settings.estadisticas_cache_ttl_seconds
+        )
+
+    async def _marca_de_agua(self, build_query) -> Tuple[int, Optional[str]]:
+        """
+        (conteo, updated_at máximo): cambia al insertar, editar (trigger de
+        migrations/001_updated_at.sql) o eliminar, también desde otro worker
+        """
+        response = await build_query('updated_at', count='exact')\
+            .order('updated_at', desc=True)\
+            .limit(1)\
+            .execute()
+        ultima = response.data[0]['updated_at'] if response.data else None
+        return response.count or 0, ultima
+
+    async def _cargar(self, build_query) -> List[Dict[str, Any]]:
+        filas: List[Dict[str, Any]] = []
+        async for rows in iter_keyset_pages(lambda: build_query(SELECT_COLUMNS), settings.export_page_size):
+            filas.extend(rows)
+        return filas
+
+    async def get_estadisticas_bovino(self, bovino_id: str, propietario_id: str) -> Dict[str, Any]:
+        """Estadísticas de un bovino (cacheadas por su marca de agua)"""
+        if not await self.ownership.owns_bovino(bovino_id, propietario_id):
+            raise Exception("Bovino no encontrado o sin permisos")
+
+        def build_query(columns: str, **kwargs):
+            return self.db.table('mediciones_bovinos').select(columns, **kwargs).eq('bovino_id', bovino_id)
+
+        clave = ('bovino', bovino_id, await self._marca_de_agua(build_query))
+        resultado = self.cache.get(clave)
+        if resultado is None:
+            resultado = {"bovino_id": bovino_id, **estadisticas_bovino(await self._cargar(build_query))}
+            self.cache.set(clave, resultado)
+        return resultado
+
+    async def get_estadisticas_finca(self, finca_id: str, propietario_id: str) -> Dict[str, Any]:
+        """Estadísticas agregadas de todos los bovinos de una finca"""
+        if not await self.ownership.owns_finca(finca_id, propietario_id):
+            raise Exception("Finca no encontrada o sin permisos")
+
+        def build_query(columns: str, **kwargs):
+            return self.db.table('mediciones_bovinos')\
+                .select(f'{columns}, bovinos!inner(finca_id)', **kwargs)\
+                .eq('bovinos.finca_id', finca_id)
+
+        clave = ('finca', finca_id, await self._marca_de_agua(build_query))
+        resultado = self.cache.get(clave)
+        if resultado is None:
+            resultado = {"finca_id": finca_id, **estadisticas_finca(await self._cargar(build_query))}
+            self.cache.set(clave, resultado)
+        return resultado
+
+# Instancia global del servicio
+estadisticas_service = EstadisticasService()
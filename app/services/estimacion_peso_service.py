@@ -0,0 +1,365 @@
+from __future__ import annotations  # Anotaciones con np.ndarray sin cargar numpy al importar
+from supabase import AsyncClient
+from app.config.database import async_http_client, supabase_admin_async  # ✅ Cliente admin asíncrono
+from app.config.settings import settings
+from app.services.finca_service import FincaService, finca_service
+from app.services.ownership_service import OwnershipService, ownership_service
+from app.utils.lazy_import import lazy_import
+from app.utils.pagination import iter_keyset_pages
+from typing import Any, Dict, List, Optional
+from datetime import datetime, timezone
+from pathlib import Path
+import asyncio
+import httpx
+import logging
+import os
+import time
+
+np = lazy_import("numpy")  # Se carga en el primer cálculo, no en el arranque
+
+logger = logging.getLogger(__name__)
+
+# Medidas morfométricas usadas como predictores (en escala logarítmica)
+CAMPOS_MORFOMETRICOS = ['altura_cm', 'l_torso_cm', 'l_oblicua_cm', 'l_cadera_cm', 'a_cadera_cm']
+CAMPO_EDAD = 'edad_meses'
+CAMPO_PESO = 'peso_bascula_kg'
+CAMPOS_PREDICTORES = CAMPOS_MORFOMETRICOS + [CAMPO_EDAD]
+
+def matriz_predictores(rows: List[Dict[str, Any]]) -> np.ndarray:
+    """
+    Matriz [n, predictores] en escala alométrica: log(medida) y log(1 + edad).
+    Valores nulos o no positivos quedan como NaN (se imputan al predecir).
+    """
+    crudo = np.array(
+        [[np.nan if row.get(campo) is None else float(row[campo]) for campo in CAMPOS_PREDICTORES] for row in rows],
+        dtype=np.float64
+    ).reshape(len(rows), len(CAMPOS_PREDICTORES))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        medidas = crudo[:, :len(CAMPOS_MORFOMETRICOS)]
+        edad = crudo[:, len(CAMPOS_MORFOMETRICOS):]
+        return np.hstack([
+            np.where(medidas > 0, np.log(medidas), np.nan),
+            np.where(edad >= 0, np.log1p(edad), np.nan)
+        ])
+
+def tiene_medidas(X: np.ndarray) -> np.ndarray:
+    """Filas con al menos una medida morfométrica válida"""
+    return ~np.isnan(X[:, :len(CAMPOS_MORFOMETRICOS)]).all(axis=1)
+
+class ModeloPeso:
+    """
+    Regresión ridge log-lineal (modelo alométrico peso = a · Π medida^b).
+    Los predictores se estandarizan; un valor faltante equivale a imputar la media.
+    """
+
+    def __init__(self, media: np.ndarray, escala: np.ndarray, coeficientes: np.ndarray, intercepto: float,
+                 sigma: float, alpha: float, muestras: int, metricas: Dict[str, float], entrenado_en: str):
+        self.media = media
+        self.escala = escala
+        self.coeficientes = coeficientes
+        self.intercepto = float(intercepto)
+        self.sigma = float(sigma)
+        self.alpha = float(alpha)
+        self.muestras = int(muestras)
+        self.metricas = metricas
+        self.entrenado_en = entrenado_en
+
+    @staticmethod
+    def _resolver(X: np.ndarray, y: np.ndarray, alpha: float):
+        """Ajuste ridge cerrado sobre predictores estandarizados"""
+        media = np.nanmean(X, axis=0)
+        media = np.where(np.isnan(media), 0.0, media)
+        escala = np.nanstd(X, axis=0)
+        escala = np.where((escala > 0) & ~np.isnan(escala), escala, 1.0)
+
+        Z = np.nan_to_num((X - media) / escala)
+        y_media = y.mean()
+        A = Z.T @ Z + alpha * np.eye(Z.shape[1])
+        coeficientes = np.linalg.solve(A, Z.T @ (y - y_media))
+        return media, escala, coeficientes, y_media
+
+    @classmethod
+    def ajustar(cls, X: np.ndarray, pesos_kg: np.ndarray, alpha: float = 1.0) -> "ModeloPeso":
+        """
+        Ajusta el modelo. Las métricas se calculan sobre una partición de validación
+        determinista (1 de cada 5 filas) y luego se reajusta con todos los datos.
+        """
+        y = np.log(pesos_kg)
+        validacion = np.arange(len(y)) % 5 == 4
+        metricas: Dict[str, float] = {}
+
+        if validacion.sum() >= 5:
+            parcial = cls(*cls._resolver(X[~validacion], y[~validacion], alpha), sigma=0.0, alpha=alpha,
+                          muestras=int((~validacion).sum()), metricas={}, entrenado_en="")
+            estimado = parcial.predecir(X[validacion], corregir_sesgo=False)
+            real = pesos_kg[validacion]
+            metricas = {
+                "rmse_kg": float(np.sqrt(np.mean((estimado - real) ** 2))),
+                "mape": float(np.mean(np.abs(estimado - real) / real)),
+                "r2_log": float(1 - np.sum((np.log(estimado) - y[validacion]) ** 2) / np.sum((y[validacion] - y[validacion].mean()) ** 2))
+            }
+
+        media, escala, coeficientes, intercepto = cls._resolver(X, y, alpha)
+        Z = np.nan_to_num((X - media) / escala)
+        residuos = y - (intercepto + Z @ coeficientes)
+        sigma = float(np.sqrt(np.sum(residuos ** 2) / max(len(y) - Z.shape[1] - 1, 1)))
+
+        return cls(media, escala, coeficientes, intercepto, sigma, alpha, len(y), metricas,
+                   datetime.now(timezone.utc).isoformat())
+
+    def predecir(self, X: np.ndarray, corregir_sesgo: bool = True) -> np.ndarray:
+        """Predicción vectorizada del peso en kg para todas las filas de X"""
+        Z = np.nan_to_num((X - self.media) / self.escala)
+        log_peso = self.intercepto + Z @ self.coeficientes
+        if corregir_sesgo:
+            # Corrección lognormal del sesgo al volver de la escala logarítmica
+            log_peso = log_peso + self.sigma ** 2 / 2
+        return np.exp(log_peso)
+
+    def intervalo(self, estimado: np.ndarray, z: float = 1.96):
+        """Intervalo aproximado del 95 % a partir del error residual en escala log"""
+        factor = np.exp(z * self.sigma)
+        return estimado / factor, estimado * factor
+
+    def guardar(self, ruta: str) -> None:
+        """Persiste los coeficientes en un .npz (escritura atómica)"""
+        destino = Path(ruta)
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        temporal = destino.with_name(destino.stem + '.tmp.npz')
+        np.savez(
+            temporal,
+            campos=np.array(CAMPOS_PREDICTORES),
+            media=self.media,
+            escala=self.escala,
+            coeficientes=self.coeficientes,
+            parametros=np.array([self.intercepto, self.sigma, self.alpha, self.muestras]),
+            metricas_nombres=np.array(list(self.metricas), dtype=str),
+            metricas_valores=np.array(list(self.metricas.values()), dtype=np.float64),
+            entrenado_en=np.array(self.entrenado_en)
+        )
+        os.replace(temporal, destino)
+
+    @classmethod
+    def cargar(cls, ruta: str) -> Optional["ModeloPeso"]:
+        """Carga un modelo guardado; None si no existe o los campos no coinciden"""
+        if not Path(ruta).exists():
+            return None
+        with np.load(ruta, allow_pickle=False) as datos:
+            if list(datos['campos']) != CAMPOS_PREDICTORES:
+                return None
+            intercepto, sigma, alpha, muestras = datos['parametros']
+            metricas = dict(zip(datos['metricas_nombres'].tolist(), datos['metricas_valores'].tolist()))
+            return cls(datos['media'], datos['escala'], datos['coeficientes'], intercepto, sigma, alpha,
+                       int(muestras), metricas, str(datos['entrenado_en']))
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "entrenado_en": self.entrenado_en,
+            "muestras": self.muestras,
+            "alpha": self.alpha,
+            "sigma_log": self.sigma,
+            "metricas": self.metricas,
+            "exponentes": {
+                campo: float(coef / escala)
+                for campo, coef, escala in zip(CAMPOS_PREDICTORES, self.coeficientes, self.escala)
+            }
+        }
+
+class EstimacionPesoService:
+    """
+    Estimación de peso a partir de medidas morfométricas.
+    El modelo se entrena con las mediciones que tienen peso de báscula y se
+    publica en Storage (settings.peso_modelo_bucket); cada worker guarda una
+    copia local y la recarga cuando cambia la versión publicada o el archivo.
+    """
+
+    def __init__(self, db_client: AsyncClient = supabase_admin_async, ownership: OwnershipService = ownership_service,
+                 fincas: FincaService = finca_service, modelo_path: Optional[str] = None,
+                 http_client: httpx.AsyncClient = async_http_client, bucket: Optional[str] = settings.peso_modelo_bucket):
+        self.db = db_client
+        self.ownership = ownership
+        self.fincas = fincas
+        self.http = http_client
+        self.modelo_path = modelo_path or settings.peso_modelo_path
+        self.bucket = bucket
+        self.object_url = f"{settings.supabase_url}/storage/v1/object/{bucket}/{settings.peso_modelo_object_key}"
+        self._modelo: Optional[ModeloPeso] = None
+        self._modelo_mtime: Optional[int] = None
+        self._modelo_cargado = False
+        self._version: Optional[str] = None  # ETag del objeto publicado que refleja la copia local
+        self._revisado_en: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    def get_modelo(self) -> Optional[ModeloPeso]:
+        """Modelo actual desde la copia local; se vuelve a cargar si el archivo cambió"""
+        try:
+            mtime = os.stat(self.modelo_path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if not self._modelo_cargado or mtime != self._modelo_mtime:
+            self._modelo = ModeloPeso.cargar(self.modelo_path) if mtime is not None else None
+            self._modelo_mtime = mtime
+            self._modelo_cargado = True
+        return self._modelo
+
+    async def refrescar_modelo(self) -> None:
+        """
+        Descarga el modelo publicado si su versión (ETag) cambió. Se consulta
+        como mucho cada settings.peso_modelo_refresh_seconds; un error deja la
+        copia local vigente.
+        """
+        ahora = time.monotonic()
+        if not self.bucket or (self._revisado_en is not None
+                               and ahora - self._revisado_en < settings.peso_modelo_refresh_seconds):
+            return
+        self._revisado_en = ahora
+        headers = {"Authorization": f"Bearer {settings.supabase_service_role_key}"}
+
+        try:
+            response = await self.http.head(self.object_url, headers=headers)
+            if response.status_code in (400, 404):
+                return  # Todavía no se publicó ningún modelo
+            response.raise_for_status()
+            version = response.headers.get("etag")
+            if version is not None and version == self._version:
+                return
+
+            response = await self.http.get(self.object_url, headers=headers)
+            response.raise_for_status()
+            await asyncio.to_thread(self._guardar_copia_local, response.content)
+            self._version = response.headers.get("etag", version)
+            logger.info("Modelo de estimación de peso actualizado (versión %s)", self._version)
+        except httpx.HTTPError as e:
+            logger.warning("No se pudo revisar el modelo de peso publicado: %s", e)
+
+    def _guardar_copia_local(self, contenido: bytes) -> None:
+        """Reemplaza la copia local de forma atómica; get_modelo la recarga por mtime"""
+        destino = Path(self.modelo_path)
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        temporal = destino.with_name(destino.stem + '.descarga.npz')
+        temporal.write_bytes(contenido)
+        os.replace(temporal, destino)
+
+    async def _publicar(self) -> Optional[str]:
+        """
+        Sube la copia local al bucket para que sobreviva a redeploys y llegue a
+        los demás workers. Devuelve la versión (ETag) publicada o None si no se
+        pudo publicar: el modelo ya quedó guardado en disco y sigue en uso aquí.
+        """
+        contenido = await asyncio.to_thread(Path(self.modelo_path).read_bytes)
+        headers = {"Authorization": f"Bearer {settings.supabase_service_role_key}"}
+        try:
+            response = await self.http.post(
+                self.object_url,
+                content=contenido,
+                headers={**headers, "Content-Type": "application/octet-stream", "x-upsert": "true"}
+            )
+            if response.status_code not in (200, 201):
+                logger.error("No se pudo publicar el modelo en el bucket '%s' (¿existe?): %s - %s",
+                             self.bucket, response.status_code, response.text)
+                return None
+            # La respuesta de la subida no trae el ETag: se lee con HEAD
+            response = await self.http.head(self.object_url, headers=headers)
+            response.raise_for_status()
+            return response.headers.get("etag")
+        except httpx.HTTPError as e:
+            logger.error("No se pudo publicar el modelo en el bucket '%s': %s", self.bucket, e)
+            return None
+
+    def _modelo_requerido(self) -> ModeloPeso:
+        modelo = self.get_modelo()
+        if modelo is None:
+            raise LookupError("Modelo de estimación de peso no entrenado")
+        return modelo
+
+    async def _cargar_entrenamiento(self) -> List[Dict[str, Any]]:
+        """Mediciones con peso de báscula, recorridas con paginación keyset"""
+        columnas = 'id, fecha, ' + ', '.join(CAMPOS_PREDICTORES + [CAMPO_PESO])
+
+        def build_query():
+            return self.db.table('mediciones_bovinos')\
+                .select(columnas)\
+                .gt(CAMPO_PESO, 0)
+
+        filas: List[Dict[str, Any]] = []
+        async for rows in iter_keyset_pages(build_query, settings.export_page_size):
+            filas.extend(rows)
+        return filas
+
+    async def entrenar(self, alpha: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Entrena el modelo con todas las mediciones pesadas, lo persiste y lo
+        publica. `publicado` es None sin bucket y False si la publicación falló.
+        """
+        async with self._lock:
+            filas = await self._cargar_entrenamiento()
+            X = matriz_predictores(filas)
+            pesos = np.array([float(fila[CAMPO_PESO]) for fila in filas], dtype=np.float64)
+            validas = tiene_medidas(X) if len(filas) else np.zeros(0, dtype=bool)
+
+            if validas.sum() < settings.peso_modelo_min_muestras:
+                raise ValueError(
+                    f"Se necesitan al menos {settings.peso_modelo_min_muestras} mediciones con peso y medidas "
+                    f"(disponibles: {int(validas.sum())})"
+                )
+
+            modelo = await asyncio.to_thread(
+                ModeloPeso.ajustar, X[validas], pesos[validas],
+                settings.peso_modelo_alpha if alpha is None else alpha
+            )
+            await asyncio.to_thread(modelo.guardar, self.modelo_path)
+            publicado = None
+            if self.bucket:
+                version = await self._publicar()
+                publicado = version is not None
+                if version is not None:
+                    # La copia local ya es esa versión: la próxima revisión no la descarga
+                    self._version = version
+            return {**modelo.info(), "publicado": publicado}
+
+    def estimar(self, medidas: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Estima el peso de muchas filas de medidas en una sola pasada vectorizada"""
+        modelo = self._modelo_requerido()
+        X = matriz_predictores(medidas)
+        validas = tiene_medidas(X)
+        estimado = modelo.predecir(X)
+        minimo, maximo = modelo.intervalo(estimado)
+
+        return [
+            {
+                "peso_estimado_kg": round(float(estimado[i]), 2),
+                "peso_min_kg": round(float(minimo[i]), 2),
+                "peso_max_kg": round(float(maximo[i]), 2)
+            } if validas[i] else {"peso_estimado_kg": None, "peso_min_kg": None, "peso_max_kg": None}
+            for i in range(len(medidas))
+        ]
+
+    async def estimar_finca(self, finca_id: str, propietario_id: str) -> List[Dict[str, Any]]:
+        """Estimación para cada bovino de la finca usando su última medición"""
+        await self.refrescar_modelo()
+        self._modelo_requerido()
+        if not await self.ownership.owns_finca(finca_id, propietario_id):
+            raise PermissionError("Finca no encontrada o sin permisos")
+
+        bovinos_response = await self.db.table('bovinos').select('id, id_bovino').eq('finca_id', finca_id).execute()
+        bovinos = bovinos_response.data or []
+        ultimas = await self.fincas.get_ultimas_mediciones_by_bovinos([bovino['id'] for bovino in bovinos])
+
+        con_medicion = [bovino for bovino in bovinos if bovino['id'] in ultimas]
+        mediciones = [ultimas[bovino['id']] for bovino in con_medicion]
+        estimaciones = self.estimar(mediciones) if mediciones else []
+
+        return [
+            {
+                "bovino_id": bovino['id'],
+                "id_bovino": bovino.get('id_bovino'),
+                "fecha_medicion": medicion.get('fecha'),
+                "peso_bascula_kg": medicion.get(CAMPO_PESO),
+                **estimacion
+            }
+            for bovino, medicion, estimacion in zip(con_medicion, mediciones, estimaciones)
+        ]
+
+# Instancia global del servicio
+estimacion_peso_service = EstimacionPesoService()
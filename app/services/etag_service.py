@@ -0,0 +1,211 @@
+"""
+ETags de las lecturas de fincas, bovinos y mediciones
+=====================================================
+
+El ETag se calcula desde marcas de agua de las tablas, sin leer ni hashear el
+cuerpo de la respuesta: `updated_at` de la fila en las rutas de detalle y
+(conteo, `updated_at` máximo) en los listados. Altas y ediciones mueven el
+máximo (trigger de migrations/001_updated_at.sql) y las bajas cambian el
+conteo, así que un `If-None-Match` vigente se responde con 304 tras una
+consulta de una fila por recurso.
+
+Con la caché de respuestas compartida (Redis) las marcas de agua se guardan
+con los mismos ámbitos que los datos: un 304 repetido no llega a PostgREST.
+Con la caché en memoria no se guardan: una escritura atendida por otro
+worker no invalidaría la marca y el detalle respondería 304 con datos
+viejos.
+
+Las rutas cuyo cuerpo sale de la caché de respuestas (listado de fincas,
+finca con bovinos y bovinos de una finca) solo llevan ETag si esa caché está
+deshabilitada o es compartida. Con la caché en memoria el cuerpo puede
+llevar hasta `response_cache_ttl_seconds` de retraso respecto de una
+escritura atendida por otro worker, mientras que la marca de agua es
+siempre actual: el cliente guardaría un ETag nuevo junto a un cuerpo viejo
+y recibiría 304 sobre datos viejos hasta la siguiente escritura.
+"""
+from supabase import AsyncClient
+from app.config.database import supabase_admin_async  # ✅ Cliente admin asíncrono
+from app.config.settings import settings
+from app.services.ownership_service import OwnershipService, ownership_service
+from app.services.response_cache_service import ResponseCacheService, response_cache_service
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+from datetime import date
+import hashlib
+import logging
+import orjson
+
+logger = logging.getLogger(__name__)
+
+# Cambia si cambia la forma de las respuestas: invalida los ETags ya emitidos
+ETAG_VERSION = 1
+
+def make_etag(route: str, user_id: str, params: Dict[str, Any], partes: List[Any]) -> str:
+    """ETag fuerte (entre comillas) de la ruta, el usuario, los parámetros y las marcas de agua"""
+    contenido = orjson.dumps([ETAG_VERSION, route, str(user_id), params, partes], option=orjson.OPT_SORT_KEYS)
+    return '"' + hashlib.blake2b(contenido, digest_size=16).hexdigest() + '"'
+
+class EtagService:
+    def __init__(self, db_client: AsyncClient = supabase_admin_async, ownership: OwnershipService = ownership_service,
+                 cache: ResponseCacheService = response_cache_service):  # ✅ Usar admin asíncrono
+        self.db = db_client
+        self.ownership = ownership
+        self.cache = cache
+        self.enabled = settings.etag_enabled
+
+    def _cuerpo_consistente(self) -> bool:
+        """El cuerpo cacheado es el mismo en todos los workers (o no hay caché)"""
+        return not self.cache.enabled or self.cache.shared
+
+    async def _etag(self, route: str, user_id: str, scopes: Sequence[str], params: Dict[str, Any],
+                    loader: Callable[[], Awaitable[Optional[List[Any]]]], cuerpo_cacheado: bool = False) -> Optional[str]:
+        """
+        ETag de una ruta o None (sin permisos, recurso inexistente o sin columna
+        `updated_at`): en ese caso la ruta responde como siempre, sin ETag.
+        `cuerpo_cacheado`: la ruta responde desde la caché de respuestas
+        """
+        if not self.enabled or (cuerpo_cacheado and not self._cuerpo_consistente()):
+            return None
+        try:
+            if self.cache.shared:
+                partes = await self.cache.cached(f"etag.{route}", user_id, scopes, params, loader)
+            else:
+                partes = await loader()
+        except Exception as e:
+            logger.warning("No se pudo calcular el ETag (%s): %s", route, e)
+            return None
+        if partes is None:
+            return None
+        return make_etag(route, user_id, params, partes)
+
+    async def _marca_de_agua(self, query) -> List[Any]:
+        """[conteo, updated_at máximo] de una consulta `select(..., count='exact')`"""
+        response = await query.order('updated_at', desc=True).limit(1).execute()
+        return [response.count or 0, response.data[0]['updated_at'] if response.data else None]
+
+    async def _updated_at(self, table: str, row_id: str) -> Optional[str]:
+        response = await self.db.table(table).select('updated_at').eq('id', row_id).execute()
+        return response.data[0]['updated_at'] if response.data else None
+
+    def _bovinos_finca(self, finca_id: str):
+        return self.db.table('bovinos').select('updated_at', count='exact').eq('finca_id', finca_id)
+
+    def _mediciones_bovino(self, bovino_id: str):
+        return self.db.table('mediciones_bovinos').select('updated_at', count='exact').eq('bovino_id', bovino_id)
+
+    def _mediciones_finca(self, finca_id: str):
+        return self.db.table('mediciones_bovinos')\
+            .select('updated_at, bovinos!inner(finca_id)', count='exact')\
+            .eq('bovinos.finca_id', finca_id)
+
+    # Fincas
+
+    async def fincas_usuario(self, propietario_id: str, params: Dict[str, Any]) -> Optional[str]:
+        """Listado de fincas del usuario"""
+        async def loader():
+            query = self.db.table('fincas').select('updated_at', count='exact').eq('propietario_id', propietario_id)
+            return await self._marca_de_agua(query)
+
+        return await self._etag("fincas.list", propietario_id, ("fincas",), params, loader, cuerpo_cacheado=True)
+
+    async def finca(self, finca_id: str, propietario_id: str, params: Optional[Dict[str, Any]] = None,
+                    bovinos: bool = False, mediciones: bool = False) -> Optional[str]:
+        """Finca sola, con su página de bovinos o completa (bovinos y últimas mediciones)"""
+        if mediciones:
+            route, scopes = "fincas.complete", ("fincas", "bovinos", "mediciones")
+        elif bovinos:
+            route, scopes = "fincas.with_bovinos", ("fincas", "bovinos")
+        else:
+            route, scopes = "fincas.detail", ("fincas",)
+        params = {**(params or {}), "finca_id": finca_id}
+        if mediciones:
+            # La respuesta completa cuenta las mediciones recientes respecto de hoy
+            params["hoy"] = date.today().isoformat()
+
+        async def loader():
+            response = await self.db.table('fincas').select('updated_at')\
+                .eq('id', finca_id).eq('propietario_id', propietario_id).execute()
+            if not response.data:
+                return None
+            partes = [response.data[0]['updated_at']]
+            if bovinos or mediciones:
+                partes.append(await self._marca_de_agua(self._bovinos_finca(finca_id)))
+            if mediciones:
+                partes.append(await self._marca_de_agua(self._mediciones_finca(finca_id)))
+            return partes
+
+        # Solo la finca con bovinos (sin mediciones) se responde desde la caché de respuestas
+        cuerpo_cacheado = bovinos and not mediciones
+        return await self._etag(route, propietario_id, scopes, params, loader, cuerpo_cacheado=cuerpo_cacheado)
+
+    # Bovinos
+
+    async def bovinos_finca(self, finca_id: str, propietario_id: str, params: Dict[str, Any]) -> Optional[str]:
+        """Listado de bovinos de una finca"""
+        async def loader():
+            if not await self.ownership.owns_finca(finca_id, propietario_id):
+                return None
+            return await self._marca_de_agua(self._bovinos_finca(finca_id))
+
+        return await self._etag("bovinos.by_finca", propietario_id, ("bovinos",), {**params, "finca_id": finca_id}, loader,
+                                cuerpo_cacheado=True)
+
+    async def bovinos_usuario(self, propietario_id: str, params: Dict[str, Any]) -> Optional[str]:
+        """Todos los bovinos del usuario (búsqueda)"""
+        async def loader():
+            query = self.db.table('bovinos')\
+                .select('updated_at, fincas!inner(propietario_id)', count='exact')\
+                .eq('fincas.propietario_id', propietario_id)
+            return await self._marca_de_agua(query)
+
+        return await self._etag("bovinos.search", propietario_id, ("bovinos",), params, loader)
+
+    async def bovino(self, bovino_id: str, propietario_id: str, mediciones: bool = False) -> Optional[str]:
+        """Bovino solo o con sus mediciones"""
+        route, scopes = ("bovinos.with_mediciones", ("bovinos", "mediciones")) if mediciones else ("bovinos.detail", ("bovinos",))
+
+        async def loader():
+            if not await self.ownership.owns_bovino(bovino_id, propietario_id):
+                return None
+            partes = [await self._updated_at('bovinos', bovino_id)]
+            if mediciones:
+                partes.append(await self._marca_de_agua(self._mediciones_bovino(bovino_id)))
+            return partes
+
+        return await self._etag(route, propietario_id, scopes, {"bovino_id": bovino_id}, loader)
+
+    # Mediciones
+
+    async def mediciones_bovino(self, bovino_id: str, propietario_id: str, params: Dict[str, Any]) -> Optional[str]:
+        """Listados, rango, última medición y estadísticas de un bovino"""
+        async def loader():
+            if not await self.ownership.owns_bovino(bovino_id, propietario_id):
+                return None
+            return await self._marca_de_agua(self._mediciones_bovino(bovino_id))
+
+        # La marca de agua es la misma para todas las rutas del bovino: se cachea una vez
+        etag = await self._etag("mediciones.by_bovino", propietario_id, ("mediciones",), {"bovino_id": bovino_id}, loader)
+        return etag and make_etag("mediciones.by_bovino", propietario_id, params, [etag])
+
+    async def mediciones_finca(self, finca_id: str, propietario_id: str, params: Dict[str, Any]) -> Optional[str]:
+        """Estadísticas de las mediciones de una finca"""
+        async def loader():
+            if not await self.ownership.owns_finca(finca_id, propietario_id):
+                return None
+            return await self._marca_de_agua(self._mediciones_finca(finca_id))
+
+        # Un bovino que cambia de finca mueve sus mediciones: también depende del ámbito "bovinos"
+        etag = await self._etag("mediciones.by_finca", propietario_id, ("bovinos", "mediciones"), {"finca_id": finca_id}, loader)
+        return etag and make_etag("mediciones.by_finca", propietario_id, params, [etag])
+
+    async def medicion(self, medicion_id: str, propietario_id: str) -> Optional[str]:
+        """Detalle de una medición"""
+        async def loader():
+            response = await self.db.table('mediciones_bovinos').select('updated_at, bovino_id').eq('id', medicion_id).execute()
+            if not response.data or not await self.ownership.owns_bovino(response.data[0]['bovino_id'], propietario_id):
+                return None
+            return [response.data[0]['updated_at']]
+
+        return await self._etag("mediciones.detail", propietario_id, ("mediciones",), {"medicion_id": medicion_id}, loader)
+
+# Instancia global del servicio
+etag_service = EtagService()
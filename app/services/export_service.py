@@ -0,0 +1,217 @@
+from supabase import AsyncClient
+from app.config.database import supabase_admin_async  # ✅ Cliente admin asíncrono
+from app.config.settings import settings
+from app.services.ownership_service import OwnershipService, ownership_service
+from app.utils.pagination import iter_keyset_pages
+from typing import Any, AsyncIterator, Dict, List
+from datetime import date
+import csv
+import importlib
+import io
+import orjson
+
+# Columnas exportadas de mediciones_bovinos (en orden)
+EXPORT_COLUMNS = [
+    'id', 'bovino_id', 'fecha', 'altura_cm', 'l_torso_cm', 'l_oblicua_cm',
+    'l_cadera_cm', 'a_cadera_cm', 'edad_meses', 'peso_bascula_kg', 'created_at'
+]
+# Columnas extra cuando la exportación abarca varios bovinos
+BOVINO_COLUMNS = ['id_bovino', 'finca_id']
+
+EXPORT_FORMATS = {
+    "json": "application/json",
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet"
+}
+# Formato de los tres endpoints cuando no se indica `formato`
+DEFAULT_EXPORT_FORMAT = "json"
+
+class _StreamingSink:
+    """
+    Destino de escritura que entrega los bytes por partes.
+    Conserva la posición absoluta (`tell`) que Parquet usa para los offsets del footer.
+    """
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def writable(self) -> bool:
+        return True
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+class ExportService:
+    """
+    Exportación en streaming de mediciones.
+    Recorre la tabla con paginación keyset (fecha, id) y escribe cada página
+    en el formato pedido, de modo que la memoria no depende del total de filas.
+    """
+
+    def __init__(self, db_client: AsyncClient = supabase_admin_async, ownership: OwnershipService = ownership_service):
+        self.db = db_client
+        self.ownership = ownership
+
+    async def export_bovino(self, bovino_id: str, propietario_id: str, formato: str) -> AsyncIterator[bytes]:
+        """Exportación de las mediciones de un bovino"""
+        if not await self.ownership.owns_bovino(bovino_id, propietario_id):
+            raise PermissionError("Bovino no encontrado o sin permisos")
+
+        def build_query():
+            return self.db.table('mediciones_bovinos').select('*').eq('bovino_id', bovino_id)
+
+        return self._render(build_query, formato, EXPORT_COLUMNS, {"bovino_id": bovino_id})
+
+    async def export_finca(self, finca_id: str, propietario_id: str, formato: str) -> AsyncIterator[bytes]:
+        """Exportación de las mediciones de todos los bovinos de una finca"""
+        if not await self.ownership.owns_finca(finca_id, propietario_id):
+            raise PermissionError("Finca no encontrada o sin permisos")
+
+        def build_query():
+            return self.db.table('mediciones_bovinos')\
+                .select('*, bovinos!inner(id_bovino, finca_id)')\
+                .eq('bovinos.finca_id', finca_id)
+
+        return self._render(build_query, formato, EXPORT_COLUMNS + BOVINO_COLUMNS, {"finca_id": finca_id})
+
+    async def export_cuenta(self, propietario_id: str, formato: str) -> AsyncIterator[bytes]:
+        """Exportación de todas las mediciones de la cuenta"""
+        def build_query():
+            return self.db.table('mediciones_bovinos')\
+                .select('*, bovinos!inner(id_bovino, finca_id, fincas!inner(propietario_id))')\
+                .eq('bovinos.fincas.propietario_id', propietario_id)
+
+        return self._render(build_query, formato, EXPORT_COLUMNS + BOVINO_COLUMNS, {"propietario_id": propietario_id})
+
+    async def _iter_pages(self, build_query) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Recorre la consulta página a página con paginación keyset sobre (fecha, id)"""
+        async for rows in iter_keyset_pages(build_query, settings.export_page_size):
+            yield [self._flatten(row) for row in rows]
+
+    def _flatten(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """Aplana los datos embebidos del bovino en columnas"""
+        bovino = row.pop('bovinos', None)
+        if bovino:
+            row['id_bovino'] = bovino.get('id_bovino')
+            row['finca_id'] = bovino.get('finca_id')
+        return row
+
+    def _render(self, build_query, formato: str, columns: List[str], metadata: Dict[str, Any]) -> AsyncIterator[bytes]:
+        """Selecciona el escritor según el formato"""
+        pages = self._iter_pages(build_query)
+        if formato == "csv":
+            return self._write_csv(pages, columns)
+        if formato == "ndjson":
+            return self._write_ndjson(pages, columns)
+        if formato == "parquet":
+            return self._write_parquet(pages, columns)
+        return self._write_json(pages, columns, metadata)
+
+    async def _write_csv(self, pages, columns: List[str]) -> AsyncIterator[bytes]:
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction='ignore')
+        writer.writeheader()
+
+        async for rows in pages:
+            writer.writerows(rows)
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate(0)
+
+        if buffer.tell():
+            yield buffer.getvalue().encode()
+
+    @staticmethod
+    def _dump_rows(rows: List[Dict[str, Any]], columns: List[str]) -> List[bytes]:
+        return [orjson.dumps({column: row.get(column) for column in columns}, default=str) for row in rows]
+
+    async def _write_ndjson(self, pages, columns: List[str]) -> AsyncIterator[bytes]:
+        async for rows in pages:
+            yield b"\n".join(self._dump_rows(rows, columns)) + b"\n"
+
+    async def _write_json(self, pages, columns: List[str], metadata: Dict[str, Any]) -> AsyncIterator[bytes]:
+        header = {**metadata, "fecha_exportacion": date.today().isoformat()}
+        yield orjson.dumps(header, default=str)[:-1] + b',"mediciones":['
+
+        total = 0
+        async for rows in pages:
+            yield (b"," if total else b"") + b",".join(self._dump_rows(rows, columns))
+            total += len(rows)
+
+        yield b'],"total_mediciones":' + str(total).encode() + b'}'
+
+    async def _write_parquet(self, pages, columns: List[str]) -> AsyncIterator[bytes]:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        numeric_columns = {'altura_cm', 'l_torso_cm', 'l_oblicua_cm', 'l_cadera_cm', 'a_cadera_cm', 'peso_bascula_kg'}
+        schema = pa.schema([
+            (column, pa.float64() if column in numeric_columns
+             else pa.int64() if column == 'edad_meses'
+             else pa.string())
+            for column in columns
+        ])
+
+        # Cada página se escribe como un row group y se vacía el buffer al instante
+        sink = _StreamingSink()
+        writer = pq.ParquetWriter(pa.PythonFile(sink, mode='w'), schema, compression='snappy')
+        drain = sink.drain
+
+        try:
+            async for rows in pages:
+                table = pa.Table.from_pylist(
+                    [{column: self._parquet_value(row.get(column), column, numeric_columns) for column in columns} for row in rows],
+                    schema=schema
+                )
+                writer.write_table(table)
+                chunk = drain()
+                if chunk:
+                    yield chunk
+        finally:
+            writer.close()
+
+        chunk = drain()
+        if chunk:
+            yield chunk
+
+    @staticmethod
+    def _parquet_value(value: Any, column: str, numeric_columns: set) -> Any:
+        if value is None:
+            return None
+        if column in numeric_columns:
+            return float(value)
+        if column == 'edad_meses':
+            return int(value)
+        return str(value)
+
+    @staticmethod
+    def parquet_available() -> bool:
+        """Parquet depende de pyarrow (dependencia opcional)"""
+        try:
+            importlib.import_module("pyarrow.parquet")
+            return True
+        except ImportError:
+            return False
+
+# Instancia global del servicio
+export_service = ExportService()
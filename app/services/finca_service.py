@@ -1,13 +1,32 @@
-from supabase import Client
-from app.config.database import supabase_admin  # ✅ Cambiar a admin
+from supabase import AsyncClient
+from postgrest.exceptions import APIError
+from app.config.database import supabase_admin_async  # ✅ Cliente admin asíncrono
 from app.models.finca import FincaCreate, FincaUpdate, FincaWithBovinosAndMediciones, BovinoWithLastMedicion
-from typing import List, Dict, Any, Optional
+from app.services.ownership_service import OwnershipService, ownership_service
+from app.services.response_cache_service import ResponseCacheService, response_cache_service
+from app.utils.pagination import Page, count_method, fetch_page
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
+import logging
 import uuid
 
+logger = logging.getLogger(__name__)
+
+# Cantidad de IDs por consulta `in_` (mantiene la URL de PostgREST en un tamaño seguro)
+BOVINO_IDS_CHUNK_SIZE = 150
+# Filas por página; coincide con el `max-rows` por defecto de Supabase
+MEDICIONES_PAGE_SIZE = 1000
+# Vista DISTINCT ON (bovino_id) de migrations/003_ultimas_mediciones.sql
+ULTIMAS_MEDICIONES_VIEW = 'ultimas_mediciones_bovinos'
+# Relación inexistente (vista sin crear) según PostgreSQL y PostgREST
+RELACION_INEXISTENTE = ('42P01', 'PGRST205')
+
 class FincaService:
-    def __init__(self, db_client: Client = supabase_admin):  # ✅ Usar admin
+    def __init__(self, db_client: AsyncClient = supabase_admin_async, ownership: OwnershipService = ownership_service,
+                 cache: ResponseCacheService = response_cache_service):  # ✅ Usar admin asíncrono
         self.db = db_client
+        self.ownership = ownership
+        self.cache = cache
     
     async def create_finca(self, finca_data: FincaCreate, propietario_id: str) -> Dict[str, Any]:
         """Crea una nueva finca"""
@@ -15,21 +34,29 @@ class FincaService:
             insert_data = finca_data.dict()
             insert_data['propietario_id'] = propietario_id
             
-            response = self.db.table('fincas').insert(insert_data).execute()
+            response = await self.db.table('fincas').insert(insert_data).execute()
             
             if response.data:
-                return response.data[0]
+                finca = response.data[0]
+                self.ownership.remember_finca(finca['id'], propietario_id)
+                await self.cache.invalidate(propietario_id, ("fincas",))
+                return finca
             else:
                 raise Exception("Error creando finca")
                 
         except Exception as e:
             raise Exception(f"Error creando finca: {str(e)}")
     
-    async def get_fincas_by_user(self, propietario_id: str) -> List[Dict[str, Any]]:
-        """Obtiene todas las fincas de un usuario"""
+    async def get_fincas_by_user(self, propietario_id: str, limit: int, after: Optional[Tuple[Any, Any]] = None, with_count: bool = False) -> Page:
+        """Obtiene una página de fincas de un usuario (keyset sobre created_at, id)"""
         try:
-            response = self.db.table('fincas').select('*').eq('propietario_id', propietario_id).execute()
-            return response.data if response.data else []
+            query = self.db.table('fincas').select('*', count=count_method(with_count)).eq('propietario_id', propietario_id)
+            return await self.cache.cached(
+                "fincas.list", propietario_id, ("fincas",),
+                {"limit": limit, "after": after, "with_count": with_count},
+                lambda: fetch_page(query, limit, after),
+                dump=Page.to_dict, load=Page.from_dict
+            )
             
         except Exception as e:
             raise Exception(f"Error obteniendo fincas: {str(e)}")
@@ -37,7 +64,7 @@ class FincaService:
     async def get_finca_by_id(self, finca_id: str, propietario_id: str) -> Optional[Dict[str, Any]]:
         """Obtiene una finca específica"""
         try:
-            response = self.db.table('fincas').select('*').eq('id', finca_id).eq('propietario_id', propietario_id).execute()
+            response = await self.db.table('fincas').select('*').eq('id', finca_id).eq('propietario_id', propietario_id).execute()
             
             if response.data:
                 return response.data[0]
@@ -51,9 +78,10 @@ class FincaService:
         try:
             update_data = finca_data.dict(exclude_unset=True)
             
-            response = self.db.table('fincas').update(update_data).eq('id', finca_id).eq('propietario_id', propietario_id).execute()
+            response = await self.db.table('fincas').update(update_data).eq('id', finca_id).eq('propietario_id', propietario_id).execute()
             
             if response.data:
+                await self.cache.invalidate(propietario_id, ("fincas",))
                 return response.data[0]
             else:
                 raise Exception("Finca no encontrada o sin permisos")
@@ -64,42 +92,133 @@ class FincaService:
     async def delete_finca(self, finca_id: str, propietario_id: str) -> bool:
         """Elimina una finca"""
         try:
-            response = self.db.table('fincas').delete().eq('id', finca_id).eq('propietario_id', propietario_id).execute()
+            response = await self.db.table('fincas').delete().eq('id', finca_id).eq('propietario_id', propietario_id).execute()
+            
+            if response.data:
+                self.ownership.forget_finca(finca_id)
+                # El borrado es en cascada: también cambian sus bovinos y mediciones
+                await self.cache.invalidate(propietario_id, ("fincas", "bovinos", "mediciones"))
             
             return len(response.data) > 0
             
         except Exception as e:
             raise Exception(f"Error eliminando finca: {str(e)}")
     
-    async def get_finca_with_bovinos(self, finca_id: str, propietario_id: str) -> Optional[Dict[str, Any]]:
-        """Obtiene una finca con sus bovinos"""
+    async def get_finca_with_bovinos(self, finca_id: str, propietario_id: str, limit: int, after: Optional[Tuple[Any, Any]] = None,
+                                     with_count: bool = False) -> Tuple[Optional[Dict[str, Any]], Optional[Page]]:
+        """Obtiene una finca con una página de sus bovinos: (finca, página de bovinos)"""
         try:
-            # Obtener finca
-            finca_response = self.db.table('fincas').select('*').eq('id', finca_id).eq('propietario_id', propietario_id).execute()
+            resultado = await self.cache.cached(
+                "fincas.with_bovinos", propietario_id, ("fincas", "bovinos"),
+                {"finca_id": finca_id, "limit": limit, "after": after, "with_count": with_count},
+                lambda: self._load_finca_with_bovinos(finca_id, propietario_id, limit, after, with_count),
+                dump=lambda r: {"finca": {k: v for k, v in r[0].items() if k != 'bovinos'}, "bovinos": r[1].to_dict()},
+                load=lambda d: ({**d["finca"], "bovinos": d["bovinos"]["items"]}, Page.from_dict(d["bovinos"]))
+            )
+            return resultado or (None, None)
             
-            if not finca_response.data:
-                return None
+        except Exception as e:
+            raise Exception(f"Error obteniendo finca con bovinos: {str(e)}")
+
+    async def _load_finca_with_bovinos(self, finca_id: str, propietario_id: str, limit: int, after: Optional[Tuple[Any, Any]],
+                                       with_count: bool) -> Optional[Tuple[Dict[str, Any], Page]]:
+        # Obtener finca
+        finca_response = await self.db.table('fincas').select('*').eq('id', finca_id).eq('propietario_id', propietario_id).execute()
+        
+        if not finca_response.data:
+            return None
+        
+        finca = finca_response.data[0]
+        
+        # Obtener la página de bovinos de la finca
+        query = self.db.table('bovinos').select('*', count=count_method(with_count)).eq('finca_id', finca_id)
+        bovinos = await fetch_page(query, limit, after)
+        
+        finca['bovinos'] = bovinos.items
+        
+        return finca, bovinos
+
+    async def get_ultimas_mediciones_by_bovinos(self, bovino_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Obtiene la última medición de cada bovino con consultas por lotes.
+        Los IDs se agrupan en bloques para el filtro `in_` y cada bloque lee la
+        vista `ultimas_mediciones_bovinos`: una fila por bovino. Sin la vista
+        (migración pendiente) se recorren todas las mediciones del bloque.
+        """
+        ultimas_mediciones: Dict[str, Dict[str, Any]] = {}
+        usar_vista = True
+        
+        for inicio in range(0, len(bovino_ids), BOVINO_IDS_CHUNK_SIZE):
+            bloque_ids = bovino_ids[inicio:inicio + BOVINO_IDS_CHUNK_SIZE]
             
-            finca = finca_response.data[0]
+            if usar_vista:
+                try:
+                    response = await self.db.table(ULTIMAS_MEDICIONES_VIEW)\
+                        .select('*')\
+                        .in_('bovino_id', bloque_ids)\
+                        .execute()
+                    for medicion in response.data or []:
+                        ultimas_mediciones[medicion['bovino_id']] = medicion
+                    continue
+                except APIError as e:
+                    if e.code not in RELACION_INEXISTENTE:
+                        raise
+                    logger.warning("Vista %s no encontrada (aplicar migrations/003_ultimas_mediciones.sql)",
+                                   ULTIMAS_MEDICIONES_VIEW)
+                    usar_vista = False
             
-            # Obtener bovinos de la finca
-            bovinos_response = self.db.table('bovinos').select('*').eq('finca_id', finca_id).execute()
+            ultimas_mediciones.update(await self._scan_ultimas_mediciones(bloque_ids))
+        
+        return ultimas_mediciones
+
+    async def _scan_ultimas_mediciones(self, bloque_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Recorrido completo de las mediciones del bloque (sin la vista)"""
+        ultimas_mediciones: Dict[str, Dict[str, Any]] = {}
+        offset = 0
+        
+        while True:
+            # Ordenado por bovino y fecha descendente: la primera fila de cada bovino es la última medición
+            medicion_response = await self.db.table('mediciones_bovinos')\
+                .select('*')\
+                .in_('bovino_id', bloque_ids)\
+                .order('bovino_id')\
+                .order('fecha', desc=True)\
+                .range(offset, offset + MEDICIONES_PAGE_SIZE - 1)\
+                .execute()
             
-            finca['bovinos'] = bovinos_response.data if bovinos_response.data else []
+            filas = medicion_response.data or []
+            for medicion in filas:
+                ultimas_mediciones.setdefault(medicion['bovino_id'], medicion)
             
-            return finca
+            if len(filas) < MEDICIONES_PAGE_SIZE:
+                break
+            offset += MEDICIONES_PAGE_SIZE
+        
+        return ultimas_mediciones
+
+    def _es_medicion_reciente(self, medicion: Dict[str, Any], dias: int = 30) -> bool:
+        """Indica si una medición es de los últimos `dias` días"""
+        try:
+            fecha_medicion = medicion['fecha']
+            if isinstance(fecha_medicion, str):
+                # La fecha viene como string "YYYY-MM-DD"
+                fecha_medicion = datetime.strptime(fecha_medicion, '%Y-%m-%d').date()
             
+            dias_diferencia = (datetime.now().date() - fecha_medicion).days
+            return dias_diferencia <= dias
         except Exception as e:
-            raise Exception(f"Error obteniendo finca con bovinos: {str(e)}")
+            # Si hay error parseando fecha, no cuenta como reciente
+            logger.warning("Error parseando fecha de medición: %s", e)
+            return False
 
     async def get_finca_with_bovinos_and_mediciones(self, finca_id: str, propietario_id: str) -> Optional[FincaWithBovinosAndMediciones]:
         """
         Obtiene una finca con todos sus bovinos y la última medición de cada uno
         """
         try:
-            # Obtener datos de la finca
-            finca_response = self.db.table('fincas')\
-                .select('*')\
+            # Obtener la finca y sus bovinos en una sola consulta
+            finca_response = await self.db.table('fincas')\
+                .select('*, bovinos(*)')\
                 .eq('id', finca_id)\
                 .eq('propietario_id', propietario_id)\
                 .execute()
@@ -108,48 +227,22 @@ class FincaService:
                 return None
             
             finca_data = finca_response.data[0]
+            bovinos_data = finca_data.pop('bovinos', None) or []
             
-            # Obtener bovinos de la finca
-            bovinos_response = self.db.table('bovinos')\
-                .select('*')\
-                .eq('finca_id', finca_id)\
-                .execute()
+            # Obtener las últimas mediciones de todos los bovinos en bloque
+            ultimas_mediciones = await self.get_ultimas_mediciones_by_bovinos(
+                [bovino['id'] for bovino in bovinos_data]
+            )
             
             bovinos_with_mediciones = []
             bovinos_con_mediciones_recientes = 0
             
-            for bovino_data in bovinos_response.data:
-                # Obtener la última medición de cada bovino
-                medicion_response = self.db.table('mediciones_bovinos')\
-                    .select('*')\
-                    .eq('bovino_id', bovino_data['id'])\
-                    .order('fecha', desc=True)\
-                    .limit(1)\
-                    .execute()
+            for bovino_data in bovinos_data:
+                ultima_medicion = ultimas_mediciones.get(bovino_data['id'])
                 
-                ultima_medicion = None
-                if medicion_response.data:
-                    ultima_medicion = medicion_response.data[0]
-                    # Considerar medición reciente si es de los últimos 30 días
-                    try:
-                        fecha_medicion_str = ultima_medicion['fecha']
-                        if isinstance(fecha_medicion_str, str):
-                            # La fecha viene como string "YYYY-MM-DD"
-                            from datetime import date
-                            fecha_medicion = datetime.strptime(fecha_medicion_str, '%Y-%m-%d').date()
-                            fecha_actual = datetime.now().date()
-                            dias_diferencia = (fecha_actual - fecha_medicion).days
-                        else:
-                            # La fecha ya es un objeto date
-                            fecha_actual = datetime.now().date()
-                            dias_diferencia = (fecha_actual - fecha_medicion_str).days
-                        
-                        if dias_diferencia <= 30:
-                            bovinos_con_mediciones_recientes += 1
-                    except Exception as e:
-                        # Si hay error parseando fecha, no cuenta como reciente
-                        print(f"Error parseando fecha de medición: {e}")
-                        pass
+                # Considerar medición reciente si es de los últimos 30 días
+                if ultima_medicion and self._es_medicion_reciente(ultima_medicion):
+                    bovinos_con_mediciones_recientes += 1
                 
                 # Crear objeto bovino con última medición
                 bovino_with_medicion = BovinoWithLastMedicion(
@@ -169,7 +262,7 @@ class FincaService:
             return finca_completa
             
         except Exception as e:
-            print(f"Error al obtener finca con bovinos y mediciones: {e}")
+            logger.error("Error al obtener finca %s con bovinos y mediciones: %s", finca_id, e)
             raise Exception(f"Error al obtener datos completos de la finca: {str(e)}")
 
 # Instancia global del servicio
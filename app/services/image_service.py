@@ -1,365 +1,410 @@
-from supabase import Client
-from app.config.database import supabase_admin  # ✅ Cambiar a admin
-from app.config.database import supabase
+from supabase import AsyncClient
+from app.config.database import supabase_admin_async, async_http_client  # ✅ Cliente admin y pool HTTP asíncronos
 from app.config.settings import settings
+from app.utils.cache import TTLCache
+from app.utils.image_variants import generate_variants
+from app.utils.pagination import iter_keyset_pages
+from concurrent.futures import Executor, ProcessPoolExecutor
 from fastapi import UploadFile
-from typing import List, Dict, Any
-import uuid
+from postgrest.types import ReturnMethod
+from typing import Dict, Any, List, Optional, Set, Tuple
+from datetime import datetime, timezone
+import asyncio
 import base64
-from datetime import datetime
+import binascii
+import hashlib
+import httpx
+import logging
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Tipos de imagen permitidos y su extensión
+ALLOWED_CONTENT_TYPES = {
+    "image/jpeg": ".jpg",
+    "image/jpg": ".jpg",
+    "image/png": ".png",
+    "image/webp": ".webp"
+}
+# Tamaño de lectura de archivos multipart
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Carpeta de imágenes de perfil en el bucket
+PROFILE_FOLDER = "perfiles"
+# Objetos por página de listado / por petición de borrado en Storage
+STORAGE_LIST_PAGE_SIZE = 1000
+STORAGE_DELETE_BATCH_SIZE = 100
+
+# Pool de procesos para el redimensionado (se crea con la primera subida)
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+class ImageValidationError(ValueError):
+    """Imagen rechazada por formato, tipo o tamaño"""
+
+def get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=settings.image_process_workers)
+    return _process_pool
+
+def shutdown_process_pool() -> None:
+    """Cierra el pool de procesos de imágenes (al apagar el servidor)"""
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+def sniff_content_type(data: bytes) -> Optional[str]:
+    """Detecta el tipo real de imagen por su firma (magic bytes)"""
+    if data[:3] == b"\xff\xd8\xff":
+        return "image/jpeg"
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return "image/png"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+def validate_image(data: bytes, declared_type: Optional[str]) -> str:
+    """
+    Valida tamaño y tipo de la imagen decodificada.
+    Devuelve el content-type real (según la firma del archivo).
+    """
+    if not data:
+        raise ImageValidationError("La imagen está vacía")
+    if len(data) > settings.image_max_bytes:
+        raise ImageValidationError(f"La imagen es demasiado grande. Máximo {settings.image_max_bytes // (1024 * 1024)}MB")
+    if declared_type and declared_type not in ALLOWED_CONTENT_TYPES:
+        raise ImageValidationError(f"Tipo de imagen no permitido. Tipos válidos: {', '.join(ALLOWED_CONTENT_TYPES)}")
+
+    content_type = sniff_content_type(data)
+    if content_type is None:
+        raise ImageValidationError("El contenido no es una imagen JPEG, PNG o WebP válida")
+    return content_type
+
+def decode_data_url(image_base64: str) -> Tuple[bytes, str]:
+    """Decodifica y valida un data URL `data:image/...;base64,...` (se ejecuta fuera del event loop)"""
+    if not image_base64:
+        raise ImageValidationError("image_base64 no puede estar vacío")
+    if not image_base64.startswith('data:image/'):
+        raise ImageValidationError("Formato de imagen base64 inválido. Debe incluir el data URL completo.")
+    if ',' not in image_base64:
+        raise ImageValidationError("Formato base64 inválido: falta coma separadora")
+
+    header, encoded = image_base64.split(',', 1)
+    if ';' not in header or ':' not in header:
+        raise ImageValidationError("Header base64 malformado")
+    declared_type = header.split(';')[0].split(':')[1]
+
+    # Rechazar antes de decodificar si el tamaño ya excede el máximo
+    if len(encoded) * 3 // 4 > settings.image_max_bytes + 3:
+        raise ImageValidationError(f"La imagen es demasiado grande. Máximo {settings.image_max_bytes // (1024 * 1024)}MB")
+
+    try:
+        data = base64.b64decode(encoded, validate=True)
+    except (binascii.Error, ValueError) as decode_error:
+        raise ImageValidationError(f"Error decodificando imagen base64: {str(decode_error)}")
+
+    return data, validate_image(data, declared_type)
+
+def content_digest(data: bytes) -> str:
+    """Hash BLAKE2b (128 bits) del contenido: direcciona el objeto en Storage"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+def prepare_base64_image(image_base64: str) -> Tuple[bytes, str, str]:
+    """Decodifica, valida y calcula el hash en un solo paso de hilo de trabajo"""
+    data, content_type = decode_data_url(image_base64)
+    return data, content_type, content_digest(data)
+
+def prepare_image(data: bytes, declared_type: Optional[str]) -> Tuple[str, str]:
+    """Valida y calcula el hash de bytes ya recibidos"""
+    return validate_image(data, declared_type), content_digest(data)
+
+def base_key_of(object_key: str) -> str:
+    """
+    Clave base compartida por el original y sus variantes:
+    perfiles/{user}_{hash}.jpg y perfiles/{user}_{hash}_256.webp -> perfiles/{user}_{hash}
+    """
+    stem = object_key.rsplit('.', 1)[0]
+    prefix, _, suffix = stem.rpartition('_')
+    if prefix and suffix.isdigit() and len(suffix) <= 5 and object_key.endswith('.webp'):
+        return prefix
+    return stem
 
 class ImageService:
-    def __init__(self, db_client: Client = supabase_admin):  # ✅ Usar admin
+    """
+    Subida de imágenes de perfil.
+    La decodificación y validación corren en un hilo de trabajo y las variantes
+    WebP en un pool de procesos; la subida usa el pool HTTP asíncrono compartido
+    y el perfil se actualiza con un solo upsert.
+    Los objetos se direccionan por contenido (BLAKE2b): reenviar los mismos bytes
+    no vuelve a subir nada y un barrido periódico borra los objetos huérfanos.
+    """
+
+    def __init__(self, db_client: AsyncClient = supabase_admin_async, http_client: httpx.AsyncClient = async_http_client,
+                 executor: Optional[Executor] = None):  # ✅ Usar admin asíncrono
         self.db = db_client
+        self.http = http_client
+        self.executor = executor
         self.bucket_name = settings.bucket_name
+        self.storage_url = f"{settings.supabase_url}/storage/v1"
+        # Índice hash -> resultado de la subida (clave de objeto y URLs)
+        self.content_index = TTLCache(
+            max_size=settings.image_dedup_cache_max_size,
+            default_ttl=settings.image_dedup_cache_ttl_seconds
+        )
 
     async def upload_profile_image_base64(self, image_base64: str, user_id: str, file_name: str = None) -> Dict[str, Any]:
         """Sube una imagen de perfil desde base64 y actualiza la tabla perfiles"""
         try:
-            print(f"🔍 === SERVICIO: Iniciando upload ===")
-            print(f"👤 user_id recibido: {user_id}")
-            print(f"📄 file_name recibido: {file_name}")
-            print(f"📏 Longitud image_base64: {len(image_base64) if image_base64 else 'None'}")
-            
-            # Validar que el base64 tenga el formato correcto
-            if not image_base64:
-                print("❌ SERVICIO: image_base64 está vacío o es None")
-                raise Exception("image_base64 no puede estar vacío")
-                
-            if not image_base64.startswith('data:image/'):
-                print(f"❌ SERVICIO: Formato incorrecto. Comienza con: {image_base64[:30]}...")
-                raise Exception("Formato de imagen base64 inválido. Debe incluir el data URL completo.")
-            
-            print("✅ SERVICIO: Formato base64 inicial válido")
-            
-            # Extraer el tipo de contenido y los datos base64
-            try:
-                if ',' not in image_base64:
-                    print("❌ SERVICIO: No se encontró coma separadora")
-                    raise Exception("Formato base64 inválido: falta coma separadora")
-                    
-                header, encoded = image_base64.split(',', 1)
-                print(f"📝 SERVICIO: Header extraído: {header}")
-                print(f"📏 SERVICIO: Longitud datos encoded: {len(encoded)}")
-                
-                if ';' not in header or ':' not in header:
-                    print(f"❌ SERVICIO: Header malformado: {header}")
-                    raise Exception("Header base64 malformado")
-                    
-                content_type = header.split(';')[0].split(':')[1]
-                print(f"📝 SERVICIO: Content-type detectado: {content_type}")
-                
-            except Exception as parse_error:
-                print(f"❌ SERVICIO: Error parseando header: {str(parse_error)}")
-                raise Exception(f"Error parseando header base64: {str(parse_error)}")
-            
-            # Validar tipo de contenido
-            allowed_types = ["image/jpeg", "image/png", "image/jpg", "image/webp"]
-            if content_type not in allowed_types:
-                print(f"❌ SERVICIO: Tipo no permitido: {content_type}")
-                print(f"📝 SERVICIO: Tipos permitidos: {allowed_types}")
-                raise Exception(f"Tipo de imagen no permitido. Tipos válidos: {', '.join(allowed_types)}")
-            
-            print("✅ SERVICIO: Tipo de contenido válido")
-            
-            # Decodificar base64
-            try:
-                print("🔄 SERVICIO: Intentando decodificar base64...")
-                image_data = base64.b64decode(encoded)
-                print(f"📏 SERVICIO: Tamaño imagen decodificada: {len(image_data)} bytes")
-            except Exception as decode_error:
-                print(f"❌ SERVICIO: Error decodificando: {str(decode_error)}")
-                print(f"📝 SERVICIO: Primeros 50 chars del encoded: {encoded[:50]}")
-                raise Exception(f"Error decodificando imagen base64: {str(decode_error)}")
-            
-            # Validar tamaño (máximo 10MB)
-            max_size = 10 * 1024 * 1024  # 10MB
-            if len(image_data) > max_size:
-                print(f"❌ SERVICIO: Imagen muy grande: {len(image_data)} bytes (máx: {max_size})")
-                raise Exception("La imagen es demasiado grande. Máximo 10MB")
-            
-            print("✅ SERVICIO: Tamaño de imagen válido")
-            
-            # Validar que el user_id es un UUID válido
-            try:
-                uuid.UUID(user_id)
-                print("✅ SERVICIO: user_id es UUID válido")
-            except ValueError:
-                print(f"❌ SERVICIO: user_id inválido: {user_id}")
-                raise Exception(f"El user_id '{user_id}' no es un UUID válido")
-            
-            # Generar nombre único para el archivo
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            extension = ".jpg" if content_type == "image/jpeg" else ".png"
-            if content_type == "image/webp":
-                extension = ".webp"
-            
-            unique_filename = f"perfiles/{user_id}_{timestamp}_{uuid.uuid4().hex[:8]}{extension}"
-            print(f"📁 SERVICIO: Nombre archivo: {unique_filename}")
-            
-            # Usar el cliente admin para subir archivos
-            from app.config.database import supabase_admin
-            
-            try:
-                print("🚀 SERVICIO: Iniciando subida al bucket...")
-                
-                # Nota: Saltamos la verificación del bucket para evitar URLs incorrectas
-                print(f"📦 SERVICIO: Bucket configurado: {self.bucket_name}")
-                print("✅ SERVICIO: Procediendo directamente con upload via HTTP")
-                
-                # Subir archivo al bucket
-                print(f"📤 SERVICIO: Subiendo archivo: {unique_filename}")
-                print(f"📦 SERVICIO: Bucket: {self.bucket_name}")
-                print(f"📏 SERVICIO: Tamaño datos: {len(image_data)} bytes")
-                
-                try:
-                    # Usar directamente la API HTTP de Supabase Storage ya que el cliente tiene problemas con URLs
-                    from app.config.settings import settings
-                    import httpx
-                    
-                    storage_url = f"{settings.supabase_url}/storage/v1"
-                    upload_url = f"{storage_url}/object/{self.bucket_name}/{unique_filename}"
-                    
-                    print(f"🌐 SERVICIO: URL directa para upload: {upload_url}")
-                    
-                    headers = {
-                        "Authorization": f"Bearer {settings.supabase_service_role_key}",
-                        "Content-Type": content_type,
-                        "Cache-Control": "3600"
-                    }
-                    
-                    print(f"🔐 SERVICIO: Headers: {headers}")
-                    
-                    # Hacer request HTTP directo
-                    with httpx.Client(timeout=30.0) as client:
-                        response = client.post(upload_url, content=image_data, headers=headers)
-                        
-                        print(f"🌐 SERVICIO: Status code: {response.status_code}")
-                        print(f"🌐 SERVICIO: Response headers: {dict(response.headers)}")
-                        print(f"🌐 SERVICIO: Response text: {response.text}")
-                        
-                        if response.status_code == 200:
-                            print("✅ SERVICIO: Upload directo exitoso")
-                            try:
-                                response_data = response.json()
-                                print(f"� SERVICIO: Response JSON: {response_data}")
-                            except:
-                                print("📊 SERVICIO: Response no es JSON válido")
-                                response_data = {"message": "Upload successful"}
-                                
-                        elif response.status_code == 409:
-                            print("⚠️ SERVICIO: Archivo ya existe, intentando con upsert...")
-                            # Intentar con upsert usando PUT
-                            put_response = client.put(upload_url, content=image_data, headers=headers)
-                            print(f"� SERVICIO: PUT Status: {put_response.status_code}")
-                            print(f"🔄 SERVICIO: PUT Response: {put_response.text}")
-                            
-                            if put_response.status_code in [200, 201]:
-                                print("✅ SERVICIO: Upload con PUT exitoso")
-                                response = put_response
-                                try:
-                                    response_data = response.json()
-                                except:
-                                    response_data = {"message": "Upload successful"}
-                            else:
-                                raise Exception(f"Upload falló con PUT: {put_response.status_code} - {put_response.text}")
-                        
-                        elif response.status_code in [400, 404]:
-                            print(f"❌ SERVICIO: Error del cliente: {response.status_code}")
-                            print(f"🔍 SERVICIO: Posible problema con bucket o permisos")
-                            
-                            # Verificar si el bucket existe usando GET
-                            bucket_check_url = f"{storage_url}/bucket/{self.bucket_name}"
-                            bucket_response = client.get(bucket_check_url, headers={
-                                "Authorization": f"Bearer {settings.supabase_service_role_key}"
-                            })
-                            print(f"🔍 SERVICIO: Bucket check status: {bucket_response.status_code}")
-                            print(f"🔍 SERVICIO: Bucket check response: {bucket_response.text}")
-                            
-                            raise Exception(f"Upload falló: {response.status_code} - {response.text}")
-                        
-                        else:
-                            raise Exception(f"Upload falló: {response.status_code} - {response.text}")
-                        
-                except Exception as upload_exception:
-                    print(f"❌ SERVICIO: Exception en upload directo: {str(upload_exception)}")
-                    print(f"🔍 SERVICIO: Exception type: {type(upload_exception).__name__}")
-                    
-                    if hasattr(upload_exception, 'args') and upload_exception.args:
-                        print(f"📝 SERVICIO: Exception args: {upload_exception.args}")
-                    
-                    # Re-lanzar la excepción
-                    raise upload_exception
-                
-                print(f"✅ SERVICIO: Imagen subida exitosamente")
-                
-                # Obtener URL pública directamente, sin usar el cliente de Supabase
-                from app.config.settings import settings
-                public_url = f"{settings.supabase_url}/storage/v1/object/public/{self.bucket_name}/{unique_filename}"
-                print(f"🔗 SERVICIO: URL pública construida: {public_url}")
-                
-                # Verificar que la URL pública funciona
-                try:
-                    import httpx
-                    with httpx.Client(timeout=10.0) as client:
-                        test_response = client.head(public_url)
-                        print(f"� SERVICIO: Test URL pública - Status: {test_response.status_code}")
-                        if test_response.status_code == 200:
-                            print("✅ SERVICIO: URL pública accesible")
-                        else:
-                            print(f"⚠️ SERVICIO: URL pública retorna: {test_response.status_code}")
-                except Exception as test_error:
-                    print(f"⚠️ SERVICIO: No se pudo verificar URL pública: {str(test_error)}")
-                    # Continuar de todos modos
-                
-                # Actualizar tabla perfiles con la nueva imagen
-                profile_updated = False
-                try:
-                    print("💾 SERVICIO: Actualizando tabla perfiles...")
-                    print(f"👤 SERVICIO: user_id para actualizar: {user_id}")
-                    print(f"🔗 SERVICIO: URL para guardar: {public_url}")
-                    
-                    # USAR CLIENTE ADMIN para evitar problemas de RLS
-                    print("🔐 SERVICIO: Usando cliente admin para actualizar perfiles...")
-                    
-                    # Primero verificar si el perfil existe
-                    print("🔍 SERVICIO: Verificando si el perfil existe...")
-                    check_response = supabase_admin.table('perfiles')\
-                        .select('id, imagen_perfil')\
-                        .eq('id', user_id)\
-                        .execute()
-                    
-                    print(f"📊 SERVICIO: Perfiles encontrados: {len(check_response.data)}")
-                    if check_response.data:
-                        existing_profile = check_response.data[0]
-                        print(f"✅ SERVICIO: Perfil existe - ID: {existing_profile.get('id')}")
-                        print(f"🖼️ SERVICIO: Imagen actual: {existing_profile.get('imagen_perfil', 'NULL')}")
-                    else:
-                        print("❌ SERVICIO: No se encontró perfil existente")
-                    
-                    # Intentar actualizar el perfil existente CON CLIENTE ADMIN
-                    print("🔄 SERVICIO: Intentando actualizar perfil con admin...")
-                    update_response = supabase_admin.table('perfiles')\
-                        .update({'imagen_perfil': public_url})\
-                        .eq('id', user_id)\
-                        .execute()
-                    
-                    print(f"📊 SERVICIO: Respuesta update - data: {update_response.data}")
-                    print(f"📊 SERVICIO: Respuesta update - count: {getattr(update_response, 'count', 'N/A')}")
-                    profile_updated = len(update_response.data) > 0
-                    print(f"✅ SERVICIO: Filas actualizadas: {len(update_response.data)}")
-                    
-                    if profile_updated:
-                        print("🎉 SERVICIO: Perfil actualizado exitosamente")
-                        # Verificar que realmente se actualizó
-                        verify_response = supabase_admin.table('perfiles')\
-                            .select('imagen_perfil')\
-                            .eq('id', user_id)\
-                            .execute()
-                        
-                        if verify_response.data:
-                            updated_url = verify_response.data[0].get('imagen_perfil')
-                            print(f"✅ SERVICIO: Verificación - URL guardada: {updated_url}")
-                            if updated_url == public_url:
-                                print("🎯 SERVICIO: URL coincide perfectamente")
-                            else:
-                                print("⚠️ SERVICIO: URL no coincide exactamente")
-                    
-                    if not profile_updated:
-                        print("🔄 SERVICIO: Update falló, intentando crear perfil...")
-                        try:
-                            print(f"➕ SERVICIO: Creando perfil para user_id: {user_id}")
-                            create_response = supabase_admin.table('perfiles')\
-                                .insert({
-                                    'id': user_id, 
-                                    'imagen_perfil': public_url
-                                })\
-                                .execute()
-                            
-                            print(f"📊 SERVICIO: Respuesta create - data: {create_response.data}")
-                            profile_updated = len(create_response.data) > 0
-                            
-                            if profile_updated:
-                                print("🎉 SERVICIO: Perfil creado exitosamente")
-                            else:
-                                print("❌ SERVICIO: No se pudo crear el perfil")
-                                
-                        except Exception as create_error:
-                            print(f"❌ SERVICIO: Error creando perfil: {str(create_error)}")
-                            print(f"🔍 SERVICIO: Tipo error create: {type(create_error).__name__}")
-                            
-                            # Verificar si es problema de foreign key
-                            if "violates foreign key" in str(create_error).lower():
-                                print("🔑 SERVICIO: Error FK - el user_id no existe en auth.users")
-                            
-                            profile_updated = False
-                    
-                except Exception as update_error:
-                    print(f"❌ SERVICIO: Error en actualización de perfil: {str(update_error)}")
-                    print(f"🔍 SERVICIO: Tipo de error update: {type(update_error).__name__}")
-                    
-                    # Análisis específico del error
-                    error_str = str(update_error).lower()
-                    if "relation" in error_str and "does not exist" in error_str:
-                        print("📋 SERVICIO: La tabla 'perfiles' no existe")
-                    elif "column" in error_str and "does not exist" in error_str:
-                        print("📋 SERVICIO: La columna 'imagen_perfil' no existe")
-                    elif "violates" in error_str:
-                        print("🔑 SERVICIO: Violación de constraaint de BD")
-                    
-                    profile_updated = False
-                
-                result = {
-                    "url": unique_filename,
-                    "public_url": public_url,
-                    "file_name": file_name or f"profile_image{extension}",
-                    "profile_updated": profile_updated
-                }
-                
-                print("✅ SERVICIO: Upload completado exitosamente")
-                print(f"🔍 === SERVICIO: Fin upload ===")
-                return result
-                
-            except Exception as upload_error:
-                print(f"❌ SERVICIO: Error en upload a bucket: {str(upload_error)}")
-                print(f"🔍 SERVICIO: Tipo de error upload: {type(upload_error).__name__}")
-                
-                # Intentar obtener más detalles del error
-                error_detail = str(upload_error)
-                
-                if hasattr(upload_error, 'message'):
-                    print(f"📝 SERVICIO: Error message: {upload_error.message}")
-                    error_detail = upload_error.message
-                elif hasattr(upload_error, 'detail'):
-                    print(f"📝 SERVICIO: Error detail: {upload_error.detail}")
-                    error_detail = upload_error.detail
-                elif hasattr(upload_error, 'args') and upload_error.args:
-                    print(f"📝 SERVICIO: Error args: {upload_error.args}")
-                    error_detail = str(upload_error.args[0]) if upload_error.args else str(upload_error)
-                
-                # Si es KeyError, mostrar qué clave falta
-                if isinstance(upload_error, KeyError):
-                    print(f"� SERVICIO: KeyError - Clave faltante: {upload_error}")
-                    error_detail = f"Clave faltante en respuesta de Supabase: {upload_error}"
-                
-                # Información adicional para debugging
-                print(f"📋 SERVICIO: Dir del error: {[attr for attr in dir(upload_error) if not attr.startswith('_')]}")
-                
-                # Verificar si es problema de bucket
-                if "404" in str(upload_error) or "Not Found" in str(upload_error):
-                    error_detail = f"Bucket '{self.bucket_name}' no encontrado o no accesible. Verificar configuración de Supabase Storage."
-                elif "401" in str(upload_error) or "Unauthorized" in str(upload_error):
-                    error_detail = f"Sin permisos para acceder al bucket '{self.bucket_name}'. Verificar SERVICE_ROLE_KEY."
-                elif "403" in str(upload_error) or "Forbidden" in str(upload_error):
-                    error_detail = f"Operación prohibida en bucket '{self.bucket_name}'. Verificar políticas RLS del bucket."
-                    
-                raise Exception(f"Error subiendo imagen a bucket: {error_detail}")
-                
+            image_data, content_type, digest = await asyncio.to_thread(prepare_base64_image, image_base64)
+            return await self._store_profile_image(image_data, content_type, digest, user_id, file_name)
+
+        except Exception as e:
+            logger.warning("Upload de imagen de perfil rechazado: %s", e)
+            raise Exception(f"Error en upload de imagen de perfil: {str(e)}")
+
+    async def upload_profile_image_file(self, file: UploadFile, user_id: str) -> Dict[str, Any]:
+        """Sube una imagen de perfil recibida como multipart/form-data"""
+        try:
+            image_data = await self._read_upload(file)
+            content_type, digest = await asyncio.to_thread(prepare_image, image_data, file.content_type)
+            return await self._store_profile_image(image_data, content_type, digest, user_id, file.filename)
+
         except Exception as e:
-            print(f"❌ SERVICIO: Error general: {str(e)}")
-            print(f"🔍 SERVICIO: Tipo de error general: {type(e).__name__}")
-            print(f"🔍 === SERVICIO: Fin upload (ERROR) ===")
+            logger.warning("Upload de imagen de perfil rechazado: %s", e)
             raise Exception(f"Error en upload de imagen de perfil: {str(e)}")
 
+    async def _read_upload(self, file: UploadFile) -> bytes:
+        """Lee el archivo por bloques y corta en cuanto supera el tamaño máximo"""
+        chunks = []
+        size = 0
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > settings.image_max_bytes:
+                raise ImageValidationError(f"La imagen es demasiado grande. Máximo {settings.image_max_bytes // (1024 * 1024)}MB")
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+    async def _store_profile_image(self, image_data: bytes, content_type: str, digest: str, user_id: str,
+                                   file_name: Optional[str]) -> Dict[str, Any]:
+        """Sube la imagen al bucket (si no existe ya) y registra su URL en perfiles"""
+        try:
+            uuid.UUID(user_id)
+        except ValueError:
+            raise ImageValidationError(f"El user_id '{user_id}' no es un UUID válido")
+
+        # Clave direccionada por contenido; las variantes comparten la base
+        extension = ALLOWED_CONTENT_TYPES[content_type]
+        base_key = f"{PROFILE_FOLDER}/{user_id}_{digest}"
+        unique_filename = f"{base_key}{extension}"
+        public_url = self.public_url(unique_filename)
+        result = {
+            "url": unique_filename,
+            "public_url": public_url,
+            "file_name": file_name or f"profile_image{extension}",
+            "profile_updated": True,
+            "variantes": {
+                str(size): self.public_url(self.variant_key(base_key, size))
+                for size in sorted(set(settings.image_variant_sizes))
+            }
+        }
+
+        # Mismos bytes ya subidos (reintentos): no se sube ni se regenera nada.
+        # El índice es local al proceso y el barrido puede haber borrado el
+        # objeto: antes de confiar en él se comprueba que siga en el bucket
+        current_url = await self._current_profile_image(user_id)
+        already_stored = (self.content_index.get(unique_filename) or current_url == public_url) \
+            and await self._object_exists(unique_filename)
+
+        if already_stored:
+            logger.info("Imagen de perfil ya almacenada, subida omitida: %s", unique_filename)
+        else:
+            self.content_index.delete(unique_filename)
+            variants = await self._generate_variants(image_data)
+
+            # Original y variantes se suben en paralelo
+            await asyncio.gather(
+                self._upload_object(unique_filename, image_data, content_type),
+                *(self._upload_object(self.variant_key(base_key, size), data, "image/webp") for size, data in variants.items())
+            )
+            logger.info("Imagen de perfil subida: %s (%d bytes, %d variantes)", unique_filename, len(image_data), len(variants))
+
+        # El perfil se actualiza siempre que apunte a otra imagen (p. ej. A -> B -> A)
+        if current_url != public_url:
+            result["profile_updated"] = await self._set_profile_image(user_id, public_url)
+        if result["profile_updated"]:
+            self.content_index.set(unique_filename, True)
+        return result
+
+    async def _current_profile_image(self, user_id: str) -> Optional[str]:
+        """URL que referencia hoy el perfil (índice persistente tras reinicios); None si no hay o falla"""
+        try:
+            response = await self.db.table('perfiles').select('imagen_perfil').eq('id', user_id).execute()
+            return response.data[0].get('imagen_perfil') if response.data else None
+        except Exception as e:
+            logger.warning("No se pudo consultar la imagen actual del perfil %s: %s", user_id, e)
+            return None
+
+    async def _object_exists(self, object_key: str) -> bool:
+        """HEAD al objeto: False si no existe o no se pudo comprobar (se vuelve a subir)"""
+        try:
+            response = await self.http.head(
+                f"{self.storage_url}/object/{self.bucket_name}/{object_key}",
+                headers={"Authorization": f"Bearer {settings.supabase_service_role_key}"}
+            )
+            return response.status_code == 200
+        except httpx.HTTPError as e:
+            logger.warning("No se pudo comprobar el objeto %s: %s", object_key, e)
+            return False
+
+    @staticmethod
+    def variant_key(base_key: str, size: int) -> str:
+        """Clave determinista de una variante: perfiles/{user_id}_..._{size}.webp"""
+        return f"{base_key}_{size}.webp"
+
+    def public_url(self, object_key: str) -> str:
+        return f"{self.storage_url}/object/public/{self.bucket_name}/{object_key}"
+
+    def object_key_from_url(self, public_url: Optional[str]) -> Optional[str]:
+        """Clave del objeto a partir de su URL pública (None si no es de este bucket)"""
+        marker = f"/object/public/{self.bucket_name}/"
+        if not public_url or marker not in public_url:
+            return None
+        return public_url.split(marker, 1)[1].split('?', 1)[0]
+
+    async def _generate_variants(self, image_data: bytes) -> Dict[int, bytes]:
+        """Redimensiona en el pool de procesos para no bloquear el event loop"""
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                self.executor or get_process_pool(),
+                generate_variants,
+                image_data,
+                settings.image_variant_sizes,
+                settings.image_variant_quality
+            )
+        except ValueError as e:
+            raise ImageValidationError(str(e))
+
+    async def _upload_object(self, object_key: str, data: bytes, content_type: str) -> None:
+        """Sube un objeto al bucket con una sola petición (x-upsert sobrescribe si existe)"""
+        response = await self.http.post(
+            f"{self.storage_url}/object/{self.bucket_name}/{object_key}",
+            content=data,
+            headers={
+                "Authorization": f"Bearer {settings.supabase_service_role_key}",
+                "Content-Type": content_type,
+                "Cache-Control": "max-age=3600",
+                "x-upsert": "true"
+            }
+        )
+
+        if response.status_code in (200, 201):
+            return
+        if response.status_code == 404:
+            raise Exception(f"Bucket '{self.bucket_name}' no encontrado o no accesible. Verificar configuración de Supabase Storage.")
+        if response.status_code == 401:
+            raise Exception(f"Sin permisos para acceder al bucket '{self.bucket_name}'. Verificar SERVICE_ROLE_KEY.")
+        if response.status_code == 403:
+            raise Exception(f"Operación prohibida en bucket '{self.bucket_name}'. Verificar políticas RLS del bucket.")
+        raise Exception(f"Upload falló: {response.status_code} - {response.text}")
+
+    async def _set_profile_image(self, user_id: str, public_url: str) -> bool:
+        """Guarda la URL en perfiles con un único upsert (crea el perfil si no existe)"""
+        try:
+            await self.db.table('perfiles')\
+                .upsert({'id': user_id, 'imagen_perfil': public_url}, returning=ReturnMethod.minimal)\
+                .execute()
+            return True
+        except Exception as update_error:
+            logger.error("Error actualizando imagen en perfiles para %s: %s", user_id, update_error)
+            return False
+
+    async def _referenced_base_keys(self) -> Set[str]:
+        """Claves base referenciadas por perfiles.imagen_perfil"""
+        def build_query():
+            return self.db.table('perfiles').select('id, imagen_perfil').not_.is_('imagen_perfil', 'null')
+
+        referenced: Set[str] = set()
+        async for rows in iter_keyset_pages(build_query, STORAGE_LIST_PAGE_SIZE, sort_column='id'):
+            for row in rows:
+                object_key = self.object_key_from_url(row.get('imagen_perfil'))
+                if object_key:
+                    referenced.add(base_key_of(object_key))
+        return referenced
+
+    async def _list_profile_objects(self) -> List[Dict[str, Any]]:
+        """Lista los objetos de la carpeta de perfiles del bucket"""
+        objects: List[Dict[str, Any]] = []
+        offset = 0
+        while True:
+            response = await self.http.post(
+                f"{self.storage_url}/object/list/{self.bucket_name}",
+                json={
+                    "prefix": PROFILE_FOLDER,
+                    "limit": STORAGE_LIST_PAGE_SIZE,
+                    "offset": offset,
+                    "sortBy": {"column": "name", "order": "asc"}
+                },
+                headers={"Authorization": f"Bearer {settings.supabase_service_role_key}"}
+            )
+            response.raise_for_status()
+            page = response.json() or []
+            # Las entradas sin id son subcarpetas
+            objects.extend(item for item in page if item.get('id'))
+            if len(page) < STORAGE_LIST_PAGE_SIZE:
+                return objects
+            offset += STORAGE_LIST_PAGE_SIZE
+
+    async def _delete_objects(self, object_keys: List[str]) -> None:
+        for inicio in range(0, len(object_keys), STORAGE_DELETE_BATCH_SIZE):
+            response = await self.http.request(
+                "DELETE",
+                f"{self.storage_url}/object/{self.bucket_name}",
+                json={"prefixes": object_keys[inicio:inicio + STORAGE_DELETE_BATCH_SIZE]},
+                headers={"Authorization": f"Bearer {settings.supabase_service_role_key}"}
+            )
+            response.raise_for_status()
+
+    async def sweep_unreferenced_images(self) -> int:
+        """
+        Borra los objetos de perfiles que ya no referencia ningún perfil.
+        Respeta un periodo de gracia para no tocar subidas en curso.
+        Devuelve la cantidad de objetos borrados.
+        """
+        # Primero los objetos y después las referencias: una subida que termina
+        # entre ambas consultas queda protegida por el periodo de gracia
+        objects = await self._list_profile_objects()
+        referenced = await self._referenced_base_keys()
+        now = datetime.now(timezone.utc)
+
+        orphans = []
+        for item in objects:
+            object_key = f"{PROFILE_FOLDER}/{item['name']}"
+            created_at = item.get('created_at')
+            if not created_at:
+                continue
+            age = (now - datetime.fromisoformat(created_at.replace('Z', '+00:00'))).total_seconds()
+            if age >= settings.image_sweep_grace_seconds and base_key_of(object_key) not in referenced:
+                orphans.append(object_key)
+
+        if orphans:
+            await self._delete_objects(orphans)
+            for object_key in orphans:
+                self.content_index.delete(object_key)
+            logger.info("Barrido de imágenes: %d objetos huérfanos borrados", len(orphans))
+        return len(orphans)
+
+    async def run_sweeper(self) -> None:
+        """Tarea de fondo: barrido periódico de imágenes huérfanas"""
+        while True:
+            await asyncio.sleep(settings.image_sweep_interval_seconds)
+            try:
+                await self.sweep_unreferenced_images()
+            except Exception as e:
+                logger.error("Error en el barrido de imágenes huérfanas: %s", e)
+
 # Instancia global del servicio
 image_service = ImageService()
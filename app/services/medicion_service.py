@@ -1,67 +1,146 @@
-from supabase import Client
-from app.config.database import supabase_admin  # ✅ Cambiar a admin
-from app.config.database import supabase
+from supabase import AsyncClient
+from postgrest.exceptions import APIError
+from app.config.database import supabase_admin_async  # ✅ Cliente admin asíncrono
+from app.config.settings import settings
 from app.models.medicion import MedicionCreate, MedicionUpdate
-from typing import List, Dict, Any, Optional
+from app.services.ownership_service import OwnershipService, ownership_service
+from app.services.estadisticas_service import EstadisticasService, estadisticas_service
+from app.services.response_cache_service import ResponseCacheService, response_cache_service
+from app.utils.pagination import Page, count_method, fetch_page
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import date
 from decimal import Decimal
+import logging
 import uuid
 
+logger = logging.getLogger(__name__)
+
+# Errores de PostgREST que rechazan el INSERT completo (respuesta 4xx, nada se
+# confirmó): datos inválidos (22), restricciones (23), columnas o tipos (42) y
+# errores de la propia API (PGRST1xx/PGRST2xx)
+ERRORES_DE_FILA = ('22', '23', '42', 'PGRST1', 'PGRST2')
+
+def es_rechazo_de_filas(error: Exception) -> bool:
+    """
+    Indica si un bloque se puede reintentar fila por fila sin duplicar: solo
+    rechazos 4xx de PostgREST. Un timeout o un corte de conexión pueden llegar
+    después del commit, así que esos errores se propagan.
+    """
+    return isinstance(error, APIError) and isinstance(error.code, str) and error.code.startswith(ERRORES_DE_FILA)
+
 class MedicionService:
-    def __init__(self, db_client: Client = supabase_admin):  # ✅ Usar admin
+    def __init__(self, db_client: AsyncClient = supabase_admin_async, ownership: OwnershipService = ownership_service,
+                 estadisticas: EstadisticasService = estadisticas_service,
+                 cache: ResponseCacheService = response_cache_service):  # ✅ Usar admin asíncrono
         self.db = db_client
+        self.ownership = ownership
+        self.estadisticas = estadisticas
+        self.cache = cache
     
-    def _convert_decimals_to_float(self, data: dict) -> dict:
-        """Convierte valores Decimal a float para evitar problemas de serialización"""
-        converted = {}
-        for key, value in data.items():
-            if isinstance(value, Decimal):
-                converted[key] = float(value)
-            else:
-                converted[key] = value
-        return converted
+    def _prepare_insert_data(self, medicion_data: MedicionCreate) -> Dict[str, Any]:
+        """Prepara una medición para inserción en PostgREST"""
+        # Decimals como float para el cuerpo JSON de la petición
+        insert_data = {
+            key: float(value) if isinstance(value, Decimal) else value
+            for key, value in medicion_data.dict().items()
+        }
+        
+        # Convertir fecha y UUID a string
+        insert_data['fecha'] = str(insert_data['fecha'])
+        insert_data['bovino_id'] = str(insert_data['bovino_id'])
+        
+        return insert_data
     
     async def create_medicion(self, medicion_data: MedicionCreate, propietario_id: str) -> Dict[str, Any]:
         """Crea una nueva medición"""
         try:
             # Verificar que el bovino pertenece al usuario
-            bovino_response = self.db.table('bovinos').select('*, fincas!inner(propietario_id)').eq('id', str(medicion_data.bovino_id)).execute()
-            
-            if not bovino_response.data or bovino_response.data[0]['fincas']['propietario_id'] != propietario_id:
+            if not await self.ownership.owns_bovino(str(medicion_data.bovino_id), propietario_id):
                 raise Exception("Bovino no encontrado o sin permisos")
             
             # Preparar datos para inserción
-            insert_data = medicion_data.dict()
+            insert_data = self._prepare_insert_data(medicion_data)
             
-            # Convertir fecha a string
-            insert_data['fecha'] = str(insert_data['fecha'])
-            
-            # Convertir Decimals a float para evitar problemas de serialización
-            insert_data = self._convert_decimals_to_float(insert_data)
-            
-            # Convertir UUID a string
-            insert_data['bovino_id'] = str(insert_data['bovino_id'])
-            
-            response = self.db.table('mediciones_bovinos').insert(insert_data).execute()
+            response = await self.db.table('mediciones_bovinos').insert(insert_data).execute()
             
             if response.data:
-                # Convertir la respuesta también
-                result = response.data[0]
-                return self._convert_decimals_to_float(result)
+                await self.cache.invalidate(propietario_id, ("mediciones",))
+                return response.data[0]
             else:
                 raise Exception("Error creando medición")
                 
         except Exception as e:
             raise Exception(f"Error creando medición: {str(e)}")
     
+    async def create_mediciones_bulk(self, bovino_id: str, mediciones_data: List[MedicionCreate], propietario_id: str) -> Dict[str, Any]:
+        """
+        Crea mediciones de un bovino con inserciones multi-fila.
+        Los permisos se verifican una sola vez y las filas se insertan por bloques;
+        si PostgREST rechaza un bloque (4xx), se reintenta fila por fila para
+        reportar el error exacto. Los errores de transporte no se reintentan.
+        Devuelve {"creadas": [...], "errores": [{"indice": i, "error": "..."}]}
+        """
+        try:
+            # Verificar permisos una sola vez para todo el lote
+            if not await self.ownership.owns_bovino(bovino_id, propietario_id):
+                return {
+                    "creadas": [],
+                    "errores": [{"indice": i, "error": "Bovino no encontrado o sin permisos"} for i in range(len(mediciones_data))]
+                }
+            
+            creadas = []
+            errores = []
+            filas = []  # (índice original, datos de inserción)
+            
+            for i, medicion_data in enumerate(mediciones_data):
+                if str(medicion_data.bovino_id) != bovino_id:
+                    errores.append({"indice": i, "error": "bovino_id no coincide"})
+                    continue
+                filas.append((i, self._prepare_insert_data(medicion_data)))
+            
+            chunk_size = settings.mediciones_batch_chunk_size
+            for inicio in range(0, len(filas), chunk_size):
+                bloque = filas[inicio:inicio + chunk_size]
+                
+                try:
+                    response = await self.db.table('mediciones_bovinos').insert([datos for _, datos in bloque]).execute()
+                    creadas.extend(response.data or [])
+                except Exception as bloque_error:
+                    if not es_rechazo_de_filas(bloque_error):
+                        # El bloque (y los anteriores) pudieron confirmarse: la caché ya no vale
+                        await self.cache.invalidate(propietario_id, ("mediciones",))
+                        raise
+                    logger.warning("Bloque de %d mediciones rechazado, reintentando fila por fila: %s", len(bloque), bloque_error)
+                    for indice, datos in bloque:
+                        try:
+                            response = await self.db.table('mediciones_bovinos').insert(datos).execute()
+                            creadas.extend(response.data or [])
+                        except Exception as fila_error:
+                            errores.append({"indice": indice, "error": str(fila_error)})
+            
+            if creadas:
+                await self.cache.invalidate(propietario_id, ("mediciones",))
+            
+            return {"creadas": creadas, "errores": errores}
+            
+        except Exception as e:
+            raise Exception(f"Error creando mediciones en lote: {str(e)}")
+    
 
     async def get_medicion_by_id(self, medicion_id: str, propietario_id: str) -> Optional[Dict[str, Any]]:
         """Obtiene una medición específica"""
         try:
-            response = self.db.table('mediciones_bovinos').select('*, bovinos!inner(*, fincas!inner(propietario_id))').eq('id', medicion_id).execute()
+            response = await self.db.table('mediciones_bovinos').select('*, bovinos!inner(*, fincas!inner(propietario_id))').eq('id', medicion_id).execute()
             
-            if response.data and response.data[0]['bovinos']['fincas']['propietario_id'] == propietario_id:
-                return response.data[0]
+            if not response.data:
+                return None
+            
+            medicion = response.data[0]
+            bovino = medicion['bovinos']
+            self.ownership.remember_bovino(bovino['id'], bovino['finca_id'], bovino['fincas']['propietario_id'])
+            
+            if bovino['fincas']['propietario_id'] == propietario_id:
+                return medicion
             return None
             
         except Exception as e:
@@ -75,13 +154,18 @@ class MedicionService:
             if not medicion_actual:
                 raise Exception("Medición no encontrada o sin permisos")
             
-            update_data = medicion_data.dict(exclude_unset=True)
+            # Decimals como float, igual que en las altas
+            update_data = {
+                key: float(value) if isinstance(value, Decimal) else value
+                for key, value in medicion_data.dict(exclude_unset=True).items()
+            }
             if 'fecha' in update_data:
                 update_data['fecha'] = str(update_data['fecha'])
             
-            response = self.db.table('mediciones_bovinos').update(update_data).eq('id', medicion_id).execute()
+            response = await self.db.table('mediciones_bovinos').update(update_data).eq('id', medicion_id).execute()
             
             if response.data:
+                await self.cache.invalidate(propietario_id, ("mediciones",))
                 return response.data[0]
             else:
                 raise Exception("Error actualizando medición")
@@ -97,7 +181,8 @@ class MedicionService:
             if not medicion_actual:
                 raise Exception("Medición no encontrada o sin permisos")
             
-            response = self.db.table('mediciones_bovinos').delete().eq('id', medicion_id).execute()
+            response = await self.db.table('mediciones_bovinos').delete().eq('id', medicion_id).execute()
+            await self.cache.invalidate(propietario_id, ("mediciones",))
             
             return len(response.data) > 0
             
@@ -108,29 +193,57 @@ class MedicionService:
         """Obtiene mediciones de un bovino en un rango de fechas"""
         try:
             # Verificar permisos
-            bovino_response = self.db.table('bovinos').select('*, fincas!inner(propietario_id)').eq('id', bovino_id).execute()
-            
-            if not bovino_response.data or bovino_response.data[0]['fincas']['propietario_id'] != propietario_id:
+            if not await self.ownership.owns_bovino(bovino_id, propietario_id):
                 raise Exception("Bovino no encontrado o sin permisos")
             
-            response = self.db.table('mediciones_bovinos').select('*').eq('bovino_id', bovino_id).gte('fecha', str(fecha_inicio)).lte('fecha', str(fecha_fin)).order('fecha', desc=True).execute()
+            response = await self.db.table('mediciones_bovinos').select('*').eq('bovino_id', bovino_id).gte('fecha', str(fecha_inicio)).lte('fecha', str(fecha_fin)).order('fecha', desc=True).execute()
             
             return response.data if response.data else []
             
         except Exception as e:
             raise Exception(f"Error obteniendo mediciones por rango: {str(e)}")
     
+    async def get_mediciones_by_bovino(self, bovino_id: str, propietario_id: str, limit: int, after: Optional[Tuple[Any, Any]] = None,
+                                       with_count: bool = False) -> Page:
+        """Obtiene una página de mediciones de un bovino (keyset sobre fecha, id descendente)"""
+        try:
+            # Verificar permisos
+            if not await self.ownership.owns_bovino(bovino_id, propietario_id):
+                raise Exception("Bovino no encontrado o sin permisos")
+            
+            query = self.db.table('mediciones_bovinos').select('*', count=count_method(with_count)).eq('bovino_id', bovino_id)
+            return await fetch_page(query, limit, after, sort_column='fecha', desc=True)
+            
+        except Exception as e:
+            raise Exception(f"Error obteniendo mediciones: {str(e)}")
+    
     async def get_ultima_medicion_bovino(self, bovino_id: str, propietario_id: str) -> Optional[Dict[str, Any]]:
         """Obtiene la última medición de un bovino"""
         try:
-            mediciones = await self.get_mediciones_by_bovino(bovino_id, propietario_id)
+            mediciones = await self.get_mediciones_by_bovino(bovino_id, propietario_id, limit=1)
             
-            if mediciones:
-                return mediciones[0]  # Ya están ordenadas por fecha desc
+            if mediciones.items:
+                return mediciones.items[0]  # Ya están ordenadas por fecha desc
             return None
             
         except Exception as e:
             raise Exception(f"Error obteniendo última medición: {str(e)}")
+    
+    async def get_estadisticas_mediciones_bovino(self, bovino_id: str, propietario_id: str) -> Dict[str, Any]:
+        """Obtiene estadísticas de las mediciones de un bovino (motor vectorizado)"""
+        try:
+            return await self.estadisticas.get_estadisticas_bovino(bovino_id, propietario_id)
+            
+        except Exception as e:
+            raise Exception(f"Error calculando estadísticas: {str(e)}")
+    
+    async def get_estadisticas_mediciones_finca(self, finca_id: str, propietario_id: str) -> Dict[str, Any]:
+        """Obtiene estadísticas agregadas de las mediciones de una finca"""
+        try:
+            return await self.estadisticas.get_estadisticas_finca(finca_id, propietario_id)
+            
+        except Exception as e:
+            raise Exception(f"Error calculando estadísticas de finca: {str(e)}")
 
 # Instancia global del servicio
 medicion_service = MedicionService()
@@ -0,0 +1,80 @@
+from supabase import AsyncClient
+from app.config.database import supabase_admin_async  # ✅ Cliente admin asíncrono
+from app.config.settings import settings
+from app.utils.cache import TTLCache
+from typing import Optional
+
+class OwnershipService:
+    """
+    Índice de propiedad bovino -> finca -> propietario con caché LRU+TTL.
+    Evita repetir la consulta de permisos antes de cada operación.
+    """
+
+    def __init__(self, db_client: AsyncClient = supabase_admin_async):
+        self.db = db_client
+        self.finca_owners = TTLCache(
+            max_size=settings.ownership_cache_max_size,
+            default_ttl=settings.ownership_cache_ttl_seconds
+        )
+        self.bovino_fincas = TTLCache(
+            max_size=settings.ownership_cache_max_size,
+            default_ttl=settings.ownership_cache_ttl_seconds
+        )
+
+    def remember_finca(self, finca_id: str, propietario_id: str) -> None:
+        """Registra el propietario de una finca"""
+        self.finca_owners.set(str(finca_id), str(propietario_id))
+
+    def remember_bovino(self, bovino_id: str, finca_id: str, propietario_id: Optional[str] = None) -> None:
+        """Registra la finca de un bovino (y el propietario de la finca si se conoce)"""
+        self.bovino_fincas.set(str(bovino_id), str(finca_id))
+        if propietario_id:
+            self.remember_finca(finca_id, propietario_id)
+
+    def forget_finca(self, finca_id: str) -> None:
+        """
+        Invalida una finca. Sus bovinos quedan invalidados de forma implícita:
+        la verificación de un bovino necesita la entrada finca -> propietario.
+        """
+        self.finca_owners.delete(str(finca_id))
+
+    def forget_bovino(self, bovino_id: str) -> None:
+        """Invalida un bovino"""
+        self.bovino_fincas.delete(str(bovino_id))
+
+    async def owns_finca(self, finca_id: str, propietario_id: str) -> bool:
+        """Indica si la finca pertenece al usuario"""
+        finca_id = str(finca_id)
+        owner = self.finca_owners.get(finca_id)
+
+        if owner is None:
+            response = await self.db.table('fincas').select('id, propietario_id').eq('id', finca_id).execute()
+            if not response.data:
+                return False
+            owner = str(response.data[0]['propietario_id'])
+            self.remember_finca(finca_id, owner)
+
+        return owner == str(propietario_id)
+
+    async def owns_bovino(self, bovino_id: str, propietario_id: str) -> bool:
+        """Indica si el bovino pertenece a una finca del usuario"""
+        bovino_id = str(bovino_id)
+        finca_id = self.bovino_fincas.get(bovino_id)
+        owner = self.finca_owners.get(finca_id) if finca_id else None
+
+        if owner is None:
+            # Consulta combinada: bovino -> finca -> propietario en una sola ida a PostgREST
+            response = await self.db.table('bovinos')\
+                .select('id, finca_id, fincas!inner(propietario_id)')\
+                .eq('id', bovino_id)\
+                .execute()
+            if not response.data:
+                return False
+            row = response.data[0]
+            owner = str(row['fincas']['propietario_id'])
+            self.remember_bovino(bovino_id, row['finca_id'], owner)
+
+        return owner == str(propietario_id)
+
+# Instancia global del servicio
+ownership_service = OwnershipService()
@@ -0,0 +1,184 @@
+"""
+Caché de respuestas por usuario
+===============================
+
+Guarda el resultado de las lecturas más consultadas por la app de campo
+(`GET /fincas/`, `GET /fincas/{id}/with-bovinos`, `GET /bovinos/finca/{id}`)
+con clave ruta + usuario + parámetros. Un acierto no hace ninguna llamada a
+PostgREST (el token ya se valida localmente, con su propia caché).
+
+Invalidación por generaciones: cada usuario tiene un token de generación por
+ámbito ("fincas", "bovinos", "mediciones") que forma parte de la clave. Las
+escrituras de FincaService, BovinoService y MedicionService reemplazan el
+token del ámbito afectado, así que las entradas anteriores quedan
+inalcanzables y expiran solas; no hace falta listar ni borrar claves.
+
+El almacenamiento es en memoria (LRU + TTL, por proceso) o, si se define
+`response_cache_redis_url`, cualquier servidor que hable el protocolo de
+Redis, compartido entre workers.
+"""
+from app.config.settings import settings
+from app.core.metrics import registry
+from app.utils.cache import TTLCache
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence
+import hashlib
+import logging
+import orjson
+import uuid
+
+logger = logging.getLogger(__name__)
+
+response_cache_requests = registry.counter(
+    "response_cache_requests_total", "Lecturas de la caché de respuestas por ruta y resultado", ("route", "result")
+)
+
+class MemoryCacheBackend:
+    """Almacenamiento en el proceso (un worker): LRU con expiración por entrada"""
+
+    # Las escrituras atendidas por otros workers no invalidan estas entradas
+    shared = False
+
+    def __init__(self, max_size: int):
+        self.cache = TTLCache(max_size=max_size)
+
+    async def mget(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        return [self.cache.get(key) for key in keys]
+
+    async def set(self, key: str, value: bytes, ttl: float, only_if_absent: bool = False) -> bool:
+        if only_if_absent and key in self.cache:
+            return False
+        self.cache.set(key, value, ttl)
+        return True
+
+    async def close(self) -> None:
+        self.cache.clear()
+
+class RedisCacheBackend:
+    """
+    Almacenamiento compartido sobre un cliente con la API de `redis.asyncio`
+    (Redis, Valkey, KeyDB o un sustituto local en pruebas)
+    """
+
+    shared = True
+
+    def __init__(self, client: Any):
+        self.client = client
+
+    async def mget(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        return await self.client.mget(list(keys))
+
+    async def set(self, key: str, value: bytes, ttl: float, only_if_absent: bool = False) -> bool:
+        return bool(await self.client.set(key, value, px=max(int(ttl * 1000), 1), nx=only_if_absent))
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+def create_backend() -> Any:
+    """Redis si hay URL y el paquete está instalado; si no, memoria"""
+    if settings.response_cache_redis_url:
+        try:
+            import redis.asyncio as redis_asyncio
+        except ImportError:
+            logger.warning("response_cache_redis_url definido pero el paquete 'redis' no está instalado; se usa la caché en memoria")
+        else:
+            return RedisCacheBackend(redis_asyncio.from_url(settings.response_cache_redis_url))
+    return MemoryCacheBackend(settings.response_cache_max_size)
+
+class ResponseCacheService:
+    def __init__(self, backend: Any = None, ttl: Optional[float] = None, enabled: Optional[bool] = None):
+        self._backend = backend  # Se crea en el primer uso (no importa redis al arrancar)
+        self.ttl = settings.response_cache_ttl_seconds if ttl is None else ttl
+        self.enabled = settings.response_cache_enabled if enabled is None else enabled
+        # Las generaciones viven más que las respuestas: si una expira, la nueva es distinta
+        self.generation_ttl = max(self.ttl * 10, 3600.0)
+
+    @property
+    def backend(self) -> Any:
+        if self._backend is None:
+            self._backend = create_backend()
+        return self._backend
+
+    @staticmethod
+    def _generation_key(user_id: str, scope: str) -> str:
+        return f"rc:gen:{user_id}:{scope}"
+
+    async def _generations(self, user_id: str, scopes: Sequence[str]) -> List[str]:
+        """Token vigente de cada ámbito; los ausentes se crean (sin pisar uno concurrente)"""
+        keys = [self._generation_key(user_id, scope) for scope in scopes]
+        values = await self.backend.mget(keys)
+        generations = []
+        for key, value in zip(keys, values):
+            if value is None:
+                value = uuid.uuid4().hex.encode()
+                if not await self.backend.set(key, value, self.generation_ttl, only_if_absent=True):
+                    value = (await self.backend.mget([key]))[0] or value
+            generations.append(value.decode() if isinstance(value, bytes) else str(value))
+        return generations
+
+    async def _key(self, route: str, user_id: str, scopes: Sequence[str], params: Dict[str, Any]) -> str:
+        generations = await self._generations(user_id, scopes)
+        digest = hashlib.blake2b(orjson.dumps(params, option=orjson.OPT_SORT_KEYS), digest_size=12).hexdigest()
+        return f"rc:{user_id}:{route}:{'.'.join(generations)}:{digest}"
+
+    async def cached(
+        self,
+        route: str,
+        user_id: str,
+        scopes: Sequence[str],
+        params: Dict[str, Any],
+        loader: Callable[[], Awaitable[Any]],
+        dump: Callable[[Any], Any] = lambda value: value,
+        load: Callable[[Any], Any] = lambda value: value
+    ) -> Any:
+        """
+        Devuelve el resultado cacheado o ejecuta `loader` y lo guarda.
+        `dump`/`load` convierten el resultado a y desde una estructura JSON.
+        Los resultados None (no encontrado) y las excepciones no se cachean;
+        una falla del almacenamiento nunca hace fallar la petición.
+        """
+        if not self.enabled:
+            return await loader()
+
+        try:
+            key = await self._key(route, str(user_id), scopes, params)
+            raw = (await self.backend.mget([key]))[0]
+        except Exception as e:
+            logger.warning("Caché de respuestas no disponible (%s): %s", route, e)
+            response_cache_requests.inc(route, "error")
+            return await loader()
+
+        if raw is not None:
+            response_cache_requests.inc(route, "hit")
+            return load(orjson.loads(raw))
+
+        response_cache_requests.inc(route, "miss")
+        value = await loader()
+        if value is not None:
+            try:
+                await self.backend.set(key, orjson.dumps(dump(value)), self.ttl)
+            except Exception as e:
+                logger.warning("No se pudo guardar en la caché de respuestas (%s): %s", route, e)
+        return value
+
+    @property
+    def shared(self) -> bool:
+        """Habilitada y con almacenamiento compartido: toda escritura invalida en todos los workers"""
+        return self.enabled and getattr(self.backend, "shared", False)
+
+    async def invalidate(self, user_id: str, scopes: Iterable[str]) -> None:
+        """Nueva generación para los ámbitos: las respuestas anteriores dejan de usarse"""
+        if not self.enabled:
+            return
+        for scope in scopes:
+            try:
+                await self.backend.set(self._generation_key(str(user_id), scope), uuid.uuid4().hex.encode(), self.generation_ttl)
+            except Exception as e:
+                # Sin invalidación la respuesta vieja dura a lo sumo `ttl`
+                logger.error("No se pudo invalidar la caché de respuestas (%s/%s): %s", user_id, scope, e)
+
+    async def close(self) -> None:
+        if self._backend is not None:
+            await self._backend.close()
+
+# Instancia global del servicio
+response_cache_service = ResponseCacheService()
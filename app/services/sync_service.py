@@ -0,0 +1,114 @@
+"""
+Sincronización incremental para clientes sin conexión
+=====================================================
+
+`GET /sync?since=<token>` devuelve solo lo que cambió después del token:
+fincas, bovinos y mediciones creados o editados (keyset sobre
+(`updated_at`, `id`)) y las bajas, desde la tabla `eliminaciones`
+(migrations/002_sync.sql). El costo depende del volumen de cambios, no del
+tamaño del hato: cada flujo es un rango sobre un índice.
+
+El token (`watermark`) guarda una posición por flujo, no una sola fecha: un
+cambio en un flujo ya recorrido mientras el cliente pagina queda después de
+su posición y llega en la siguiente sincronización. El cliente guarda el
+último token recibido y vuelve a llamar mientras `has_more` sea verdadero.
+
+`updated_at` se asigna antes del commit: una transacción lenta puede hacer
+visible una fila con una marca anterior a la de filas ya entregadas. Por eso
+ninguna posición avanza más allá de `now() - sync_safety_lag_seconds`; lo
+más reciente llega en la siguiente sincronización.
+
+Las bajas las escribe un trigger AFTER DELETE en la misma transacción que el
+borrado: cubre los hijos borrados en cascada y los borrados hechos fuera de
+la API. La baja de una finca o un bovino llega también con la de sus hijos.
+"""
+from supabase import AsyncClient
+from app.config.database import supabase_admin_async  # ✅ Cliente admin asíncrono
+from app.utils.pagination import fetch_page
+from app.config.settings import settings
+from typing import Any, Dict, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+import base64
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# (nombre en la respuesta, tabla, columna de orden, select, filtro de propietario, embebido a quitar)
+# En este orden: los padres llegan antes que sus hijos dentro de una página
+STREAMS = (
+    ("fincas", "fincas", "updated_at", "*", "propietario_id", None),
+    ("bovinos", "bovinos", "updated_at", "*, fincas!inner(propietario_id)", "fincas.propietario_id", "fincas"),
+    ("mediciones", "mediciones_bovinos", "updated_at", "*, bovinos!inner(fincas!inner(propietario_id))",
+     "bovinos.fincas.propietario_id", "bovinos"),
+    ("eliminados", "eliminaciones", "created_at", "tabla, registro_id, created_at, id", "propietario_id", None),
+)
+
+def encode_token(posiciones: Dict[str, Tuple[Any, Any]]) -> str:
+    """Token opaco (base64url) con la posición (sort, id) de cada flujo"""
+    raw = json.dumps(posiciones, default=str, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+def decode_token(token: Optional[str]) -> Dict[str, Tuple[Any, Any]]:
+    """Decodifica un token de sincronización; ValueError si no es válido"""
+    if not token:
+        return {}
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        posiciones = {nombre: (sort_value, row_id) for nombre, (sort_value, row_id) in json.loads(raw).items()}
+    except Exception:
+        raise ValueError("Token de sincronización inválido")
+    if not set(posiciones) <= {stream[0] for stream in STREAMS}:
+        raise ValueError("Token de sincronización inválido")
+    return posiciones
+
+class SyncService:
+    def __init__(self, db_client: AsyncClient = supabase_admin_async,
+                 safety_lag: Optional[float] = None):  # ✅ Usar admin asíncrono
+        self.db = db_client
+        self.safety_lag = settings.sync_safety_lag_seconds if safety_lag is None else safety_lag
+
+    async def get_cambios(self, propietario_id: str, since: Optional[str], limit: int) -> Dict[str, Any]:
+        """
+        Página de cambios después de `since` con a lo sumo `limit` elementos entre
+        todos los flujos. ValueError si el token no es válido.
+        """
+        posiciones = decode_token(since)
+        # Límite superior común a todos los flujos: lo posterior puede tener transacciones sin confirmar
+        corte = (datetime.now(timezone.utc) - timedelta(seconds=self.safety_lag)).isoformat()
+        resultado: Dict[str, Any] = {}
+        restantes = limit
+        has_more = False
+
+        for nombre, tabla, sort_column, columnas, filtro, embebido in STREAMS:
+            if restantes == 0:
+                # Flujo sin consultar en esta página
+                resultado[nombre] = []
+                has_more = True
+                continue
+
+            query = self.db.table(tabla).select(columnas).eq(filtro, propietario_id).lt(sort_column, corte)
+            pagina = await fetch_page(query, restantes, posiciones.get(nombre), sort_column=sort_column)
+            filas = pagina.items
+            if filas:
+                posiciones[nombre] = (filas[-1][sort_column], filas[-1]["id"])
+            if pagina.next_cursor is not None:
+                has_more = True
+
+            resultado[nombre] = [self._fila(nombre, fila, embebido) for fila in filas]
+            restantes -= len(filas)
+
+        resultado["watermark"] = encode_token(posiciones)
+        resultado["has_more"] = has_more
+        return resultado
+
+    @staticmethod
+    def _fila(nombre: str, fila: Dict[str, Any], embebido: Optional[str]) -> Dict[str, Any]:
+        if nombre == "eliminados":
+            return {"tabla": fila["tabla"], "id": fila["registro_id"], "eliminado_en": fila["created_at"]}
+        if embebido:
+            fila.pop(embebido, None)
+        return fila
+
+# Instancia global del servicio
+sync_service = SyncService()
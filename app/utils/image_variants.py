@@ -0,0 +1,30 @@
+from typing import Dict, Iterable
+import io
+
+def generate_variants(data: bytes, sizes: Iterable[int], quality: int = 80) -> Dict[int, bytes]:
+    """
+    Genera variantes WebP que caben en un cuadrado de `size` px (sin ampliar).
+    Se ejecuta en un proceso de trabajo: solo recibe y devuelve bytes.
+    Lanza ValueError si Pillow no puede decodificar la imagen.
+    """
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    try:
+        with Image.open(io.BytesIO(data)) as original:
+            original.load()
+            # Respetar la orientación EXIF de las fotos de celular
+            image = ImageOps.exif_transpose(original)
+    except (UnidentifiedImageError, OSError) as e:
+        raise ValueError(f"Imagen no decodificable: {str(e)}")
+
+    has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+    image = image.convert("RGBA" if has_alpha else "RGB")
+
+    variants: Dict[int, bytes] = {}
+    # De mayor a menor: cada variante parte de la anterior, ya reducida
+    for size in sorted(set(sizes), reverse=True):
+        image.thumbnail((size, size), Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, format="WEBP", quality=quality, method=4)
+        variants[size] = buffer.getvalue()
+    return variants
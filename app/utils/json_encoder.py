@@ -1,14 +0,0 @@
-import json
-from decimal import Decimal
-from datetime import datetime, date
-import uuid
-
-class CustomJSONEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, Decimal):
-            return float(obj)  # Convertir Decimal a float
-        elif isinstance(obj, (datetime, date)):
-            return obj.isoformat()
-        elif isinstance(obj, uuid.UUID):
-            return str(obj)
-        return super().default(obj)
\ No newline at end of file
@@ -0,0 +1,29 @@
+from fastapi.responses import JSONResponse
+from decimal import Decimal
+from typing import Any
+import orjson
+
+# numpy (estadísticas / estimación) y claves no string se serializan de forma nativa
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+def _default(obj: Any) -> Any:
+    """Tipos que orjson no serializa por sí mismo (datetime, date y UUID son nativos)"""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if hasattr(obj, 'model_dump'):
+        return obj.model_dump(mode='json')
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, Exception):
+        return str(obj)
+    raise TypeError(f"Tipo no serializable a JSON: {type(obj).__name__}")
+
+def dumps(content: Any) -> bytes:
+    """Serializa a bytes JSON en una sola pasada"""
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+class FastJSONResponse(JSONResponse):
+    """Respuesta JSON por defecto de la API (orjson con soporte de Decimal)"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
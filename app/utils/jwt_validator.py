@@ -0,0 +1,88 @@
+import asyncio
+import hashlib
+from typing import Any, Dict, Optional
+
+import jwt
+from jwt import PyJWKClient
+from jwt.exceptions import PyJWKClientError
+
+# Algoritmos que emite Supabase Auth: secreto compartido (legacy) o llaves asimétricas (JWKS)
+SYMMETRIC_ALGORITHMS = {"HS256"}
+ASYMMETRIC_ALGORITHMS = {"RS256", "ES256"}
+
+class TokenValidationError(Exception):
+    """El token es inválido (firma, expiración o audiencia)"""
+
+class LocalValidationUnavailable(Exception):
+    """No es posible validar el token localmente; se requiere verificación remota"""
+
+def token_fingerprint(token: str) -> str:
+    """Clave estable para cachés: nunca se guarda el token en claro"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def user_from_claims(claims: Dict[str, Any]) -> Dict[str, Any]:
+    """Construye el diccionario de usuario con la misma forma que la verificación remota"""
+    return {
+        "id": claims["sub"],
+        "email": claims.get("email"),
+        "created_at": None,
+        "updated_at": None,
+        "user_metadata": claims.get("user_metadata") or {},
+        "app_metadata": claims.get("app_metadata") or {}
+    }
+
+class JWTValidator:
+    """Valida localmente tokens de Supabase (firma, `exp` y `aud`)"""
+
+    def __init__(
+        self,
+        secret: Optional[str] = None,
+        jwks_url: Optional[str] = None,
+        audience: str = "authenticated",
+        leeway: int = 0
+    ):
+        self.secret = secret
+        self.audience = audience
+        self.leeway = leeway
+        self._jwks_client = PyJWKClient(jwks_url, cache_keys=True) if jwks_url else None
+
+    async def decode(self, token: str) -> Dict[str, Any]:
+        """
+        Devuelve los claims del token.
+        Lanza TokenValidationError si el token es inválido y
+        LocalValidationUnavailable si no hay llave para validarlo.
+        """
+        try:
+            header = jwt.get_unverified_header(token)
+        except jwt.DecodeError as e:
+            raise TokenValidationError(f"Token malformado: {str(e)}")
+
+        algorithm = header.get("alg")
+
+        if algorithm in SYMMETRIC_ALGORITHMS:
+            if not self.secret:
+                raise LocalValidationUnavailable("Secreto JWT no configurado")
+            key = self.secret
+        elif algorithm in ASYMMETRIC_ALGORITHMS:
+            if not self._jwks_client:
+                raise LocalValidationUnavailable("JWKS no configurado")
+            try:
+                # PyJWKClient descarga con urllib (bloqueante): fuera del event loop
+                signing_key = await asyncio.to_thread(self._jwks_client.get_signing_key_from_jwt, token)
+            except PyJWKClientError as e:
+                raise LocalValidationUnavailable(f"Llave de firma no disponible: {str(e)}")
+            key = signing_key.key
+        else:
+            raise LocalValidationUnavailable(f"Algoritmo no soportado: {algorithm}")
+
+        try:
+            return jwt.decode(
+                token,
+                key,
+                algorithms=[algorithm],
+                audience=self.audience,
+                leeway=self.leeway,
+                options={"require": ["exp", "sub"]}
+            )
+        except jwt.InvalidTokenError as e:
+            raise TokenValidationError(str(e))
@@ -0,0 +1,21 @@
+from types import ModuleType
+import importlib.util
+import sys
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    Importa un módulo de forma diferida: el módulo real se carga en el primer
+    acceso a un atributo. Se usa para dependencias pesadas (numpy) que solo
+    necesitan algunos endpoints y no deben pesar en el arranque en frío.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"No se encontró el módulo {name}")
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
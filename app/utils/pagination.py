@@ -0,0 +1,112 @@
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import base64
+import json
+
+def _quote(value: Any) -> str:
+    """Cita un valor para árboles lógicos de PostgREST (fechas con ':' '.' '+')"""
+    return '"' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+def keyset_condition(sort_column: str, last_sort_value: Any, last_id: Any, desc: bool = False, id_column: str = "id") -> str:
+    """
+    Condición PostgREST (para `.or_()`) que continúa después de la fila (sort, id).
+    Equivale a `(sort, id) > (último_sort, último_id)` o `<` si el orden es descendente.
+    """
+    op = "lt" if desc else "gt"
+    sort_value = _quote(last_sort_value)
+    return (
+        f"{sort_column}.{op}.{sort_value},"
+        f"and({sort_column}.eq.{sort_value},{id_column}.{op}.{_quote(last_id)})"
+    )
+
+async def iter_keyset_pages(build_query, page_size: int, sort_column: str = "fecha", id_column: str = "id") -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Recorre una consulta PostgREST completa en páginas con paginación keyset ascendente.
+    `build_query` debe devolver un query builder nuevo (con select y filtros) en cada llamada.
+    """
+    last_row: Optional[Dict[str, Any]] = None
+
+    while True:
+        query = build_query()
+        if last_row is not None:
+            query = query.or_(keyset_condition(sort_column, last_row[sort_column], last_row[id_column], id_column=id_column))
+
+        response = await query.order(sort_column).order(id_column).limit(page_size).execute()
+        rows = response.data or []
+        if not rows:
+            return
+
+        last_row = rows[-1]
+        yield rows
+
+        if len(rows) < page_size:
+            return
+
+def encode_cursor(sort_value: Any, row_id: Any) -> str:
+    """Token opaco (base64url) con la clave keyset (sort, id) de la última fila"""
+    raw = json.dumps([sort_value, row_id], default=str, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[Any, Any]]:
+    """Decodifica un cursor; ValueError si no es válido"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_value, row_id = json.loads(raw)
+    except Exception:
+        raise ValueError("Cursor de paginación inválido")
+    if row_id is None:
+        raise ValueError("Cursor de paginación inválido")
+    return sort_value, row_id
+
+class Page:
+    """Página de resultados con el cursor siguiente y el total (si se pidió)"""
+
+    def __init__(self, items: List[Dict[str, Any]], next_cursor: Optional[str] = None, total: Optional[int] = None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.total = total
+
+    def headers(self) -> Dict[str, str]:
+        """Cabeceras X-Next-Cursor / X-Total-Count para la respuesta HTTP"""
+        headers = {}
+        if self.next_cursor:
+            headers["X-Next-Cursor"] = self.next_cursor
+        if self.total is not None:
+            headers["X-Total-Count"] = str(self.total)
+        return headers
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Forma JSON (caché de respuestas)"""
+        return {"items": self.items, "next_cursor": self.next_cursor, "total": self.total}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Page":
+        return cls(data["items"], data.get("next_cursor"), data.get("total"))
+
+def count_method(with_count: bool) -> Optional[str]:
+    """`Prefer: count=estimated` solo cuando el cliente pide el total"""
+    return "estimated" if with_count else None
+
+async def fetch_page(query, limit: int, after: Optional[Tuple[Any, Any]] = None, sort_column: str = "created_at",
+                     desc: bool = False, id_column: str = "id") -> Page:
+    """
+    Ejecuta una página keyset: continúa después de `after` (sort, id) y pide
+    `limit + 1` filas a PostgREST para saber si hay más sin contar la tabla.
+    """
+    if after is not None:
+        query = query.or_(keyset_condition(sort_column, after[0], after[1], desc=desc, id_column=id_column))
+
+    response = await query\
+        .order(sort_column, desc=desc)\
+        .order(id_column, desc=desc)\
+        .limit(limit + 1)\
+        .execute()
+
+    rows = response.data or []
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][sort_column], rows[-1][id_column])
+
+    return Page(rows, next_cursor, getattr(response, "count", None))
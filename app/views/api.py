@@ -4,7 +4,9 @@ from app.controllers import (
     finca_controller,
     bovino_controller,
     medicion_controller,
-    image_controller
+    image_controller,
+    estimacion_controller,
+    sync_controller
 )
 
 # Router principal para todas las rutas de la API
@@ -16,3 +18,5 @@ api_router.include_router(finca_controller.router)
 api_router.include_router(bovino_controller.router)
 api_router.include_router(medicion_controller.router)
 api_router.include_router(image_controller.router)
+api_router.include_router(estimacion_controller.router)
+api_router.include_router(sync_controller.router)
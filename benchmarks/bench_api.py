@@ -0,0 +1,269 @@
+"""
+Prueba de carga de las rutas calientes de la API
+================================================
+
+Generador de carga asíncrono (httpx) contra la aplicación completa en el
+mismo proceso (middlewares, validación, servicios y pool HTTP incluidos),
+con Supabase servido en memoria por app/fake_supabase con latencia ajustable.
+No hay red ni servidor: los resultados son comparables entre commits.
+
+Escenarios:
+- finca_complete_{10,100,1000}: GET /fincas/{id}/complete por tamaño de finca
+- fincas_list, bovinos_finca, mediciones_bovino: listados paginados
+- mediciones_batch: POST /mediciones/bovino/{id}/batch (--lote filas)
+- auth_verify: GET /auth/verify (validación de token)
+- upload_profile: POST /images/upload-profile (JPEG 512x512 distinto por petición)
+
+La caché de respuestas está deshabilitada: cada petición llega a Supabase.
+
+Cada escenario corre en lazo cerrado con --concurrencia clientes después de un
+calentamiento. La salida JSON incluye p50/p95/p99 (ms), media, errores y
+throughput (peticiones/s). Con --comparar se contrasta contra una corrida
+anterior y el proceso termina con código 1 si algún escenario empeora más que
+--tolerancia (p95 más alto o throughput más bajo).
+
+Uso:
+    python -m benchmarks.bench_api --salida resultados.json
+    python -m benchmarks.bench_api --latencia-ms 20 --jitter-ms 10 --escenarios finca_complete_1000
+    python -m benchmarks.bench_api --comparar base.json --tolerancia 0.15
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+# (método, ruta, kwargs de httpx) para la i-ésima petición del escenario
+Peticion = Tuple[str, str, Dict[str, Any]]
+
+
+def percentil(valores: List[float], p: float) -> float:
+    """Percentil por rango más cercano sobre valores ordenados"""
+    if not valores:
+        return 0.0
+    indice = max(0, min(len(valores) - 1, int(round(p / 100 * len(valores) + 0.5)) - 1))
+    return valores[indice]
+
+
+def configurar_entorno(args: argparse.Namespace) -> None:
+    """Debe ejecutarse antes de importar la aplicación (settings se lee al importar)"""
+    os.environ["FAKE_SUPABASE_ENABLED"] = "true"
+    os.environ["FAKE_SUPABASE_LATENCY_MS"] = str(args.latencia_ms)
+    os.environ["FAKE_SUPABASE_JITTER_MS"] = str(args.jitter_ms)
+    os.environ["FAKE_SUPABASE_SEED"] = str(args.seed)
+    os.environ.setdefault("SUPABASE_URL", "https://bench.supabase.co")
+    os.environ.setdefault("SUPABASE_ANON_KEY", "bench-anon")
+    os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "bench-service-role")
+    os.environ.setdefault("SECRET_KEY", "bench-secret")
+    # Sin logs por petición ni muestreos que distorsionen la medición
+    os.environ["LOG_LEVEL"] = "WARNING"
+    os.environ["DIAGNOSTICS_SAMPLE_RATE"] = "0"
+    os.environ["PROFILING_SAMPLE_RATE"] = "0"
+    # Los listados se repiten con los mismos parámetros: con la caché de
+    # respuestas se mediría el acierto, no la consulta a Supabase
+    os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+
+
+def construir_escenarios(datos: Dict[str, Any], lote: int, imagenes: List[str]) -> Dict[str, Callable[[int], Peticion]]:
+    from benchmarks.seed import lote_mediciones
+
+    fincas = datos["fincas"]
+    lote_json = lote_mediciones(datos["bovino_lote_id"], lote)
+    escenarios: Dict[str, Callable[[int], Peticion]] = {}
+
+    for tamano, finca_id in fincas.items():
+        escenarios[f"finca_complete_{tamano}"] = lambda i, finca_id=finca_id: ("GET", f"/api/v1/fincas/{finca_id}/complete", {})
+
+    finca_media = fincas[sorted(fincas)[len(fincas) // 2]]
+    escenarios.update({
+        "fincas_list": lambda i: ("GET", "/api/v1/fincas/", {"params": {"limit": 50}}),
+        "bovinos_finca": lambda i: ("GET", f"/api/v1/bovinos/finca/{finca_media}", {"params": {"limit": 50}}),
+        "mediciones_bovino": lambda i: ("GET", f"/api/v1/mediciones/bovino/{datos['bovino_id']}", {}),
+        "mediciones_batch": lambda i: ("POST", f"/api/v1/mediciones/bovino/{datos['bovino_lote_id']}/batch", {"json": lote_json}),
+        "auth_verify": lambda i: ("GET", "/api/v1/auth/verify", {}),
+        "upload_profile": lambda i: ("POST", "/api/v1/images/upload-profile", {"json": {"image_base64": imagenes[i % len(imagenes)]}})
+    })
+    return escenarios
+
+
+async def ejecutar_escenario(client: httpx.AsyncClient, peticion: Callable[[int], Peticion],
+                             total: int, concurrencia: int, calentamiento: int, desplazamiento: int = 0) -> Dict[str, Any]:
+    """Lazo cerrado: cada cliente lanza la siguiente petición al recibir la respuesta"""
+    for i in range(calentamiento):
+        metodo, ruta, kwargs = peticion(desplazamiento + i)
+        await client.request(metodo, ruta, **kwargs)
+
+    latencias: List[float] = []
+    errores: Dict[str, int] = {}
+    siguiente = 0
+
+    async def cliente() -> None:
+        nonlocal siguiente
+        while siguiente < total:
+            i = siguiente
+            siguiente += 1
+            metodo, ruta, kwargs = peticion(desplazamiento + calentamiento + i)
+            inicio = time.perf_counter()
+            try:
+                respuesta = await client.request(metodo, ruta, **kwargs)
+                await respuesta.aread()
+                if respuesta.status_code >= 400:
+                    errores[str(respuesta.status_code)] = errores.get(str(respuesta.status_code), 0) + 1
+            except Exception as e:
+                errores[type(e).__name__] = errores.get(type(e).__name__, 0) + 1
+            latencias.append((time.perf_counter() - inicio) * 1000)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente() for _ in range(concurrencia)))
+    duracion = time.perf_counter() - inicio
+
+    latencias.sort()
+    return {
+        "peticiones": len(latencias),
+        "errores": sum(errores.values()),
+        "errores_por_tipo": errores,
+        "p50_ms": round(percentil(latencias, 50), 2),
+        "p95_ms": round(percentil(latencias, 95), 2),
+        "p99_ms": round(percentil(latencias, 99), 2),
+        "media_ms": round(sum(latencias) / len(latencias), 2) if latencias else 0.0,
+        "max_ms": round(latencias[-1], 2) if latencias else 0.0,
+        "throughput_rps": round(len(latencias) / duracion, 1) if duracion else 0.0,
+        "duracion_s": round(duracion, 3)
+    }
+
+
+def commit_actual() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparar(actual: Dict[str, Any], base: Dict[str, Any], tolerancia: float) -> List[str]:
+    """Líneas de la tabla comparativa; las regresiones se marcan con ❌"""
+    lineas = [
+        "| Escenario | p95 base | p95 actual | rps base | rps actual | |",
+        "|-----------|---------:|-----------:|---------:|-----------:|-|"
+    ]
+    for nombre, resultado in actual["escenarios"].items():
+        anterior = base.get("escenarios", {}).get(nombre)
+        if not anterior:
+            continue
+        regresion = (
+            resultado["p95_ms"] > anterior["p95_ms"] * (1 + tolerancia)
+            or resultado["throughput_rps"] < anterior["throughput_rps"] * (1 - tolerancia)
+        )
+        lineas.append(
+            f"| {nombre} | {anterior['p95_ms']:.2f} | {resultado['p95_ms']:.2f} | "
+            f"{anterior['throughput_rps']:.1f} | {resultado['throughput_rps']:.1f} | {'❌' if regresion else '✅'} |"
+        )
+    return lineas
+
+
+async def correr(args: argparse.Namespace) -> Dict[str, Any]:
+    from app.config.database import close_clients
+    from app.fake_supabase import get_fake_backend
+    from app.main import app
+    from app.services.image_service import shutdown_process_pool
+    from benchmarks.seed import imagenes_base64, sembrar
+
+    datos = sembrar(get_fake_backend(), tamanos=args.tamanos, mediciones_por_bovino=args.mediciones, seed=args.seed)
+    imagenes = imagenes_base64(args.peticiones + args.calentamiento) if "upload_profile" in (args.escenarios or ["upload_profile"]) else []
+    escenarios = construir_escenarios(datos, args.lote, imagenes)
+    seleccion = args.escenarios or list(escenarios)
+    desconocidos = [n for n in seleccion if n not in escenarios]
+    if desconocidos:
+        raise SystemExit(f"Escenarios desconocidos: {', '.join(desconocidos)} (disponibles: {', '.join(escenarios)})")
+
+    transporte = httpx.ASGITransport(app=app)
+    resultados: Dict[str, Any] = {}
+    try:
+        async with httpx.AsyncClient(
+            transport=transporte,
+            base_url="http://bench",
+            headers={"Authorization": f"Bearer {datos['token']}"},
+            timeout=None
+        ) as client:
+            for nombre in seleccion:
+                resultados[nombre] = await ejecutar_escenario(
+                    client, escenarios[nombre], args.peticiones, args.concurrencia, args.calentamiento
+                )
+                r = resultados[nombre]
+                print(
+                    f"{nombre:<22} p50 {r['p50_ms']:>8.2f} ms  p95 {r['p95_ms']:>8.2f} ms  "
+                    f"p99 {r['p99_ms']:>8.2f} ms  {r['throughput_rps']:>8.1f} req/s  errores {r['errores']}",
+                    file=sys.stderr
+                )
+    finally:
+        await close_clients()
+        shutdown_process_pool()
+
+    return {
+        "meta": {
+            "commit": commit_actual(),
+            "fecha": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "parametros": {
+                "peticiones": args.peticiones,
+                "concurrencia": args.concurrencia,
+                "calentamiento": args.calentamiento,
+                "latencia_ms": args.latencia_ms,
+                "jitter_ms": args.jitter_ms,
+                "seed": args.seed,
+                "tamanos": args.tamanos,
+                "mediciones_por_bovino": args.mediciones,
+                "lote": args.lote
+            }
+        },
+        "escenarios": resultados
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--peticiones", type=int, default=200, help="Peticiones medidas por escenario")
+    parser.add_argument("--concurrencia", type=int, default=10)
+    parser.add_argument("--calentamiento", type=int, default=10)
+    parser.add_argument("--latencia-ms", type=float, default=5.0, help="Latencia inyectada por llamada a Supabase")
+    parser.add_argument("--jitter-ms", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[10, 100, 1000], help="Bovinos por finca")
+    parser.add_argument("--mediciones", type=int, default=3, help="Mediciones sembradas por bovino")
+    parser.add_argument("--lote", type=int, default=50, help="Filas por petición de mediciones_batch")
+    parser.add_argument("--escenarios", nargs="+", help="Subconjunto de escenarios (por defecto todos)")
+    parser.add_argument("--salida", help="Archivo JSON de resultados (por defecto stdout)")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior")
+    parser.add_argument("--tolerancia", type=float, default=0.10, help="Empeoramiento permitido (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    configurar_entorno(args)
+    resultado = asyncio.run(correr(args))
+
+    salida = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            archivo.write(salida + "\n")
+    else:
+        print(salida)
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as archivo:
+            base = json.load(archivo)
+        lineas = comparar(resultado, base, args.tolerancia)
+        print("\n".join(lineas), file=sys.stderr)
+        if any(linea.endswith("❌ |") for linea in lineas):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Benchmark de logging por petición
+=================================
+
+Mide el tiempo que el hilo del event loop dedica a registrar una petición con
+el camino anterior (print() a stdout y `logging.basicConfig` escribiendo de
+forma síncrona) y con el actual (QueueHandler + formato JSON en el listener).
+
+Escenarios reproducidos:
+- autenticada: 2 print() de `get_current_user_id` (uno con el usuario completo)
+  + 2 líneas de `log_requests`; ahora 1 debug filtrado + 1 línea de acceso.
+- upload-profile: ~50 print() del middleware, el controlador y ImageService
+  + 2 líneas de `log_requests`; ahora 5 debug filtrados + diagnóstico + acceso.
+
+La salida se escribe en un archivo temporal con buffer de línea (equivalente a
+PYTHONUNBUFFERED=1, habitual en contenedores). Ambos caminos se miden alternados.
+
+Uso:
+    python -m benchmarks.bench_logging [--peticiones 2000]
+"""
+import argparse
+import contextlib
+import logging
+import os
+import queue
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from logging.handlers import QueueListener
+from typing import Callable, List
+
+from app.core.logging_config import JsonFormatter, RequestIdFilter, _PreparedQueueHandler, request_id_var
+
+USUARIO = {
+    "id": str(uuid.uuid4()),
+    "email": "ganadero@example.com",
+    "created_at": "2024-01-01 00:00:00+00:00",
+    "updated_at": "2024-06-01 00:00:00+00:00",
+    "user_metadata": {"nombre": "Ganadero", "telefono": "3001234567"},
+    "app_metadata": {"provider": "email", "providers": ["email"]}
+}
+PRINTS_UPLOAD = 50
+
+
+def logger_antes(stream) -> logging.Logger:
+    """Equivalente a logging.basicConfig(level=INFO): StreamHandler síncrono"""
+    logger = logging.getLogger("bench.antes")
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+    logger.handlers[:] = [handler]
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return logger
+
+
+def logger_despues(stream):
+    """Configuración de app.core.logging_config sobre un logger aislado"""
+    output = logging.StreamHandler(stream)
+    output.setFormatter(JsonFormatter())
+    log_queue = queue.SimpleQueue()
+    handler = _PreparedQueueHandler(log_queue)
+    handler.addFilter(RequestIdFilter())
+
+    logger = logging.getLogger("bench.despues")
+    logger.handlers[:] = [handler]
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    listener = QueueListener(log_queue, output)
+    listener.start()
+    return logger, listener
+
+
+def peticion_antes(logger: logging.Logger, upload: bool) -> None:
+    inicio = time.time()
+    logger.info(f"Request: POST http://api/api/v1/images/upload-profile")
+    if upload:
+        for i in range(PRINTS_UPLOAD):
+            print(f"📝 SERVICIO: paso {i} de la subida, longitud datos: {123456 + i} bytes")
+    print(f"🔐 AUTH: Usuario autenticado ID: {USUARIO['id']}")
+    print(f"🔍 AUTH: Datos completos usuario: {USUARIO}")
+    logger.info(f"Response: 200 - Time: {time.time() - inicio:.4f}s")
+
+
+def peticion_despues(logger: logging.Logger, upload: bool) -> None:
+    token = request_id_var.set(uuid.uuid4().hex)
+    inicio = time.perf_counter()
+    if upload:
+        for i in range(5):
+            logger.debug("Paso %d de la subida", i)
+    logger.debug("Usuario autenticado", extra={"user_id": USUARIO["id"]})
+    if upload:
+        logger.info(
+            "diagnostico POST /api/v1/images/upload-profile status=200",
+            extra={"diagnostics": {"request_bytes": 123456, "response_bytes": 512, "status": 200}}
+        )
+    duracion = round((time.perf_counter() - inicio) * 1000, 2)
+    logger.info("%s %s %s %.2fms", "POST", "/api/v1/images/upload-profile", 200, duracion,
+                extra={"method": "POST", "path": "/api/v1/images/upload-profile", "status": 200, "duration_ms": duracion})
+    request_id_var.reset(token)
+
+
+def medir(antes: Callable[[], None], despues: Callable[[], None], peticiones: int):
+    tiempos_antes: List[float] = []
+    tiempos_despues: List[float] = []
+    for _ in range(peticiones):
+        for funcion, tiempos in ((antes, tiempos_antes), (despues, tiempos_despues)):
+            inicio = time.perf_counter()
+            funcion()
+            tiempos.append((time.perf_counter() - inicio) * 1_000_000)
+    return tiempos_antes, tiempos_despues
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--peticiones", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        salida = open(os.path.join(directorio, "stdout.log"), "w", buffering=1, encoding="utf-8")
+        antes = logger_antes(salida)
+        despues, listener = logger_despues(salida)
+
+        lineas = [
+            f"Costo de logging en el hilo del event loop (µs por petición, {args.peticiones} peticiones)",
+            "",
+            "| Escenario | Antes p50 | Después p50 | Antes p99 | Después p99 |",
+            "|-----------|----------:|------------:|----------:|------------:|"
+        ]
+        with contextlib.redirect_stdout(salida):
+            for nombre, upload in (("autenticada", False), ("upload-profile", True)):
+                tiempos_antes, tiempos_despues = medir(
+                    lambda: peticion_antes(antes, upload), lambda: peticion_despues(despues, upload), args.peticiones
+                )
+                p_antes = statistics.quantiles(tiempos_antes, n=100)
+                p_despues = statistics.quantiles(tiempos_despues, n=100)
+                lineas.append(
+                    f"| {nombre} | {statistics.median(tiempos_antes):.1f} | {statistics.median(tiempos_despues):.1f} | "
+                    f"{p_antes[98]:.1f} | {p_despues[98]:.1f} |"
+                )
+
+        listener.stop()
+        salida.close()
+
+    print("\n".join(lineas), file=sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Micro-benchmarks de los caminos calientes (pytest-benchmark)
+============================================================
+
+Miden los servicios sin el stack HTTP de la API: finca completa por tamaño,
+inserción por lotes, listados (con y sin caché de respuestas), verificación de token y subida de imagen de
+perfil (variantes WebP incluidas). Complementan a bench_api.py, que mide las
+rutas completas bajo concurrencia.
+
+Uso (el archivo se pasa explícitamente: no forma parte de la suite de tests):
+    pytest benchmarks/bench_micro.py --benchmark-json=micro.json
+    pytest benchmarks/bench_micro.py --benchmark-compare=0001 --benchmark-compare-fail=median:10%
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.config.settings import settings
+from app.models.medicion import MedicionCreate
+from app.services.auth_service import AuthService
+from app.services.finca_service import FincaService
+from app.services.image_service import ImageService, decode_data_url
+from app.services.medicion_service import MedicionService
+from app.services.ownership_service import OwnershipService
+from app.services.response_cache_service import MemoryCacheBackend, ResponseCacheService
+from app.utils.image_variants import generate_variants
+from benchmarks.seed import imagenes_base64, lote_mediciones
+
+
+@pytest.fixture(scope="module")
+def ownership(db):
+    return OwnershipService(db)
+
+
+@pytest.fixture(scope="module")
+def fincas(db, ownership):
+    # Sin caché de respuestas: se mide el camino completo hasta PostgREST
+    return FincaService(db, ownership=ownership, cache=ResponseCacheService(enabled=False))
+
+
+@pytest.fixture(scope="module")
+def mediciones(db, ownership):
+    return MedicionService(db, ownership=ownership, cache=ResponseCacheService(enabled=False))
+
+
+@pytest.mark.parametrize("tamano", [10, 100, 1000])
+def test_finca_complete(benchmark, loop, datos, fincas, tamano):
+    finca_id = datos["fincas"][tamano]
+    resultado = benchmark(
+        lambda: loop.run_until_complete(fincas.get_finca_with_bovinos_and_mediciones(finca_id, datos["user_id"]))
+    )
+    assert len(resultado.bovinos) == tamano
+
+
+def test_fincas_list(benchmark, loop, datos, fincas):
+    pagina = benchmark(lambda: loop.run_until_complete(fincas.get_fincas_by_user(datos["user_id"], 50, with_count=True)))
+    assert pagina.items
+
+
+def test_fincas_list_cached(benchmark, loop, db, ownership, datos):
+    service = FincaService(db, ownership=ownership, cache=ResponseCacheService(backend=MemoryCacheBackend(100), enabled=True))
+    pagina = benchmark(lambda: loop.run_until_complete(service.get_fincas_by_user(datos["user_id"], 50, with_count=True)))
+    assert pagina.items
+
+
+def test_mediciones_bovino(benchmark, loop, datos, mediciones):
+    pagina = benchmark(
+        lambda: loop.run_until_complete(mediciones.get_mediciones_by_bovino(datos["bovino_id"], datos["user_id"], 50))
+    )
+    assert pagina.items
+
+
+def test_mediciones_batch(benchmark, loop, backend, datos, mediciones):
+    bovino_id = datos["bovino_lote_id"]
+    lote = [MedicionCreate(**fila) for fila in lote_mediciones(bovino_id, 50)]
+    tabla = backend.store.tables
+
+    def limpiar():
+        # Cada ronda parte de la misma tabla
+        tabla["mediciones_bovinos"] = [m for m in tabla["mediciones_bovinos"] if m["bovino_id"] != bovino_id]
+
+    resultado = benchmark.pedantic(
+        lambda: loop.run_until_complete(mediciones.create_mediciones_bulk(bovino_id, lote, datos["user_id"])),
+        setup=limpiar, rounds=50, warmup_rounds=2
+    )
+    assert len(resultado["creadas"]) == 50
+
+
+def test_verify_token(benchmark, loop, backend, db, http, datos):
+    service = AuthService(db_client=db, http_client=http)
+    service.admin_db = db
+    service.jwt_validator.secret = backend.auth.jwt_secret
+
+    def verificar():
+        # Sin caché: validación local del JWT completa
+        service.token_cache.clear()
+        return loop.run_until_complete(service.verify_token(datos["token"]))
+
+    usuario = benchmark(verificar)
+    assert usuario["id"] == datos["user_id"]
+
+
+def test_generate_variants(benchmark):
+    datos_imagen, _ = decode_data_url(imagenes_base64(1)[0])
+    variantes = benchmark(generate_variants, datos_imagen, settings.image_variant_sizes, settings.image_variant_quality)
+    assert set(variantes) == set(settings.image_variant_sizes)
+
+
+def test_upload_profile(benchmark, loop, db, http, datos):
+    # Hilo en lugar del pool de procesos: mide el trabajo, no el arranque de procesos
+    service = ImageService(db_client=db, http_client=http, executor=ThreadPoolExecutor(max_workers=1))
+    imagenes = iter(imagenes_base64(200))
+
+    def siguiente():
+        # Una imagen distinta por ronda: evita la deduplicación por hash
+        return (next(imagenes),), {}
+
+    resultado = benchmark.pedantic(
+        lambda imagen: loop.run_until_complete(service.upload_profile_image_base64(imagen, datos["user_id"])),
+        setup=siguiente, rounds=100, warmup_rounds=2
+    )
+    assert resultado["profile_updated"]
@@ -0,0 +1,174 @@
+"""
+Benchmark de serialización JSON
+===============================
+
+Compara el costo de serializar 1.000 mediciones con el camino anterior
+(JSONResponse + json.loads/json.dumps con CustomJSONEncoder + middleware
+decimal_json_middleware + conversión de Decimals fila por fila) y con el
+camino actual (FastJSONResponse como respuesta por defecto).
+
+Uso:
+    python -m benchmarks.bench_serializacion [--filas 1000] [--repeticiones 200]
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from typing import List
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.datastructures import Default
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.models.medicion import MedicionResponse
+from app.utils.json_response import FastJSONResponse
+
+
+def build_mediciones(filas: int) -> List[dict]:
+    """Filas con la forma devuelta por PostgREST para mediciones_bovinos"""
+    bovino_id = str(uuid.uuid4())
+    inicio = date(2023, 1, 1)
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "bovino_id": bovino_id,
+            "fecha": str(inicio + timedelta(days=i)),
+            "altura_cm": 120.5 + i % 10,
+            "l_torso_cm": 140.25,
+            "l_oblicua_cm": 150.0,
+            "l_cadera_cm": 45.75,
+            "a_cadera_cm": 40.1,
+            "edad_meses": 12 + i % 24,
+            "peso_bascula_kg": 350.5 + i % 50,
+            "created_at": datetime(2023, 1, 1, tzinfo=timezone.utc).isoformat()
+        }
+        for i in range(filas)
+    ]
+
+
+# --- Camino anterior (reproducido para la comparación) ---
+
+class CustomJSONEncoder(json.JSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, Decimal):
+            return float(obj)
+        elif isinstance(obj, (datetime, date)):
+            return obj.isoformat()
+        elif isinstance(obj, uuid.UUID):
+            return str(obj)
+        return super().default(obj)
+
+
+def convert_decimals_to_float(data: dict) -> dict:
+    return {key: float(value) if isinstance(value, Decimal) else value for key, value in data.items()}
+
+
+def serializar_antes(rows: List[dict]) -> bytes:
+    """Conversión por fila + jsonable_encoder + JSONResponse + reserialización del middleware"""
+    content = jsonable_encoder([convert_decimals_to_float(row) for row in rows])
+    body = JSONResponse(content).body
+    return json.dumps(json.loads(body), cls=CustomJSONEncoder).encode()
+
+
+def serializar_despues(rows: List[dict]) -> bytes:
+    """FastJSONResponse devuelta directamente (rutas sin response_model)"""
+    return FastJSONResponse(rows).body
+
+
+def build_app(nuevo: bool, rows: List[dict]) -> FastAPI:
+    """Aplicación mínima con la configuración anterior o la actual"""
+    if nuevo:
+        app = FastAPI(default_response_class=Default(FastJSONResponse))
+    else:
+        app = FastAPI()
+
+        @app.middleware("http")
+        async def decimal_json_middleware(request: Request, call_next):
+            response = await call_next(request)
+            if response.headers.get("content-type", "").startswith("application/json") and hasattr(response, 'body'):
+                response.body = json.dumps(json.loads(response.body), cls=CustomJSONEncoder).encode()
+            return response
+
+    @app.get("/mediciones", response_model=List[MedicionResponse])
+    async def mediciones():
+        return rows if nuevo else [convert_decimals_to_float(row) for row in rows]
+
+    @app.get("/estadisticas")
+    async def estadisticas():
+        if nuevo:
+            return FastJSONResponse({"filas": rows})
+        return {"filas": rows}
+
+    return app
+
+
+def medir(antes, despues, repeticiones: int):
+    """Mide ambos caminos alternados para que la deriva del equipo afecte a los dos por igual"""
+    tiempos_antes, tiempos_despues = [], []
+    for _ in range(repeticiones):
+        for funcion, tiempos in ((antes, tiempos_antes), (despues, tiempos_despues)):
+            inicio = time.perf_counter()
+            funcion()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+    return tiempos_antes, tiempos_despues
+
+
+async def medir_http(app_antes: FastAPI, app_despues: FastAPI, ruta: str, repeticiones: int):
+    """Tiempo completo de petición ASGI (sin red) alternando ambas aplicaciones"""
+    tiempos_antes, tiempos_despues = [], []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app_antes), base_url="http://bench") as client_antes, \
+            httpx.AsyncClient(transport=httpx.ASGITransport(app=app_despues), base_url="http://bench") as client_despues:
+        clientes = ((client_antes, tiempos_antes), (client_despues, tiempos_despues))
+        for client, _ in clientes:
+            await client.get(ruta)  # calentamiento
+        for _ in range(repeticiones):
+            for client, tiempos in clientes:
+                inicio = time.perf_counter()
+                response = await client.get(ruta)
+                response.raise_for_status()
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+    return tiempos_antes, tiempos_despues
+
+
+def resumen(nombre: str, antes: List[float], despues: List[float]) -> str:
+    mediana_antes = statistics.median(antes)
+    mediana_despues = statistics.median(despues)
+    return (
+        f"| {nombre} | {mediana_antes:.2f} | {mediana_despues:.2f} | "
+        f"{mediana_antes / mediana_despues:.1f}x |"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=1000)
+    parser.add_argument("--repeticiones", type=int, default=200)
+    args = parser.parse_args()
+
+    rows = build_mediciones(args.filas)
+    assert json.loads(serializar_antes(rows)) == json.loads(serializar_despues(rows))
+
+    lineas = [
+        f"Serialización de {args.filas} mediciones (mediana en ms, {args.repeticiones} repeticiones)",
+        "",
+        "| Camino | Antes (ms) | Después (ms) | Mejora |",
+        "|--------|-----------:|-------------:|-------:|",
+        resumen("Serialización (sin response_model)",
+                *medir(lambda: serializar_antes(rows), lambda: serializar_despues(rows), args.repeticiones))
+    ]
+
+    app_antes, app_despues = build_app(False, rows), build_app(True, rows)
+    for ruta, nombre in (("/mediciones", "HTTP con response_model"), ("/estadisticas", "HTTP sin response_model")):
+        lineas.append(resumen(nombre, *asyncio.run(medir_http(app_antes, app_despues, ruta, args.repeticiones))))
+
+    print("\n".join(lineas))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Fixtures de los micro-benchmarks (pytest-benchmark)
+===================================================
+
+Los servicios reales corren contra app/fake_supabase sin latencia: se mide
+solo el costo de CPU de la aplicación y del cliente de Supabase. A diferencia
+de tests/conftest.py, el backend es de sesión y viene sembrado (sembrar).
+"""
+import asyncio
+import os
+
+# Antes de importar la aplicación: settings se lee al importar
+os.environ.setdefault("SUPABASE_URL", "https://bench.supabase.co")
+os.environ.setdefault("SUPABASE_ANON_KEY", "bench-anon")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "bench-service-role")
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import pytest
+
+from app.config.settings import settings
+from app.fake_supabase import FakeSupabase
+from benchmarks.seed import sembrar
+
+
+@pytest.fixture(scope="session")
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture(scope="session")
+def backend():
+    return FakeSupabase(buckets=(settings.bucket_name,))
+
+
+@pytest.fixture(scope="session")
+def datos(backend):
+    return sembrar(backend, tamanos=(10, 100, 1000))
+
+
+@pytest.fixture(scope="session")
+def http(backend):
+    return backend.async_http_client()
+
+
+@pytest.fixture(scope="session")
+def db(backend, http):
+    return backend.async_db_client(http, settings.supabase_service_role_key)
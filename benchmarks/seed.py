@@ -0,0 +1,104 @@
+"""
+Datos de prueba para los benchmarks
+===================================
+
+Siembra el backend falso de Supabase (app/fake_supabase) directamente en
+memoria, sin pasar por HTTP: un usuario con token válido, una finca por cada
+tamaño pedido (10, 100, 1000 bovinos...) con mediciones por bovino, y un
+bovino vacío para las inserciones por lote. La generación usa una semilla
+fija, así que dos corridas siembran exactamente los mismos valores.
+"""
+import base64
+import io
+import random
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List
+
+from app.fake_supabase import FakeSupabase
+
+EMAIL = "bench@example.com"
+PASSWORD = "bench-secreto"
+
+
+def _medicion(rng: random.Random, bovino_id: str, fecha: date, edad_meses: int) -> Dict[str, Any]:
+    altura = round(rng.uniform(110, 150), 2)
+    return {
+        "bovino_id": bovino_id,
+        "fecha": fecha.isoformat(),
+        "altura_cm": altura,
+        "l_torso_cm": round(altura * rng.uniform(1.1, 1.3), 2),
+        "l_oblicua_cm": round(altura * rng.uniform(1.2, 1.4), 2),
+        "l_cadera_cm": round(rng.uniform(40, 55), 2),
+        "a_cadera_cm": round(rng.uniform(45, 60), 2),
+        "edad_meses": edad_meses,
+        "peso_bascula_kg": round(altura * rng.uniform(2.5, 3.5), 2)
+    }
+
+
+def sembrar(backend: FakeSupabase, tamanos: Iterable[int] = (10, 100, 1000),
+            mediciones_por_bovino: int = 3, seed: int = 0) -> Dict[str, Any]:
+    """
+    Crea los datos y devuelve los identificadores que usan los escenarios:
+    {"user_id", "token", "fincas": {tamaño: finca_id}, "bovino_id", "bovino_lote_id"}
+    """
+    rng = random.Random(seed)
+    store = backend.store
+
+    user = backend.auth.users.get(EMAIL) or backend.auth.create_user(EMAIL, PASSWORD, {"nombre_completo": "Bench"})
+    fincas: Dict[int, str] = {}
+    primer_bovino = None
+
+    for tamano in tamanos:
+        finca = store.insert("fincas", {"nombre": f"Finca {tamano} bovinos", "propietario_id": user["id"]})[0]
+        fincas[tamano] = finca["id"]
+        bovinos = store.insert("bovinos", [
+            {
+                "id_bovino": f"F{tamano}-{i:04d}",
+                "sexo": rng.choice(("Macho", "Hembra")),
+                "raza": rng.choice(("Brahman", "Holstein", "Cebú", "Normando")),
+                "finca_id": finca["id"]
+            }
+            for i in range(tamano)
+        ])
+        inicio = date(2024, 1, 1)
+        store.insert("mediciones_bovinos", [
+            _medicion(rng, bovino["id"], inicio + timedelta(days=30 * n), 12 + n)
+            for bovino in bovinos
+            for n in range(mediciones_por_bovino)
+        ])
+        primer_bovino = primer_bovino or bovinos[0]["id"]
+
+    finca_lote = store.insert("fincas", {"nombre": "Finca lotes", "propietario_id": user["id"]})[0]
+    bovino_lote = store.insert("bovinos", {"id_bovino": "LOTE-1", "finca_id": finca_lote["id"]})[0]
+
+    return {
+        "user_id": user["id"],
+        "token": backend.auth.issue_token(user),
+        "fincas": fincas,
+        "bovino_id": primer_bovino,
+        "bovino_lote_id": bovino_lote["id"]
+    }
+
+
+def lote_mediciones(bovino_id: str, cantidad: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Cuerpo JSON para POST /mediciones/bovino/{id}/batch"""
+    rng = random.Random(seed)
+    inicio = date(2023, 1, 1)
+    return [_medicion(rng, bovino_id, inicio + timedelta(days=i), 6 + i // 30) for i in range(cantidad)]
+
+
+def imagenes_base64(cantidad: int, lado: int = 512) -> List[str]:
+    """
+    Data URLs JPEG distintas entre sí: la caché por hash de contenido de
+    ImageService no debe convertir las subidas en aciertos
+    """
+    from PIL import Image
+
+    imagenes = []
+    for i in range(cantidad):
+        imagen = Image.new("RGB", (lado, lado), ((i * 37) % 256, (i * 91) % 256, (i * 53) % 256))
+        imagen.putpixel((i % lado, (i // lado) % lado), (255, 255, 255))
+        buffer = io.BytesIO()
+        imagen.save(buffer, format="JPEG", quality=85)
+        imagenes.append("data:image/jpeg;base64," + base64.b64encode(buffer.getvalue()).decode())
+    return imagenes
@@ -0,0 +1,64 @@
+-- =====================================================================
+-- 001: updated_at en fincas, bovinos y mediciones_bovinos
+-- =====================================================================
+-- Marca de agua de los ETags (app/services/etag_service.py): cada alta o
+-- edición deja su updated_at como máximo de la tabla y las bajas cambian el
+-- conteo. Ejecutar una vez en el SQL Editor de Supabase; es idempotente.
+--
+-- Las filas existentes toman created_at como valor inicial.
+
+CREATE OR REPLACE FUNCTION public.set_updated_at()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    -- clock_timestamp(): dos ediciones en la misma transacción no repiten el valor
+    NEW.updated_at := clock_timestamp();
+    RETURN NEW;
+END;
+$$;
+
+-- fincas
+ALTER TABLE public.fincas ADD COLUMN IF NOT EXISTS updated_at timestamptz;
+UPDATE public.fincas SET updated_at = created_at WHERE updated_at IS NULL;
+ALTER TABLE public.fincas
+    ALTER COLUMN updated_at SET DEFAULT now(),
+    ALTER COLUMN updated_at SET NOT NULL;
+
+DROP TRIGGER IF EXISTS fincas_set_updated_at ON public.fincas;
+CREATE TRIGGER fincas_set_updated_at
+    BEFORE UPDATE ON public.fincas
+    FOR EACH ROW EXECUTE FUNCTION public.set_updated_at();
+
+CREATE INDEX IF NOT EXISTS fincas_propietario_updated_at_idx
+    ON public.fincas (propietario_id, updated_at DESC);
+
+-- bovinos
+ALTER TABLE public.bovinos ADD COLUMN IF NOT EXISTS updated_at timestamptz;
+UPDATE public.bovinos SET updated_at = created_at WHERE updated_at IS NULL;
+ALTER TABLE public.bovinos
+    ALTER COLUMN updated_at SET DEFAULT now(),
+    ALTER COLUMN updated_at SET NOT NULL;
+
+DROP TRIGGER IF EXISTS bovinos_set_updated_at ON public.bovinos;
+CREATE TRIGGER bovinos_set_updated_at
+    BEFORE UPDATE ON public.bovinos
+    FOR EACH ROW EXECUTE FUNCTION public.set_updated_at();
+
+CREATE INDEX IF NOT EXISTS bovinos_finca_updated_at_idx
+    ON public.bovinos (finca_id, updated_at DESC);
+
+-- mediciones_bovinos
+ALTER TABLE public.mediciones_bovinos ADD COLUMN IF NOT EXISTS updated_at timestamptz;
+UPDATE public.mediciones_bovinos SET updated_at = created_at WHERE updated_at IS NULL;
+ALTER TABLE public.mediciones_bovinos
+    ALTER COLUMN updated_at SET DEFAULT now(),
+    ALTER COLUMN updated_at SET NOT NULL;
+
+DROP TRIGGER IF EXISTS mediciones_bovinos_set_updated_at ON public.mediciones_bovinos;
+CREATE TRIGGER mediciones_bovinos_set_updated_at
+    BEFORE UPDATE ON public.mediciones_bovinos
+    FOR EACH ROW EXECUTE FUNCTION public.set_updated_at();
+
+CREATE INDEX IF NOT EXISTS mediciones_bovinos_bovino_updated_at_idx
+    ON public.mediciones_bovinos (bovino_id, updated_at DESC);
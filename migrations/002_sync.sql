@@ -0,0 +1,95 @@
+-- =====================================================================
+-- 002: registro de eliminaciones e índices de sincronización
+-- =====================================================================
+-- GET /sync (app/services/sync_service.py) recorre cada tabla por
+-- (updated_at, id) después del watermark del cliente y lee las bajas de
+-- `eliminaciones`. Requiere 001_updated_at.sql. Idempotente.
+
+-- Una fila por fila borrada de fincas, bovinos o mediciones_bovinos, escrita
+-- por los triggers de abajo en la misma transacción que el borrado
+CREATE TABLE IF NOT EXISTS public.eliminaciones (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    propietario_id uuid NOT NULL,
+    tabla text NOT NULL CHECK (tabla IN ('fincas', 'bovinos', 'mediciones')),
+    registro_id uuid NOT NULL,
+    created_at timestamptz NOT NULL DEFAULT clock_timestamp()
+);
+
+CREATE INDEX IF NOT EXISTS eliminaciones_propietario_created_at_idx
+    ON public.eliminaciones (propietario_id, created_at, id);
+
+-- Búsqueda del propietario de un padre ya borrado (bajas en cascada)
+CREATE INDEX IF NOT EXISTS eliminaciones_tabla_registro_idx
+    ON public.eliminaciones (tabla, registro_id);
+
+-- Solo la API (service role) lee el registro; los triggers escriben como su dueño
+ALTER TABLE public.eliminaciones ENABLE ROW LEVEL SECURITY;
+
+-- Registra la baja de la fila con su propietario. En un borrado en cascada el
+-- padre ya no existe: el propietario sale de la baja del padre, registrada
+-- antes porque los triggers de los hijos son diferidos (ver abajo)
+CREATE OR REPLACE FUNCTION public.registrar_eliminacion()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    propietario uuid;
+BEGIN
+    IF TG_TABLE_NAME = 'fincas' THEN
+        propietario := OLD.propietario_id;
+    ELSIF TG_TABLE_NAME = 'bovinos' THEN
+        SELECT f.propietario_id INTO propietario FROM fincas f WHERE f.id = OLD.finca_id;
+        IF propietario IS NULL THEN
+            SELECT e.propietario_id INTO propietario FROM eliminaciones e
+            WHERE e.tabla = 'fincas' AND e.registro_id = OLD.finca_id;
+        END IF;
+    ELSE
+        SELECT f.propietario_id INTO propietario
+        FROM bovinos b JOIN fincas f ON f.id = b.finca_id WHERE b.id = OLD.bovino_id;
+        IF propietario IS NULL THEN
+            SELECT e.propietario_id INTO propietario FROM eliminaciones e
+            WHERE e.tabla = 'bovinos' AND e.registro_id = OLD.bovino_id;
+        END IF;
+    END IF;
+
+    IF propietario IS NOT NULL THEN
+        INSERT INTO eliminaciones (propietario_id, tabla, registro_id)
+        VALUES (propietario, CASE TG_TABLE_NAME WHEN 'mediciones_bovinos' THEN 'mediciones' ELSE TG_TABLE_NAME END, OLD.id);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+-- fincas: AFTER DELETE normal. bovinos y mediciones: diferidos al COMMIT, así
+-- corren después de la baja de su padre (la cascada encola primero al padre)
+DROP TRIGGER IF EXISTS fincas_registrar_eliminacion ON public.fincas;
+CREATE TRIGGER fincas_registrar_eliminacion
+    AFTER DELETE ON public.fincas
+    FOR EACH ROW EXECUTE FUNCTION public.registrar_eliminacion();
+
+DROP TRIGGER IF EXISTS bovinos_registrar_eliminacion ON public.bovinos;
+CREATE CONSTRAINT TRIGGER bovinos_registrar_eliminacion
+    AFTER DELETE ON public.bovinos
+    DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW EXECUTE FUNCTION public.registrar_eliminacion();
+
+DROP TRIGGER IF EXISTS mediciones_bovinos_registrar_eliminacion ON public.mediciones_bovinos;
+CREATE CONSTRAINT TRIGGER mediciones_bovinos_registrar_eliminacion
+    AFTER DELETE ON public.mediciones_bovinos
+    DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW EXECUTE FUNCTION public.registrar_eliminacion();
+
+-- Keyset (updated_at, id) de cada flujo: el costo depende de los cambios
+-- posteriores al watermark, no del tamaño de la tabla
+CREATE INDEX IF NOT EXISTS fincas_updated_at_id_idx
+    ON public.fincas (updated_at, id);
+CREATE INDEX IF NOT EXISTS bovinos_updated_at_id_idx
+    ON public.bovinos (updated_at, id);
+CREATE INDEX IF NOT EXISTS mediciones_bovinos_updated_at_id_idx
+    ON public.mediciones_bovinos (updated_at, id);
+
+-- Las bajas antiguas pueden purgarse; un cliente con un watermark anterior a
+-- la purga debe sincronizar desde cero (since vacío). Por ejemplo:
+--   DELETE FROM public.eliminaciones WHERE created_at < now() - interval '180 days';
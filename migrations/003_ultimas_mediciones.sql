@@ -0,0 +1,19 @@
+-- =====================================================================
+-- 003: última medición de cada bovino
+-- =====================================================================
+-- FincaService.get_ultimas_mediciones_by_bovinos (finca completa y estimación
+-- de peso por finca) lee esta vista por bloques de bovino_id: una fila por
+-- bovino en lugar de todas sus mediciones. Idempotente; sin la vista el
+-- servicio vuelve a recorrer mediciones_bovinos.
+
+-- DISTINCT ON recorre el índice y toma la primera fila de cada bovino; el
+-- filtro bovino_id IN (...) se aplica antes del DISTINCT ON
+CREATE INDEX IF NOT EXISTS mediciones_bovinos_bovino_fecha_idx
+    ON public.mediciones_bovinos (bovino_id, fecha DESC, created_at DESC);
+
+-- security_invoker: con el cliente anónimo se siguen aplicando las políticas RLS
+CREATE OR REPLACE VIEW public.ultimas_mediciones_bovinos
+WITH (security_invoker = true) AS
+SELECT DISTINCT ON (bovino_id) *
+FROM public.mediciones_bovinos
+ORDER BY bovino_id, fecha DESC, created_at DESC;
@@ -8,5 +8,6 @@ if __name__ == "__main__":
         host=settings.host,
         port=settings.port,
         reload=settings.debug,
-        log_level="info"
+        log_level="info",
+        access_log=False  # La línea de acceso (con request_id) la emite RequestIdMiddleware
     )
@@ -89,12 +89,48 @@ def run_specific_test_type(test_type):
         print(f"\n💥 Error ejecutando tests {test_type}: {e}")
         return 1
 
+def run_benchmarks():
+    """Ejecuta los micro-benchmarks y la prueba de carga contra Supabase en memoria"""
+    try:
+        root = Path(__file__).parent
+        test_env = os.environ.copy()
+        test_env['PYTHONPATH'] = str(root)
+        resultados = root / "benchmarks" / "resultados"
+        resultados.mkdir(parents=True, exist_ok=True)
+        
+        print("\n⏱️ Ejecutando micro-benchmarks...")
+        micro = subprocess.run([
+            sys.executable, "-m", "pytest",
+            "benchmarks/bench_micro.py",
+            "--disable-warnings",
+            f"--benchmark-json={resultados / 'micro.json'}"
+        ], env=test_env, cwd=root)
+        
+        print("\n🚦 Ejecutando prueba de carga...")
+        carga = subprocess.run([
+            sys.executable, "-m", "benchmarks.bench_api",
+            "--salida", str(resultados / "api.json")
+        ], env=test_env, cwd=root)
+        
+        returncode = micro.returncode or carga.returncode
+        if returncode == 0:
+            print(f"\n✅ Resultados en {resultados}")
+        else:
+            print("\n❌ Los benchmarks fallaron")
+        return returncode
+        
+    except Exception as e:
+        print(f"\n💥 Error ejecutando benchmarks: {e}")
+        return 1
+
 def main():
     """Función principal"""
     print_banner()
     
     if len(sys.argv) > 1:
         test_type = sys.argv[1].lower()
+        if test_type == 'bench':
+            return run_benchmarks()
         return run_specific_test_type(test_type)
     else:
         return run_tests()
@@ -10,6 +10,16 @@ from fastapi.testclient import TestClient
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.main import app
+from app.config.settings import settings
+from app.fake_supabase import FakeSupabase
+from app.services.bovino_service import BovinoService
+from app.services.estadisticas_service import EstadisticasService
+from app.services.etag_service import EtagService
+from app.services.finca_service import FincaService
+from app.services.medicion_service import MedicionService
+from app.services.ownership_service import OwnershipService
+from app.services.response_cache_service import ResponseCacheService
+from app.services.sync_service import SyncService
 
 # Base URL para tests
 TEST_BASE_URL = "http://localhost:8000"
@@ -33,3 +43,36 @@ def get_auth_headers(token: str) -> dict:
 def get_json_headers() -> dict:
     """Obtiene headers para JSON"""
     return {"Content-Type": "application/json"}
+
+# Servicios reales contra Supabase en memoria (app/fake_supabase). Cada test
+# tiene su propio backend; un archivo redefine solo lo que cambia (p. ej. `cache`)
+@pytest.fixture
+def backend():
+    return FakeSupabase(buckets=(settings.bucket_name,))
+
+@pytest.fixture
+def http(backend):
+    return backend.async_http_client()
+
+@pytest.fixture
+def db(backend, http):
+    return backend.async_db_client(http)
+
+@pytest.fixture
+def ownership(db):
+    return OwnershipService(db)
+
+@pytest.fixture
+def cache():
+    """Sin caché de respuestas; los tests de la caché y de ETags la habilitan"""
+    return ResponseCacheService(enabled=False)
+
+@pytest.fixture
+def servicios(db, ownership, cache):
+    return {
+        "fincas": FincaService(db, ownership=ownership, cache=cache),
+        "bovinos": BovinoService(db, ownership=ownership, cache=cache),
+        "mediciones": MedicionService(db, ownership=ownership, estadisticas=EstadisticasService(db, ownership), cache=cache),
+        "etags": EtagService(db, ownership=ownership, cache=cache),
+        "sync": SyncService(db, safety_lag=0),
+    }
@@ -0,0 +1,69 @@
+"""
+Test del diagnóstico muestreado de peticiones
+=============================================
+
+Verifica que solo se registran las rutas configuradas, que se cuentan
+los bytes en tránsito y que el cuerpo de la petición no se altera.
+"""
+import logging
+import pytest
+from app.middleware.diagnostics import RequestDiagnosticsMiddleware
+
+
+async def echo_app(scope, receive, send):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body", False):
+            break
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": body, "more_body": True})
+    await send({"type": "http.response.body", "body": b"!"})
+
+
+async def call(app, path, chunks):
+    messages = [{"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1} for i, chunk in enumerate(chunks)]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http", "method": "POST", "path": path,
+        "headers": [(b"content-type", b"application/json; charset=utf-8"), (b"content-length", b"6")]
+    }
+    await app(scope, receive, send)
+    return b"".join(m.get("body", b"") for m in sent if m["type"] == "http.response.body")
+
+
+@pytest.mark.unit
+class TestRequestDiagnostics:
+    """Tests del middleware de diagnóstico"""
+
+    @pytest.mark.asyncio
+    async def test_registra_tamanos_de_rutas_configuradas(self, caplog):
+        app = RequestDiagnosticsMiddleware(echo_app, routes=["/api/v1/images/"], sample_rate=1.0)
+        with caplog.at_level(logging.INFO, logger="app.middleware.diagnostics"):
+            body = await call(app, "/api/v1/images/upload-profile", [b"abc", b"def"])
+
+        assert body == b"abcdef!"
+        record = caplog.records[-1]
+        assert record.diagnostics["request_bytes"] == 6
+        assert record.diagnostics["response_bytes"] == 7
+        assert record.diagnostics["status"] == 200
+        assert record.diagnostics["content_type"] == "application/json"
+        assert record.diagnostics["content_length"] == 6
+
+    @pytest.mark.asyncio
+    async def test_ignora_rutas_no_configuradas_o_sin_muestreo(self, caplog):
+        fuera_de_ruta = RequestDiagnosticsMiddleware(echo_app, routes=["/api/v1/images/"], sample_rate=1.0)
+        sin_muestreo = RequestDiagnosticsMiddleware(echo_app, routes=["/api/v1/images/"], sample_rate=0.0)
+        with caplog.at_level(logging.INFO, logger="app.middleware.diagnostics"):
+            assert await call(fuera_de_ruta, "/api/v1/fincas/", [b"x"]) == b"x!"
+            assert await call(sin_muestreo, "/api/v1/images/upload-profile", [b"x"]) == b"x!"
+
+        assert not caplog.records
@@ -0,0 +1,124 @@
+"""
+Test de estadísticas de mediciones
+==================================
+
+Verifica el motor vectorizado contra cálculos de referencia por bovino y la
+caché por marca de agua contra el backend falso de Supabase.
+"""
+import pytest
+import numpy as np
+from datetime import date, timedelta
+from app.models.bovino import BovinoCreate
+from app.models.finca import FincaCreate
+from app.models.medicion import MedicionCreate, MedicionUpdate
+from app.services.estadisticas_service import (
+    EstadisticasService,
+    estadisticas_bovino,
+    estadisticas_finca,
+    pendientes_por_grupo
+)
+from app.services.medicion_service import MedicionService
+
+PROPIETARIO = "2f1c7b3e-8d4a-4a57-9c1e-0f3b5d2a6e71"
+
+
+def build_mediciones(bovino_id: str, pesos, alturas=None, inicio: date = date(2024, 1, 1), paso_dias: int = 30):
+    """Genera mediciones equiespaciadas de un bovino"""
+    alturas = alturas or [None] * len(pesos)
+    return [
+        {
+            "id": f"{bovino_id}-{i}",
+            "bovino_id": bovino_id,
+            "fecha": str(inicio + timedelta(days=i * paso_dias)),
+            "altura_cm": altura,
+            "l_torso_cm": None,
+            "l_oblicua_cm": None,
+            "l_cadera_cm": None,
+            "a_cadera_cm": None,
+            "edad_meses": 12 + i,
+            "peso_bascula_kg": peso
+        }
+        for i, (peso, altura) in enumerate(zip(pesos, alturas))
+    ]
+
+
+@pytest.mark.unit
+class TestEstadisticasBovino:
+    """Tests de estadísticas de un bovino"""
+
+    def test_resumen_y_ganancia_diaria(self):
+        """Ganancia diaria lineal y resumen con nulos ignorados"""
+        rows = build_mediciones("b1", [300.0, 330.0, 360.0, None], alturas=[120.0, 121.5, 123.0, 124.5])
+        resultado = estadisticas_bovino(rows)
+
+        assert resultado["total_mediciones"] == 4
+        assert resultado["ganancia_diaria_kg"] == pytest.approx(1.0)
+        assert resultado["tasas_crecimiento_dia"]["altura_cm"] == pytest.approx(0.05)
+        assert resultado["tasas_crecimiento_dia"]["l_torso_cm"] is None
+
+        peso = resultado["campos"]["peso_bascula_kg"]
+        assert peso["n"] == 3
+        assert peso["media"] == pytest.approx(330.0)
+        assert peso["p50"] == pytest.approx(330.0)
+        assert resultado["campos"]["l_cadera_cm"] == {"n": 0}
+
+    def test_sin_mediciones(self):
+        """Un bovino sin mediciones devuelve totales vacíos"""
+        assert estadisticas_bovino([])["total_mediciones"] == 0
+
+
+@pytest.mark.unit
+class TestEstadisticasFinca:
+    """Tests de agregación por finca"""
+
+    def test_agrupacion_coincide_con_calculo_individual(self):
+        """La pasada agrupada produce las mismas pendientes que cada bovino por separado"""
+        rng = np.random.default_rng(7)
+        rows = []
+        for b in range(50):
+            pesos = list(200 + b + np.cumsum(rng.uniform(10, 40, size=6)))
+            rows.extend(build_mediciones(f"b{b:02d}", pesos, paso_dias=20 + b % 5))
+        rng.shuffle(rows)
+
+        resultado = estadisticas_finca(rows)
+        assert resultado["total_bovinos"] == 50
+        assert resultado["total_mediciones"] == 300
+
+        for bovino in resultado["bovinos"]:
+            individual = estadisticas_bovino([row for row in rows if row["bovino_id"] == bovino["bovino_id"]])
+            assert bovino["ganancia_diaria_kg"] == pytest.approx(individual["ganancia_diaria_kg"])
+            assert bovino["ultima_fecha"] == individual["ultima_fecha"]
+            assert bovino["total_mediciones"] == 6
+
+    def test_pendiente_indefinida_con_un_punto(self):
+        """Con un solo punto por grupo la pendiente es NaN"""
+        pendientes, conteos = pendientes_por_grupo(
+            np.array([0, 1, 1]), 2, np.array([0.0, 0.0, 10.0]), np.array([[5.0], [1.0], [6.0]])
+        )
+        assert np.isnan(pendientes[0, 0])
+        assert pendientes[1, 0] == pytest.approx(0.5)
+        assert conteos[:, 0].tolist() == [1.0, 2.0]
+
+
+@pytest.mark.unit
+class TestEstadisticasCache:
+    """Resultados cacheados por (conteo, updated_at máximo)"""
+
+    @pytest.mark.asyncio
+    async def test_edicion_en_otro_worker_renueva_el_resultado(self, db, ownership, cache, servicios):
+        finca = await servicios["fincas"].create_finca(FincaCreate(nombre="Norte"), PROPIETARIO)
+        bovino = await servicios["bovinos"].create_bovino(BovinoCreate(id_bovino="B-1", finca_id=finca["id"]), PROPIETARIO)
+        medicion = await servicios["mediciones"].create_medicion(
+            MedicionCreate(bovino_id=bovino["id"], fecha=date(2024, 1, 1), peso_bascula_kg=300), PROPIETARIO
+        )
+        estadisticas = servicios["mediciones"].estadisticas
+        antes = await estadisticas.get_estadisticas_bovino(bovino["id"], PROPIETARIO)
+        assert await estadisticas.get_estadisticas_bovino(bovino["id"], PROPIETARIO) is antes
+
+        # Otro worker: su propia caché de estadísticas; la edición no cambia el conteo
+        otro_worker = MedicionService(db, ownership=ownership, estadisticas=EstadisticasService(db, ownership), cache=cache)
+        await otro_worker.update_medicion(medicion["id"], MedicionUpdate(peso_bascula_kg=320), PROPIETARIO)
+
+        despues = await estadisticas.get_estadisticas_bovino(bovino["id"], PROPIETARIO)
+        assert antes["campos"]["peso_bascula_kg"]["max"] == 300
+        assert despues["campos"]["peso_bascula_kg"]["max"] == 320
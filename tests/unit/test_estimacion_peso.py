@@ -0,0 +1,232 @@
+"""
+Test de estimación de peso
+==========================
+
+Verifica el ajuste ridge log-lineal, la persistencia, la predicción por lotes,
+la publicación del modelo en Storage y que solo un administrador lo entrena.
+"""
+import httpx
+import pytest
+import numpy as np
+from fastapi import FastAPI
+from app.config.settings import settings
+from app.controllers import estimacion_controller
+from app.fake_supabase import FakeSupabase
+from app.middleware.auth import get_current_user_id
+from app.services.estimacion_peso_service import (
+    EstimacionPesoService,
+    ModeloPeso,
+    matriz_predictores,
+    tiene_medidas
+)
+
+ADMIN = "2f1c7b3e-8d4a-4a57-9c1e-0f3b5d2a6e71"
+USUARIO = "9a0b1c2d-3e4f-4a5b-8c6d-7e8f9a0b1c2d"
+
+
+def build_mediciones(n: int = 400, ruido: float = 0.03, semilla: int = 11):
+    """Mediciones sintéticas con peso alométrico conocido: peso = 0.002 · torso^1.2 · cadera^0.9 · altura^0.8"""
+    rng = np.random.default_rng(semilla)
+    altura = rng.uniform(100, 150, n)
+    torso = rng.uniform(110, 170, n)
+    cadera = rng.uniform(35, 60, n)
+    peso = 0.002 * torso ** 1.2 * cadera ** 0.9 * altura ** 0.8 * np.exp(rng.normal(0, ruido, n))
+    return [
+        {
+            "altura_cm": altura[i], "l_torso_cm": torso[i], "l_oblicua_cm": None,
+            "l_cadera_cm": cadera[i], "a_cadera_cm": None, "edad_meses": 24,
+            "peso_bascula_kg": peso[i]
+        }
+        for i in range(n)
+    ]
+
+
+@pytest.mark.unit
+class TestModeloPeso:
+    """Tests del modelo alométrico"""
+
+    def test_recupera_exponentes(self):
+        """El ajuste recupera los exponentes alométricos y reporta métricas de validación"""
+        filas = build_mediciones()
+        X = matriz_predictores(filas)
+        pesos = np.array([fila["peso_bascula_kg"] for fila in filas])
+        modelo = ModeloPeso.ajustar(X, pesos, alpha=0.01)
+
+        exponentes = modelo.info()["exponentes"]
+        assert exponentes["l_torso_cm"] == pytest.approx(1.2, abs=0.05)
+        assert exponentes["l_cadera_cm"] == pytest.approx(0.9, abs=0.05)
+        assert exponentes["altura_cm"] == pytest.approx(0.8, abs=0.05)
+        assert modelo.metricas["mape"] < 0.05
+
+    def test_guardar_y_cargar(self, tmp_path):
+        """Los coeficientes persistidos producen las mismas predicciones"""
+        filas = build_mediciones(n=100)
+        X = matriz_predictores(filas)
+        modelo = ModeloPeso.ajustar(X, np.array([fila["peso_bascula_kg"] for fila in filas]))
+
+        ruta = str(tmp_path / "modelo_peso.npz")
+        modelo.guardar(ruta)
+        cargado = ModeloPeso.cargar(ruta)
+
+        assert cargado is not None
+        assert np.allclose(cargado.predecir(X), modelo.predecir(X))
+        assert cargado.metricas == modelo.metricas
+
+    def test_filas_sin_medidas(self):
+        """Filas sin medidas morfométricas no se estiman"""
+        X = matriz_predictores([{"altura_cm": None, "edad_meses": 10}, {"altura_cm": 120}])
+        assert tiene_medidas(X).tolist() == [False, True]
+
+
+@pytest.mark.unit
+class TestEstimacionPesoService:
+    """Tests del servicio de estimación"""
+
+    def test_estimar_lote(self, tmp_path):
+        """La estimación por lotes devuelve un resultado por fila e intervalos coherentes"""
+        filas = build_mediciones(n=200)
+        X = matriz_predictores(filas)
+        ruta = str(tmp_path / "modelo_peso.npz")
+        ModeloPeso.ajustar(X, np.array([fila["peso_bascula_kg"] for fila in filas])).guardar(ruta)
+
+        service = EstimacionPesoService(modelo_path=ruta)
+        estimaciones = service.estimar(filas[:50] + [{"edad_meses": 5}])
+
+        assert len(estimaciones) == 51
+        assert estimaciones[-1]["peso_estimado_kg"] is None
+        for fila, estimacion in zip(filas[:50], estimaciones):
+            assert estimacion["peso_min_kg"] < estimacion["peso_estimado_kg"] < estimacion["peso_max_kg"]
+            assert estimacion["peso_estimado_kg"] == pytest.approx(fila["peso_bascula_kg"], rel=0.15)
+
+    def test_sin_modelo(self, tmp_path):
+        """Sin modelo entrenado se informa con LookupError"""
+        service = EstimacionPesoService(modelo_path=str(tmp_path / "no_existe.npz"))
+        with pytest.raises(LookupError):
+            service.estimar([{"altura_cm": 120}])
+
+
+@pytest.fixture
+def publicacion(tmp_path):
+    """Dos workers con copias locales distintas sobre el mismo backend falso (base de datos y bucket)"""
+    backend = FakeSupabase(buckets=("modelos",))
+    http = backend.async_http_client()
+    db = backend.async_db_client(http)
+    workers = [
+        EstimacionPesoService(db, modelo_path=str(tmp_path / f"worker_{i}.npz"), http_client=http, bucket="modelos")
+        for i in range(2)
+    ]
+    return db, workers
+
+
+async def insertar_mediciones(db, n=100):
+    filas = [{k: (float(v) if v is not None else None) for k, v in fila.items()} for fila in build_mediciones(n=n)]
+    await db.table('mediciones_bovinos').insert(filas).execute()
+
+
+def sin_publicacion(info):
+    return {k: v for k, v in info.items() if k != "publicado"}
+
+
+@pytest.mark.unit
+class TestModeloPublicado:
+    """Publicación del modelo en Storage y recarga en los demás workers"""
+
+    @pytest.mark.asyncio
+    async def test_otro_worker_recarga_la_version_nueva(self, monkeypatch, publicacion):
+        db, (entrenador, lector) = publicacion
+        monkeypatch.setattr(settings, "peso_modelo_refresh_seconds", 0)
+        await insertar_mediciones(db)
+
+        await lector.refrescar_modelo()
+        assert lector.get_modelo() is None
+
+        primero = await entrenador.entrenar(alpha=1.0)
+        assert primero["publicado"] is True
+        await lector.refrescar_modelo()
+        assert lector.get_modelo().info() == sin_publicacion(primero)
+
+        # Un reentrenamiento reemplaza al modelo ya cargado en el otro worker
+        segundo = await entrenador.entrenar(alpha=50.0)
+        await lector.refrescar_modelo()
+        assert lector.get_modelo().alpha == 50.0 and lector.get_modelo().info() == sin_publicacion(segundo)
+
+    @pytest.mark.asyncio
+    async def test_quien_publica_no_descarga_su_version(self, monkeypatch, publicacion):
+        db, (entrenador, _) = publicacion
+        monkeypatch.setattr(settings, "peso_modelo_refresh_seconds", 0)
+        await insertar_mediciones(db)
+        await entrenador.entrenar()
+
+        metodos = []
+        http = entrenador.http
+
+        class Registro(httpx.AsyncBaseTransport):
+            async def handle_async_request(self, request):
+                metodos.append(request.method)
+                return await http._transport.handle_async_request(request)
+
+        entrenador.http = httpx.AsyncClient(transport=Registro())
+        await entrenador.refrescar_modelo()
+        assert metodos == ["HEAD"]
+
+    @pytest.mark.asyncio
+    async def test_bucket_inexistente_no_hace_fallar_el_entrenamiento(self, publicacion):
+        db, (entrenador, _) = publicacion
+        await insertar_mediciones(db)
+        entrenador.bucket = "no-existe"
+        entrenador.object_url = entrenador.object_url.replace("/modelos/", "/no-existe/")
+
+        info = await entrenador.entrenar()
+
+        assert info["publicado"] is False
+        assert entrenador.get_modelo().info() == sin_publicacion(info)
+
+    @pytest.mark.asyncio
+    async def test_sin_bucket_solo_disco_local(self, tmp_path, publicacion):
+        db, _ = publicacion
+        await insertar_mediciones(db)
+        service = EstimacionPesoService(db, modelo_path=str(tmp_path / "local.npz"), bucket=None)
+
+        info = await service.entrenar()
+
+        assert info["publicado"] is None and service.get_modelo() is not None
+
+    @pytest.mark.asyncio
+    async def test_revision_limitada_por_intervalo(self, monkeypatch, publicacion):
+        _, (_, lector) = publicacion
+        monkeypatch.setattr(settings, "peso_modelo_refresh_seconds", 3600)
+        peticiones = []
+        lector.http = httpx.AsyncClient(transport=httpx.MockTransport(
+            lambda request: peticiones.append(request) or httpx.Response(404)
+        ))
+
+        await lector.refrescar_modelo()
+        await lector.refrescar_modelo()
+        assert len(peticiones) == 1
+
+
+@pytest.mark.unit
+class TestEntrenamientoSoloAdmin:
+    """POST /estimacion/modelo/entrenar exige un administrador"""
+
+    @pytest.mark.asyncio
+    async def test_usuario_comun_recibe_403(self, monkeypatch):
+        entrenado = []
+
+        async def entrenar(alpha=None):
+            entrenado.append(alpha)
+            raise ValueError("sin datos")
+
+        monkeypatch.setattr(estimacion_controller.estimacion_peso_service, "entrenar", entrenar)
+        monkeypatch.setattr(settings, "admin_user_ids", [ADMIN])
+        app = FastAPI()
+        app.include_router(estimacion_controller.router)
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            app.dependency_overrides[get_current_user_id] = lambda: USUARIO
+            comun = await client.post("/estimacion/modelo/entrenar")
+            app.dependency_overrides[get_current_user_id] = lambda: ADMIN
+            admin = await client.post("/estimacion/modelo/entrenar")
+
+        assert comun.status_code == 403
+        assert admin.status_code == 422 and entrenado == [None]
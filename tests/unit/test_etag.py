@@ -0,0 +1,198 @@
+"""
+Test de ETags y GET condicionales
+=================================
+
+El ETag sale de marcas de agua (updated_at y conteos) contra el backend falso
+de Supabase, cambia con altas, ediciones y bajas, y un `If-None-Match` vigente
+responde 304 sin leer los datos.
+"""
+from datetime import date
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.controllers import bovino_controller, finca_controller, medicion_controller
+from app.middleware.auth import get_current_user_id
+from app.middleware.etag import etag_matches
+from app.models.bovino import BovinoCreate
+from app.models.finca import FincaCreate, FincaUpdate
+from app.models.medicion import MedicionCreate
+from app.services.etag_service import EtagService
+from app.services.response_cache_service import MemoryCacheBackend, ResponseCacheService
+
+PROPIETARIO = "2f1c7b3e-8d4a-4a57-9c1e-0f3b5d2a6e71"
+OTRO = "9a0b1c2d-3e4f-4a5b-8c6d-7e8f9a0b1c2d"
+
+
+@pytest.fixture
+def cache():
+    """Caché de respuestas habilitada y compartida entre workers, como RedisCacheBackend"""
+    backend = MemoryCacheBackend(1000)
+    backend.shared = True
+    return ResponseCacheService(backend=backend, enabled=True)
+
+
+@pytest.fixture
+def api(monkeypatch, servicios):
+    """Routers reales con los servicios sobre el backend falso"""
+    for controller in (finca_controller, bovino_controller, medicion_controller):
+        monkeypatch.setattr(controller, "etag_service", servicios["etags"])
+    monkeypatch.setattr(finca_controller, "finca_service", servicios["fincas"])
+    monkeypatch.setattr(bovino_controller, "bovino_service", servicios["bovinos"])
+    monkeypatch.setattr(medicion_controller, "medicion_service", servicios["mediciones"])
+
+    app = FastAPI()
+    for controller in (finca_controller, bovino_controller, medicion_controller):
+        app.include_router(controller.router)
+    app.dependency_overrides[get_current_user_id] = lambda: PROPIETARIO
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.mark.unit
+class TestEtagMatches:
+    """Comparación de If-None-Match"""
+
+    def test_lista_debil_y_comodin(self):
+        assert etag_matches('"a", "b"', '"b"')
+        assert etag_matches('W/"b"', '"b"')
+        assert etag_matches("*", '"b"')
+        assert not etag_matches('"a"', '"b"')
+        assert not etag_matches(None, '"b"')
+
+
+@pytest.mark.unit
+class TestEtagService:
+    """Marcas de agua contra el backend falso"""
+
+    @pytest.mark.asyncio
+    async def test_cambia_con_altas_ediciones_y_bajas(self, servicios):
+        fincas, bovinos, etags = servicios["fincas"], servicios["bovinos"], servicios["etags"]
+        finca = await fincas.create_finca(FincaCreate(nombre="Norte"), PROPIETARIO)
+        params = {"limit": 20}
+
+        vistos = [await etags.bovinos_finca(finca["id"], PROPIETARIO, params)]
+        assert await etags.bovinos_finca(finca["id"], PROPIETARIO, params) == vistos[0]
+
+        bovino = await bovinos.create_bovino(BovinoCreate(id_bovino="B-1", finca_id=finca["id"]), PROPIETARIO)
+        vistos.append(await etags.bovinos_finca(finca["id"], PROPIETARIO, params))
+        await bovinos.delete_bovino(bovino["id"], PROPIETARIO)
+        vistos.append(await etags.bovinos_finca(finca["id"], PROPIETARIO, params))
+        # Tras la baja el listado vuelve a estar vacío: mismo contenido, mismo ETag
+        assert vistos[1] != vistos[0] and vistos[2] == vistos[0]
+
+        detalle = await etags.finca(finca["id"], PROPIETARIO)
+        await fincas.update_finca(finca["id"], FincaUpdate(nombre="Norte 2"), PROPIETARIO)
+        assert await etags.finca(finca["id"], PROPIETARIO) != detalle
+
+        # Los parámetros de la página forman parte del ETag
+        assert await etags.bovinos_finca(finca["id"], PROPIETARIO, {"limit": 5}) != vistos[-1]
+
+    @pytest.mark.asyncio
+    async def test_sin_permisos_o_deshabilitado_no_hay_etag(self, servicios):
+        fincas, etags = servicios["fincas"], servicios["etags"]
+        finca = await fincas.create_finca(FincaCreate(nombre="Norte"), PROPIETARIO)
+
+        assert await etags.finca(finca["id"], OTRO) is None
+        assert await etags.bovinos_finca(finca["id"], OTRO, {}) is None
+
+        etags.enabled = False
+        assert await etags.finca(finca["id"], PROPIETARIO) is None
+
+    @pytest.mark.asyncio
+    async def test_finca_completa_depende_de_mediciones(self, servicios):
+        fincas, bovinos, mediciones, etags = (
+            servicios["fincas"], servicios["bovinos"], servicios["mediciones"], servicios["etags"]
+        )
+        finca = await fincas.create_finca(FincaCreate(nombre="Norte"), PROPIETARIO)
+        bovino = await bovinos.create_bovino(BovinoCreate(id_bovino="B-1", finca_id=finca["id"]), PROPIETARIO)
+
+        completa = await etags.finca(finca["id"], PROPIETARIO, bovinos=True, mediciones=True)
+        con_bovinos = await etags.finca(finca["id"], PROPIETARIO, bovinos=True)
+        await mediciones.create_medicion(MedicionCreate(bovino_id=bovino["id"], fecha=date(2024, 1, 1)), PROPIETARIO)
+
+        assert await etags.finca(finca["id"], PROPIETARIO, bovinos=True, mediciones=True) != completa
+        assert await etags.finca(finca["id"], PROPIETARIO, bovinos=True) == con_bovinos
+
+
+@pytest.mark.unit
+class TestGetCondicional:
+    """Rutas con ETag e If-None-Match"""
+
+    @pytest.mark.asyncio
+    async def test_listado_responde_304_sin_leer_datos(self, api, backend, servicios):
+        await servicios["fincas"].create_finca(FincaCreate(nombre="Norte"), PROPIETARIO)
+
+        primera = await api.get("/fincas/")
+        etag = primera.headers["etag"]
+        assert primera.status_code == 200 and len(primera.json()) == 1
+        assert primera.headers["cache-control"] == "private, no-cache"
+
+        # Caché compartida: la marca de agua también está cacheada, no llega a PostgREST
+        peticiones = backend.requests
+        segunda = await api.get("/fincas/", headers={"If-None-Match": etag})
+        assert segunda.status_code == 304 and segunda.headers["etag"] == etag
+        assert segunda.content == b""
+        assert backend.requests == peticiones
+
+        await api.post("/fincas/", json={"nombre": "Sur"})
+        tercera = await api.get("/fincas/", headers={"If-None-Match": etag})
+        assert tercera.status_code == 200 and len(tercera.json()) == 2
+        assert tercera.headers["etag"] != etag
+
+    @pytest.mark.asyncio
+    async def test_cache_en_memoria_sin_etag_en_rutas_cacheadas(self, api, backend, servicios):
+        """El cuerpo cacheado por worker puede ser más viejo que la marca de agua"""
+        servicios["etags"].cache.backend.shared = False  # MemoryCacheBackend por worker
+        finca = await servicios["fincas"].create_finca(FincaCreate(nombre="Norte"), PROPIETARIO)
+
+        for ruta in ("/fincas/", f"/fincas/{finca['id']}/with-bovinos", f"/bovinos/finca/{finca['id']}"):
+            respuesta = await api.get(ruta)
+            assert respuesta.status_code == 200 and "etag" not in respuesta.headers, ruta
+
+        # Las rutas que no pasan por la caché de respuestas conservan el ETag
+        detalle = await api.get(f"/fincas/{finca['id']}")
+        peticiones = backend.requests
+        assert (await api.get(f"/fincas/{finca['id']}", headers={"If-None-Match": detalle.headers["etag"]})).status_code == 304
+        # Sin caché de la marca de agua: solo su consulta, sin leer los datos
+        assert backend.requests == peticiones + 1
+
+    @pytest.mark.asyncio
+    async def test_escritura_en_otro_worker_cambia_el_etag(self, servicios):
+        """Con cachés en memoria por worker la marca de agua no se cachea: nunca un 304 viejo"""
+        fincas, etags = servicios["fincas"], servicios["etags"]
+        finca = await fincas.create_finca(FincaCreate(nombre="Norte"), PROPIETARIO)
+        otro_worker = EtagService(etags.db, ownership=etags.ownership,
+                                  cache=ResponseCacheService(backend=MemoryCacheBackend(1000), enabled=True))
+
+        antes = await otro_worker.finca(finca["id"], PROPIETARIO)
+        await fincas.update_finca(finca["id"], FincaUpdate(nombre="Norte 2"), PROPIETARIO)
+        assert await otro_worker.finca(finca["id"], PROPIETARIO) != antes
+
+    @pytest.mark.asyncio
+    async def test_detalle_y_estadisticas(self, api, servicios):
+        finca = await servicios["fincas"].create_finca(FincaCreate(nombre="Norte"), PROPIETARIO)
+        bovino = await servicios["bovinos"].create_bovino(BovinoCreate(id_bovino="B-1", finca_id=finca["id"]), PROPIETARIO)
+        medicion = await servicios["mediciones"].create_medicion(
+            MedicionCreate(bovino_id=bovino["id"], fecha=date(2024, 1, 1), altura_cm=120), PROPIETARIO
+        )
+
+        for ruta in (f"/fincas/{finca['id']}/complete", f"/bovinos/{bovino['id']}",
+                     f"/mediciones/{medicion['id']}", f"/mediciones/bovino/{bovino['id']}/estadisticas"):
+            respuesta = await api.get(ruta)
+            assert respuesta.status_code == 200, ruta
+            condicional = await api.get(ruta, headers={"If-None-Match": respuesta.headers["etag"]})
+            assert condicional.status_code == 304, ruta
+
+        # Rutas distintas del mismo bovino no comparten ETag
+        ultima = await api.get(f"/mediciones/bovino/{bovino['id']}/ultima")
+        listado = await api.get(f"/mediciones/bovino/{bovino['id']}")
+        assert ultima.headers["etag"] != listado.headers["etag"]
+
+    @pytest.mark.asyncio
+    async def test_recurso_ajeno_sin_etag(self, api, servicios):
+        finca = await servicios["fincas"].create_finca(FincaCreate(nombre="Ajena"), OTRO)
+
+        respuesta = await api.get(f"/fincas/{finca['id']}", headers={"If-None-Match": "*"})
+        assert respuesta.status_code == 404
+        assert "etag" not in respuesta.headers
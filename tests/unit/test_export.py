@@ -0,0 +1,168 @@
+"""
+Test de la exportación de mediciones
+====================================
+
+Exportaciones de bovino, finca y cuenta contra el backend falso de Supabase:
+la salida de cada formato (CSV, NDJSON, JSON y Parquet) se parsea y se
+compara con las filas, recorriendo varias páginas keyset. También el formato
+por defecto de los endpoints y el 501 de Parquet sin pyarrow.
+"""
+from datetime import date
+import csv
+import io
+import json
+import sys
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.config.settings import settings
+from app.controllers import medicion_controller
+from app.middleware.auth import get_current_user_id
+from app.models.bovino import BovinoCreate
+from app.models.finca import FincaCreate
+from app.models.medicion import MedicionCreate
+from app.services.export_service import BOVINO_COLUMNS, EXPORT_COLUMNS, ExportService
+
+PROPIETARIO = "2f1c7b3e-8d4a-4a57-9c1e-0f3b5d2a6e71"
+OTRO = "9a0b1c2d-3e4f-4a5b-8c6d-7e8f9a0b1c2d"
+
+
+@pytest.fixture
+def exportacion(monkeypatch, db, ownership):
+    # Páginas de 2 filas: cada exportación recorre varias páginas
+    monkeypatch.setattr(settings, "export_page_size", 2)
+    return ExportService(db, ownership=ownership)
+
+
+async def poblar(servicios):
+    """Finca con dos bovinos (3 y 2 mediciones) y una finca ajena"""
+    finca = await servicios["fincas"].create_finca(FincaCreate(nombre="Norte"), PROPIETARIO)
+    bovinos = []
+    for i, total in enumerate((3, 2)):
+        bovino = await servicios["bovinos"].create_bovino(BovinoCreate(id_bovino=f"B-{i}", finca_id=finca["id"]), PROPIETARIO)
+        for mes in range(1, total + 1):
+            await servicios["mediciones"].create_medicion(
+                MedicionCreate(bovino_id=bovino["id"], fecha=date(2024, mes, 1), altura_cm=100 + mes, edad_meses=mes), PROPIETARIO
+            )
+        bovinos.append(bovino)
+    ajena = await servicios["fincas"].create_finca(FincaCreate(nombre="Ajena"), OTRO)
+    ajeno = await servicios["bovinos"].create_bovino(BovinoCreate(id_bovino="X-1", finca_id=ajena["id"]), OTRO)
+    await servicios["mediciones"].create_medicion(MedicionCreate(bovino_id=ajeno["id"], fecha=date(2024, 1, 1)), OTRO)
+    return finca, bovinos
+
+
+async def leer(stream) -> bytes:
+    return b"".join([chunk async for chunk in stream])
+
+
+@pytest.mark.unit
+class TestExportFormatos:
+    """La salida de cada formato se parsea y contiene las filas esperadas"""
+
+    @pytest.mark.asyncio
+    async def test_csv(self, servicios, exportacion):
+        finca, _ = await poblar(servicios)
+
+        contenido = await leer(await exportacion.export_finca(finca["id"], PROPIETARIO, "csv"))
+        filas = list(csv.DictReader(io.StringIO(contenido.decode())))
+
+        assert list(filas[0]) == EXPORT_COLUMNS + BOVINO_COLUMNS
+        assert len(filas) == 5
+        assert {fila["id_bovino"] for fila in filas} == {"B-0", "B-1"}
+        assert {fila["finca_id"] for fila in filas} == {finca["id"]}
+        assert sorted(float(fila["altura_cm"]) for fila in filas) == [101, 101, 102, 102, 103]
+
+    @pytest.mark.asyncio
+    async def test_ndjson(self, servicios, exportacion):
+        _, bovinos = await poblar(servicios)
+
+        contenido = await leer(await exportacion.export_bovino(bovinos[0]["id"], PROPIETARIO, "ndjson"))
+        filas = [json.loads(linea) for linea in contenido.decode().splitlines()]
+
+        assert len(filas) == 3
+        assert all(list(fila) == EXPORT_COLUMNS for fila in filas)
+        assert sorted(fila["fecha"] for fila in filas) == ["2024-01-01", "2024-02-01", "2024-03-01"]
+
+    @pytest.mark.asyncio
+    async def test_json(self, servicios, exportacion):
+        _, bovinos = await poblar(servicios)
+
+        documento = json.loads(await leer(await exportacion.export_cuenta(PROPIETARIO, "json")))
+
+        assert documento["propietario_id"] == PROPIETARIO
+        assert documento["total_mediciones"] == len(documento["mediciones"]) == 5
+        assert {m["bovino_id"] for m in documento["mediciones"]} == {b["id"] for b in bovinos}
+        assert len({m["id"] for m in documento["mediciones"]}) == 5
+
+    @pytest.mark.asyncio
+    async def test_json_sin_mediciones(self, servicios, exportacion):
+        finca = await servicios["fincas"].create_finca(FincaCreate(nombre="Vacía"), PROPIETARIO)
+
+        documento = json.loads(await leer(await exportacion.export_finca(finca["id"], PROPIETARIO, "json")))
+
+        assert documento["mediciones"] == [] and documento["total_mediciones"] == 0
+
+    @pytest.mark.asyncio
+    async def test_parquet(self, servicios, exportacion):
+        pq = pytest.importorskip("pyarrow.parquet")
+        finca, _ = await poblar(servicios)
+
+        contenido = await leer(await exportacion.export_finca(finca["id"], PROPIETARIO, "parquet"))
+        tabla = pq.read_table(io.BytesIO(contenido))
+
+        assert tabla.column_names == EXPORT_COLUMNS + BOVINO_COLUMNS
+        assert tabla.num_rows == 5
+        assert sorted(tabla.column("altura_cm").to_pylist()) == [101.0, 101.0, 102.0, 102.0, 103.0]
+        assert sorted(tabla.column("edad_meses").to_pylist()) == [1, 1, 2, 2, 3]
+
+    @pytest.mark.asyncio
+    async def test_sin_permisos(self, servicios, exportacion):
+        finca, bovinos = await poblar(servicios)
+
+        with pytest.raises(PermissionError):
+            await exportacion.export_finca(finca["id"], OTRO, "csv")
+        with pytest.raises(PermissionError):
+            await exportacion.export_bovino(bovinos[0]["id"], OTRO, "csv")
+
+
+@pytest.mark.unit
+class TestExportEndpoints:
+    """Rutas de exportación con el router real"""
+
+    @pytest.fixture
+    def api(self, monkeypatch, exportacion):
+        monkeypatch.setattr(medicion_controller, "export_service", exportacion)
+        app = FastAPI()
+        app.include_router(medicion_controller.router)
+        app.dependency_overrides[get_current_user_id] = lambda: PROPIETARIO
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+    @pytest.mark.asyncio
+    async def test_formato_por_defecto_es_json(self, servicios, api):
+        finca, bovinos = await poblar(servicios)
+
+        async with api:
+            respuestas = [
+                await api.get("/mediciones/export"),
+                await api.get(f"/mediciones/finca/{finca['id']}/export"),
+                await api.get(f"/mediciones/bovino/{bovinos[0]['id']}/export"),
+            ]
+
+        for respuesta in respuestas:
+            assert respuesta.status_code == 200
+            assert respuesta.headers["content-type"] == "application/json"
+            assert respuesta.headers["content-disposition"].endswith('.json"')
+        assert [r.json()["total_mediciones"] for r in respuestas] == [5, 5, 3]
+
+    @pytest.mark.asyncio
+    async def test_parquet_sin_pyarrow(self, monkeypatch, servicios, api):
+        # None en sys.modules hace que el import falle con ImportError
+        monkeypatch.setitem(sys.modules, "pyarrow.parquet", None)
+
+        async with api:
+            respuesta = await api.get("/mediciones/export", params={"formato": "parquet"})
+
+        assert respuesta.status_code == 501
+        assert "pyarrow" in respuesta.json()["detail"]
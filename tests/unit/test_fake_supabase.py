@@ -0,0 +1,164 @@
+"""
+Test del backend falso de Supabase
+==================================
+
+Ejecuta los servicios reales contra PostgREST, Auth y Storage en memoria
+(sin red): filtros, embebidos !inner, paginación keyset, conteos, upsert,
+login y subida de objetos, además de la latencia inyectada.
+"""
+from datetime import date
+import time
+
+import httpx
+import pytest
+
+from app.config.settings import settings
+from app.fake_supabase import FakeSupabase
+from app.models.auth import UserLogin, UserRegister
+from app.models.bovino import BovinoCreate
+from app.models.finca import FincaCreate
+from app.models.medicion import MedicionCreate
+from app.services.auth_service import AuthService
+from app.services.image_service import ImageService
+from app.utils.pagination import decode_cursor
+
+PROPIETARIO = "2f1c7b3e-8d4a-4a57-9c1e-0f3b5d2a6e71"
+OTRO = "9a0b1c2d-3e4f-4a5b-8c6d-7e8f9a0b1c2d"
+
+
+@pytest.mark.unit
+class TestFakePostgrest:
+    """Consultas de los servicios contra el subconjunto de PostgREST"""
+
+    @pytest.mark.asyncio
+    async def test_flujo_finca_bovino_mediciones(self, servicios):
+        fincas, bovinos, mediciones = servicios["fincas"], servicios["bovinos"], servicios["mediciones"]
+        finca = await fincas.create_finca(FincaCreate(nombre="La Esperanza"), PROPIETARIO)
+        bovino = await bovinos.create_bovino(
+            BovinoCreate(id_bovino="B-1", sexo="Macho", finca_id=finca["id"]), PROPIETARIO
+        )
+        for mes in (1, 2, 3):
+            await mediciones.create_medicion(
+                MedicionCreate(bovino_id=bovino["id"], fecha=date(2024, mes, 1), altura_cm=120 + mes), PROPIETARIO
+            )
+
+        rango = await mediciones.get_mediciones_by_fecha_range(
+            bovino["id"], date(2024, 1, 15), date(2024, 3, 1), PROPIETARIO
+        )
+        assert [m["fecha"] for m in rango] == ["2024-03-01", "2024-02-01"]
+
+        ultima = await mediciones.get_ultima_medicion_bovino(bovino["id"], PROPIETARIO)
+        assert ultima["altura_cm"] == 123
+
+        completa = await fincas.get_finca_with_bovinos_and_mediciones(finca["id"], PROPIETARIO)
+        assert completa.bovinos[0].id_bovino == "B-1"
+
+        # El embebido !inner filtra por propietario: otro usuario no ve el bovino
+        with pytest.raises(Exception):
+            await mediciones.get_ultima_medicion_bovino(bovino["id"], OTRO)
+
+    @pytest.mark.asyncio
+    async def test_paginacion_keyset_y_conteo(self, servicios):
+        fincas = servicios["fincas"]
+        for i in range(5):
+            await fincas.create_finca(FincaCreate(nombre=f"Finca {i}"), PROPIETARIO)
+        await fincas.create_finca(FincaCreate(nombre="Ajena"), OTRO)
+
+        primera = await fincas.get_fincas_by_user(PROPIETARIO, limit=3, with_count=True)
+        assert len(primera.items) == 3 and primera.total == 5 and primera.next_cursor
+
+        segunda = await fincas.get_fincas_by_user(PROPIETARIO, limit=3, after=decode_cursor(primera.next_cursor))
+        ids = {f["id"] for f in primera.items} | {f["id"] for f in segunda.items}
+        assert len(segunda.items) == 2 and len(ids) == 5 and segunda.next_cursor is None
+
+    @pytest.mark.asyncio
+    async def test_ilike_upsert_y_borrado_en_cascada(self, backend, db, servicios):
+        fincas, bovinos = servicios["fincas"], servicios["bovinos"]
+        finca = await fincas.create_finca(FincaCreate(nombre="Norte"), PROPIETARIO)
+        bovino = await bovinos.create_bovino(BovinoCreate(id_bovino="ABC-7", finca_id=finca["id"]), PROPIETARIO)
+
+        encontrados = await db.table("bovinos").select("*").ilike("id_bovino", "%bc-%").execute()
+        assert [b["id"] for b in encontrados.data] == [bovino["id"]]
+
+        await db.table("perfiles").upsert({"id": PROPIETARIO, "nombre_completo": "Ana"}).execute()
+        await db.table("perfiles").upsert({"id": PROPIETARIO, "imagen_perfil": "x.webp"}).execute()
+        perfil = (await db.table("perfiles").select("*").eq("id", PROPIETARIO).execute()).data
+        assert perfil[0]["nombre_completo"] == "Ana" and perfil[0]["imagen_perfil"] == "x.webp"
+
+        assert await fincas.delete_finca(finca["id"], PROPIETARIO)
+        assert backend.store.tables["bovinos"] == []
+
+    @pytest.mark.asyncio
+    async def test_errores_con_formato_postgrest(self, db):
+        with pytest.raises(Exception) as error:
+            await db.table("no_existe").select("*").execute()
+        assert "42P01" in str(error.value)
+
+        await db.table("fincas").insert({"id": "f1", "nombre": "A", "propietario_id": PROPIETARIO}).execute()
+        with pytest.raises(Exception) as error:
+            await db.table("fincas").insert({"id": "f1", "nombre": "B", "propietario_id": PROPIETARIO}).execute()
+        assert "23505" in str(error.value)
+
+
+@pytest.mark.unit
+class TestFakeAuthStorage:
+    """Auth y Storage en memoria"""
+
+    @pytest.mark.asyncio
+    async def test_registro_login_y_validacion_local(self, backend, http, db):
+        service = AuthService(db_client=db, http_client=http)
+        service.admin_db = db
+        service.jwt_validator.secret = backend.auth.jwt_secret
+
+        registro = await service.register_user(UserRegister(email="ana@example.com", password="secreto1", nombre_completo="Ana"))
+        assert backend.store.tables["perfiles"][0]["nombre_completo"] == "Ana"
+
+        sesion = await service.login_user(UserLogin(email="ana@example.com", password="secreto1"))
+        token = sesion["session"].access_token
+        claims = await service.jwt_validator.decode(token)
+        assert claims["sub"] == registro["user"].id
+
+        with pytest.raises(Exception):
+            await service.login_user(UserLogin(email="ana@example.com", password="otra"))
+
+        respuesta = await http.get(
+            f"{settings.supabase_url}/auth/v1/user", headers={"Authorization": f"Bearer {token}"}
+        )
+        assert respuesta.json()["email"] == "ana@example.com"
+
+    @pytest.mark.asyncio
+    async def test_subida_listado_y_borrado_de_objetos(self, backend, http, db):
+        service = ImageService(db_client=db, http_client=http)
+        await service._upload_object("perfiles/u1.webp", b"imagen", "image/webp")
+        await service._upload_object("perfiles/u1.webp", b"imagen2", "image/webp")
+
+        publica = await http.head(service.public_url("perfiles/u1.webp"))
+        assert publica.status_code == 200 and publica.headers["content-type"] == "image/webp"
+
+        listado = await service._list_profile_objects()
+        assert [o["name"] for o in listado] == ["u1.webp"]
+        assert listado[0]["metadata"]["size"] == len(b"imagen2")
+
+        await service._delete_objects(["perfiles/u1.webp"])
+        assert backend.storage.objects[settings.bucket_name] == {}
+
+
+@pytest.mark.unit
+class TestFakeLatency:
+    """Latencia inyectada"""
+
+    def test_jitter_reproducible_con_semilla(self):
+        a = FakeSupabase(latency_ms=5, jitter_ms=10, seed=7)
+        b = FakeSupabase(latency_ms=5, jitter_ms=10, seed=7)
+        demoras = [a.delay() for _ in range(20)]
+        assert demoras == [b.delay() for _ in range(20)]
+        assert all(0.005 <= d <= 0.015 for d in demoras)
+
+    @pytest.mark.asyncio
+    async def test_latencia_se_aplica_por_peticion(self):
+        backend = FakeSupabase(latency_ms=30)
+        async with httpx.AsyncClient(transport=backend.async_transport()) as client:
+            inicio = time.perf_counter()
+            respuesta = await client.get(f"{settings.supabase_url}/auth/v1/health")
+        assert respuesta.status_code == 200
+        assert time.perf_counter() - inicio >= 0.03
@@ -0,0 +1,59 @@
+"""
+Test de la última medición por bovino
+=====================================
+
+get_ultimas_mediciones_by_bovinos contra el backend falso de Supabase: una
+fila por bovino desde la vista `ultimas_mediciones_bovinos` (una consulta por
+bloque de IDs) y el recorrido completo cuando la vista no existe.
+"""
+from datetime import date
+
+import pytest
+
+from app.models.bovino import BovinoCreate
+from app.models.finca import FincaCreate
+from app.models.medicion import MedicionCreate
+from app.services import finca_service as finca_service_module
+
+PROPIETARIO = "2f1c7b3e-8d4a-4a57-9c1e-0f3b5d2a6e71"
+
+
+async def poblar(servicios, bovinos=5, mediciones=4):
+    """Bovinos con varias mediciones; devuelve {bovino_id: fecha más reciente}"""
+    finca = await servicios["fincas"].create_finca(FincaCreate(nombre="Norte"), PROPIETARIO)
+    esperado = {}
+    for i in range(bovinos):
+        bovino = await servicios["bovinos"].create_bovino(BovinoCreate(id_bovino=f"B-{i}", finca_id=finca["id"]), PROPIETARIO)
+        # Fechas desordenadas: la última insertada no es la más reciente
+        fechas = [date(2024, 1 + (j * 5 + i) % 12, 1) for j in range(mediciones)]
+        lote = [MedicionCreate(bovino_id=bovino["id"], fecha=fecha) for fecha in fechas]
+        await servicios["mediciones"].create_mediciones_bulk(bovino["id"], lote, PROPIETARIO)
+        esperado[bovino["id"]] = str(max(fechas))
+    return esperado
+
+
+@pytest.mark.unit
+class TestUltimasMediciones:
+    """Una fila por bovino, con y sin la vista"""
+
+    @pytest.mark.asyncio
+    async def test_solo_la_ultima_por_bovino(self, monkeypatch, backend, servicios):
+        esperado = await poblar(servicios)
+        monkeypatch.setattr(finca_service_module, "BOVINO_IDS_CHUNK_SIZE", 2)
+        ids = list(esperado) + ["00000000-0000-4000-8000-000000000000"]  # sin mediciones
+
+        peticiones = backend.requests
+        ultimas = await servicios["fincas"].get_ultimas_mediciones_by_bovinos(ids)
+
+        assert {bovino_id: medicion["fecha"] for bovino_id, medicion in ultimas.items()} == esperado
+        # Una consulta por bloque de 2 IDs, no una página por cada medición
+        assert backend.requests - peticiones == 3
+
+    @pytest.mark.asyncio
+    async def test_sin_vista_recorre_las_mediciones(self, monkeypatch, servicios):
+        esperado = await poblar(servicios, bovinos=3)
+        monkeypatch.setattr(finca_service_module, "ULTIMAS_MEDICIONES_VIEW", "vista_sin_migrar")
+
+        ultimas = await servicios["fincas"].get_ultimas_mediciones_by_bovinos(list(esperado))
+
+        assert {bovino_id: medicion["fecha"] for bovino_id, medicion in ultimas.items()} == esperado
@@ -0,0 +1,115 @@
+"""
+Test de sondeos de salud
+========================
+
+Verifica que los sondeos guardan resultado y latencia, que los errores y
+timeouts marcan al servicio como no listo, que /livez y /readyz no hacen E/S
+y que un fallo de conexión en el arranque se recupera con los sondeos.
+"""
+import asyncio
+import httpx
+import pytest
+from app.core.health import UpstreamHealth
+from app.core.startup import StartupState
+
+
+def build_health(**probes):
+    return UpstreamHealth(probes=probes, interval=60, timeout=0.05)
+
+
+async def ok():
+    return None
+
+
+async def falla():
+    raise RuntimeError("PostgREST caído")
+
+
+async def lento():
+    await asyncio.sleep(1)
+
+
+@pytest.mark.unit
+class TestUpstreamHealth:
+    """Tests de UpstreamHealth y los endpoints de probe"""
+
+    @pytest.mark.asyncio
+    async def test_sondeos_exitosos_y_fallidos(self):
+        health = build_health(postgrest=ok, storage=falla, auth=lento)
+        assert not health.ready()
+        assert health.failing() == []
+
+        await health.check_all()
+
+        snapshot = health.snapshot()
+        assert snapshot["postgrest"]["ok"] is True
+        assert snapshot["postgrest"]["latency_ms"] >= 0
+        assert snapshot["storage"]["error"] == "PostgREST caído"
+        assert "Sin respuesta" in snapshot["auth"]["error"]
+        assert sorted(health.failing()) == ["auth", "storage"]
+        assert not health.ready()
+
+    @pytest.mark.asyncio
+    async def test_listo_solo_con_resultados_recientes(self):
+        health = build_health(postgrest=ok, storage=ok)
+        await health.check_all()
+        assert health.ready()
+
+        health._checked_at["storage"] -= 1000
+        assert not health.ready()
+        assert health.snapshot()["storage"]["stale"] is True
+
+    @pytest.mark.asyncio
+    async def test_probes_http_no_llaman_a_supabase(self, monkeypatch):
+        from app import main
+        llamadas = []
+
+        async def contar():
+            llamadas.append(1)
+
+        health = build_health(postgrest=contar)
+        monkeypatch.setattr(main, "upstream_health", health)
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+            livez = await client.get("/livez")
+            readyz = await client.get("/readyz")
+
+        assert livez.status_code == 200
+        assert readyz.status_code == 503
+        assert readyz.json()["upstream"]["postgrest"] == {"ok": None}
+        assert llamadas == []
+
+    @pytest.mark.asyncio
+    async def test_readyz_se_recupera_tras_fallo_en_el_arranque(self, monkeypatch):
+        from app import main
+        supabase_caido = True
+
+        async def postgrest():
+            if supabase_caido:
+                raise RuntimeError("connection refused")
+
+        # La verificación de base de datos del arranque falló y no se vuelve a ejecutar
+        arranque = StartupState()
+        for name in arranque.checks:
+            arranque.checks[name] = {"status": "error" if name == "database" else "ok"}
+        arranque.started_at = arranque.finished_at = 1.0
+        health = build_health(postgrest=postgrest)
+        monkeypatch.setattr(main, "startup_state", arranque)
+        monkeypatch.setattr(main, "upstream_health", health)
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+            await health.check_all()
+            caido = await client.get("/readyz")
+            supabase_caido = False
+            await health.check_all()
+            recuperado = await client.get("/readyz")
+            salud = await client.get("/health")
+
+        assert caido.status_code == 503
+        assert recuperado.status_code == 200
+        assert salud.json()["status"] == "healthy"
+
+        # Un error estático (p. ej. variables de entorno) sí deja la instancia fuera
+        arranque.checks["env"] = {"status": "error"}
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+            assert (await client.get("/readyz")).status_code == 503
@@ -0,0 +1,295 @@
+"""
+Test de subida de imágenes
+==========================
+
+Verifica la validación de imágenes, que la subida hace una sola petición
+por objeto a Storage y un solo upsert en perfiles, la deduplicación por
+contenido y el barrido de objetos huérfanos.
+"""
+import base64
+import io
+import json
+import pytest
+import httpx
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+from starlette.datastructures import UploadFile
+from app.services.image_service import (
+    ImageService,
+    ImageValidationError,
+    base_key_of,
+    decode_data_url,
+    validate_image
+)
+
+def build_png(width: int = 1500, height: int = 1000) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (120, 80, 40)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+PNG_BYTES = build_png()
+USER_ID = "11111111-1111-1111-1111-111111111111"
+
+
+class FakeTable:
+    """Tabla perfiles en memoria con el subconjunto de PostgREST que usa el servicio"""
+
+    def __init__(self, db):
+        self.db = db
+        self.filters = []
+        self.limit_size = None
+
+    def select(self, columns):
+        return self
+
+    @property
+    def not_(self):
+        return self
+
+    def is_(self, column, value):
+        self.filters.append(lambda row: row.get(column) is not None)
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def or_(self, condition):
+        last_id = condition.split('id.gt."', 1)[1].split('"', 1)[0]
+        self.filters.append(lambda row: row["id"] > last_id)
+        return self
+
+    def order(self, column, desc=False):
+        return self
+
+    def limit(self, size):
+        self.limit_size = size
+        return self
+
+    def upsert(self, data, **kwargs):
+        self.db.calls.append(("upsert", data))
+        self.db.perfiles = [row for row in self.db.perfiles if row["id"] != data["id"]] + [dict(data)]
+        return self
+
+    async def execute(self):
+        rows = sorted(
+            (row for row in self.db.perfiles if all(f(row) for f in self.filters)),
+            key=lambda row: row["id"]
+        )
+        return SimpleNamespace(data=rows[:self.limit_size] if self.limit_size else rows)
+
+
+class FakeDB:
+    def __init__(self):
+        self.calls = []
+        self.perfiles = []
+
+    def table(self, name):
+        self.calls.append(("table", name))
+        return FakeTable(self)
+
+
+def build_service(stored=None):
+    """ImageService con Storage y base de datos simulados (HEAD responde 404 si el objeto no está en `stored`)"""
+    requests = []
+    stored = set() if stored is None else stored
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.method == "HEAD":
+            return httpx.Response(200 if request.url.path in stored else 404)
+        stored.add(request.url.path)
+        return httpx.Response(200, json={"Key": "ok"})
+
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    db = FakeDB()
+    service = ImageService(db_client=db, http_client=http_client, executor=ThreadPoolExecutor(max_workers=1))
+    return service, requests, db
+
+
+@pytest.mark.unit
+class TestImageValidation:
+    """Tests de validación de imágenes"""
+
+    def test_decode_data_url(self):
+        """Un data URL válido se decodifica y el tipo sale de la firma del archivo"""
+        data_url = "data:image/png;base64," + base64.b64encode(PNG_BYTES).decode()
+        data, content_type = decode_data_url(data_url)
+        assert data == PNG_BYTES
+        assert content_type == "image/png"
+
+    def test_rechaza_contenido_no_imagen(self):
+        """Bytes que no son imagen se rechazan aunque el header diga image/png"""
+        data_url = "data:image/png;base64," + base64.b64encode(b"<html></html>").decode()
+        with pytest.raises(ImageValidationError):
+            decode_data_url(data_url)
+
+    def test_rechaza_tipo_no_permitido(self):
+        with pytest.raises(ImageValidationError):
+            validate_image(PNG_BYTES, "image/gif")
+
+
+@pytest.mark.unit
+class TestImageUpload:
+    """Tests del flujo de subida"""
+
+    @pytest.mark.asyncio
+    async def test_base64_una_peticion_y_un_upsert(self):
+        """La subida base64 hace un POST con x-upsert y un upsert en perfiles"""
+        service, requests, db = build_service()
+        data_url = "data:image/png;base64," + base64.b64encode(PNG_BYTES).decode()
+
+        result = await service.upload_profile_image_base64(data_url, USER_ID)
+
+        assert len(requests) == 4  # original + 3 variantes
+        assert all(request.method == "POST" and request.headers["x-upsert"] == "true" for request in requests)
+        assert [call for call in db.calls if call[0] == "upsert"] == [("upsert", {"id": USER_ID, "imagen_perfil": result["public_url"]})]
+        assert result["profile_updated"] is True
+        assert result["url"].startswith(f"perfiles/{USER_ID}_")
+
+    @pytest.mark.asyncio
+    async def test_multipart(self):
+        """La subida multipart usa el mismo flujo"""
+        service, requests, _ = build_service()
+        upload = UploadFile(io.BytesIO(PNG_BYTES), filename="foto.png", headers={"content-type": "image/png"})
+
+        result = await service.upload_profile_image_file(upload, USER_ID)
+
+        assert requests[0].content == PNG_BYTES
+        assert result["file_name"] == "foto.png"
+
+    @pytest.mark.asyncio
+    async def test_variantes_webp(self):
+        """Se generan variantes WebP con claves deterministas junto al original"""
+        service, requests, _ = build_service()
+        data_url = "data:image/png;base64," + base64.b64encode(PNG_BYTES).decode()
+
+        result = await service.upload_profile_image_base64(data_url, USER_ID)
+
+        base_key = result["url"].rsplit(".", 1)[0]
+        assert list(result["variantes"]) == ["64", "256", "1024"]
+        for size, url in result["variantes"].items():
+            assert url.endswith(f"{base_key}_{size}.webp")
+
+        subidas = {request.url.path.rsplit("/", 1)[-1]: request for request in requests}
+        variante = subidas[f"{base_key.rsplit('/', 1)[-1]}_1024.webp"]
+        assert variante.headers["content-type"] == "image/webp"
+        with Image.open(io.BytesIO(variante.content)) as image:
+            assert image.format == "WEBP"
+            assert image.size == (1024, 683)
+
+    @pytest.mark.asyncio
+    async def test_imagen_corrupta(self):
+        """Una firma PNG con contenido corrupto se rechaza sin subir nada"""
+        service, requests, _ = build_service()
+        data_url = "data:image/png;base64," + base64.b64encode(b"\x89PNG\r\n\x1a\n" + b"\x00" * 64).decode()
+
+        with pytest.raises(Exception):
+            await service.upload_profile_image_base64(data_url, USER_ID)
+        assert requests == []
+
+    @pytest.mark.asyncio
+    async def test_reintento_no_vuelve_a_subir(self):
+        """Los mismos bytes se direccionan a la misma clave y el reintento no sube nada"""
+        service, requests, db = build_service()
+        data_url = "data:image/png;base64," + base64.b64encode(PNG_BYTES).decode()
+
+        primero = await service.upload_profile_image_base64(data_url, USER_ID)
+        subidas = len(requests)
+        segundo = await service.upload_profile_image_base64(data_url, USER_ID)
+
+        assert segundo["url"] == primero["url"]
+        assert segundo["variantes"] == primero["variantes"]
+        assert [request.method for request in requests[subidas:]] == ["HEAD"]
+        assert len([call for call in db.calls if call[0] == "upsert"]) == 1
+
+    @pytest.mark.asyncio
+    async def test_reintento_tras_reinicio(self):
+        """Sin índice en memoria, el perfil que ya apunta a la imagen evita la subida"""
+        service, requests, db = build_service()
+        data_url = "data:image/png;base64," + base64.b64encode(PNG_BYTES).decode()
+        resultado = await service.upload_profile_image_base64(data_url, USER_ID)
+        requests.clear()
+
+        service.content_index.clear()
+        await service.upload_profile_image_base64(data_url, USER_ID)
+        assert [request.method for request in requests] == ["HEAD"]
+        assert db.perfiles == [{"id": USER_ID, "imagen_perfil": resultado["public_url"]}]
+
+    @pytest.mark.asyncio
+    async def test_volver_a_una_imagen_anterior_actualiza_el_perfil(self):
+        """A -> B -> A: la tercera subida no sube nada pero el perfil vuelve a apuntar a A"""
+        service, requests, db = build_service()
+        imagen_a = "data:image/png;base64," + base64.b64encode(PNG_BYTES).decode()
+        imagen_b = "data:image/png;base64," + base64.b64encode(build_png(800, 600)).decode()
+
+        a = await service.upload_profile_image_base64(imagen_a, USER_ID)
+        await service.upload_profile_image_base64(imagen_b, USER_ID)
+        subidas = len([request for request in requests if request.method == "POST"])
+        tercera = await service.upload_profile_image_base64(imagen_a, USER_ID)
+
+        assert tercera["profile_updated"] is True
+        assert len([request for request in requests if request.method == "POST"]) == subidas
+        assert db.perfiles == [{"id": USER_ID, "imagen_perfil": a["public_url"]}]
+
+    @pytest.mark.asyncio
+    async def test_objeto_borrado_se_vuelve_a_subir(self):
+        """Si el objeto ya no está en el bucket, un acierto del índice no alcanza"""
+        stored = set()
+        service, requests, _ = build_service(stored)
+        data_url = "data:image/png;base64," + base64.b64encode(PNG_BYTES).decode()
+        await service.upload_profile_image_base64(data_url, USER_ID)
+
+        # Borrado por el barrido de otro proceso: el índice local no se enteró
+        stored.clear()
+        requests.clear()
+        await service.upload_profile_image_base64(data_url, USER_ID)
+
+        assert requests[0].method == "HEAD"
+        assert len([request for request in requests if request.method == "POST"]) == 4
+
+
+@pytest.mark.unit
+class TestImageSweeper:
+    """Tests del barrido de imágenes huérfanas"""
+
+    def test_base_key(self):
+        """Original y variantes comparten la clave base"""
+        assert base_key_of("perfiles/u_abc.jpg") == "perfiles/u_abc"
+        assert base_key_of("perfiles/u_abc_256.webp") == "perfiles/u_abc"
+        assert base_key_of("perfiles/u_abc.webp") == "perfiles/u_abc"
+
+    @pytest.mark.asyncio
+    async def test_borra_solo_huerfanos_antiguos(self):
+        """Se borran los objetos no referenciados fuera del periodo de gracia"""
+        viejo = "2020-01-01T00:00:00Z"
+        nuevo = "2999-01-01T00:00:00Z"
+        objetos = [
+            {"id": "1", "name": "u1_actual.jpg", "created_at": viejo},
+            {"id": "2", "name": "u1_actual_64.webp", "created_at": viejo},
+            {"id": "3", "name": "u1_anterior.jpg", "created_at": viejo},
+            {"id": "4", "name": "u1_anterior_64.webp", "created_at": viejo},
+            {"id": "5", "name": "u2_en_curso.jpg", "created_at": nuevo},
+            {"id": None, "name": "subcarpeta"}
+        ]
+        borrados = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            if request.method == "POST" and "/object/list/" in request.url.path:
+                return httpx.Response(200, json=objetos)
+            if request.method == "DELETE":
+                borrados.extend(json.loads(request.content)["prefixes"])
+                return httpx.Response(200, json=[])
+            return httpx.Response(404)
+
+        db = FakeDB()
+        service = ImageService(db_client=db, http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+        db.perfiles = [
+            {"id": "a", "imagen_perfil": service.public_url("perfiles/u1_actual.jpg")},
+            {"id": "b", "imagen_perfil": None}
+        ]
+
+        assert await service.sweep_unreferenced_images() == 2
+        assert sorted(borrados) == ["perfiles/u1_anterior.jpg", "perfiles/u1_anterior_64.webp"]
@@ -0,0 +1,57 @@
+"""
+Test de presupuesto de arranque
+===============================
+
+Importa la aplicación en un intérprete nuevo y verifica que la importación
+no supera el presupuesto de tiempo, no crea clientes de Supabase (se crean
+de forma diferida) y no carga numpy.
+"""
+import json
+import os
+import subprocess
+import sys
+import pytest
+
+# Presupuesto en segundos; se puede ajustar en máquinas lentas de CI
+IMPORT_TIME_BUDGET_SECONDS = float(os.getenv("IMPORT_TIME_BUDGET_SECONDS", "3.0"))
+
+SCRIPT = """
+import json, sys, time
+inicio = time.perf_counter()
+import app.main
+duracion = time.perf_counter() - inicio
+from app.config import database
+print(json.dumps({
+    "segundos": duracion,
+    "clientes_creados": [n for n in ("supabase", "supabase_admin", "supabase_async", "supabase_admin_async", "async_http_client")
+                         if getattr(database, n).initialized],
+    "numpy_cargado": "numpy._core" in sys.modules or "numpy.core" in sys.modules
+}))
+"""
+
+
+@pytest.mark.unit
+class TestImportTime:
+    """Tests del costo de importar app.main"""
+
+    def test_importacion_dentro_del_presupuesto(self):
+        env = {
+            "SUPABASE_URL": "https://example.supabase.co",
+            "SUPABASE_ANON_KEY": "x",
+            "SUPABASE_SERVICE_ROLE_KEY": "y",
+            "SECRET_KEY": "z",
+            **os.environ,
+            "LOG_LEVEL": "WARNING"
+        }
+        raiz = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        salida = subprocess.run(
+            [sys.executable, "-c", SCRIPT], cwd=raiz, env=env, capture_output=True, text=True, timeout=60
+        )
+        assert salida.returncode == 0, salida.stderr
+        resultado = json.loads(salida.stdout.strip().splitlines()[-1])
+
+        assert resultado["clientes_creados"] == []
+        assert not resultado["numpy_cargado"]
+        assert resultado["segundos"] < IMPORT_TIME_BUDGET_SECONDS, (
+            f"Importar app.main tomó {resultado['segundos']:.2f}s (presupuesto {IMPORT_TIME_BUDGET_SECONDS}s)"
+        )
@@ -0,0 +1,101 @@
+"""
+Test del subsistema de logging
+==============================
+
+Verifica el formato JSON, la correlación por request_id, los niveles por
+módulo y que la escritura ocurre en el listener (fuera del hilo que emite).
+"""
+import io
+import json
+import logging
+import pytest
+from app.core.logging_config import request_id_var, setup_logging, shutdown_logging
+from app.middleware.request_id import RequestIdMiddleware
+
+
+@pytest.fixture
+def log_stream():
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    stream = io.StringIO()
+    setup_logging("INFO", "json", {"app.tests.ruidoso": "WARNING"}, stream=stream)
+    yield stream
+    shutdown_logging()
+    root.handlers[:] = handlers
+    root.setLevel(level)
+    logging.getLogger("app.tests.ruidoso").setLevel(logging.NOTSET)
+
+
+def lines(stream):
+    shutdown_logging()  # vacía la cola
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+@pytest.mark.unit
+class TestLoggingConfig:
+    """Tests de setup_logging y RequestIdMiddleware"""
+
+    def test_json_con_request_id_y_extras(self, log_stream):
+        token = request_id_var.set("abc123")
+        try:
+            logging.getLogger("app.tests").info("hola %s", "mundo", extra={"user_id": "u1"})
+        finally:
+            request_id_var.reset(token)
+
+        entry = lines(log_stream)[0]
+        assert entry["msg"] == "hola mundo"
+        assert entry["level"] == "INFO"
+        assert entry["logger"] == "app.tests"
+        assert entry["request_id"] == "abc123"
+        assert entry["user_id"] == "u1"
+
+    def test_niveles_por_modulo_y_excepciones(self, log_stream):
+        logging.getLogger("app.tests.ruidoso").info("descartado")
+        logging.getLogger("app.tests.ruidoso").warning("conservado")
+        try:
+            raise ValueError("fallo")
+        except ValueError:
+            logging.getLogger("app.tests").exception("con traza")
+
+        entries = lines(log_stream)
+        assert [e["msg"] for e in entries] == ["conservado", "con traza"]
+        assert "ValueError: fallo" in entries[1]["exc"]
+
+    @pytest.mark.asyncio
+    async def test_middleware_propaga_request_id(self, log_stream):
+        vistos = []
+
+        async def app(scope, receive, send):
+            vistos.append(request_id_var.get())
+            await send({"type": "http.response.start", "status": 204, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        enviados = []
+
+        async def send(message):
+            enviados.append(message)
+
+        scope = {"type": "http", "method": "GET", "path": "/health", "headers": [(b"x-request-id", b"req-1")]}
+        await RequestIdMiddleware(app)(scope, None, send)
+
+        assert vistos == ["req-1"]
+        assert (b"x-request-id", b"req-1") in enviados[0]["headers"]
+        assert request_id_var.get() == "-"
+        acceso = lines(log_stream)[-1]
+        assert acceso["request_id"] == "req-1"
+        assert acceso["status"] == 204
+        assert acceso["path"] == "/health"
+
+    def test_clientes_y_arranque_escriben_en_el_log(self, monkeypatch, capsys, log_stream):
+        import httpx
+        from app.config import database
+        from app.core.startup import print_status
+
+        monkeypatch.setattr(database, "async_http_client", database.LazyClient("prueba", httpx.AsyncClient))
+        database._create_async_client("clave", "admin")
+        print_status("Base de datos: Con errores", False)
+
+        entries = lines(log_stream)
+        assert [(e["logger"], e["level"]) for e in entries] == [("app.config.database", "INFO"), ("app.core.startup", "ERROR")]
+        assert entries[0]["msg"] == "Cliente Supabase asíncrono admin creado"
+        assert capsys.readouterr().out == ""
@@ -0,0 +1,111 @@
+"""
+Test de la creación de mediciones en lote
+=========================================
+
+Verifica que las filas se insertan por bloques, que un rechazo de PostgREST
+(4xx) se reintenta fila por fila y que un error de transporte no se reintenta
+(el bloque pudo haberse confirmado y el reintento duplicaría filas).
+"""
+from datetime import date
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from postgrest.exceptions import APIError
+
+from app.config.settings import settings
+from app.models.medicion import MedicionCreate
+from app.services.medicion_service import MedicionService, es_rechazo_de_filas
+from app.services.response_cache_service import ResponseCacheService
+
+BOVINO = "5b0e6f2a-1c3d-4e5f-8a9b-0c1d2e3f4a5b"
+PROPIETARIO = "2f1c7b3e-8d4a-4a57-9c1e-0f3b5d2a6e71"
+
+
+class FakeInsert:
+    def __init__(self, db, data):
+        self.db = db
+        self.data = data
+
+    async def execute(self):
+        filas = self.data if isinstance(self.data, list) else [self.data]
+        self.db.inserts.append(len(filas))
+        error = self.db.errores.pop(0) if self.db.errores else None
+        if error is not None:
+            raise error
+        if any(fila.get("altura_cm") == 999 for fila in filas):
+            raise APIError({"code": "23514", "message": "violates check constraint \"altura_maxima\""})
+        return SimpleNamespace(data=[dict(fila) for fila in filas])
+
+
+class FakeDB:
+    """mediciones_bovinos con errores programados por llamada (None: sin error)"""
+
+    def __init__(self, errores=None):
+        self.inserts = []
+        self.errores = list(errores or [])
+
+    def table(self, name):
+        return SimpleNamespace(insert=lambda data: FakeInsert(self, data))
+
+
+class FakeOwnership:
+    async def owns_bovino(self, bovino_id, propietario_id):
+        return True
+
+
+def build_service(db):
+    return MedicionService(db, ownership=FakeOwnership(), cache=ResponseCacheService(enabled=False))
+
+
+def build_mediciones(alturas):
+    return [MedicionCreate(bovino_id=BOVINO, fecha=date(2024, 1, 1), altura_cm=altura) for altura in alturas]
+
+
+@pytest.mark.unit
+class TestMedicionesBulk:
+    """Bloques y reintentos de create_mediciones_bulk"""
+
+    @pytest.mark.asyncio
+    async def test_inserta_por_bloques(self, monkeypatch):
+        monkeypatch.setattr(settings, "mediciones_batch_chunk_size", 2)
+        db = FakeDB()
+
+        resultado = await build_service(db).create_mediciones_bulk(BOVINO, build_mediciones([100, 110, 120, 130, 140]), PROPIETARIO)
+
+        assert db.inserts == [2, 2, 1]
+        assert [fila["altura_cm"] for fila in resultado["creadas"]] == [100, 110, 120, 130, 140]
+        assert resultado["errores"] == []
+
+    @pytest.mark.asyncio
+    async def test_rechazo_4xx_reintenta_fila_por_fila(self, monkeypatch):
+        monkeypatch.setattr(settings, "mediciones_batch_chunk_size", 3)
+        db = FakeDB()
+
+        resultado = await build_service(db).create_mediciones_bulk(BOVINO, build_mediciones([100, 999, 120, 130]), PROPIETARIO)
+
+        # Bloque de 3 rechazado, sus 3 filas una a una y luego el bloque final
+        assert db.inserts == [3, 1, 1, 1, 1]
+        assert [fila["altura_cm"] for fila in resultado["creadas"]] == [100, 120, 130]
+        assert [error["indice"] for error in resultado["errores"]] == [1]
+        assert "altura_maxima" in resultado["errores"][0]["error"]
+
+    @pytest.mark.asyncio
+    async def test_error_de_transporte_no_se_reintenta(self, monkeypatch):
+        monkeypatch.setattr(settings, "mediciones_batch_chunk_size", 2)
+        db = FakeDB(errores=[None, httpx.ReadTimeout("timeout")])
+
+        with pytest.raises(Exception, match="timeout"):
+            await build_service(db).create_mediciones_bulk(BOVINO, build_mediciones([100, 110, 120, 130, 140]), PROPIETARIO)
+
+        # Ni reintento fila por fila ni bloques posteriores
+        assert db.inserts == [2, 2]
+
+    def test_clasificacion_de_errores(self):
+        assert es_rechazo_de_filas(APIError({"code": "23505", "message": "duplicate key"}))
+        assert es_rechazo_de_filas(APIError({"code": "PGRST204", "message": "column not found"}))
+        # Timeout de la sentencia, pool agotado o gateway sin JSON: no es un rechazo de filas
+        assert not es_rechazo_de_filas(APIError({"code": "57014", "message": "statement timeout"}))
+        assert not es_rechazo_de_filas(APIError({"code": "PGRST003", "message": "pool timeout"}))
+        assert not es_rechazo_de_filas(APIError({"code": 504, "message": "JSON could not be generated"}))
+        assert not es_rechazo_de_filas(httpx.ConnectError("reset"))
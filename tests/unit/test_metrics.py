@@ -0,0 +1,90 @@
+"""
+Test de métricas Prometheus
+===========================
+
+Verifica el formato de exposición, la clasificación de llamadas a Supabase
+y que la latencia HTTP se etiqueta con la plantilla de la ruta.
+"""
+import httpx
+import pytest
+from fastapi import APIRouter, FastAPI
+from app.core.metrics import (
+    Histogram,
+    MetricsTransport,
+    classify_upstream,
+    http_request_duration,
+    upstream_request_duration
+)
+from app.middleware.metrics import MetricsMiddleware
+
+
+@pytest.mark.unit
+class TestMetrics:
+    """Tests del registro, el transporte instrumentado y el middleware"""
+
+    def test_histograma_acumula_buckets(self):
+        histograma = Histogram("prueba_seconds", "Prueba", ("ruta",), buckets=(0.1, 1.0))
+        histograma.observe(0.05, "/a")
+        histograma.observe(0.5, "/a")
+        histograma.observe(5, "/a")
+
+        texto = "\n".join(histograma.render())
+        assert '# TYPE prueba_seconds histogram' in texto
+        assert 'prueba_seconds_bucket{ruta="/a",le="0.1"} 1' in texto
+        assert 'prueba_seconds_bucket{ruta="/a",le="1"} 2' in texto
+        assert 'prueba_seconds_bucket{ruta="/a",le="+Inf"} 3' in texto
+        assert 'prueba_seconds_count{ruta="/a"} 3' in texto
+        assert 'prueba_seconds_sum{ruta="/a"} 5.55' in texto
+
+    @pytest.mark.parametrize("method, url, headers, esperado", [
+        ("GET", "/rest/v1/mediciones_bovinos?bovino_id=eq.1", {}, ("postgrest", "mediciones_bovinos", "select")),
+        ("POST", "/rest/v1/perfiles", {"prefer": "resolution=merge-duplicates"}, ("postgrest", "perfiles", "upsert")),
+        ("POST", "/rest/v1/rpc/ultimas_mediciones", {}, ("postgrest", "ultimas_mediciones", "rpc")),
+        ("POST", "/storage/v1/object/list/bucket", {}, ("storage", "bucket", "list")),
+        ("POST", "/storage/v1/object/bucket/perfiles/a.png", {}, ("storage", "bucket", "upload")),
+        ("GET", "/auth/v1/user", {}, ("auth", "user", "get")),
+        ("GET", "/auth/v1/admin/users/2f1c7b3e-8d4a-4a57-9c1e-0f3b5d2a6e71", {}, ("auth", "admin/users", "get")),
+    ])
+    def test_clasifica_llamadas_supabase(self, method, url, headers, esperado):
+        request = httpx.Request(method, "https://example.supabase.co" + url, headers=headers)
+        assert classify_upstream(request) == esperado
+
+    @pytest.mark.asyncio
+    async def test_transporte_mide_respuestas_y_errores(self):
+        def handler(request):
+            if request.url.path.endswith("caida"):
+                raise httpx.ConnectError("sin conexión", request=request)
+            return httpx.Response(200, json=[])
+
+        etiquetas = ("postgrest", "bovinos_metricas", "select", "200")
+        antes = upstream_request_duration.count(*etiquetas)
+        async with httpx.AsyncClient(transport=MetricsTransport(httpx.MockTransport(handler))) as client:
+            await client.get("https://example.supabase.co/rest/v1/bovinos_metricas")
+            with pytest.raises(httpx.ConnectError):
+                await client.get("https://example.supabase.co/rest/v1/caida")
+
+        assert upstream_request_duration.count(*etiquetas) == antes + 1
+        assert upstream_request_duration.count("postgrest", "caida", "select", "error") >= 1
+
+    @pytest.mark.asyncio
+    async def test_middleware_usa_plantilla_de_ruta(self):
+        app = FastAPI()
+        app.add_middleware(MetricsMiddleware)
+
+        router = APIRouter(prefix="/fincas_metricas")
+
+        @router.get("/{finca_id}")
+        async def finca(finca_id: str):
+            return {"id": finca_id}
+
+        api = APIRouter()
+        api.include_router(router)
+        app.include_router(api, prefix="/api/v1")
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            await client.get("/api/v1/fincas_metricas/1")
+            await client.get("/api/v1/fincas_metricas/2")
+            await client.get("/no-existe")
+
+        assert http_request_duration.count("GET", "/api/v1/fincas_metricas/{finca_id}", "200") == 2
+        assert http_request_duration.count("GET", "unmatched", "404") >= 1
@@ -0,0 +1,99 @@
+"""
+Test del índice de propiedad
+============================
+
+OwnershipService contra el backend falso de Supabase: un acierto de la caché
+no consulta PostgREST, los borrados de fincas y bovinos invalidan sus
+entradas y las entradas vencidas se vuelven a consultar.
+"""
+import time
+
+import pytest
+
+from app.config.settings import settings
+from app.models.bovino import BovinoCreate
+from app.models.finca import FincaCreate
+from app.services.ownership_service import OwnershipService
+
+PROPIETARIO = "2f1c7b3e-8d4a-4a57-9c1e-0f3b5d2a6e71"
+OTRO = "9a0b1c2d-3e4f-4a5b-8c6d-7e8f9a0b1c2d"
+
+
+async def poblar(servicios):
+    finca = await servicios["fincas"].create_finca(FincaCreate(nombre="Norte"), PROPIETARIO)
+    bovino = await servicios["bovinos"].create_bovino(BovinoCreate(id_bovino="B-1", finca_id=finca["id"]), PROPIETARIO)
+    return finca, bovino
+
+
+@pytest.mark.unit
+class TestOwnershipService:
+    """Aciertos, invalidación y expiración del índice bovino -> finca -> propietario"""
+
+    @pytest.mark.asyncio
+    async def test_acierto_sin_llamadas_a_postgrest(self, backend, db, servicios):
+        finca, bovino = await poblar(servicios)
+        ownership = OwnershipService(db)
+
+        peticiones = backend.requests
+        assert await ownership.owns_bovino(bovino["id"], PROPIETARIO)
+        # Una sola consulta combinada registra también la finca
+        assert backend.requests - peticiones == 1
+
+        peticiones = backend.requests
+        assert await ownership.owns_bovino(bovino["id"], PROPIETARIO)
+        assert await ownership.owns_finca(finca["id"], PROPIETARIO)
+        assert not await ownership.owns_finca(finca["id"], OTRO)
+        assert backend.requests == peticiones
+
+    @pytest.mark.asyncio
+    async def test_alta_registra_la_propiedad(self, backend, ownership, servicios):
+        finca, bovino = await poblar(servicios)
+
+        peticiones = backend.requests
+        assert await ownership.owns_finca(finca["id"], PROPIETARIO)
+        assert await ownership.owns_bovino(bovino["id"], PROPIETARIO)
+        assert backend.requests == peticiones
+
+    @pytest.mark.asyncio
+    async def test_inexistente_no_se_cachea(self, backend, ownership):
+        finca_id = "00000000-0000-4000-8000-000000000000"
+
+        assert not await ownership.owns_finca(finca_id, PROPIETARIO)
+        peticiones = backend.requests
+        assert not await ownership.owns_finca(finca_id, PROPIETARIO)
+        assert backend.requests - peticiones == 1
+
+    @pytest.mark.asyncio
+    async def test_borrar_bovino_lo_olvida(self, ownership, servicios):
+        _, bovino = await poblar(servicios)
+
+        assert await servicios["bovinos"].delete_bovino(bovino["id"], PROPIETARIO)
+
+        assert bovino["id"] not in ownership.bovino_fincas
+        assert not await ownership.owns_bovino(bovino["id"], PROPIETARIO)
+
+    @pytest.mark.asyncio
+    async def test_borrar_finca_olvida_sus_bovinos(self, ownership, servicios):
+        finca, bovino = await poblar(servicios)
+
+        assert await servicios["fincas"].delete_finca(finca["id"], PROPIETARIO)
+
+        assert finca["id"] not in ownership.finca_owners
+        assert not await ownership.owns_finca(finca["id"], PROPIETARIO)
+        # La entrada bovino -> finca sigue, pero sin propietario se vuelve a consultar
+        assert not await ownership.owns_bovino(bovino["id"], PROPIETARIO)
+
+    @pytest.mark.asyncio
+    async def test_entradas_vencidas_se_consultan(self, monkeypatch, backend, db, servicios):
+        finca, bovino = await poblar(servicios)
+        monkeypatch.setattr(settings, "ownership_cache_ttl_seconds", 0.01)
+        ownership = OwnershipService(db)
+        assert await ownership.owns_bovino(bovino["id"], PROPIETARIO)
+
+        time.sleep(0.02)
+        peticiones = backend.requests
+        assert await ownership.owns_bovino(bovino["id"], PROPIETARIO)
+        assert await ownership.owns_finca(finca["id"], PROPIETARIO)
+
+        # El bovino se vuelve a consultar y registra de nuevo la finca
+        assert backend.requests - peticiones == 1
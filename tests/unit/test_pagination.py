@@ -0,0 +1,76 @@
+"""
+Test de paginación keyset
+=========================
+
+Verifica los cursores opacos y que el límite se envía a PostgREST.
+"""
+import pytest
+from types import SimpleNamespace
+from app.utils.pagination import decode_cursor, encode_cursor, fetch_page
+
+
+class FakeQuery:
+    """Query builder mínimo que registra las llamadas y filtra en memoria"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    def or_(self, condition):
+        self.calls.append(("or", condition))
+        return self
+
+    def order(self, column, desc=False):
+        self.calls.append(("order", column, desc))
+        return self
+
+    def limit(self, size):
+        self.calls.append(("limit", size))
+        self.size = size
+        return self
+
+    async def execute(self):
+        return SimpleNamespace(data=self.rows[:self.size], count=None)
+
+
+@pytest.mark.unit
+class TestCursor:
+    """Tests de codificación de cursores"""
+
+    def test_roundtrip(self):
+        """El cursor conserva la clave (sort, id)"""
+        cursor = encode_cursor("2024-05-01T10:00:00+00:00", "abc")
+        assert "=" not in cursor
+        assert decode_cursor(cursor) == ("2024-05-01T10:00:00+00:00", "abc")
+
+    def test_invalido(self):
+        """Un cursor manipulado se rechaza"""
+        assert decode_cursor(None) is None
+        with pytest.raises(ValueError):
+            decode_cursor("no-es-un-cursor")
+
+
+@pytest.mark.unit
+class TestFetchPage:
+    """Tests de la página keyset"""
+
+    @pytest.mark.asyncio
+    async def test_limite_y_siguiente_cursor(self):
+        """Se piden limit + 1 filas y el cursor apunta a la última devuelta"""
+        rows = [{"id": str(i), "fecha": f"2024-01-{i + 1:02d}"} for i in range(5)]
+        query = FakeQuery(rows)
+        page = await fetch_page(query, 3, sort_column="fecha", desc=True)
+
+        assert ("limit", 4) in query.calls
+        assert len(page.items) == 3
+        assert decode_cursor(page.next_cursor) == ("2024-01-03", "2")
+        assert page.headers() == {"X-Next-Cursor": page.next_cursor}
+
+    @pytest.mark.asyncio
+    async def test_ultima_pagina(self):
+        """Sin filas extra no hay cursor siguiente y se aplica la condición keyset"""
+        query = FakeQuery([{"id": "9", "created_at": "2024-01-01"}])
+        page = await fetch_page(query, 10, after=("2023-12-31", "8"))
+
+        assert page.next_cursor is None
+        assert query.calls[0] == ("or", 'created_at.gt."2023-12-31",and(created_at.eq."2023-12-31",id.gt."8")')
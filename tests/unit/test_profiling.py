@@ -0,0 +1,77 @@
+"""
+Test del perfilado por petición
+===============================
+
+Verifica que solo se perfilan las peticiones con el token o el muestreo,
+que el ID vuelve en la respuesta y que el informe se genera desde el store.
+"""
+import httpx
+import pytest
+from fastapi import FastAPI
+from app.core.profiling import ProfileStore
+from app.middleware.profiling import ProfilingMiddleware
+
+
+def calculo_costoso():
+    return sum(i * i for i in range(20000))
+
+
+def build_app(store, **kwargs):
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware, store=store, path_prefix="/api/v1/", **kwargs)
+
+    @app.get("/api/v1/fincas/")
+    async def fincas():
+        return {"total": calculo_costoso()}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    return app
+
+
+async def get(app, path, headers=None):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        return await client.get(path, headers=headers)
+
+
+@pytest.mark.unit
+class TestProfiling:
+    """Tests de ProfilingMiddleware y ProfileStore"""
+
+    @pytest.mark.asyncio
+    async def test_perfila_con_token_valido(self):
+        store = ProfileStore()
+        app = build_app(store, token="secreto", sample_rate=0.0)
+
+        response = await get(app, "/api/v1/fincas/", {"X-Profile": "secreto"})
+
+        profile_id = response.headers["x-profile-id"]
+        assert store.list()[0]["id"] == profile_id
+        assert store.list()[0]["status"] == 200
+        report = store.report(profile_id, limit=100)
+        assert "calculo_costoso" in report
+        assert store.raw(profile_id)
+
+    @pytest.mark.asyncio
+    async def test_ignora_token_invalido_y_rutas_fuera_del_prefijo(self):
+        store = ProfileStore()
+        app = build_app(store, token="secreto", sample_rate=0.0)
+
+        sin_token = await get(app, "/api/v1/fincas/", {"X-Profile": "otro"})
+        fuera = await get(app, "/health", {"X-Profile": "secreto"})
+
+        assert "x-profile-id" not in sin_token.headers
+        assert "x-profile-id" not in fuera.headers
+        assert store.list() == []
+
+    @pytest.mark.asyncio
+    async def test_muestreo_sin_token(self):
+        store = ProfileStore(max_size=2)
+        app = build_app(store, token="", sample_rate=1.0)
+
+        for _ in range(3):
+            await get(app, "/api/v1/fincas/", {"X-Profile": ""})
+
+        assert len(store.list()) == 2
@@ -0,0 +1,180 @@
+"""
+Test de la caché de respuestas por usuario
+==========================================
+
+Aciertos sin llamadas a PostgREST, invalidación por generaciones desde las
+escrituras de los servicios, aislamiento por usuario y ámbito, y el
+almacenamiento con la API de redis.asyncio (sustituto en memoria).
+"""
+from datetime import date
+import time
+
+import pytest
+
+from app.models.bovino import BovinoCreate
+from app.models.finca import FincaCreate
+from app.models.medicion import MedicionCreate
+from app.services.response_cache_service import MemoryCacheBackend, RedisCacheBackend, ResponseCacheService
+
+PROPIETARIO = "2f1c7b3e-8d4a-4a57-9c1e-0f3b5d2a6e71"
+OTRO = "9a0b1c2d-3e4f-4a5b-8c6d-7e8f9a0b1c2d"
+
+
+class FakeRedis:
+    """Subconjunto de redis.asyncio usado por RedisCacheBackend"""
+
+    def __init__(self):
+        self.data = {}
+        self.closed = False
+
+    async def mget(self, keys):
+        ahora = time.monotonic()
+        return [valor if expira > ahora else None for valor, expira in (self.data.get(k, (None, 0)) for k in keys)]
+
+    async def set(self, key, value, px=None, nx=False):
+        if nx and (await self.mget([key]))[0] is not None:
+            return None
+        self.data[key] = (value, time.monotonic() + px / 1000)
+        return True
+
+    async def aclose(self):
+        self.closed = True
+
+
+class FallingBackend:
+    """Almacenamiento caído: toda operación falla"""
+
+    async def mget(self, keys):
+        raise ConnectionError("sin conexión")
+
+    async def set(self, key, value, ttl, only_if_absent=False):
+        raise ConnectionError("sin conexión")
+
+
+@pytest.fixture
+def cache():
+    return ResponseCacheService(backend=MemoryCacheBackend(1000), ttl=60, enabled=True)
+
+
+@pytest.mark.unit
+class TestResponseCacheServicios:
+    """Lecturas cacheadas de FincaService y BovinoService"""
+
+    @pytest.mark.asyncio
+    async def test_acierto_sin_llamadas_a_postgrest(self, backend, servicios):
+        fincas = servicios["fincas"]
+        await fincas.create_finca(FincaCreate(nombre="Norte"), PROPIETARIO)
+
+        primera = await fincas.get_fincas_by_user(PROPIETARIO, limit=10, with_count=True)
+        peticiones = backend.requests
+        segunda = await fincas.get_fincas_by_user(PROPIETARIO, limit=10, with_count=True)
+
+        assert backend.requests == peticiones
+        assert segunda.items == primera.items and segunda.total == 1
+
+        # Otros parámetros son otra entrada
+        await fincas.get_fincas_by_user(PROPIETARIO, limit=5)
+        assert backend.requests > peticiones
+
+    @pytest.mark.asyncio
+    async def test_escrituras_invalidan(self, servicios):
+        fincas, bovinos = servicios["fincas"], servicios["bovinos"]
+        finca = await fincas.create_finca(FincaCreate(nombre="Norte"), PROPIETARIO)
+        assert len((await fincas.get_fincas_by_user(PROPIETARIO, limit=10)).items) == 1
+
+        await fincas.create_finca(FincaCreate(nombre="Sur"), PROPIETARIO)
+        assert len((await fincas.get_fincas_by_user(PROPIETARIO, limit=10)).items) == 2
+
+        assert (await bovinos.get_bovinos_by_finca(finca["id"], PROPIETARIO, limit=10)).items == []
+        _, lista = await fincas.get_finca_with_bovinos(finca["id"], PROPIETARIO, limit=10)
+        assert lista.items == []
+
+        bovino = await bovinos.create_bovino(BovinoCreate(id_bovino="B-1", finca_id=finca["id"]), PROPIETARIO)
+        assert [b["id"] for b in (await bovinos.get_bovinos_by_finca(finca["id"], PROPIETARIO, limit=10)).items] == [bovino["id"]]
+        con_bovinos, lista = await fincas.get_finca_with_bovinos(finca["id"], PROPIETARIO, limit=10)
+        assert con_bovinos["bovinos"] == lista.items and len(lista.items) == 1
+
+        await bovinos.delete_bovino(bovino["id"], PROPIETARIO)
+        assert (await bovinos.get_bovinos_by_finca(finca["id"], PROPIETARIO, limit=10)).items == []
+
+    @pytest.mark.asyncio
+    async def test_ambitos_y_usuarios_aislados(self, backend, servicios):
+        fincas, bovinos, mediciones = servicios["fincas"], servicios["bovinos"], servicios["mediciones"]
+        finca = await fincas.create_finca(FincaCreate(nombre="Norte"), PROPIETARIO)
+        bovino = await bovinos.create_bovino(BovinoCreate(id_bovino="B-1", finca_id=finca["id"]), PROPIETARIO)
+        await fincas.get_fincas_by_user(PROPIETARIO, limit=10)
+        await fincas.get_fincas_by_user(OTRO, limit=10)
+
+        # Una medición no toca los listados de fincas
+        await mediciones.create_medicion(MedicionCreate(bovino_id=bovino["id"], fecha=date(2024, 1, 1)), PROPIETARIO)
+        peticiones = backend.requests
+        await fincas.get_fincas_by_user(PROPIETARIO, limit=10)
+        assert backend.requests == peticiones
+
+        # Las escrituras de un usuario no invalidan las entradas de otro
+        await fincas.create_finca(FincaCreate(nombre="Ajena"), OTRO)
+        peticiones = backend.requests
+        assert len((await fincas.get_fincas_by_user(PROPIETARIO, limit=10)).items) == 1
+        assert backend.requests == peticiones
+        assert len((await fincas.get_fincas_by_user(OTRO, limit=10)).items) == 1
+
+    @pytest.mark.asyncio
+    async def test_sin_permisos_no_se_cachea(self, servicios):
+        fincas, bovinos = servicios["fincas"], servicios["bovinos"]
+        finca = await fincas.create_finca(FincaCreate(nombre="Norte"), PROPIETARIO)
+
+        assert await fincas.get_finca_with_bovinos(finca["id"], OTRO, limit=10) == (None, None)
+        with pytest.raises(Exception):
+            await bovinos.get_bovinos_by_finca(finca["id"], OTRO, limit=10)
+        with pytest.raises(Exception):
+            await bovinos.get_bovinos_by_finca(finca["id"], OTRO, limit=10)
+
+
+@pytest.mark.unit
+class TestResponseCacheService:
+    """Servicio de caché y almacenamientos"""
+
+    @pytest.mark.asyncio
+    async def test_backend_redis(self):
+        cliente = FakeRedis()
+        cache = ResponseCacheService(backend=RedisCacheBackend(cliente), ttl=60, enabled=True)
+        llamadas = []
+
+        async def loader():
+            llamadas.append(1)
+            return {"n": len(llamadas)}
+
+        assert await cache.cached("r", "u", ("fincas",), {"a": 1}, loader) == {"n": 1}
+        assert await cache.cached("r", "u", ("fincas",), {"a": 1}, loader) == {"n": 1}
+        await cache.invalidate("u", ("fincas",))
+        assert await cache.cached("r", "u", ("fincas",), {"a": 1}, loader) == {"n": 2}
+
+        await cache.close()
+        assert cliente.closed
+
+    @pytest.mark.asyncio
+    async def test_falla_del_almacenamiento_usa_loader(self):
+        cache = ResponseCacheService(backend=FallingBackend(), enabled=True)
+
+        async def loader():
+            return [1, 2]
+
+        assert await cache.cached("r", "u", ("fincas",), {}, loader) == [1, 2]
+        await cache.invalidate("u", ("fincas",))
+
+    @pytest.mark.asyncio
+    async def test_none_y_deshabilitada_no_cachean(self):
+        llamadas = []
+
+        async def loader():
+            llamadas.append(1)
+            return None
+
+        cache = ResponseCacheService(backend=MemoryCacheBackend(10), enabled=True)
+        await cache.cached("r", "u", ("fincas",), {}, loader)
+        await cache.cached("r", "u", ("fincas",), {}, loader)
+        assert len(llamadas) == 2
+
+        deshabilitada = ResponseCacheService(backend=MemoryCacheBackend(10), enabled=False)
+        await deshabilitada.cached("r", "u", ("fincas",), {}, loader)
+        assert len(llamadas) == 3 and len(deshabilitada.backend.cache) == 0
@@ -0,0 +1,176 @@
+"""
+Test de la sincronización incremental
+=====================================
+
+GET /sync contra el backend falso de Supabase: cambios después del watermark,
+bajas registradas por los servicios, paginación entre flujos y respuesta
+comprimida con gzip.
+"""
+from datetime import date, datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+from app.controllers import sync_controller
+from app.middleware.auth import get_current_user_id
+from app.models.bovino import BovinoCreate, BovinoUpdate
+from app.models.finca import FincaCreate
+from app.models.medicion import MedicionCreate
+from app.services.sync_service import SyncService, decode_token
+
+PROPIETARIO = "2f1c7b3e-8d4a-4a57-9c1e-0f3b5d2a6e71"
+OTRO = "9a0b1c2d-3e4f-4a5b-8c6d-7e8f9a0b1c2d"
+
+
+async def sincronizar_todo(sync, since=None, limit=100):
+    """Repite GET /sync mientras haya más; devuelve (cambios acumulados, watermark, llamadas)"""
+    acumulado = {"fincas": [], "bovinos": [], "mediciones": [], "eliminados": []}
+    llamadas = 0
+    while True:
+        cambios = await sync.get_cambios(PROPIETARIO, since, limit)
+        llamadas += 1
+        for nombre in acumulado:
+            acumulado[nombre].extend(cambios[nombre])
+        since = cambios["watermark"]
+        if not cambios["has_more"]:
+            return acumulado, since, llamadas
+
+
+@pytest.mark.unit
+class TestSyncService:
+    """Cambios por flujo y bajas"""
+
+    @pytest.mark.asyncio
+    async def test_solo_cambios_despues_del_watermark(self, servicios):
+        fincas, bovinos, mediciones, sync = (
+            servicios["fincas"], servicios["bovinos"], servicios["mediciones"], servicios["sync"]
+        )
+        finca = await fincas.create_finca(FincaCreate(nombre="Norte"), PROPIETARIO)
+        await fincas.create_finca(FincaCreate(nombre="Ajena"), OTRO)
+        bovino = await bovinos.create_bovino(BovinoCreate(id_bovino="B-1", finca_id=finca["id"]), PROPIETARIO)
+        otro_bovino = await bovinos.create_bovino(BovinoCreate(id_bovino="B-2", finca_id=finca["id"]), PROPIETARIO)
+        await mediciones.create_medicion(MedicionCreate(bovino_id=bovino["id"], fecha=date(2024, 1, 1)), PROPIETARIO)
+
+        inicial, watermark, _ = await sincronizar_todo(sync)
+        assert [f["nombre"] for f in inicial["fincas"]] == ["Norte"]
+        assert len(inicial["bovinos"]) == 2 and len(inicial["mediciones"]) == 1
+        assert "fincas" not in inicial["bovinos"][0] and "bovinos" not in inicial["mediciones"][0]
+
+        # Sin cambios: respuesta vacía
+        vacio, mismo, _ = await sincronizar_todo(sync, watermark)
+        assert not any(vacio.values()) and decode_token(mismo) == decode_token(watermark)
+
+        await bovinos.update_bovino(bovino["id"], BovinoUpdate(raza="Brahman"), PROPIETARIO)
+        await bovinos.delete_bovino(otro_bovino["id"], PROPIETARIO)
+        delta, _, _ = await sincronizar_todo(sync, watermark)
+
+        assert [b["raza"] for b in delta["bovinos"]] == ["Brahman"]
+        assert delta["fincas"] == [] and delta["mediciones"] == []
+        assert [(e["tabla"], e["id"]) for e in delta["eliminados"]] == [("bovinos", otro_bovino["id"])]
+
+    @pytest.mark.asyncio
+    async def test_paginacion_entre_flujos(self, servicios):
+        fincas, bovinos, sync = servicios["fincas"], servicios["bovinos"], servicios["sync"]
+        finca = await fincas.create_finca(FincaCreate(nombre="Norte"), PROPIETARIO)
+        for i in range(6):
+            await bovinos.create_bovino(BovinoCreate(id_bovino=f"B-{i}", finca_id=finca["id"]), PROPIETARIO)
+
+        primera = await sync.get_cambios(PROPIETARIO, None, 4)
+        assert len(primera["fincas"]) == 1 and len(primera["bovinos"]) == 3 and primera["has_more"]
+
+        todo, _, llamadas = await sincronizar_todo(sync, limit=4)
+        assert llamadas == 2
+        assert len({b["id"] for b in todo["bovinos"]}) == 6
+
+    @pytest.mark.asyncio
+    async def test_bajas_de_cada_servicio(self, servicios):
+        fincas, bovinos, mediciones, sync = (
+            servicios["fincas"], servicios["bovinos"], servicios["mediciones"], servicios["sync"]
+        )
+        finca = await fincas.create_finca(FincaCreate(nombre="Norte"), PROPIETARIO)
+        bovino = await bovinos.create_bovino(BovinoCreate(id_bovino="B-1", finca_id=finca["id"]), PROPIETARIO)
+        medicion = await mediciones.create_medicion(MedicionCreate(bovino_id=bovino["id"], fecha=date(2024, 1, 1)), PROPIETARIO)
+        _, watermark, _ = await sincronizar_todo(sync)
+
+        await mediciones.delete_medicion(medicion["id"], PROPIETARIO)
+        await fincas.delete_finca(finca["id"], PROPIETARIO)
+        delta, _, _ = await sincronizar_todo(sync, watermark)
+
+        # El bovino se borró en cascada con la finca y también tiene su baja
+        assert [(e["tabla"], e["id"]) for e in delta["eliminados"]] == [
+            ("mediciones", medicion["id"]), ("fincas", finca["id"]), ("bovinos", bovino["id"])
+        ]
+
+    @pytest.mark.asyncio
+    async def test_bajas_fuera_de_la_api_y_en_cascada(self, servicios):
+        fincas, bovinos, mediciones, sync = (
+            servicios["fincas"], servicios["bovinos"], servicios["mediciones"], servicios["sync"]
+        )
+        finca = await fincas.create_finca(FincaCreate(nombre="Norte"), PROPIETARIO)
+        bovino = await bovinos.create_bovino(BovinoCreate(id_bovino="B-1", finca_id=finca["id"]), PROPIETARIO)
+        medicion = await mediciones.create_medicion(MedicionCreate(bovino_id=bovino["id"], fecha=date(2024, 1, 1)), PROPIETARIO)
+        _, watermark, _ = await sincronizar_todo(sync)
+
+        # Borrado directo en la base (SQL Editor, otro servicio): lo registra el trigger
+        await sync.db.table('bovinos').delete().eq('id', bovino["id"]).execute()
+        delta, _, _ = await sincronizar_todo(sync, watermark)
+
+        assert [(e["tabla"], e["id"]) for e in delta["eliminados"]] == [
+            ("bovinos", bovino["id"]), ("mediciones", medicion["id"])
+        ]
+        assert (await sync.get_cambios(OTRO, None, 100))["eliminados"] == []
+
+    @pytest.mark.asyncio
+    async def test_confirmacion_tardia_no_se_pierde(self, servicios):
+        fincas, db = servicios["fincas"], servicios["sync"].db
+        ahora = datetime.now(timezone.utc)
+
+        async def insertar(nombre, antiguedad):
+            marca = (ahora - timedelta(seconds=antiguedad)).isoformat()
+            await db.table('fincas').insert({"nombre": nombre, "propietario_id": PROPIETARIO, "updated_at": marca}).execute()
+
+        await insertar("Antigua", 60)
+        await fincas.create_finca(FincaCreate(nombre="Norte"), PROPIETARIO)
+        sin_margen, con_margen = SyncService(db, safety_lag=0), SyncService(db, safety_lag=30)
+        rapido = await sin_margen.get_cambios(PROPIETARIO, None, 100)
+        lento = await con_margen.get_cambios(PROPIETARIO, None, 100)
+        assert [f["nombre"] for f in rapido["fincas"]] == ["Antigua", "Norte"]
+        # Lo posterior a now() - margen puede tener transacciones en vuelo: todavía no se entrega
+        assert [f["nombre"] for f in lento["fincas"]] == ["Antigua"]
+
+        # Una transacción lenta confirma una fila con updated_at anterior a "Norte"
+        await insertar("Tardía", 20)
+
+        # Pasado el margen (simulado con margen 0) la fila llega; sin margen se perdió
+        con_margen.safety_lag = 0
+        assert [f["nombre"] for f in (await con_margen.get_cambios(PROPIETARIO, lento["watermark"], 100))["fincas"]] == ["Tardía", "Norte"]
+        assert (await sin_margen.get_cambios(PROPIETARIO, rapido["watermark"], 100))["fincas"] == []
+
+    @pytest.mark.asyncio
+    async def test_token_invalido(self, servicios):
+        with pytest.raises(ValueError):
+            await servicios["sync"].get_cambios(PROPIETARIO, "no-es-un-token", 10)
+
+
+@pytest.mark.unit
+class TestSyncEndpoint:
+    """Ruta GET /api/v1/sync/ con la aplicación completa"""
+
+    @pytest.mark.asyncio
+    async def test_respuesta_comprimida(self, monkeypatch, servicios):
+        from app import main
+        finca = await servicios["fincas"].create_finca(FincaCreate(nombre="Norte"), PROPIETARIO)
+        for i in range(30):
+            await servicios["bovinos"].create_bovino(BovinoCreate(id_bovino=f"B-{i}", finca_id=finca["id"]), PROPIETARIO)
+
+        monkeypatch.setattr(sync_controller, "sync_service", servicios["sync"])
+        monkeypatch.setitem(main.app.dependency_overrides, get_current_user_id, lambda: PROPIETARIO)
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+            respuesta = await client.get("/api/v1/sync/", headers={"Accept-Encoding": "gzip"})
+            invalido = await client.get("/api/v1/sync/", params={"since": "###"})
+
+        assert respuesta.status_code == 200
+        assert respuesta.headers["content-encoding"] == "gzip"
+        assert len(respuesta.json()["bovinos"]) == 30
+        assert invalido.status_code == 400
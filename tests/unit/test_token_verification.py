@@ -0,0 +1,213 @@
+"""
+Test de verificación de tokens
+==============================
+
+Verifica la caché TTL, la validación local de JWT sin llamadas a Supabase y
+las revocaciones del logout (locales y compartidas entre workers).
+"""
+import time
+import httpx
+import pytest
+import jwt
+from fastapi import FastAPI
+from app.config.settings import settings
+from app.controllers import auth_controller
+from app.middleware.auth import get_current_user_id
+from app.services.auth_service import AuthService
+from app.services.response_cache_service import MemoryCacheBackend, ResponseCacheService
+from app.utils.cache import TTLCache
+
+TEST_JWT_SECRET = "secreto-de-pruebas-con-longitud-suficiente"
+
+
+def build_token(secret: str = TEST_JWT_SECRET, expires_in: int = 3600, audience: str = "authenticated",
+                session_id: str = None) -> str:
+    """Genera un token con la forma de los emitidos por Supabase Auth"""
+    claims = {
+        "sub": "11111111-1111-1111-1111-111111111111",
+        "email": "test@example.com",
+        "aud": audience,
+        "exp": int(time.time()) + expires_in,
+        "user_metadata": {"nombre_completo": "Usuario Test"},
+        "app_metadata": {"provider": "email"}
+    }
+    if session_id:
+        claims["session_id"] = session_id
+    return jwt.encode(claims, secret, algorithm="HS256")
+
+
+def build_service(cache=None) -> AuthService:
+    """AuthService sin respaldo remoto; `cache` guarda las revocaciones si es compartida"""
+    service = AuthService(cache=cache or ResponseCacheService(enabled=False))
+
+    async def remote_not_allowed(token):
+        raise AssertionError("No se esperaba verificación remota")
+
+    service._verify_token_remote = remote_not_allowed
+    return service
+
+
+def shared_cache() -> ResponseCacheService:
+    """Caché compartida entre workers, como RedisCacheBackend"""
+    backend = MemoryCacheBackend(1000)
+    backend.shared = True
+    return ResponseCacheService(backend=backend, enabled=True)
+
+
+@pytest.fixture
+def auth_service_local(monkeypatch):
+    """AuthService con secreto JWT local y sin respaldo remoto"""
+    monkeypatch.setattr(settings, "supabase_jwt_secret", TEST_JWT_SECRET)
+    monkeypatch.setattr(settings, "auth_force_remote_verification", False)
+    return build_service()
+
+
+@pytest.mark.unit
+class TestTTLCache:
+    """Tests de la caché LRU con expiración"""
+
+    def test_get_and_expire(self):
+        """Las entradas expiran según su TTL"""
+        cache = TTLCache(max_size=10, default_ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2, ttl=0.01)
+        time.sleep(0.02)
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+
+    def test_lru_eviction(self):
+        """Al superar el tamaño se descarta la entrada menos usada"""
+        cache = TTLCache(max_size=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert "a" in cache
+        assert "b" not in cache
+        assert cache.stats()["evictions"] == 1
+
+
+@pytest.mark.unit
+class TestLocalTokenVerification:
+    """Tests de validación local de JWT"""
+
+    @pytest.mark.asyncio
+    async def test_valid_token_is_cached(self, auth_service_local):
+        """Un token válido se verifica localmente y luego sale de la caché"""
+        token = build_token()
+        user = await auth_service_local.verify_token(token)
+        assert user["id"] == "11111111-1111-1111-1111-111111111111"
+        assert user["email"] == "test@example.com"
+
+        await auth_service_local.verify_token(token)
+        stats = auth_service_local.get_token_cache_stats()
+        assert stats["verifications"]["local"] == 1
+        assert stats["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_invalid_tokens_rejected(self, auth_service_local):
+        """Firma, expiración o audiencia inválidas se rechazan sin consultar Supabase"""
+        assert await auth_service_local.verify_token(build_token(secret="otro-secreto-distinto-de-pruebas")) is None
+        assert await auth_service_local.verify_token(build_token(expires_in=-60)) is None
+        assert await auth_service_local.verify_token(build_token(audience="otra")) is None
+
+    @pytest.mark.asyncio
+    async def test_revoked_token(self, auth_service_local):
+        """Un token revocado deja de ser válido aunque esté en caché"""
+        token = build_token()
+        assert await auth_service_local.verify_token(token) is not None
+        await auth_service_local.revoke_token(token)
+        assert await auth_service_local.verify_token(token) is None
+
+
+@pytest.mark.unit
+class TestRevocaciones:
+    """Revocaciones del logout entre workers y bajo presión de memoria"""
+
+    @pytest.mark.asyncio
+    async def test_revocacion_compartida_entre_workers(self, auth_service_local):
+        cache = shared_cache()
+        worker_a, worker_b = build_service(cache), build_service(cache)
+        token = build_token()
+        assert await worker_b.verify_token(token) is not None
+
+        await worker_a.revoke_token(token)
+
+        # worker_b tenía el usuario en su caché de tokens y aun así lo rechaza
+        assert await worker_b.verify_token(token) is None
+        assert await worker_b.verify_token(build_token(expires_in=3000)) is not None
+
+    @pytest.mark.asyncio
+    async def test_revocaciones_locales_no_se_descartan_por_lru(self, monkeypatch, auth_service_local):
+        monkeypatch.setattr(settings, "token_cache_max_size", 2)
+        service = build_service()
+        tokens = [build_token(expires_in=3600 + i) for i in range(5)]
+
+        for token in tokens:
+            await service.revoke_token(token)
+
+        for token in tokens:
+            assert await service.verify_token(token) is None
+        assert service.get_token_cache_stats()["revoked"] == 5
+
+    @pytest.mark.asyncio
+    async def test_sesion_cerrada_se_verifica_en_supabase(self, auth_service_local):
+        remotas = []
+
+        async def remote(token):
+            remotas.append(token)
+            return None  # Supabase ya cerró la sesión
+
+        auth_service_local._verify_token_remote = remote
+        await auth_service_local.revoke_token(build_token(session_id="sesion-1"))
+        renovado = build_token(expires_in=3000, session_id="sesion-1")
+
+        assert await auth_service_local.verify_token(renovado) is None
+        assert remotas == [renovado]
+        # Otra sesión del mismo usuario sigue validándose localmente
+        assert await auth_service_local.verify_token(build_token(session_id="sesion-2")) is not None
+
+    @pytest.mark.asyncio
+    async def test_sin_almacenamiento_compartido_se_verifica_en_supabase(self, auth_service_local):
+        class Caido(MemoryCacheBackend):
+            shared = True
+
+            async def mget(self, keys):
+                raise ConnectionError("sin conexión")
+
+        remotas = []
+
+        async def remote(token):
+            remotas.append(token)
+            return {"id": "11111111-1111-1111-1111-111111111111"}
+
+        service = build_service(ResponseCacheService(backend=Caido(10), enabled=True))
+        service._verify_token_remote = remote
+        token = build_token()
+
+        assert await service.verify_token(token) is not None
+        assert remotas == [token]
+
+
+@pytest.mark.unit
+class TestVerifyStatsEndpoint:
+    """GET /auth/verify/stats solo para administradores"""
+
+    @pytest.mark.asyncio
+    async def test_solo_administradores(self, monkeypatch, auth_service_local):
+        admin = "22222222-2222-2222-2222-222222222222"
+        monkeypatch.setattr(auth_controller, "auth_service", auth_service_local)
+        monkeypatch.setattr(settings, "admin_user_ids", [admin])
+        app = FastAPI()
+        app.include_router(auth_controller.router)
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            anonimo = await client.get("/auth/verify/stats")
+            app.dependency_overrides[get_current_user_id] = lambda: "11111111-1111-1111-1111-111111111111"
+            comun = await client.get("/auth/verify/stats")
+            app.dependency_overrides[get_current_user_id] = lambda: admin
+            respuesta = await client.get("/auth/verify/stats")
+
+        assert anonimo.status_code in (401, 403)
+        assert comun.status_code == 403
+        assert respuesta.status_code == 200 and "hits" in respuesta.json()
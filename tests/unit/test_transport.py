@@ -0,0 +1,99 @@
+"""
+Test de la capa de transporte
+=============================
+
+Verifica la configuración del pool compartido y que login/registro usan ese
+pool en lugar de crear un cliente Supabase nuevo por llamada.
+"""
+import ssl
+
+import httpx
+import pytest
+from app.config import database
+from app.config.settings import Settings, settings
+from app.config.transport import create_async_http_client
+from app.core.metrics import MetricsTransport
+from app.models.auth import UserLogin
+from app.services.auth_service import AuthService
+
+USER = {
+    "id": "2f1c7b3e-8d4a-4a57-9c1e-0f3b5d2a6e71",
+    "aud": "authenticated",
+    "role": "authenticated",
+    "email": "ganadero@example.com",
+    "app_metadata": {"provider": "email"},
+    "user_metadata": {},
+    "created_at": "2024-01-01T00:00:00Z"
+}
+
+
+@pytest.mark.unit
+class TestTransport:
+    """Tests del pool HTTP compartido"""
+
+    @pytest.mark.asyncio
+    async def test_cliente_asincrono_usa_configuracion_central(self):
+        client = create_async_http_client()
+        try:
+            assert isinstance(client._transport, MetricsTransport)
+            pool = client._transport._transport._pool
+            assert pool._max_connections == settings.db_pool_max_connections
+            assert pool._max_keepalive_connections == settings.db_pool_max_keepalive
+            assert pool._retries == settings.db_connect_retries
+            assert client.timeout.pool == settings.db_pool_timeout_seconds
+        finally:
+            await client.aclose()
+
+    @pytest.mark.asyncio
+    async def test_verifica_el_certificado_por_defecto(self):
+        assert Settings.model_fields["db_verify_ssl"].default is True
+        client = create_async_http_client()
+        try:
+            contexto = client._transport._transport._pool._ssl_context
+            assert contexto.verify_mode == ssl.CERT_REQUIRED and contexto.check_hostname
+        finally:
+            await client.aclose()
+
+    @pytest.mark.asyncio
+    async def test_login_reutiliza_el_pool(self):
+        peticiones = []
+
+        def handler(request):
+            peticiones.append(request)
+            return httpx.Response(200, json={
+                "access_token": "token", "token_type": "bearer", "expires_in": 3600,
+                "expires_at": 4102444800, "refresh_token": "refresh", "user": USER
+            })
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http:
+            service = AuthService(db_client=None, http_client=http)
+
+            async def perfil(user_id):
+                return {"id": user_id}
+
+            service.get_user_profile = perfil
+            for _ in range(2):
+                resultado = await service.login_user(UserLogin(email="ganadero@example.com", password="secreto123"))
+
+        assert resultado["perfil"] == {"id": USER["id"]}
+        assert len(peticiones) == 2
+        assert all(p.url.path == "/auth/v1/token" for p in peticiones)
+        assert peticiones[0].headers["apikey"] == settings.supabase_anon_key
+
+    @pytest.mark.asyncio
+    async def test_cierre_solo_de_clientes_creados(self, monkeypatch):
+        creados = []
+
+        def fabrica():
+            creados.append(httpx.AsyncClient())
+            return creados[-1]
+
+        monkeypatch.setattr(database, "async_http_client", database.LazyClient("prueba", fabrica))
+        monkeypatch.setattr(database, "http_client", database.LazyClient("prueba_sync", httpx.Client))
+
+        await database.close_clients()
+        assert creados == []
+
+        database.async_http_client.get_instance()
+        await database.close_clients()
+        assert creados[0].is_closed